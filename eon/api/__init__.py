@@ -152,3 +152,27 @@ def load_query_params(kw, validator):
         LOG.exception(e.message)
         raise e
     return {k: kw.get(k) for k in res_const.API_FILTER_KEYS}
+
+
+def load_pagination_params(kw):
+    """Helper function for loading pagination query params
+    :param kw: a dict of validated query params
+    :return: A dict of limit, marker, sort_key and sort_dir. The limit
+        is capped at CONF.api.max_limit, which is also the limit of a page
+        requested with a marker only. Without limit and marker the limit
+        is None and the whole collection is returned.
+    """
+    kw = kw or dict()
+    limit = kw.get(res_const.LIMIT_KEY)
+    if limit:
+        limit = min(int(limit), CONF.api.max_limit)
+    elif kw.get(res_const.MARKER_KEY):
+        limit = CONF.api.max_limit
+    else:
+        limit = None
+    return {res_const.LIMIT_KEY: limit,
+            res_const.MARKER_KEY: kw.get(res_const.MARKER_KEY),
+            res_const.SORT_KEY: (kw.get(res_const.SORT_KEY) or
+                                 res_const.DEFAULT_SORT_KEY),
+            res_const.SORT_DIR_KEY: (kw.get(res_const.SORT_DIR_KEY) or
+                                     res_const.DEFAULT_SORT_DIR)}
@@ -15,6 +15,8 @@
 #.
 
 import pecan
+import urllib
+
 from wsme import types as wtypes
 
 from eon.api.controllers import base
@@ -32,6 +34,36 @@ def build_url(resource, resource_args, bookmark=False, base_url=None):
     return template % {'url': base_url, 'res': resource, 'args': resource_args}
 
 
+def get_next(collection, limit, url, resource, **kwargs):
+    """Return a link to the next page of a paginated collection.
+
+    :param collection: the current page, a list of dicts with an 'id'
+    :param limit: the page size the current page was fetched with, None
+        when the collection was not paginated
+    :param url: the base url of the API
+    :param resource: the collection resource, e.g. 'resources'
+    :param kwargs: the remaining query params to carry over to the next page
+    :return: a Link, or None when the collection holds the last page
+    """
+    if limit is None or len(collection) < limit:
+        return None
+    kwargs['limit'] = limit
+    kwargs['marker'] = collection[-1]['id']
+    q_args = urllib.urlencode(sorted((key, value)
+                                     for key, value in kwargs.items()
+                                     if value is not None))
+    return Link.make_link('next', url, 'v2', '%s?%s' % (resource, q_args),
+                          bookmark=True)
+
+
+def set_next_link_header(response, next_link):
+    """Advertise the next page of a collection in the response
+    Link header, keeping the response body a plain list."""
+    if next_link:
+        response.headers['Link'] = '<%s>; rel="%s"' % (next_link.href,
+                                                        next_link.rel)
+
+
 class Link(base.APIBase):
     """A link representation."""
 
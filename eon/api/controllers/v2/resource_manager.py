@@ -19,6 +19,8 @@ from pecan import rest
 
 from eon import api
 from eon import validators
+from eon.api.controllers import link
+from eon.common.constants import ResourceManagerConstants as const
 
 RESOURCE_MANAGER = "resource_mgrs"
 
@@ -26,6 +28,8 @@ RESOURCE_MANAGER = "resource_mgrs"
 class ResourceManager(rest.RestController):
 
     # Version 1.0: initial version - CRUD APIs
+    _custom_actions = {'inventory_health': ['GET']}
+
     def __init__(self):
         self.validator = validators.ResourceManagerValidator()
 
@@ -33,7 +37,10 @@ class ResourceManager(rest.RestController):
     @api.handle_exceptions()
     def get_all(self, **kwargs):
         """Returns all the resource managers or
-        the filtered resource mgrs based on the query parameter
+        the filtered resource mgrs based on the query parameter.
+        The resource mgrs are paginated by the limit, marker, sort_key and
+        sort_dir query parameters; the next page, if any, is advertised in
+        the Link response header.
         :param: keyword arguments for querying
         :return [
                     {"1": "b",
@@ -49,8 +56,16 @@ class ResourceManager(rest.RestController):
         """
         api.load_query_params(kwargs, self.validator.validate_get)
         type_ = kwargs.get("type")
-        return pecan.request.rpcapi_v2.get_all_resource_mgrs(
-            pecan.request.context, type_)
+        pagination = api.load_pagination_params(kwargs)
+        resource_mgrs = pecan.request.rpcapi_v2.get_all_resource_mgrs(
+            pecan.request.context, type_, pagination)
+        next_link = link.get_next(resource_mgrs, pagination[const.LIMIT_KEY],
+                                  pecan.request.host_url, RESOURCE_MANAGER,
+                                  type=type_,
+                                  sort_key=pagination[const.SORT_KEY],
+                                  sort_dir=pagination[const.SORT_DIR_KEY])
+        link.set_next_link_header(pecan.response, next_link)
+        return resource_mgrs
 
     @pecan.expose('json')
     @api.handle_exceptions()
@@ -59,6 +74,31 @@ class ResourceManager(rest.RestController):
         return pecan.request.rpcapi_v2.get_resource_mgr(
             pecan.request.context, res_mgr_id)
 
+    @pecan.expose('json')
+    @api.handle_exceptions()
+    def inventory_health(self, **kwargs):
+        """Returns the health of the inventory cache of each registered
+        resource manager, optionally filtered by the type query parameter.
+        :return [
+                    {"id": "xyz",
+                     "type": "vcenter",
+                     "source": "vcenter",
+                     "monitoring": true,
+                     "objects": {"HostSystem": 20, ...},
+                     "version": "42",
+                     "update_age": 3.2,
+                     "poll_age": 0.5,
+                     "reconnects": 0,
+                     "initial_load_seconds": 1.8,
+                     "memory_bytes": 123456,
+                     ...
+                    }
+                ]
+        """
+        api.load_query_params(kwargs, self.validator.validate_get)
+        return pecan.request.rpcapi_v2.get_inventory_health(
+            pecan.request.context, kwargs.get("type"))
+
     @pecan.expose('json')
     @api.handle_exceptions()
     def post(self):
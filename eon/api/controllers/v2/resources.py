@@ -20,6 +20,7 @@ from pecan import rest
 
 from eon import api
 from eon import validators
+from eon.api.controllers import link
 from eon.api.controllers.v2 import resource_actions
 from eon.common import constants
 from eon.common import exception
@@ -36,6 +37,7 @@ class Resources(rest.RestController):
     deactivate = resource_actions.DectivateController()
     get_template = resource_actions.GetTemplateController()
     provision = resource_actions.ProvisionController()
+    _custom_actions = {'running_plays': ['GET']}
 
     def __init__(self):
         self.validator = validators.ResourceValidator()
@@ -45,7 +47,10 @@ class Resources(rest.RestController):
     @api.handle_exceptions()
     def get_all(self, **kwargs):
         """Returns all the resources or
-        the filtered resources based on the query parameter
+        the filtered resources based on the query parameter.
+        The resources are paginated by the limit, marker, sort_key and
+        sort_dir query parameters; the next page, if any, is advertised in
+        the Link response header.
         :param: keyword arguments for querying
         :return [
                     {"1": "b",
@@ -65,8 +70,18 @@ class Resources(rest.RestController):
             return [self.const.ESXCLUSTER, self.const.HLINUX, self.const.RHEL,
                     self.const.HYPERV]
 
-        return pecan.request.rpcapi_v2.get_all_resources(
-            pecan.request.context, filters)
+        pagination = api.load_pagination_params(kwargs)
+        resources = pecan.request.rpcapi_v2.get_all_resources(
+            pecan.request.context, filters, pagination)
+        next_link = link.get_next(resources,
+                                  pagination[self.const.LIMIT_KEY],
+                                  pecan.request.host_url, RESOURCES,
+                                  sort_key=pagination[self.const.SORT_KEY],
+                                  sort_dir=pagination[
+                                      self.const.SORT_DIR_KEY],
+                                  **filters)
+        link.set_next_link_header(pecan.response, next_link)
+        return resources
 
     @pecan.expose('json')
     @api.handle_exceptions()
@@ -84,6 +99,26 @@ class Resources(rest.RestController):
         return pecan.request.rpcapi_v2.get_resource(
             pecan.request.context, res_id)
 
+    @pecan.expose('json')
+    @api.handle_exceptions()
+    def running_plays(self):
+        """Returns the plays run by the conductor for the activations and
+        deactivations in progress, the longest running first. Each
+        conductor tracks its own plays, with several conductors only those
+        of the conductor the request reached are returned.
+        :return [
+                    {"pRef": "1504608791_5316",
+                     "name": "site",
+                     "elapsed": 412.5,
+                     "polls": 14,
+                     "next_poll": 38.2,
+                     "conductor": "deployer-ccp-c0-m1"
+                    }
+                ]
+        """
+        return pecan.request.rpcapi_v2.get_running_plays(
+            pecan.request.context)
+
     @pecan.expose('json')
     @api.handle_exceptions()
     def post(self):
@@ -27,9 +27,19 @@ class BaseConstants(object):
     USERNAME_KEY = "username"
     PORT_KEY = "port"
     RUN_PLAYBOOK_KEY = "run_playbook"
+    LIMIT_KEY = "limit"
+    MARKER_KEY = "marker"
+    SORT_KEY = "sort_key"
+    SORT_DIR_KEY = "sort_dir"
+    PAGINATION_KEYS = [LIMIT_KEY, MARKER_KEY, SORT_KEY, SORT_DIR_KEY]
+    DEFAULT_SORT_KEY = "id"
+    DEFAULT_SORT_DIR = "asc"
+    SUPPORTED_SORT_DIRS = ["asc", "desc"]
+    SUPPORTED_SORT_KEYS = ["id", NAME_KEY, TYPE_KEY, "created_at",
+                           "updated_at"]
     SUPPORTED_QUERY_PARAMS = [IP_ADDRESS_KEY,
                               NAME_KEY,
-                              TYPE_KEY]
+                              TYPE_KEY] + PAGINATION_KEYS
 
 
 class ResourceManagerConstants(BaseConstants):
@@ -75,7 +85,8 @@ class ResourceConstants(BaseConstants):
                               BaseConstants.TYPE_KEY,
                               LIST_SUPPORTED_TYPES,
                               STATE_KEY
-                              ]
+                              ] + BaseConstants.PAGINATION_KEYS
+    SUPPORTED_SORT_KEYS = BaseConstants.SUPPORTED_SORT_KEYS + [STATE_KEY]
     UPDATE_RES_ATTRS = [BaseConstants.NAME_KEY, BaseConstants.IP_ADDRESS_KEY,
                         BaseConstants.USERNAME_KEY, BaseConstants.PASSWORD_KEY,
                         BaseConstants.PORT_KEY, MAC_ADDR, ILO_IP, ILO_USER,
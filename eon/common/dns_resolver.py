@@ -0,0 +1,155 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+"""Caching resolver of the IP addresses/FQDNs given for resources and
+resource managers. The forward lookups go through eventlet's green DNS and
+the reverse lookups, which the green DNS answers from the name servers only,
+run in a native thread so that /etc/hosts is honoured. Either way a slow name
+server only blocks the calling green thread.
+"""
+
+import collections
+import socket
+import time
+
+import dns.exception
+import eventlet
+from eventlet import tpool
+from eventlet.support import greendns
+import netaddr
+from oslo_config import cfg
+
+import eon.openstack.common.log as logging
+
+CONF = cfg.CONF
+
+LOG = logging.getLogger(__name__)
+
+dns_opts = [
+    cfg.IntOpt('dns_cache_ttl', default=300,
+               help='Seconds a resolved IP address/FQDN is cached'),
+    cfg.IntOpt('dns_negative_cache_ttl', default=30,
+               help='Seconds an IP address/FQDN that could not be '
+                    'resolved is cached'),
+    cfg.IntOpt('dns_cache_size', default=1024,
+               help='Maximum number of IP addresses/FQDNs cached'),
+    cfg.FloatOpt('dns_lookup_timeout', default=5.0,
+                 help='Seconds after which an IP address/FQDN lookup is '
+                      'given up and treated as not resolvable'),
+    cfg.IntOpt('dns_bulk_resolve_workers', default=16,
+               help='Number of concurrent lookups of a bulk resolve'),
+]
+
+CONF.register_opts(dns_opts)
+
+_LOOKUP_ERRORS = (socket.error, dns.exception.DNSException)
+
+
+class AddressResolver(object):
+    """Resolves an IP address or FQDN into its addresses and host name,
+    caching the answers for ``ttl`` seconds and the failed lookups for
+    ``negative_ttl`` seconds.
+    """
+
+    def __init__(self, ttl, negative_ttl, timeout, max_size):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.max_size = max_size
+        self._cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, ip_or_name):
+        """Returns the resolved addresses followed by the host name, or
+        just ``ip_or_name`` when it could not be resolved.
+        """
+        entry = self._cache.get(ip_or_name)
+        if entry is not None and entry[0] > time.time():
+            self.hits += 1
+            return list(entry[1])
+        self.misses += 1
+        ipaddrlist = self._lookup(ip_or_name)
+        if ipaddrlist:
+            expires = time.time() + self.ttl
+        else:
+            ipaddrlist = [ip_or_name]
+            expires = time.time() + self.negative_ttl
+        self._cache.pop(ip_or_name, None)
+        self._cache[ip_or_name] = (expires, tuple(ipaddrlist))
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return list(ipaddrlist)
+
+    def resolve_many(self, ip_or_names):
+        """Resolves the IP addresses/FQDNs concurrently.
+
+        :return: a dict of each IP address/FQDN to its resolve() result
+        """
+        ip_or_names = list(set(ip_or_names))
+        pool = eventlet.GreenPool(CONF.dns_bulk_resolve_workers)
+        return dict(zip(ip_or_names, pool.imap(self.resolve, ip_or_names)))
+
+    def clear(self):
+        self._cache.clear()
+
+    def _lookup(self, ip_or_name):
+        """Looks up the address and its host name the way gethostbyaddr
+        does, returning an empty list when it fails or times out.
+        """
+        ipaddrlist = []
+        with eventlet.Timeout(self.timeout, False):
+            try:
+                if netaddr.valid_ipv4(ip_or_name) or \
+                        netaddr.valid_ipv6(ip_or_name):
+                    address = ip_or_name
+                else:
+                    address = self._forward_lookup(ip_or_name)
+                ipaddrlist = [address, self._reverse_lookup(address)]
+            except _LOOKUP_ERRORS as e:
+                LOG.info("Could not resolve %s", ip_or_name)
+                LOG.info(e)
+            return ipaddrlist
+        LOG.info("Timed out resolving %s", ip_or_name)
+        return []
+
+    @staticmethod
+    def _forward_lookup(name):
+        for family in (socket.AF_INET, socket.AF_INET6):
+            answer = greendns.resolve(name, family, raises=False)
+            if answer.rrset:
+                return answer.rrset[0].address
+        raise socket.gaierror(socket.EAI_NONAME,
+                              'No address associated with %s' % name)
+
+    @staticmethod
+    def _reverse_lookup(address):
+        # gethostbyaddr looks the address up as the system is configured,
+        # in the hosts file first
+        return tpool.execute(socket.gethostbyaddr, address)[0]
+
+
+_RESOLVER = None
+
+
+def get_resolver():
+    global _RESOLVER
+    if _RESOLVER is None:
+        _RESOLVER = AddressResolver(CONF.dns_cache_ttl,
+                                    CONF.dns_negative_cache_ttl,
+                                    CONF.dns_lookup_timeout,
+                                    CONF.dns_cache_size)
+    return _RESOLVER
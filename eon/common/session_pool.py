@@ -0,0 +1,285 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+"""Pools of the logged in vCenter sessions, shared by the inventory
+collectors (oslo.vmware) and the deployer (pyVmomi) instead of logging in
+for every operation.
+"""
+
+import atexit
+import contextlib
+import hashlib
+import threading
+import time
+
+from oslo_config import cfg
+
+import eon.openstack.common.log as logging
+
+CONF = cfg.CONF
+
+LOG = logging.getLogger(__name__)
+
+session_pool_opts = [
+    cfg.IntOpt('max_sessions_per_vcenter',
+               default=2,
+               help='Maximum number of sessions logged in to a vCenter by '
+                    'each of the oslo.vmware and pyVmomi clients, the '
+                    'concurrent operations share them'),
+    cfg.IntOpt('session_check_interval',
+               default=60,
+               help='Seconds after which a pooled vCenter session is '
+                    'checked to still be authenticated before it is used '
+                    'again'),
+]
+
+CONF.register_opts(session_pool_opts, 'vmware')
+
+OSLO_VMWARE = "oslo.vmware"
+PYVMOMI = "pyVmomi"
+
+
+class _PooledSession(object):
+    __slots__ = ("session", "users", "checked", "lock")
+
+    def __init__(self):
+        self.session = None
+        self.users = 0
+        self.checked = time.time()
+        # held while the session logs in or is checked
+        self.lock = threading.Lock()
+
+
+class SessionPool(object):
+    """Shares at most max_sessions sessions of a vCenter, handing out the
+    least used one and logging in another one while there are fewer than
+    max_sessions and all of them are used. A session not checked for
+    check_interval seconds is checked before it is handed out and
+    re-authenticated when it is no longer active. The sessions log in and
+    are checked outside of the lock of the pool, the users of the other
+    sessions do not wait for them.
+
+    :param connect: callable returning a new logged in session
+    :param is_active: callable(session) returning whether the session is
+        still authenticated
+    :param reconnect: callable(session) returning the re-authenticated
+        session, the same or a new object
+    :param disconnect: callable(session) logging the session out
+    """
+
+    def __init__(self, connect, is_active, reconnect, disconnect,
+                 max_sessions=None, check_interval=None):
+        self._connect = connect
+        self._is_active = is_active
+        self._reconnect = reconnect
+        self._disconnect = disconnect
+        self.max_sessions = max(1, max_sessions or
+                                CONF.vmware.max_sessions_per_vcenter)
+        if check_interval is None:
+            check_interval = CONF.vmware.session_check_interval
+        self.check_interval = check_interval
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Returns a session for a caller using it until it calls
+        release(session), it is counted as a user of the session until
+        then. The session is not to be logged out by the caller.
+        """
+        return self._acquire().session
+
+    def release(self, session):
+        """Stops counting the caller of get() as a user of session.
+        Returns whether the session is one of the pool.
+        """
+        with self._lock:
+            for pooled in self._sessions:
+                if pooled.session is session:
+                    pooled.users = max(0, pooled.users - 1)
+                    return True
+        return False
+
+    def reconnect(self, session):
+        """Re-authenticates session, found no longer active by one of its
+        users. Returns the re-authenticated session, or None when session
+        is not one of the pool.
+        """
+        with self._lock:
+            pooled = next((pooled for pooled in self._sessions
+                           if pooled.session is session), None)
+        if pooled is None:
+            return None
+        with pooled.lock:
+            # unless another user re-authenticated it meanwhile
+            if pooled.session is session:
+                pooled.session = self._reconnect(session)
+                pooled.checked = time.time()
+            return pooled.session
+
+    @contextlib.contextmanager
+    def session(self):
+        """Holds a session while in the context"""
+        pooled = self._acquire()
+        try:
+            yield pooled.session
+        finally:
+            self._release(pooled)
+
+    def _release(self, pooled):
+        with self._lock:
+            pooled.users = max(0, pooled.users - 1)
+
+    def _acquire(self):
+        while True:
+            with self._lock:
+                pooled = min(self._sessions, key=lambda s: s.users) \
+                    if self._sessions else None
+                if pooled is None or (pooled.users and
+                                      len(self._sessions) <
+                                      self.max_sessions):
+                    pooled = _PooledSession()
+                    pooled.lock.acquire()
+                    self._sessions.append(pooled)
+                    task = self._login
+                elif (time.time() - pooled.checked >= self.check_interval
+                      and pooled.lock.acquire(False)):
+                    task = self._check
+                else:
+                    task = None
+                pooled.users += 1
+            try:
+                if task is not None:
+                    try:
+                        task(pooled)
+                    finally:
+                        pooled.lock.release()
+                else:
+                    # logging in or checked by another user
+                    with pooled.lock:
+                        pass
+            except Exception:
+                self._release(pooled)
+                raise
+            if pooled.session is not None:
+                return pooled
+            # its login failed, the pool no longer has it
+            self._release(pooled)
+
+    def _login(self, pooled):
+        try:
+            pooled.session = self._connect()
+        except Exception:
+            with self._lock:
+                self._sessions.remove(pooled)
+            raise
+        pooled.checked = time.time()
+
+    def _check(self, pooled):
+        try:
+            active = self._is_active(pooled.session)
+        except Exception as e:
+            LOG.info("Failed to check the vCenter session, Error: %s" % e)
+            active = False
+        if not active:
+            LOG.info("Re-authenticating the inactive vCenter session")
+            pooled.session = self._reconnect(pooled.session)
+        pooled.checked = time.time()
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for pooled in sessions:
+            if pooled.session is None:
+                continue
+            try:
+                self._disconnect(pooled.session)
+            except Exception as e:
+                LOG.info("Failed to log out of the vCenter session, "
+                         "Error: %s" % e)
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _digest(password):
+    return hashlib.sha256(password or "").hexdigest()
+
+
+def get_pool(client, host, port, username, password, create_pool):
+    """Returns the session pool of the client (OSLO_VMWARE or PYVMOMI) for
+    the vCenter and user, calling create_pool() to create it when there is
+    none or when the password changed.
+    """
+    key = (client, host, int(port), username)
+    digest = _digest(password)
+    with _POOLS_LOCK:
+        entry = _POOLS.get(key)
+        stale = None
+        if entry is not None and entry[0] != digest:
+            stale = entry[1]
+            entry = None
+        if entry is None:
+            entry = _POOLS[key] = (digest, create_pool())
+    if stale is not None:
+        stale.close()
+    return entry[1]
+
+
+def _get_pools():
+    with _POOLS_LOCK:
+        return [pool for _, pool in _POOLS.values()]
+
+
+def release(session):
+    """Releases a session returned by the get() of one of the pools.
+    Returns False when none of the pools has the session, e.g. as they
+    were removed, it is then up to the caller to log it out.
+    """
+    for pool in _get_pools():
+        if pool.release(session):
+            return True
+    return False
+
+
+def reconnect(session):
+    """Re-authenticates a session returned by the get() of one of the
+    pools, see SessionPool.reconnect. Returns None when none of the pools
+    has the session.
+    """
+    for pool in _get_pools():
+        reconnected = pool.reconnect(session)
+        if reconnected is not None:
+            return reconnected
+    return None
+
+
+def remove_pools(host):
+    """Logs out of the pooled sessions of the vCenter"""
+    with _POOLS_LOCK:
+        keys = [key for key in _POOLS if key[1] == host]
+        pools = [_POOLS.pop(key)[1] for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+@atexit.register
+def close_pools():
+    with _POOLS_LOCK:
+        pools = [pool for _, pool in _POOLS.values()]
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
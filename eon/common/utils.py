@@ -15,16 +15,18 @@
 #
 
 import hashlib
+import netaddr
 import os
 import signal
-import socket as os_socket
 import six
 import subprocess
+import sys
 
 from oslo_config import cfg
 
 import eon.openstack.common.log as logging
 from eon.common.gettextutils import _
+from eon.common import dns_resolver
 from eon.common import exception
 
 
@@ -147,16 +149,55 @@ def get_hash(data):
     return hashlib.sha1(data).hexdigest()
 
 
+def deep_size(value, seen=None):
+    """Returns the bytes of value and of everything it references, the
+    objects already in seen (id to object) are not counted again.
+    """
+    if seen is None:
+        seen = {}
+    stack = [value]
+    size = 0
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        # keep the value referenced so that its id is not reused
+        seen[id(value)] = value
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            stack.extend(value)
+        stack.extend(getattr(value, "__dict__", {}).values())
+        for slot in getattr(type(value), "__slots__", ()):
+            stack.append(getattr(value, slot, None))
+    return size
+
+
 def get_addresses(ip_or_name):
-    ipaddrlist = []
+    """Returns the addresses and host name of the IP address/FQDN, or just
+    the IP address/FQDN when it could not be resolved. The answers are
+    cached, see eon.common.dns_resolver.
+    """
+    return dns_resolver.get_resolver().resolve(ip_or_name)
+
+
+def get_addresses_bulk(ip_or_names):
+    """Resolves many IP addresses/FQDNs concurrently, e.g. when a batch
+    of resources is registered.
+
+    :return: a dict of each IP address/FQDN to its get_addresses() result
+    """
+    return dns_resolver.get_resolver().resolve_many(ip_or_names)
+
+
+def normalize_address(address):
+    """Returns the canonical form of an IP address, or the lower-cased
+    host name without the trailing dot.
+    """
+    address = address.strip().lower().rstrip('.')
     try:
-        (hostname, aliaslist, ipaddrlist) = os_socket.gethostbyaddr(
-                                                            ip_or_name)
-        ipaddrlist.append(hostname)
-        return ipaddrlist
-    except Exception as e:
-        # Provided IP/FQDN is not resolvable
-        LOG.info("Could not resolve %s", ip_or_name)
-        LOG.info(e)
-        ipaddrlist.append(ip_or_name)
-    return ipaddrlist
+        return str(netaddr.IPAddress(address, flags=netaddr.INET_PTON))
+    except (netaddr.AddrFormatError, ValueError):
+        return address
@@ -19,7 +19,9 @@ import oslo_messaging as messaging
 from eventlet import greenpool
 from oslo_config import cfg
 
+import eon.db
 from eon.common import constants
+from eon.hlm_facade import play_poller
 from eon.virt import manager
 from eon.openstack.common import log
 from eon.openstack.common import periodic_task
@@ -29,8 +31,16 @@ LOG = log.getLogger(__name__)
 
 con_mgr_opts = [
     cfg.IntOpt("poll_resource_interval",
-               default=60,
-               help="auto-import resource refresh period."),
+               default=300,
+               help="auto-import resource refresh period. The resources "
+                    "are also imported as soon as the inventory change "
+                    "events of their resource managers are received, this "
+                    "full refresh reconciles the events missed."),
+    cfg.IntOpt("db_pool_stats_interval",
+               default=600,
+               help="Seconds between two logs of the DB connection pool "
+                    "statistics of the conductor, a negative value "
+                    "disables them."),
 ]
 
 cfg.CONF.register_opts(con_mgr_opts)
@@ -49,6 +59,7 @@ class ConductorManager(periodic_task.PeriodicTasks):
     def __init__(self, host, topic):
         super(ConductorManager, self).__init__()
         periodic_task.PeriodicTasks.__init__(self)
+        self.host = host
         self.topic = topic
         self._resource_mgr = manager.ResourceManager()
         self._resource = manager.Resource()
@@ -57,12 +68,18 @@ class ConductorManager(periodic_task.PeriodicTasks):
         # GreenPool of background workers for performing tasks async
         self._worker_pool = greenpool.GreenPool(size=CONF.rpc_thread_pool_size)
         self._resource_mgr.start(self.context)
+        for resource_mgr_type in self.AUTO_IMPORT_RESOURCE_MGRS:
+            self._resource_mgr.subscribe_inventory_events(self.context,
+                                                          resource_mgr_type)
 
-    def get_all_resource_mgrs(self, context, type_=None):
+    def get_all_resource_mgrs(self, context, type_=None, pagination=None):
         """
         @param type_: vcenter/scvmm/oneview
+        @param pagination: Dictionary with limit, marker, sort_key and
+            sort_dir
         """
-        eon_resource_mgr = self._resource_mgr.get_all(context, type_)
+        eon_resource_mgr = self._resource_mgr.get_all(context, type_,
+                                                      pagination=pagination)
         if not eon_resource_mgr:
             return []
 
@@ -78,6 +95,18 @@ class ConductorManager(periodic_task.PeriodicTasks):
     def create_resource_mgr(self, context, data):
         return self._resource_mgr.create(context=context, data=data)
 
+    def get_inventory_health(self, context, type_=None):
+        """
+        @param type_: vcenter/scvmm/oneview, all the types when None
+        """
+        return self._resource_mgr.get_inventory_health(context, type_=type_)
+
+    def get_db_pool_stats(self, context):
+        """Returns the statistics of the DB connection pool of this
+        conductor.
+        """
+        return eon.db.get_api().get_pool_stats()
+
     def periodic_tasks(self, context, raise_on_error=False):
         """Periodic tasks are run at pre-specified interval."""
         return self.run_periodic_tasks(context, raise_on_error=raise_on_error)
@@ -95,6 +124,11 @@ class ConductorManager(periodic_task.PeriodicTasks):
                                       context,
                                       resource_mgr_type)
 
+    @periodic_task.periodic_task(spacing=CONF.db_pool_stats_interval)
+    def log_db_pool_stats(self, context):
+        LOG.info("DB connection pool statistics: %s"
+                 % self.get_db_pool_stats(context))
+
     def update_resource_mgr(self, context, id_, update_data):
         return self._resource_mgr.update(
             context=context, id_=id_, update_data=update_data)
@@ -102,18 +136,29 @@ class ConductorManager(periodic_task.PeriodicTasks):
     def delete_resource_mgr(self, context, id_):
         return self._resource_mgr.delete(context=context, id_=id_)
 
-    def get_all_resources(self, context, filters=None):
+    def get_all_resources(self, context, filters=None, pagination=None):
         """
         @param filters: Dictionary with resource type and state
             {"type": "<resource type>",
              "state": "<resource state>"}
+        @param pagination: Dictionary with limit, marker, sort_key and
+            sort_dir
         """
-        eon_resource = self._resource.get_all(context, filters=filters)
+        eon_resource = self._resource.get_all(context, filters=filters,
+                                              pagination=pagination)
         if not eon_resource:
             return []
 
         return eon_resource
 
+    def get_running_plays(self, context):
+        """Returns the plays the activations and deactivations of this
+        conductor wait for. The plays are tracked by each conductor, those
+        of the other conductors are not included.
+        """
+        return [dict(play, conductor=self.host)
+                for play in play_poller.get_running_plays()]
+
     def get_resource(self, context, id_, with_inventory):
         if with_inventory:
             return self._resource.get_with_inventory(context=context,
@@ -60,15 +60,24 @@ class ConductorAPI(object):
         self.client = rpc.get_client(target, version_cap=self.RPC_API_VERSION,
                                      serializer=serializer)
 
-    def get_all_resource_mgrs(self, context, type_):
+    def get_all_resource_mgrs(self, context, type_, pagination=None):
         cctxt = self.client.prepare(topic=self.topic)
-        return cctxt.call(context, 'get_all_resource_mgrs', type_=type_)
+        return cctxt.call(context, 'get_all_resource_mgrs', type_=type_,
+                          pagination=pagination)
 
     def get_resource_mgr(self, context, id_, with_inventory=True):
         cctxt = self.client.prepare(topic=self.topic)
         return cctxt.call(context, 'get_resource_mgr',
                           id_=id_, with_inventory=with_inventory)
 
+    def get_inventory_health(self, context, type_=None):
+        cctxt = self.client.prepare(topic=self.topic)
+        return cctxt.call(context, 'get_inventory_health', type_=type_)
+
+    def get_db_pool_stats(self, context):
+        cctxt = self.client.prepare(topic=self.topic)
+        return cctxt.call(context, 'get_db_pool_stats')
+
     def create_resource_mgr(self, context, data):
         cctxt = self.client.prepare(topic=self.topic, timeout=300)
         return cctxt.call(context, 'create_resource_mgr', data=data)
@@ -82,9 +91,14 @@ class ConductorAPI(object):
         cctxt = self.client.prepare(topic=self.topic)
         return cctxt.call(context, 'delete_resource_mgr', id_=id_)
 
-    def get_all_resources(self, context, filters):
+    def get_all_resources(self, context, filters, pagination=None):
+        cctxt = self.client.prepare(topic=self.topic)
+        return cctxt.call(context, 'get_all_resources', filters=filters,
+                          pagination=pagination)
+
+    def get_running_plays(self, context):
         cctxt = self.client.prepare(topic=self.topic)
-        return cctxt.call(context, 'get_all_resources', filters=filters)
+        return cctxt.call(context, 'get_running_plays')
 
     def get_resource(self, context, id_, with_inventory=True):
         cctxt = self.client.prepare(topic=self.topic)
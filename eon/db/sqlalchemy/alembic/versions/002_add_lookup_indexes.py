@@ -0,0 +1,90 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#.
+
+"""Add composite indexes for the resource and property lookups
+Revision ID: 5b1f7e3c9a42
+Revises: 2ac322d60ab1
+Create Date: 2026-10-18 10:12:41.506221
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5b1f7e3c9a42'
+down_revision = '2ac322d60ab1'
+
+# (table, index name, columns) matching the filters of get_properties,
+# get_resource_mgr_properties and _get_all in eon.db.sqlalchemy.api
+INDEXES = [
+    ("resource_manager", "ix_resource_manager_type_deleted",
+     ["type", "deleted"]),
+    ("resource", "ix_resource_type_state_deleted",
+     ["type", "state", "deleted"]),
+    ("resource", "ix_resource_resource_mgr_id_state_deleted",
+     ["resource_mgr_id", "state", "deleted"]),
+    ("resource", "ix_resource_name_deleted",
+     ["name", "deleted"]),
+    ("properties", "ix_properties_parent_id_deleted",
+     ["parent_id", "deleted"]),
+    ("resource_mgr_properties",
+     "ix_resource_mgr_properties_parent_id_deleted",
+     ["parent_id", "deleted"]),
+]
+
+# Foreign key columns. MySQL silently drops the implicit index it created
+# for a foreign key once another index leads with the same column.
+FOREIGN_KEY_COLUMNS = {
+    "resource": "resource_mgr_id",
+    "properties": "parent_id",
+    "resource_mgr_properties": "parent_id",
+}
+
+
+def upgrade():
+    """Create the lookup indexes
+
+    Databases created from the current models by the initial migration
+    already have them, so only the missing ones are created.
+    """
+    for table, name, columns in INDEXES:
+        if name not in _get_index_names(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    """Drop the lookup indexes
+
+    On MySQL the foreign key index is restored first, otherwise the
+    composite index that replaced it cannot be dropped.
+    """
+    is_mysql = op.get_bind().dialect.name == 'mysql'
+    for table, name, columns in INDEXES:
+        index_names = _get_index_names(table)
+        if name not in index_names:
+            continue
+        fk_column = FOREIGN_KEY_COLUMNS.get(table)
+        if (is_mysql and columns[0] == fk_column and
+                fk_column not in index_names):
+            op.create_index(fk_column, table, [fk_column])
+        op.drop_index(name, table_name=table)
+
+
+def _get_index_names(table):
+    inspector = sa.inspect(op.get_bind())
+    return [index['name'] for index in inspector.get_indexes(table)]
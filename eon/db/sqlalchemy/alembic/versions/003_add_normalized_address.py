@@ -0,0 +1,76 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#.
+
+"""Add the normalized address column for the duplicate checks
+Revision ID: 7d3e0a4f1b86
+Revises: 5b1f7e3c9a42
+Create Date: 2026-10-18 13:02:17.340958
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '7d3e0a4f1b86'
+down_revision = '5b1f7e3c9a42'
+
+TABLES = ['resource_manager', 'resource']
+COLUMN = 'normalized_address'
+ADDRESS_COLUMNS = ['ip_address', COLUMN]
+
+
+def _index_name(table, column):
+    return 'ix_%s_%s_deleted' % (table, column)
+
+
+def upgrade():
+    """Add and backfill the normalized address column and index the
+    address columns
+
+    Databases created from the current models by the initial migration
+    already have them. The existing rows are backfilled with the
+    lower-cased ip_address, as no name resolution is done here; the
+    column is refreshed on the next update of the address.
+    """
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        columns = [column['name'] for column in inspector.get_columns(table)]
+        if COLUMN not in columns:
+            op.add_column(table, sa.Column(COLUMN, sa.String(255)))
+            table_ref = sa.sql.table(table,
+                                     sa.sql.column('ip_address'),
+                                     sa.sql.column(COLUMN))
+            op.execute(table_ref.update().
+                       where(table_ref.c.ip_address != 'UNSET').
+                       values({COLUMN: sa.func.lower(
+                           table_ref.c.ip_address)}))
+        index_names = [index['name']
+                       for index in inspector.get_indexes(table)]
+        for column in ADDRESS_COLUMNS:
+            name = _index_name(table, column)
+            if name not in index_names:
+                op.create_index(name, table, [column, 'deleted'])
+
+
+def downgrade():
+    """Drop the address indexes and the normalized address column"""
+    for table in TABLES:
+        for column in ADDRESS_COLUMNS:
+            op.drop_index(_index_name(table, column), table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(COLUMN)
@@ -14,21 +14,35 @@
 # under the License.
 #.
 
+import itertools
 import logging
+import threading
 import time
+import weakref
 
 from oslo_config import cfg
+from oslo_db import exception as db_exception
+from oslo_db.sqlalchemy import utils as db_utils
 import sqlalchemy
 from eon.common.gettextutils import _
 import eon.common.log as os_logging
 import sqlalchemy.orm as sa_orm
+from sqlalchemy import pool as sa_pool
 
 from eon.common import exception
 from eon.db.sqlalchemy import models
+from eon.openstack.common import uuidutils
 
 
 _ENGINE = None
 _MAKER = None
+# transactional session makers keyed by (autocommit, expire_on_commit)
+_TRANSACTIONAL_MAKERS = {}
+# row caches invalidated by every write, see register_row_cache
+_ROW_CACHES = weakref.WeakSet()
+PROPERTY_TABLES = ('properties', 'resource_mgr_properties')
+# invalidation key of a write which may have removed any cached row
+ALL_ROWS = ('*', None)
 _MAX_RETRIES = None
 _RETRY_INTERVAL = None
 BASE = models.Base
@@ -39,6 +53,8 @@ LOG = os_logging.getLogger(__name__)
 STATUSES = ['active', 'saving', 'queued', 'killed', 'pending_delete',
             'deleted']
 
+PAGINATION_KEYS = ('limit', 'marker', 'sort_key', 'sort_dir')
+
 db_opts = [
     cfg.IntOpt('sql_idle_timeout', default=3600,
                help=(_('Period in seconds after which SQLAlchemy should '
@@ -52,6 +68,18 @@ db_opts = [
     cfg.BoolOpt('db_auto_create', default=False,
                 help=(_('A boolean that determines if the database will be '
                         'automatically created.'))),
+    cfg.IntOpt('sql_max_pool_size', default=10,
+               help=(_('Maximum number of SQL connections to keep open in '
+                       'the pool.'))),
+    cfg.IntOpt('sql_max_overflow', default=20,
+               help=(_('Number of connections that can be opened beyond '
+                       'sql_max_pool_size when the pool is exhausted.'))),
+    cfg.IntOpt('sql_pool_timeout', default=30,
+               help=(_('The amount of time to wait (in seconds) for a '
+                       'connection from the pool before giving up.'))),
+    cfg.BoolOpt('sql_pool_pre_ping', default=True,
+                help=(_('Test connections for liveness when they are '
+                        'checked out of the pool.'))),
 ]
 
 CONF = cfg.CONF
@@ -127,15 +155,25 @@ def get_engine():
         _RETRY_INTERVAL
 
     if not _ENGINE:
-        sqlalchemy.engine.url.make_url(_CONNECTION)
+        url = sqlalchemy.engine.url.make_url(_CONNECTION)
 
         engine_args = {
             'pool_recycle': _IDLE_TIMEOUT,
+            'pool_pre_ping': CONF.sql_pool_pre_ping,
             'echo': False,
             'convert_unicode': True}
+        # SQLite uses a NullPool or a SingletonThreadPool, which cannot be
+        # sized.
+        if not url.drivername.startswith('sqlite'):
+            engine_args.update({
+                'poolclass': _TimedQueuePool,
+                'pool_size': CONF.sql_max_pool_size,
+                'max_overflow': CONF.sql_max_overflow,
+                'pool_timeout': CONF.sql_pool_timeout})
 
         try:
             _ENGINE = sqlalchemy.create_engine(_CONNECTION, **engine_args)
+            _register_pool_listeners(_ENGINE)
             _ENGINE.connect = _wrap_db_error(_ENGINE.connect)
             _ENGINE.connect()
         except Exception as err:
@@ -157,16 +195,177 @@ def _get_maker(autocommit=True, expire_on_commit=False, transactional=False):
     global _MAKER, _ENGINE
     assert _ENGINE
     if transactional:
-        return sa_orm.sessionmaker(bind=_ENGINE,
-                                   autocommit=autocommit,
-                                   expire_on_commit=expire_on_commit)
+        key = (autocommit, expire_on_commit)
+        if key not in _TRANSACTIONAL_MAKERS:
+            _TRANSACTIONAL_MAKERS[key] = _make_sessionmaker(autocommit,
+                                                            expire_on_commit)
+        return _TRANSACTIONAL_MAKERS[key]
     if not _MAKER:
-        _MAKER = sa_orm.sessionmaker(bind=_ENGINE,
-                                     autocommit=autocommit,
-                                     expire_on_commit=expire_on_commit)
+        _MAKER = _make_sessionmaker(autocommit, expire_on_commit)
     return _MAKER
 
 
+def _make_sessionmaker(autocommit, expire_on_commit):
+    maker = sa_orm.sessionmaker(bind=_ENGINE,
+                                autocommit=autocommit,
+                                expire_on_commit=expire_on_commit)
+    sqlalchemy.event.listen(maker, 'after_flush', _after_flush)
+    sqlalchemy.event.listen(maker, 'after_commit', _after_transaction_end)
+    sqlalchemy.event.listen(maker, 'after_rollback', _after_transaction_end)
+    return maker
+
+
+def register_row_cache(cache):
+    """Register a cache of resource, resource manager and property rows
+    to be invalidated by every write made through the DB API
+
+    :param cache: object with invalidate(keys) and clear() methods, keys
+     being a set of (table name, id) tuples. The id is the parent_id for
+     the property tables. clear() is called when a resource manager is
+     deleted, as its resources are removed by a cascading delete. Only a
+     weak reference to the cache is kept.
+    """
+    _ROW_CACHES.add(cache)
+
+
+def _invalidate_row_caches(keys):
+    for cache in list(_ROW_CACHES):
+        if ALL_ROWS in keys:
+            cache.clear()
+        else:
+            cache.invalidate(keys)
+
+
+def _record_writes(session, keys):
+    """Invalidate the cached rows written in session now and again when
+    its transaction ends, as the previously committed rows may be cached
+    again in between.
+    """
+    if keys:
+        session.info.setdefault('written_rows', set()).update(keys)
+        _invalidate_row_caches(keys)
+
+
+def _row_keys(instance, deleted=False):
+    table = instance.__tablename__
+    if table in PROPERTY_TABLES:
+        return [(table, instance.parent_id)]
+    if deleted and table == 'resource_manager':
+        return [ALL_ROWS]
+    if deleted and table == 'resource':
+        # the properties are removed by a cascading delete
+        return [(table, instance.id), ('properties', instance.id)]
+    return [(table, instance.id)]
+
+
+def _after_flush(session, flush_context):
+    keys = set()
+    for instance in itertools.chain(session.new, session.dirty):
+        keys.update(_row_keys(instance))
+    for instance in session.deleted:
+        keys.update(_row_keys(instance, deleted=True))
+    _record_writes(session, keys)
+
+
+def _after_transaction_end(session):
+    keys = session.info.pop('written_rows', None)
+    if keys:
+        _invalidate_row_caches(keys)
+
+
+class _PoolStats(object):
+    """Connection pool checkout and wait statistics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.timeouts = 0
+            self.waits = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def incr(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, wait):
+        with self._lock:
+            self.waits += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'timeouts': self.timeouts,
+                'avg_wait': (self.total_wait / self.waits
+                             if self.waits else 0.0),
+                'max_wait': self.max_wait,
+            }
+
+
+_POOL_STATS = _PoolStats()
+
+
+class _TimedQueuePool(sa_pool.QueuePool):
+    """QueuePool which records how long callers wait for a connection"""
+
+    def _do_get(self):
+        start = time.time()
+        try:
+            return super(_TimedQueuePool, self)._do_get()
+        except sqlalchemy.exc.TimeoutError:
+            _POOL_STATS.incr('timeouts')
+            LOG.warning("Timed out waiting for a DB connection, pool "
+                        "status: %s", self.status())
+            raise
+        finally:
+            _POOL_STATS.record_wait(time.time() - start)
+
+
+def _register_pool_listeners(engine):
+    def _on_connect(dbapi_conn, conn_record):
+        _POOL_STATS.incr('connects')
+
+    def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+        _POOL_STATS.incr('checkouts')
+
+    def _on_checkin(dbapi_conn, conn_record):
+        _POOL_STATS.incr('checkins')
+
+    sqlalchemy.event.listen(engine, 'connect', _on_connect)
+    sqlalchemy.event.listen(engine, 'checkout', _on_checkout)
+    sqlalchemy.event.listen(engine, 'checkin', _on_checkin)
+
+
+def get_pool_stats():
+    """Return the connection pool statistics
+
+    :return: dict with the connect, checkout, checkin and timeout counters,
+     the average and maximum time (in seconds) spent waiting for a
+     connection and, for a sized pool, its current size, checked out
+     connections and overflow.
+    """
+    stats = _POOL_STATS.as_dict()
+    pool = _ENGINE.pool if _ENGINE else None
+    if isinstance(pool, sa_pool.QueuePool):
+        stats.update({
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+        })
+    return stats
+
+
 def _is_db_connection_error(args):
     """Return True if error in connecting to db."""
     # NOTE(adam_g): This is currently MySQL specific and needs to be extended
@@ -219,7 +418,7 @@ def handle_db_exception(fn):
                 raise e
         except (sa_orm.exc.NoResultFound, exception.NotFound,
                 exception.Duplicate,
-                exception.InvalidOperation,
+                exception.Invalid,
                 exception.DatabaseMigrationError) as e:
             raise e
         except Exception as e:
@@ -240,12 +439,27 @@ def get_all_resource_managers(context, session=None, **kwargs):
          'type' : 'vcenter',
          'name' : 'vcenter-1',
         }
+     The result can be paginated with the optional limit, marker, sort_key
+     and sort_dir fields, see _paginate_query.
     :return: List of resource_manger objects
     """
     session = session or _get_session()
     return _get_all(context, session, models.ResourceManager, **kwargs)
 
 
+@handle_db_exception
+def get_resource_managers_by_addresses(context, addresses, session=None):
+    """Get the Resource Managers registered with any of the addresses
+
+    :param addresses: IP addresses or host names, matched against both the
+     ip_address and normalized_address columns
+    :return: List of resource_manager objects
+    """
+    session = session or _get_session()
+    return _get_all_by_addresses(context, session, models.ResourceManager,
+                                 addresses)
+
+
 def get_resource_manager(context, _id, session=None):
     """Get a Resource Manager from resource_manager table
 
@@ -319,6 +533,8 @@ def get_all_resources(context, session=None, **kwargs):
          'state': 'imported',
          'resource_mgr_id': '305ff8ea-15ee-4401-ab1e-ff12623986de'
         }
+     The result can be paginated with the optional limit, marker, sort_key
+     and sort_dir fields, see _paginate_query.
     :return: List of resource objects
     """
     session = session or _get_session()
@@ -335,6 +551,19 @@ def get_resource(context, _id, session=None):
     return _get(context, _id, session, models.Resource)
 
 
+@handle_db_exception
+def get_resources_by_addresses(context, addresses, session=None):
+    """Get the Resources registered with any of the addresses
+
+    :param addresses: IP addresses or host names, matched against both the
+     ip_address and normalized_address columns
+    :return: List of resource objects
+    """
+    session = session or _get_session()
+    return _get_all_by_addresses(context, session, models.Resource,
+                                 addresses)
+
+
 @handle_db_exception
 def get_resource_managers_by_resource_id(context, _id, session=None):
     """Get a Resource Mgr from resource Mgr table
@@ -404,6 +633,31 @@ def update_resource(context, _id, values, session=None):
     return _update(context, _id, values, session, models.Resource)
 
 
+@handle_db_exception
+def update_resource_state(context, _id, expected_states, new_state,
+                          values=None, session=None):
+    """Move a Resource from one of the expected states to a new state with
+    a single conditional UPDATE
+
+    :param _id: ID of the Resource
+    :param expected_states: states the Resource is allowed to be in
+    :param new_state: state to move the Resource to
+    :param values: other fields of the Resource to update along with
+        the state
+    :return: True if the Resource was moved, False if it was not in one
+        of the expected states or does not exist
+    """
+    values = dict(values or {}, state=new_state)
+    session = session or _get_session()
+    with session.begin(subtransactions=True):
+        _record_writes(session, [('resource', _id)])
+        updated = (session.query(models.Resource).
+                   filter_by(id=_id, deleted=False).
+                   filter(models.Resource.state.in_(expected_states)).
+                   update(values, synchronize_session=False))
+    return updated == 1
+
+
 def delete_resource(context, _id, session=None):
     """Delete a Resource from resource table
 
@@ -414,6 +668,79 @@ def delete_resource(context, _id, session=None):
     return _delete(context, _id, session, models.Resource)
 
 
+@handle_db_exception
+def get_resources_with_properties(context, session=None, **kwargs):
+    """Get Resources along with their properties using a single joined
+    query
+
+    :param kwargs: Optional fields to filter the Resources, same as
+     get_all_resources
+    :return: Tuple of the list of resource objects and a dictionary of
+     property object lists keyed by resource ID. Every returned Resource
+     is present in the dictionary, with an empty list when it has no
+     properties
+    """
+    session = session or _get_session()
+    filters = _get_filters(models.Resource, **kwargs)
+    with session.begin(subtransactions=True):
+        query = (session.query(models.Resource, models.Properties).
+                 outerjoin(models.Properties,
+                           sqlalchemy.and_(
+                               models.Properties.parent_id ==
+                               models.Resource.id,
+                               models.Properties.deleted == False)).  # noqa
+                 filter(*filters).
+                 filter(models.Resource.deleted == False))  # noqa
+        resources = []
+        props = {}
+        for resource, prop in query.all():
+            if resource.id not in props:
+                resources.append(resource)
+                props[resource.id] = []
+            if prop is not None:
+                props[resource.id].append(prop)
+    return resources, props
+
+
+@handle_db_exception
+def create_resources(context, values_list, session=None):
+    """Create Resources in resource table with a single multi-row insert
+
+    :param values_list: List of dictionaries to persist in the resource
+     table, see create_resource
+    :return: List of dicts of the created resources, including their
+     generated IDs. The rows are not read back from the DB
+    """
+    session = session or _get_session()
+    rows = [dict(values, id=uuidutils.generate_uuid())
+            for values in values_list]
+    if rows:
+        with session.begin(subtransactions=True):
+            session.execute(models.Resource.__table__.insert(), rows)
+            _record_writes(session, set(('resource', row['id'])
+                                        for row in rows))
+    return rows
+
+
+@handle_db_exception
+def delete_resources(context, ids, session=None):
+    """Delete Resources from resource table with a single statement
+
+    :param ids: IDs of the Resources
+    :return: number of deleted resources
+    """
+    if not ids:
+        return 0
+    session = session or _get_session()
+    with session.begin(subtransactions=True):
+        _record_writes(session, set(
+            itertools.chain(*[[('resource', _id), ('properties', _id)]
+                              for _id in ids])))
+        return (session.query(models.Resource).
+                filter(models.Resource.id.in_(ids)).
+                delete(synchronize_session=False))
+
+
 @handle_db_exception
 def _get(context, _id, session, db_model):
     with session.begin(subtransactions=True):
@@ -429,24 +756,35 @@ def _get(context, _id, session, db_model):
             raise exception.NotFound(msg)
 
 
-@handle_db_exception
-def _get_all(context, session, db_model, **kwargs):
+def _get_filters(db_model, **kwargs):
     type_ = kwargs.get('type')
     name = kwargs.get('name')
     rsc_mgr_id = kwargs.get('resource_mgr_id')
     state = kwargs.get('state')
     filters = []
+    if type_:
+        filters.append(db_model.type == type_)
+    if name:
+        filters.append(db_model.name == name)
+    if rsc_mgr_id:
+        filters.append(db_model.resource_mgr_id == rsc_mgr_id)
+    if state:
+        filters.append(db_model.state == state)
+    return filters
+
+
+@handle_db_exception
+def _get_all(context, session, db_model, **kwargs):
+    filters = _get_filters(db_model, **kwargs)
     with session.begin(subtransactions=True):
-        if type_:
-            filters.append(db_model.type == type_)
-        if name:
-            filters.append(db_model.name == name)
-        if rsc_mgr_id:
-            filters.append(db_model.resource_mgr_id == rsc_mgr_id)
-        if state:
-            filters.append(db_model.state == state)
         query = (session.query(db_model).filter(*filters).
                  filter_by(deleted=False))
+        if any(kwargs.get(key) for key in PAGINATION_KEYS):
+            query = _paginate_query(context, session, db_model, query,
+                                    limit=kwargs.get('limit'),
+                                    marker=kwargs.get('marker'),
+                                    sort_key=kwargs.get('sort_key'),
+                                    sort_dir=kwargs.get('sort_dir'))
         instances = query.all()
         if len(instances) == 0:
             LOG.info("No %s found"
@@ -454,6 +792,46 @@ def _get_all(context, session, db_model, **kwargs):
         return instances
 
 
+@handle_db_exception
+def _get_all_by_addresses(context, session, db_model, addresses):
+    addresses = list(set(addresses))
+    if not addresses:
+        return []
+    with session.begin(subtransactions=True):
+        query = (session.query(db_model).
+                 filter(sqlalchemy.or_(
+                     db_model.ip_address.in_(addresses),
+                     db_model.normalized_address.in_(addresses))).
+                 filter_by(deleted=False))
+        return query.all()
+
+
+def _paginate_query(context, session, db_model, query, limit=None,
+                    marker=None, sort_key=None, sort_dir=None):
+    """Apply keyset pagination to a query
+
+    :param limit: maximum number of rows to return
+    :param marker: ID of the last row of the previous page. Only rows
+     sorted after it are returned
+    :param sort_key: column to sort on, 'id' is always used as the
+     final sort key so that the ordering is stable
+    :param sort_dir: 'asc' or 'desc'
+    :return: query with the ORDER BY, keyset predicates and LIMIT applied
+    """
+    sort_keys = [sort_key or 'id']
+    if 'id' not in sort_keys:
+        sort_keys.append('id')
+    marker_ref = None
+    if marker:
+        marker_ref = _get(context, marker, session, db_model)
+    try:
+        return db_utils.paginate_query(query, db_model, limit, sort_keys,
+                                       marker=marker_ref,
+                                       sort_dir=sort_dir or 'asc')
+    except db_exception.InvalidSortKey:
+        raise exception.InvalidSortKey()
+
+
 @handle_db_exception
 def _update(context, _id, values, session, db_model):
     with session.begin(subtransactions=True):
@@ -512,6 +890,58 @@ def get_properties(context, parent_id, key=None, session=None):
             raise exception.NotFound(msg)
 
 
+@handle_db_exception
+def get_properties_by_parent_ids(context, parent_ids, session=None):
+    """Get properties from the properties table for a set of Resources
+    in a single query
+
+    :param parent_ids: IDs of the Resources
+    :return: Dictionary of property object lists keyed by parent_id. Every
+     requested parent_id is present, with an empty list when the Resource
+     has no properties
+    """
+    parent_ids = set(parent_ids)
+    props = dict((parent_id, []) for parent_id in parent_ids)
+    if not parent_ids:
+        return props
+    session = session or _get_session()
+    with session.begin(subtransactions=True):
+        query = (session.query(models.Properties).
+                 filter(models.Properties.parent_id.in_(parent_ids)).
+                 filter_by(deleted=False))
+        for prop in query.all():
+            props[prop.parent_id].append(prop)
+    return props
+
+
+@handle_db_exception
+def create_properties(context, properties, session=None):
+    """Create properties in properties table for one or more Resources
+    with a single multi-row insert
+
+    :param properties: Dictionary of {key: value} dictionaries keyed by
+     the ID of the Resource
+    :return: List of dicts of the created properties. The rows are not
+     read back from the DB
+    """
+    session = session or _get_session()
+    return _insert_properties(session, models.Properties, properties)
+
+
+@handle_db_exception
+def upsert_properties(context, properties, session=None):
+    """Create or update properties in properties table for one or more
+    Resources. Existing keys are updated in place, the others are inserted.
+
+    :param properties: Dictionary of {key: value} dictionaries keyed by
+     the ID of the Resource
+    :return: List of dicts of the written properties. The rows are not
+     read back from the DB
+    """
+    session = session or _get_session()
+    return _upsert_properties(session, models.Properties, properties)
+
+
 def create_property(context, parent_id, key, value, session=None):
     """Create a property in properties table for a Resource
 
@@ -572,6 +1002,67 @@ def delete_property(context, parent_id, key=None, session=None):
             prop_ref.delete(session=session)
         return prop_refs
 
+
+def _insert_properties(session, model, properties):
+    """Insert the properties of model with one executemany statement.
+    IDs are generated here so that the rows need not be read back.
+    """
+    rows = [{'id': uuidutils.generate_uuid(),
+             'parent_id': parent_id,
+             'key': key,
+             'value': value}
+            for parent_id, props in properties.iteritems()
+            for key, value in props.iteritems()]
+    if rows:
+        with session.begin(subtransactions=True):
+            session.execute(model.__table__.insert(), rows)
+            _record_writes(session, set((model.__tablename__, parent_id)
+                                        for parent_id in properties))
+    return rows
+
+
+def _upsert_properties(session, model, properties):
+    """Update the existing keys of model in place and insert the others.
+    Uses one query for the existing keys and at most one executemany
+    statement each for the updates and the inserts.
+    """
+    properties = dict((parent_id, props)
+                      for parent_id, props in properties.iteritems() if props)
+    if not properties:
+        return []
+    table = model.__table__
+    keys = set(key for props in properties.itervalues() for key in props)
+    with session.begin(subtransactions=True):
+        query = (session.query(model.id, model.parent_id, model.key).
+                 filter(model.parent_id.in_(properties.keys())).
+                 filter(model.key.in_(keys)).
+                 filter_by(deleted=False))
+        existing = dict(((parent_id, key), _id)
+                        for _id, parent_id, key in query.all())
+        updated = []
+        inserts = {}
+        for parent_id, props in properties.iteritems():
+            for key, value in props.iteritems():
+                _id = existing.get((parent_id, key))
+                if _id:
+                    updated.append({'id': _id,
+                                    'parent_id': parent_id,
+                                    'key': key,
+                                    'value': value})
+                else:
+                    inserts.setdefault(parent_id, {})[key] = value
+        if updated:
+            _record_writes(session, set((model.__tablename__, row['parent_id'])
+                                        for row in updated))
+            session.execute(
+                table.update().
+                where(table.c.id == sqlalchemy.bindparam('_id')).
+                values(value=sqlalchemy.bindparam('_value')),
+                [{'_id': row['id'], '_value': row['value']}
+                 for row in updated])
+        rows = _insert_properties(session, model, inserts)
+    return updated + rows
+
 # Resource Manager Properties DB API methods
 
 
@@ -620,6 +1111,37 @@ def create_resource_mgr_property(context, parent_id, key, value, session=None):
                                     session=session)
 
 
+@handle_db_exception
+def create_resource_mgr_properties(context, properties, session=None):
+    """Create properties in properties table for one or more Resource
+    Managers with a single multi-row insert
+
+    :param properties: Dictionary of {key: value} dictionaries keyed by
+     the ID of the Resource Manager
+    :return: List of dicts of the created properties. The rows are not
+     read back from the DB
+    """
+    session = session or _get_session()
+    return _insert_properties(session, models.ResourceManagerProperties,
+                              properties)
+
+
+@handle_db_exception
+def upsert_resource_mgr_properties(context, properties, session=None):
+    """Create or update properties in properties table for one or more
+    Resource Managers. Existing keys are updated in place, the others are
+    inserted.
+
+    :param properties: Dictionary of {key: value} dictionaries keyed by
+     the ID of the Resource Manager
+    :return: List of dicts of the written properties. The rows are not
+     read back from the DB
+    """
+    session = session or _get_session()
+    return _upsert_properties(session, models.ResourceManagerProperties,
+                              properties)
+
+
 @handle_db_exception
 def _update_res_mgr_property(context, _id, parent_id, key,
                              value, session):
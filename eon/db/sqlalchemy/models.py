@@ -19,7 +19,7 @@ from oslo_db.sqlalchemy import models
 
 from sqlalchemy import Column, String, Text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, UniqueConstraint
 
 
 class EonBase(models.ModelBase, models.TimestampMixin, models.SoftDeleteMixin):
@@ -56,7 +56,12 @@ class ResourceManager(Base):
     """Represent a Resource manager"""
     __tablename__ = 'resource_manager'
     __table_args__ = (UniqueConstraint(
-        'name', 'deleted'), {})
+        'name', 'deleted'),
+        Index('ix_resource_manager_type_deleted', 'type', 'deleted'),
+        Index('ix_resource_manager_ip_address_deleted',
+              'ip_address', 'deleted'),
+        Index('ix_resource_manager_normalized_address_deleted',
+              'normalized_address', 'deleted'), {})
 
     id = Column(String(36), primary_key=True, default=uuidutils.generate_uuid)
     name = Column(String(255), nullable=False)
@@ -65,11 +70,22 @@ class ResourceManager(Base):
     password = Column(String(255), nullable=False)
     port = Column(String(255), nullable=False)
     type = Column(String(255), nullable=False)
+    # normalized resolved address, used for the duplicate checks
+    normalized_address = Column(String(255))
 
 
 class Resource(Base):
     """Represent a Resource"""
     __tablename__ = 'resource'
+    __table_args__ = (
+        Index('ix_resource_type_state_deleted', 'type', 'state', 'deleted'),
+        Index('ix_resource_resource_mgr_id_state_deleted',
+              'resource_mgr_id', 'state', 'deleted'),
+        Index('ix_resource_name_deleted', 'name', 'deleted'),
+        Index('ix_resource_ip_address_deleted', 'ip_address', 'deleted'),
+        Index('ix_resource_normalized_address_deleted',
+              'normalized_address', 'deleted'),
+        {'mysql_engine': 'InnoDB'})
 
     id = Column(String(36), primary_key=True, default=uuidutils.generate_uuid)
     name = Column(String(255), nullable=False)
@@ -83,6 +99,8 @@ class Resource(Base):
     type = Column(String(255), nullable=False)
     state = Column(String(255), nullable=False)
     port = Column(String(255), nullable=False)
+    # normalized resolved address, used for the duplicate checks
+    normalized_address = Column(String(255))
 
 
 class Properties(Base):
@@ -90,7 +108,9 @@ class Properties(Base):
      or HLM resources"""
     __tablename__ = 'properties'
     __table_args__ = (UniqueConstraint('id', name='uniq_properties0id'), {})
-    __table_args__ = (UniqueConstraint('key', 'parent_id'), {})
+    __table_args__ = (UniqueConstraint('key', 'parent_id'),
+                      Index('ix_properties_parent_id_deleted',
+                            'parent_id', 'deleted'), {})
 
     id = Column(String(36), primary_key=True, default=uuidutils.generate_uuid)
     parent_id = Column(String(255),
@@ -104,7 +124,9 @@ class ResourceManagerProperties(Base):
     """Represent a Property for Resource manager """
     __tablename__ = 'resource_mgr_properties'
     __table_args__ = (UniqueConstraint('id', name='uniq_properties0id'), {})
-    __table_args__ = (UniqueConstraint('key', 'parent_id'), {})
+    __table_args__ = (UniqueConstraint('key', 'parent_id'),
+                      Index('ix_resource_mgr_properties_parent_id_deleted',
+                            'parent_id', 'deleted'), {})
 
     id = Column(String(36), primary_key=True, default=uuidutils.generate_uuid)
     parent_id = Column(String(255),
@@ -31,12 +31,20 @@ class ProxyInstallerUtility(object):
                                                   vc['port'],
                                                   vc['username'],
                                                   vc['password'])
-        self.content = self.si.RetrieveContent()
-        self.dc = VMwareUtils.get_data_center(self.content,
-                                              vc['datacenter'])
-        self.vc = vc
-        self.network_adapter = NetworkAdapter(self.si,
-                                              self.dc['networkFolder'])
+        try:
+            self.content = self.si.RetrieveContent()
+            self.dc = VMwareUtils.get_data_center(self.content,
+                                                  vc['datacenter'])
+            self.vc = vc
+            self.network_adapter = NetworkAdapter(self.si,
+                                                  self.dc['networkFolder'])
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        """Releases the vCenter session"""
+        VMwareUtils.release_vcenter_session(self.si)
 
     def create_network_infrastructure(self):
         """
@@ -60,4 +68,8 @@ class ProxyInstallerUtility(object):
         """
         Wrapper method to clean up the DVS and PGs
         """
-        return Cleanup(data).teardown_network()
+        cleanup = Cleanup(data)
+        try:
+            return cleanup.teardown_network()
+        finally:
+            cleanup.close()
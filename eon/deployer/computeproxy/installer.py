@@ -34,45 +34,67 @@ class ProxyInstaller(basedriver.BaseDriver):
 
     def setup_network(self, data):
         proxy_utility = cp_utility.ProxyInstallerUtility(data)
-        return proxy_utility.create_network_infrastructure()
+        try:
+            return proxy_utility.create_network_infrastructure()
+        finally:
+            proxy_utility.close()
 
     def create(self, data):
         proxy_utility = cp_utility.ProxyInstallerUtility(data)
-        if CONF.network.esx_network_driver == constants.NOOP_NETWORK_DRIVER:
-            proxy_utility.configure_network_infrastructure()
+        try:
+            if (CONF.network.esx_network_driver ==
+                    constants.NOOP_NETWORK_DRIVER):
+                proxy_utility.configure_network_infrastructure()
+        finally:
+            proxy_utility.close()
         session = self._get_session(data)
-        proxy_vm_name = self._get_proxy_vm_name(data)
-        proxy_info = compute_proxy_vm.create_shell_vm(
-            session, proxy_vm_name, data)
-        return proxy_info
+        try:
+            proxy_vm_name = self._get_proxy_vm_name(data)
+            proxy_info = compute_proxy_vm.create_shell_vm(
+                session, proxy_vm_name, data)
+            return proxy_info
+        finally:
+            self._release_session(session)
 
     def get_info(self, data):
         session = self._get_session(data)
-        proxy_vm_name = self._get_proxy_vm_name(data)
-        conf_pg_name = self._get_conf_pg_name(data)
-        return compute_proxy_vm.get_shell_vm_info(
-            session, proxy_vm_name, conf_pg_name)
+        try:
+            proxy_vm_name = self._get_proxy_vm_name(data)
+            conf_pg_name = self._get_conf_pg_name(data)
+            return compute_proxy_vm.get_shell_vm_info(
+                session, proxy_vm_name, conf_pg_name)
+        finally:
+            self._release_session(session)
 
     def delete(self, data):
         session = self._get_session(data)
-        proxy_vm_name = self._get_proxy_vm_name(data)
-        conf_pg_name = self._get_conf_pg_name(data)
-        compute_proxy_vm.delete_shell_vm(session, proxy_vm_name,
-                                         conf_pg_name)
+        try:
+            proxy_vm_name = self._get_proxy_vm_name(data)
+            conf_pg_name = self._get_conf_pg_name(data)
+            compute_proxy_vm.delete_shell_vm(session, proxy_vm_name,
+                                             conf_pg_name)
+        finally:
+            self._release_session(session)
 
     def delete_template(self, data):
         session = self._get_session(data)
-        content = session.get('content')
-        template_name = self._get_template_name(data)
-        vm = content.rootFolder.find_by_name(template_name)
-        if not vm:
-            return
+        try:
+            content = session.get('content')
+            template_name = self._get_template_name(data)
+            vm = content.rootFolder.find_by_name(template_name)
+            if not vm:
+                return
 
-        compute_proxy_vm.delete_vm(vm, session['si'])
+            compute_proxy_vm.delete_vm(vm, session['si'])
+        finally:
+            self._release_session(session)
 
     def teardown_network(self, data):
         proxy_utility = cp_utility.ProxyInstallerUtility(data)
-        return proxy_utility.teardown_network(data)
+        try:
+            return proxy_utility.teardown_network(data)
+        finally:
+            proxy_utility.close()
 
     def _get_session(self, data):
         session = dict()
@@ -81,9 +103,16 @@ class ProxyInstaller(basedriver.BaseDriver):
             vc['ip_address'], vc['port'],
             vc['username'], vc['password'])
         session['si'] = si
-        session['content'] = si.RetrieveContent()
+        try:
+            session['content'] = si.RetrieveContent()
+        except Exception:
+            util.VMwareUtils.release_vcenter_session(si)
+            raise
         return session
 
+    def _release_session(self, session):
+        util.VMwareUtils.release_vcenter_session(session.get('si'))
+
     def _get_proxy_vm_name(self, data):
         vc = data.get("vcenter_configuration")
         cluster_name = vc.get("cluster")
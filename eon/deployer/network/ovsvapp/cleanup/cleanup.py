@@ -37,13 +37,22 @@ class Cleanup:
         service_instance = util.VMwareUtils.get_vcenter_session(
             vc['ip_address'], vc['port'], vc['username'], vc['password'])
         self.si = service_instance
-        self.content = service_instance.RetrieveContent()
-        dc = util.VMwareUtils.get_data_center(self.content, vc['datacenter'])
-        self.dc_name = dc['name']
-        self.network_folder = dc['networkFolder']
-        self.vm_folder = dc['vmFolder']
-        self.cluster = util.VMwareUtils.get_cluster(
-            self.content, dc['hostFolder'], vc['cluster_moid'])
+        try:
+            self.content = service_instance.RetrieveContent()
+            dc = util.VMwareUtils.get_data_center(self.content,
+                                                  vc['datacenter'])
+            self.dc_name = dc['name']
+            self.network_folder = dc['networkFolder']
+            self.vm_folder = dc['vmFolder']
+            self.cluster = util.VMwareUtils.get_cluster(
+                self.content, dc['hostFolder'], vc['cluster_moid'])
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        """Releases the vCenter session"""
+        util.VMwareUtils.release_vcenter_session(self.si)
 
     def _destroy_network_task(self, network):
         network_name = network.name
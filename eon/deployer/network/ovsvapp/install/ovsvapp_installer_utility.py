@@ -32,11 +32,19 @@ class OVSvAppInstallerUtility:
         vc = self.input_json.get('vcenter_configuration')
         self.si = VMwareUtils.get_vcenter_session(
             vc['ip_address'], vc['port'], vc['username'], vc['password'])
-        self.content = self.si.RetrieveContent()
-        self.dc = VMwareUtils.get_data_center(
-            self.content, vc['datacenter'])
+        try:
+            self.content = self.si.RetrieveContent()
+            self.dc = VMwareUtils.get_data_center(
+                self.content, vc['datacenter'])
+        except Exception:
+            self.close()
+            raise
         self.vc = vc
 
+    def close(self):
+        """Releases the vCenter session"""
+        VMwareUtils.release_vcenter_session(self.si)
+
     def setup_network(self):
         ValidateInputs(self.input_json).validate_inputs(True)
         network_adapter = NetworkAdapter(self.si, self.dc['networkFolder'])
@@ -74,7 +82,11 @@ class OVSvAppInstallerUtility:
             if not is_new_hosts:
                 LOG.info("Invoking cleanup script due to the error that "
                          "occurred previously.")
-                Cleanup(self.input_json).unimport_cluster()
+                cleanup = Cleanup(self.input_json)
+                try:
+                    cleanup.unimport_cluster()
+                finally:
+                    cleanup.close()
             raise ex
         except exception.OVSvAppValidationError as ev:
             LOG.exception(ev)
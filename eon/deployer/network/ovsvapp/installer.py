@@ -33,17 +33,22 @@ class OvsvappInstaller(basedriver.BaseDriver):
 
     def create(self, data):
         payload = self._ovsvapp_input(data)
-        output_json = (OVSvAppInstallerUtility(payload).
-                       invoke_ovsvapp_installer())
-        return output_json
+        installer_utility = OVSvAppInstallerUtility(payload)
+        try:
+            return installer_utility.invoke_ovsvapp_installer()
+        finally:
+            installer_utility.close()
 
     def get_info(self, data):
         pass
 
     def delete(self, data):
         payload = self._ovsvapp_input(data)
-        output_json = Cleanup(payload).unimport_cluster()
-        return output_json
+        cleanup = Cleanup(payload)
+        try:
+            return cleanup.unimport_cluster()
+        finally:
+            cleanup.close()
 
     def update(self, data):
         move_host.move_host_back_to_cluster(data)
@@ -56,7 +61,11 @@ class OvsvappInstaller(basedriver.BaseDriver):
         :return: True is success else False
         """
         payload = self._ovsvapp_input(data)
-        return OVSvAppInstallerUtility(payload).setup_network()
+        installer_utility = OVSvAppInstallerUtility(payload)
+        try:
+            return installer_utility.setup_network()
+        finally:
+            installer_utility.close()
 
     def teardown_network(self, data):
         """
@@ -65,7 +74,11 @@ class OvsvappInstaller(basedriver.BaseDriver):
         :return: True is success else False
         """
         payload = self._ovsvapp_input(data)
-        return Cleanup(payload).teardown_network()
+        cleanup = Cleanup(payload)
+        try:
+            return cleanup.teardown_network()
+        finally:
+            cleanup.close()
 
     def _ovsvapp_input(self, data):
         """
@@ -14,7 +14,6 @@
 # under the License.
 #
 
-import atexit
 import base64
 import json
 import os
@@ -34,6 +33,7 @@ import requests.packages.urllib3 as urllib3
 
 from eon import deployer
 from eon.common import exception
+from eon.common import session_pool
 import eon.common.log as logging
 from eon.deployer import constants
 
@@ -107,34 +107,24 @@ class VMwareUtils:
     def get_vcenter_session(vcenter_host, vcenter_port, vcenter_user,
                             vcenter_pwd):
         """
-        Connect to Vcenter Server with specified credentials
+        Get a pooled session of the Vcenter Server with specified
+        credentials, logging in when there is none. It is released with
+        release_vcenter_session once used.
         @return: Service Instance
         """
+        def _connect(si=None):
+            return VMwareUtils._connect(vcenter_host, vcenter_port,
+                                        vcenter_user, vcenter_pwd)
+
+        def _create_pool():
+            return session_pool.SessionPool(
+                _connect, VMwareUtils._is_session_active, _connect,
+                Disconnect)
+
         try:
-            LOG.info("Trying to connect to vCenter Server {} ...".
-                     format(vcenter_host))
-            urllib3.disable_warnings()
-            si = None
-            context = None
-            if hasattr(ssl, 'SSLContext'):
-                context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
-                context.verify_mode = ssl.CERT_NONE
-            if context:
-                # Python >= 2.7.9
-                si = SmartConnect(host=vcenter_host,
-                                  port=int(vcenter_port),
-                                  user=vcenter_user,
-                                  pwd=vcenter_pwd,
-                                  sslContext=context)
-            else:
-                # Python >= 2.7.7
-                si = SmartConnect(host=vcenter_host,
-                                  port=int(vcenter_port),
-                                  user=vcenter_user,
-                                  pwd=vcenter_pwd)
-            atexit.register(Disconnect, si)
-            LOG.info("Connected to vCenter Server {}".format(vcenter_host))
-            return si
+            return session_pool.get_pool(
+                session_pool.PYVMOMI, vcenter_host, vcenter_port,
+                vcenter_user, vcenter_pwd, _create_pool).get()
         except vmodl.MethodFault as e:
             msg = _("Couldn't connect the vCenter "
                     "server because of VMware fault")
@@ -144,6 +134,48 @@ class VMwareUtils:
             LOG.exception(e)
             raise exception.VcenterConnectionException()
 
+    @staticmethod
+    def release_vcenter_session(si):
+        """
+        Release a session returned by get_vcenter_session, it stays logged
+        in for the other operations
+        """
+        session_pool.release(si)
+
+    @staticmethod
+    def _connect(vcenter_host, vcenter_port, vcenter_user, vcenter_pwd):
+        """
+        Connect to Vcenter Server with specified credentials
+        @return: Service Instance
+        """
+        LOG.info("Trying to connect to vCenter Server {} ...".
+                 format(vcenter_host))
+        urllib3.disable_warnings()
+        si = None
+        context = None
+        if hasattr(ssl, 'SSLContext'):
+            context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+            context.verify_mode = ssl.CERT_NONE
+        if context:
+            # Python >= 2.7.9
+            si = SmartConnect(host=vcenter_host,
+                              port=int(vcenter_port),
+                              user=vcenter_user,
+                              pwd=vcenter_pwd,
+                              sslContext=context)
+        else:
+            # Python >= 2.7.7
+            si = SmartConnect(host=vcenter_host,
+                              port=int(vcenter_port),
+                              user=vcenter_user,
+                              pwd=vcenter_pwd)
+        LOG.info("Connected to vCenter Server {}".format(vcenter_host))
+        return si
+
+    @staticmethod
+    def _is_session_active(si):
+        return si.content.sessionManager.currentSession is not None
+
     @staticmethod
     def wait_for_task(task, si, actionName='job', hideResult=False):
         property_collector = si.content.propertyCollector
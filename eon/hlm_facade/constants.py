@@ -47,6 +47,7 @@ HLM_STOP = HLM_PLAYBOOKS + "/hlm_stop"
 HLM_STATUS = HLM_PLAYBOOKS + "/hlm_status"
 
 PLAYS = FACADE_BASE_URL + "/plays"
+LIVE_PLAYS = PLAYS + "?live=true"
 
 PLAYBOOK_MAP = {'site': HLM_PLAYBOOKS + '/site',
                 'hlm_start': HLM_PLAYBOOKS + '/hlm_start',
@@ -46,6 +46,10 @@ class NotFound(exception.EonException):
     message = _("%s")
 
 
+class NotSupported(exception.EonException):
+    message = _("%s")
+
+
 class RetryException(exception.EonException):
 
     def __init__(self, cleanup=None):
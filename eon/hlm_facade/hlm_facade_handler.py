@@ -20,13 +20,24 @@ from functools import partial
 from functools import wraps
 import constants as facade_constants
 from eon.hlm_facade import http_requests
+from eon.hlm_facade import json_patch
+from eon.hlm_facade import play_poller
+from eon.hlm_facade import read_cache
 from eon.hlm_facade import exception as facade_exceptions
 from eon.openstack.common import log as logging
 from oslo_config import cfg
 
 HLM_UX_SERVICES = [cfg.StrOpt('hux_services_url',
                               default="http://localhost:9085",
-                              help='Endpoint of node running hlm ux services')
+                              help='Endpoint of node running hlm ux services'),
+                   cfg.BoolOpt('json_patch_updates',
+                               default=False,
+                               help='Send the changes made to the input '
+                                    'model documents as JSON patches rather '
+                                    'than the whole documents. Only enable '
+                                    'it when hlm ux services accepts PATCH '
+                                    'requests of application/json-patch+'
+                                    'json bodies'),
                    ]
 
 CONF = cfg.CONF
@@ -37,6 +48,9 @@ CONF.register_opts(HLM_UX_SERVICES, hlm_ux_services_group)
 
 LOG = logging.getLogger(__name__)
 
+# URLs hlm ux services did not accept JSON patches for
+_PATCH_UNSUPPORTED = set()
+
 
 def retry(func):
     @wraps(func)
@@ -70,35 +84,87 @@ class HLMFacadeWrapper(object):
     def __init__(self, context):
         self.context = context
         self.endpoint_url = CONF.hlm_ux_service.hux_services_url
+        self.cache = read_cache.get_cache(context)
 
     def _ks_auth_header(self):
         """ Get the auth token from context
         """
         return {'X-Auth-Token': self.context.auth_token}
 
-    @retry
-    def _get_status(self, pRef, **kwargs):
-        url = ("%s%s/%s" % (self.endpoint_url, facade_constants.PLAYS,
-                            pRef))
-        resp = http_requests.get(url, headers=self._ks_auth_header())
-        resp_code = resp.get('code')
-        if resp_code == 0:
-            return resp
-        elif resp_code and resp_code != 0:
-            CommandString = resp.get('commandString')
-            message = (_("Playbook: '%s' run failed. Check ansible logs "
-                       "[%s, %s] on deployer for more details for "
-                       "process[%s].")
-                       % (logging.mask_password(CommandString),
-                          '~/.ansible/ansible.log',
-                          '/var/log/configuration_processor/errors.log',
-                          pRef))
-            LOG.error("%s" % message)
-            raise facade_exceptions.GetException("%s. Status Code: %s"
-                                                 % (message, resp_code))
-        else:
-            kill_process = partial(self._kill_play, pRef)
-            raise facade_exceptions.RetryException(cleanup=kill_process)
+    def _get(self, url):
+        """ Get an input model document, from the read cache of the context
+        when it was read already.
+        """
+        return self.cache.get(
+            url, lambda: http_requests.get(url,
+                                           headers=self._ks_auth_header()))
+
+    def _modify(self, request, url, *args, **kwargs):
+        """ Make a request changing the input model or running a play, the
+        read cache of the context is invalidated.
+        """
+        try:
+            return request(url, *args, headers=self._ks_auth_header(),
+                           **kwargs)
+        finally:
+            self.cache.invalidate()
+
+    def _patch(self, url, ops, fallback):
+        """ Apply the JSON patch operations ops to the input model document
+        at url, fallback() updates it when hlm ux services does not accept
+        JSON patches for url or rejects this one, e.g. as its test
+        operations failed on a document changed since it was read.
+        """
+        try:
+            return self._modify(http_requests.patch, url, ops)
+        except facade_exceptions.NotSupported as e:
+            LOG.info("JSON patches not accepted for %s, sending the whole "
+                     "document. Error: %s" % (url, e))
+            _PATCH_UNSUPPORTED.add(url)
+        except (facade_exceptions.NotFound,
+                facade_exceptions.HlmFacadeException) as e:
+            LOG.info("JSON patch of %s rejected, sending the whole "
+                     "document. Error: %s" % (url, e))
+        return fallback()
+
+    def _replace(self, request, url, body):
+        """ Replace the input model document at url with body, only its
+        changes from the cached document are sent when it was read already.
+        The patch tests the values it changes, the whole body is sent when
+        the document changed since it was cached.
+        """
+        cached = self.cache.peek(url)
+        if (not isinstance(cached, (dict, list)) or
+                url in _PATCH_UNSUPPORTED or
+                not CONF.hlm_ux_service.json_patch_updates):
+            return self._modify(request, url, body=body)
+        ops = json_patch.diff(cached, body)
+        if not ops:
+            LOG.info("No changes to %s" % url)
+            return None
+        if not ops[0]["path"]:
+            # replaced as a whole
+            return self._modify(request, url, body=body)
+        return self._patch(url, ops,
+                           lambda: self._modify(request, url, body=body))
+
+    def cache_stats(self):
+        """ Hits, misses and hit rate of the read cache of the context
+        """
+        return self.cache.stats()
+
+    def _get_status(self, pRef, play=None, **kwargs):
+        """ Wait for the play to complete, polled by the play poller with
+        the other running plays. It is waited for as long as the retry
+        decorator would have polled it retries times.
+        """
+        retries = kwargs.get('retries', facade_constants.RETRY_COUNT)
+        max_delay = kwargs.get('max_delay', facade_constants.MAX_INTERVAL)
+        return play_poller.get_poller().wait(
+            self.endpoint_url, pRef, self._ks_auth_header(),
+            play_poller.play_timeout(retries, max_delay),
+            max_interval=max_delay, name=play,
+            cleanup=partial(self._kill_play, pRef))
 
     def commit_changes(self, id_, task):
         """ Commit input model changes
@@ -107,28 +173,28 @@ class HLMFacadeWrapper(object):
         LOG.info("[%s] Committing changes to input model for %s task" %
                  (id_, task))
         body = {'message': facade_constants.COMMIT_MESSAGE % (id_, task)}
-        return http_requests.post(url, body, headers=self._ks_auth_header())
+        return self._modify(http_requests.post, url, body)
 
     def revert_changes(self):
         """ Revert input model changes.
         """
         url = ("%s%s" % (self.endpoint_url, facade_constants.REVERT_URL))
         LOG.info("Reverting input model changes")
-        return http_requests.delete(url, headers=self._ks_auth_header())
+        return self._modify(http_requests.delete, url)
 
     def get_model(self):
         """ Get complete input model.
         """
         url = ("%s%s" % (self.endpoint_url, facade_constants.INPUT_MODEL_URL))
         LOG.info("Retrieving complete input model")
-        return http_requests.get(url, headers=self._ks_auth_header())
+        return self._get(url)
 
     def update_model(self, model):
         """ Update complete input model.
         """
         url = ("%s%s" % (self.endpoint_url, facade_constants.INPUT_MODEL_URL))
         LOG.info("Updating complete input model")
-        http_requests.post(url, body=model, headers=self._ks_auth_header())
+        self._replace(http_requests.post, url, model)
 
     def get_hostnames(self):
         """ Get all the cp generated hostname for all servers
@@ -138,7 +204,7 @@ class HLMFacadeWrapper(object):
         url = ("%s%s" % (self.endpoint_url,
                          facade_constants.CP_OUTPUT_SERVER_INFO))
         LOG.info("Retrieving CP output for servers_info_yml")
-        servers = http_requests.get(url, headers=self._ks_auth_header())
+        servers = self._get(url)
         hostnames = dict()
         for key in servers:
             hostnames[key] = servers[key]['hostname']
@@ -155,7 +221,7 @@ class HLMFacadeWrapper(object):
                                 facade_constants.EXPANDED_INPUT_MODEL_SERVERS,
                                 id_))
         LOG.info("Retrieving expanded input model")
-        return http_requests.get(url, headers=self._ks_auth_header())
+        return self._get(url)
 
     def get_controlplanes(self):
         """ Get servers data from input model
@@ -163,33 +229,33 @@ class HLMFacadeWrapper(object):
         url = ("%s%s" % (self.endpoint_url,
                          facade_constants.CONTROLPLANES_URL))
         LOG.info("Retrieving servers.yml from input model")
-        return http_requests.get(url, headers=self._ks_auth_header())
+        return self._get(url)
 
     def get_servers(self):
         """ Get servers data from input model
         """
         url = ("%s%s" % (self.endpoint_url, facade_constants.SERVERS_URL))
         LOG.info("Retrieving servers.yml from input model")
-        return http_requests.get(url, headers=self._ks_auth_header())
+        return self._get(url)
 
     def get_server_by_id(self, id_):
         url = ("%s%s/%s" % (self.endpoint_url, facade_constants.SERVERS_URL,
                             id_))
         LOG.info("[%s] Retrieving servers.yml from input model" % id_)
-        return http_requests.get(url, headers=self._ks_auth_header())
+        return self._get(url)
 
     def get_interfaces_by_id(self, id_):
         url = ("%s%s/%s" % (self.endpoint_url, facade_constants.INTERFACES_URL,
                             id_))
         LOG.info("[%s] Retrieving interfaces from input model" % id_)
-        return http_requests.get(url, headers=self._ks_auth_header())
+        return self._get(url)
 
     def get_networks(self):
         """ Get servers data from input model
         """
         url = ("%s%s" % (self.endpoint_url, facade_constants.NETWORKS_URL))
         LOG.info("Retrieving networks from input model")
-        return http_requests.get(url, headers=self._ks_auth_header())
+        return self._get(url)
 
     def get_network_groups(self):
         """ Get servers data from input model
@@ -197,7 +263,7 @@ class HLMFacadeWrapper(object):
         url = ("%s%s" % (self.endpoint_url,
                          facade_constants.NETWORKS_GROUPS_URL))
         LOG.info("Retrieving network groups from input model")
-        return http_requests.get(url, headers=self._ks_auth_header())
+        return self._get(url)
 
     def get_server_groups(self):
         """ Get servers data from input model
@@ -205,7 +271,7 @@ class HLMFacadeWrapper(object):
         url = ("%s%s" % (self.endpoint_url,
                          facade_constants.SERVER_GROUPS_URL))
         LOG.info("Retrieving server groups from input model")
-        return http_requests.get(url, headers=self._ks_auth_header())
+        return self._get(url)
 
     def get_interfaces_by_name(self, name):
         """ Get servers data from input model
@@ -213,7 +279,7 @@ class HLMFacadeWrapper(object):
         url = ("%s%s/%s" % (self.endpoint_url, facade_constants.INTERFACES_URL,
                             name))
         LOG.info("Retrieving interfaces from input model")
-        return http_requests.get(url, headers=self._ks_auth_header())
+        return self._get(url)
 
     def create_server(self, model):
         """ Update servers data in input model
@@ -221,7 +287,7 @@ class HLMFacadeWrapper(object):
         url = ("%s%s" % (self.endpoint_url, facade_constants.SERVERS_URL))
         LOG.info("Updating input model with data: %s"
                  % logging.mask_password(model))
-        http_requests.post(url, body=model, headers=self._ks_auth_header())
+        self._modify(http_requests.post, url, body=model)
         LOG.info("Updated input model successfully")
 
     def update_server_by_id(self, model, id_):
@@ -229,20 +295,20 @@ class HLMFacadeWrapper(object):
         url = ("%s%s/%s" % (self.endpoint_url, facade_constants.SERVERS_URL,
                             id_))
         data.update(model)
-        http_requests.put(url, body=data, headers=self._ks_auth_header())
+        self._modify(http_requests.put, url, body=data)
         LOG.info("[%s] Updated input model successfully" % id_)
 
     def delete_server(self, id_):
         url = ("%s%s/%s" % (self.endpoint_url, facade_constants.SERVERS_URL,
                             id_))
-        http_requests.delete(url, headers=self._ks_auth_header())
+        self._modify(http_requests.delete, url)
         LOG.info("Deleted %s from hlm input model" % id_)
 
     def _run(self, url, body=None):
         """ Execute a play and get corresponding process reference to
         track the play.
         """
-        resp = http_requests.post(url, body, headers=self._ks_auth_header())
+        resp = self._modify(http_requests.post, url, body)
         return resp.get('pRef')
 
     def _kill_play(self, process_ref):
@@ -253,7 +319,7 @@ class HLMFacadeWrapper(object):
         LOG.info("Force killing the play with process "
                  "ref %s" % str(process_ref))
         try:
-            http_requests.delete(url, headers=self._ks_auth_header())
+            self._modify(http_requests.delete, url)
         except facade_exceptions.NotFound:
             LOG.warning("The play with process ref"
                         " %s was not found. Ignoring.." % str(process_ref))
@@ -265,7 +331,7 @@ class HLMFacadeWrapper(object):
                          facade_constants.CONFIG_PROCESSOR_RUN))
         LOG.info("Executing config processor run")
         process_ref = self._run(url, body)
-        return self._get_status(process_ref)
+        return self._get_status(process_ref, play='config_processor_run')
 
     def ready_deployment(self):
         """ Run ready deployment
@@ -274,7 +340,7 @@ class HLMFacadeWrapper(object):
                          facade_constants.READY_DEPLOYMENT))
         LOG.info("Executing ready deployment")
         process_ref = self._run(url)
-        return self._get_status(process_ref)
+        return self._get_status(process_ref, play='ready_deployment')
 
     def cobbler_deploy(self, id_, password):
         """ API call to re-image baremetal server and install OS.
@@ -286,7 +352,7 @@ class HLMFacadeWrapper(object):
                               "disable_pwd_auth": "false"}}
         url = self.endpoint_url + facade_constants.OSINSTALL
         LOG.info("Os Install begins on %s" % id_)
-        http_requests.post(url, body=body, headers=self._ks_auth_header())
+        self._modify(http_requests.post, url, body=body)
 
     @retry
     def cobbler_deploy_status(self, id_, **kwargs):
@@ -348,7 +414,7 @@ class HLMFacadeWrapper(object):
                  % (facade_constants.PLAYBOOK_MAP[play], limit, tags))
         url = self.endpoint_url + facade_constants.PLAYBOOK_MAP[play]
         process_ref = self._run(url, body=body)
-        return self._get_status(process_ref, **kwargs)
+        return self._get_status(process_ref, play=play, **kwargs)
 
     def run_monitoring_playbooks(self):
         """Method to run hlm monitoring playbooks
@@ -362,38 +428,45 @@ class HLMFacadeWrapper(object):
 
     def add_empty_pass_through(self):
         """Add pass_through.yml if not present in the input model"""
-        # Get the full model
-        # Insert the pass_through stuff
-        # Update the input model
+        # Patch the input model with the pass_through stuff, or get the
+        # full model, insert it and update the input model
 
         filename = 'data/pass_through.yml'
         key = 'pass-through'
-        sections_dict = {key: [filename]}
-        filesectionmap_dict = {filename: ['product', key]}
-        inputmodel_dict = {key: {'servers': [], 'global': {}}}
-
-        model = self.get_model()
-        fileInfo = model.get("fileInfo")
-        files = fileInfo.get("files")
-        sections = fileInfo.get("sections")
-        filesectionmap = fileInfo.get("fileSectionMap")
-        product = sections.get('product')
-
-        files.append(filename)
-        product.append(filename)
+        ops = [{"op": "add",
+                "path": json_patch.pointer("fileInfo", "files", "-"),
+                "value": filename},
+               {"op": "add",
+                "path": json_patch.pointer("fileInfo", "sections",
+                                           "product", "-"),
+                "value": filename},
+               {"op": "add",
+                "path": json_patch.pointer("fileInfo", "sections", key),
+                "value": [filename]},
+               {"op": "add",
+                "path": json_patch.pointer("fileInfo", "fileSectionMap",
+                                           filename),
+                "value": ['product', key]},
+               {"op": "add",
+                "path": json_patch.pointer("inputModel", key),
+                "value": {'servers': [], 'global': {}}}]
+
+        def update_model():
+            self.update_model(json_patch.apply(self.get_model(), ops))
 
-        sections.update(sections_dict)
-        filesectionmap.update(filesectionmap_dict)
-        model.get("inputModel").update(inputmodel_dict)
-
-        self.update_model(model)
+        url = ("%s%s" % (self.endpoint_url, facade_constants.INPUT_MODEL_URL))
+        if (url in _PATCH_UNSUPPORTED or
+                not CONF.hlm_ux_service.json_patch_updates):
+            return update_model()
+        LOG.info("Adding pass_through.yml to the input model")
+        self._patch(url, ops, update_model)
 
     def get_pass_through(self):
         """ Get pass through yml contents """
         LOG.info("Retrieving pass through yml from input model")
         url = ("%s%s" % (self.endpoint_url, facade_constants.PASS_THROUGH_URL))
         try:
-            resp = http_requests.get(url, headers=self._ks_auth_header())
+            resp = self._get(url)
             LOG.debug("Pass through contents: %s" % resp)
             return resp
         except facade_exceptions.NotFound:
@@ -411,4 +484,4 @@ class HLMFacadeWrapper(object):
     def update_pass_through(self, body):
         url = ("%s%s" % (self.endpoint_url,
                          facade_constants.PASS_THROUGH_URL))
-        return http_requests.put(url, body, headers=self._ks_auth_header())
+        return self._replace(http_requests.put, url, body)
@@ -16,14 +16,77 @@
 
 import json
 import logging as default_log
+import threading
+
 import requests
+from requests import adapters
+from requests.packages.urllib3.util import retry
 from eon.hlm_facade import exception as facade_exception
 from eon.openstack.common import log as logging
+from oslo_config import cfg
+
+HTTP_OPTS = [
+    cfg.IntOpt('http_pool_maxsize',
+               default=10,
+               help='Maximum number of keep-alive connections to hlm ux '
+                    'services kept open for the concurrent requests'),
+    cfg.FloatOpt('http_connect_timeout',
+                 default=10,
+                 help='Seconds to wait for a connection to hlm ux services'),
+    cfg.FloatOpt('http_read_timeout',
+                 default=600,
+                 help='Seconds to wait for a response of hlm ux services'),
+    cfg.IntOpt('http_connect_retries',
+               default=3,
+               help='Number of times a request failing to connect to hlm ux '
+                    'services is retried'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(HTTP_OPTS, 'hlm_ux_service')
 
 LOG = logging.getLogger(__name__)
 default_log.getLogger("requests").setLevel("WARNING")
 SECRET = "***"
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    """Returns the requests session shared by the requests to hlm ux
+    services, keeping their connections alive.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # only the failures to connect are retried, the request
+                # did not reach the server
+                max_retries = retry.Retry(
+                    total=CONF.hlm_ux_service.http_connect_retries,
+                    connect=CONF.hlm_ux_service.http_connect_retries,
+                    read=0, backoff_factor=0.5)
+                adapter = adapters.HTTPAdapter(
+                    pool_maxsize=CONF.hlm_ux_service.http_pool_maxsize,
+                    max_retries=max_retries)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def reset_session():
+    """Closes the connections of the shared session, the next request
+    creates a new one with the current options.
+    """
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
+
 
 def _log(method, req_url, headers, req_body):
     # base curl command
@@ -47,27 +110,46 @@ def _log(method, req_url, headers, req_body):
     LOG.debug(curl_string)
 
 
-def _http_request(method, req_url, headers=None, body=None):
+def _http_request(method, req_url, headers=None, body=None, timeout=None,
+                  content_type="application/json"):
     """ A simple HTTP request interface
+
+    :param timeout: seconds to wait for the response, or a (connect, read)
+        tuple, http_connect_timeout and http_read_timeout by default
     """
     if not headers:
         headers = {}
-    headers['Content-Type'] = "application/json"
+    headers['Content-Type'] = content_type
     headers['Accept'] = "application/json"
     if body:
         body = json.dumps(body)
+    if timeout is None:
+        timeout = (CONF.hlm_ux_service.http_connect_timeout,
+                   CONF.hlm_ux_service.http_read_timeout)
     try:
-        _log(method, req_url, headers, body)
-        resp = requests.request(method,
-                                req_url,
-                                headers=headers,
-                                data=body)
+        # the curl command masking the passwords of the body is only
+        # built when it is logged
+        if LOG.isEnabledFor(default_log.DEBUG):
+            _log(method, req_url, headers, body)
+        resp = _get_session().request(method,
+                                      req_url,
+                                      headers=headers,
+                                      data=body,
+                                      timeout=timeout)
     except Exception:
         raise
 
-    LOG.debug("RESP: %s" % resp)
-    if resp.text:
-        fin_resp = resp.json()
+    LOG.debug("RESP: %s", resp)
+    # decoded from the bytes received, the input model documents are not
+    # copied to a unicode string first
+    if resp.content:
+        try:
+            fin_resp = json.loads(resp.content)
+        except ValueError:
+            if resp.status_code < 400:
+                raise
+            # error page of the web server in front of hlm ux services
+            fin_resp = {'message': resp.content}
     else:
         fin_resp = resp
 
@@ -76,6 +158,12 @@ def _http_request(method, req_url, headers=None, body=None):
     elif resp.status_code == requests.codes.not_found:
         message = fin_resp.get('message')
         raise facade_exception.NotFound(message)
+    elif resp.status_code in (requests.codes.method_not_allowed,
+                              requests.codes.unsupported_media_type,
+                              requests.codes.not_implemented):
+        message = (fin_resp.get('message')
+                   if isinstance(fin_resp, dict) else None)
+        raise facade_exception.NotSupported(message)
 
     if 400 <= resp.status_code < 600:
         LOG.warn("hlm-ux-services request returned failure status: %s"
@@ -86,17 +174,24 @@ def _http_request(method, req_url, headers=None, body=None):
     return fin_resp
 
 
-def post(url, body, headers=None):
-    return _http_request('POST', url, headers, body)
+def post(url, body, headers=None, timeout=None):
+    return _http_request('POST', url, headers, body, timeout=timeout)
+
 
+def get(url, headers=None, timeout=None):
+    return _http_request('GET', url, headers, timeout=timeout)
 
-def get(url, headers=None):
-    return _http_request('GET', url, headers)
 
+def delete(url, headers=None, timeout=None):
+    return _http_request('DELETE', url, headers, timeout=timeout)
 
-def delete(url, headers=None):
-    return _http_request('DELETE', url, headers)
 
+def put(url, body, headers=None, timeout=None):
+    return _http_request('PUT', url, headers, body, timeout=timeout)
 
-def put(url, body, headers=None):
-    return _http_request('PUT', url, headers, body)
+
+def patch(url, body, headers=None, timeout=None):
+    """ Apply the JSON patch operations body to the document at url
+    """
+    return _http_request('PATCH', url, headers, body, timeout=timeout,
+                         content_type="application/json-patch+json")
@@ -0,0 +1,146 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+"""JSON patch (RFC 6902) documents of the changes made to the input model
+documents, sent to hlm ux services instead of the whole documents.
+"""
+
+import copy
+
+
+def _escape(token):
+    return unicode(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def pointer(*tokens):
+    """Returns the JSON pointer of the path made of tokens"""
+    return "".join("/" + _escape(token) for token in tokens)
+
+
+def _test(path, value):
+    return {"op": "test", "path": path, "value": value}
+
+
+def _diff(source, target, path, ops, test):
+    if isinstance(source, dict) and isinstance(target, dict):
+        for key in source:
+            if key not in target:
+                if test:
+                    ops.append(_test(path + pointer(key), source[key]))
+                ops.append({"op": "remove",
+                            "path": path + pointer(key)})
+        for key, value in target.iteritems():
+            if key not in source:
+                ops.append({"op": "add", "path": path + pointer(key),
+                            "value": value})
+            else:
+                _diff(source[key], value, path + pointer(key), ops, test)
+    elif isinstance(source, list) and isinstance(target, list):
+        common = min(len(source), len(target))
+        for index in xrange(common):
+            # the items are addressed by index, a changed item is tested
+            # as a whole for the changes not to go to another item
+            item_ops = []
+            _diff(source[index], target[index], path + pointer(index),
+                  item_ops, False)
+            if item_ops and test:
+                ops.append(_test(path + pointer(index), source[index]))
+            ops.extend(item_ops)
+        # removed from the end for the indexes of the others to hold
+        for index in xrange(len(source) - 1, common - 1, -1):
+            if test:
+                ops.append(_test(path + pointer(index), source[index]))
+            ops.append({"op": "remove", "path": path + pointer(index)})
+        for value in target[common:]:
+            ops.append({"op": "add", "path": path + "/-", "value": value})
+    elif (source != target or
+          isinstance(source, bool) is not isinstance(target, bool)):
+        if test:
+            ops.append(_test(path, source))
+        ops.append({"op": "replace", "path": path, "value": target})
+
+
+def diff(source, target, test=True):
+    """Returns the operations changing the document source into target.
+    The lists are compared item by item, an item inserted or removed in the
+    middle of a list replaces the items after it.
+
+    :param test: precede the operations replacing or removing values, or
+        changing list items, with test operations of their values in
+        source, for the patch to be rejected when the document is no
+        longer source
+    """
+    ops = []
+    _diff(source, target, "", ops, test)
+    return ops
+
+
+def _resolve(document, path):
+    """Returns the parent of the value at path and its key in it"""
+    tokens = [_unescape(token) for token in path.split("/")[1:]]
+    parent = document
+    for token in tokens[:-1]:
+        parent = parent[int(token) if isinstance(parent, list) else token]
+    key = tokens[-1]
+    if isinstance(parent, list) and key != "-":
+        key = int(key)
+    return parent, key
+
+
+def apply(document, ops):
+    """Applies the add, remove, replace and test operations ops to document
+    in place, returning it.
+
+    :raises KeyError, IndexError: when a path does not exist in document
+    :raises ValueError: when a test operation fails
+    """
+    for op in ops:
+        if op["op"] == "test":
+            if op["path"]:
+                parent, key = _resolve(document, op["path"])
+                value = parent[key]
+            else:
+                value = document
+            if value != op["value"]:
+                raise ValueError("JSON patch test of %s failed" % op["path"])
+            continue
+        if not op["path"]:
+            if op["op"] == "remove":
+                document = None
+            else:
+                document = copy.deepcopy(op["value"])
+            continue
+        parent, key = _resolve(document, op["path"])
+        if op["op"] == "remove":
+            del parent[key]
+        elif op["op"] == "add" and isinstance(parent, list):
+            if key == "-":
+                parent.append(copy.deepcopy(op["value"]))
+            else:
+                parent.insert(key, copy.deepcopy(op["value"]))
+        elif op["op"] in ("add", "replace"):
+            if op["op"] == "replace":
+                # the value replaced must exist
+                parent[key]
+            parent[key] = copy.deepcopy(op["value"])
+        else:
+            raise ValueError("Unsupported JSON patch operation %s"
+                             % op["op"])
+    return document
@@ -0,0 +1,238 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+"""Tracks the plays run through hlm ux services, one background poller
+polling the status of all the running plays for the green threads waiting
+for them rather than a poll loop for each play.
+"""
+
+import itertools
+import time
+
+import eventlet
+from eventlet import event
+from oslo_config import cfg
+
+from eon.hlm_facade import constants as facade_constants
+from eon.hlm_facade import exception as facade_exceptions
+from eon.hlm_facade import http_requests
+from eon.openstack.common import log as logging
+
+PLAY_POLLER_OPTS = [
+    cfg.IntOpt('play_poll_min_interval',
+               default=2,
+               help='Seconds before the status of a running play is polled '
+                    'again, the interval grows while the play runs'),
+    cfg.IntOpt('play_poll_max_interval',
+               default=facade_constants.MAX_INTERVAL,
+               help='Maximum seconds between two polls of the status of a '
+                    'running play'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(PLAY_POLLER_OPTS, 'hlm_ux_service')
+
+LOG = logging.getLogger(__name__)
+
+# growth of the poll interval of a running play
+INTERVAL_GROWTH = 1.5
+
+
+def play_timeout(retries, max_delay):
+    """Seconds a play polled retries times by the retry decorator was
+    waited for
+    """
+    sleep_count = itertools.count(5, 7)
+    return sum(min(sleep_count.next(), max_delay)
+               for _ in xrange(retries - 1))
+
+
+class _Play(object):
+    __slots__ = ("pRef", "name", "endpoint_url", "headers", "started",
+                 "deadline", "interval", "max_interval", "next_poll",
+                 "polls", "cleanup", "result")
+
+    def __init__(self, pRef, name, endpoint_url, headers, timeout,
+                 max_interval, cleanup):
+        self.pRef = pRef
+        self.name = name
+        self.endpoint_url = endpoint_url
+        self.headers = headers
+        self.started = time.time()
+        self.deadline = self.started + timeout
+        self.interval = min(CONF.hlm_ux_service.play_poll_min_interval,
+                            max_interval)
+        self.max_interval = max_interval
+        self.next_poll = self.started
+        self.polls = 0
+        self.cleanup = cleanup
+        self.result = event.Event()
+
+    @property
+    def url(self):
+        return "%s%s/%s" % (self.endpoint_url, facade_constants.PLAYS,
+                            self.pRef)
+
+
+class PlayPoller(object):
+    """Polls the status of the running plays in a green thread, living as
+    long as there are plays to wait for. A play is polled right after it
+    started and then at intervals growing from play_poll_min_interval to
+    its max_interval. The plays due at the same time are polled by listing
+    all the plays at once.
+    """
+
+    def __init__(self):
+        self._plays = {}
+        self._worker = None
+        self._wakeup = None
+        self.requests = 0
+
+    def wait(self, endpoint_url, pRef, headers, timeout, max_interval=None,
+             name=None, cleanup=None):
+        """Waits for the play to complete, returning its status.
+
+        :raises GetException: when the play failed
+        :raises TimeoutError: when the play still runs after timeout
+            seconds, once cleanup() was called
+        """
+        play = self._plays.get(pRef)
+        if play is None:
+            max_interval = min(
+                max_interval or CONF.hlm_ux_service.play_poll_max_interval,
+                CONF.hlm_ux_service.play_poll_max_interval)
+            play = self._plays[pRef] = _Play(pRef, name, endpoint_url,
+                                             headers, timeout, max_interval,
+                                             cleanup)
+            if self._worker is None:
+                self._worker = eventlet.spawn(self._run)
+            elif self._wakeup is not None and not self._wakeup.ready():
+                self._wakeup.send()
+        return play.result.wait()
+
+    def get_running_plays(self):
+        """Returns the plays waited for, the longest running first"""
+        now = time.time()
+        plays = [{"pRef": play.pRef,
+                  "name": play.name,
+                  "elapsed": round(now - play.started, 1),
+                  "polls": play.polls,
+                  "next_poll": round(max(0, play.next_poll - now), 1)}
+                 for play in self._plays.values()]
+        return sorted(plays, key=lambda play: play["elapsed"], reverse=True)
+
+    def _run(self):
+        try:
+            while self._plays:
+                now = time.time()
+                delay = min(play.next_poll
+                            for play in self._plays.values()) - now
+                if delay > 0:
+                    # woken up early by a new play
+                    self._wakeup = event.Event()
+                    with eventlet.Timeout(delay, False):
+                        self._wakeup.wait()
+                    self._wakeup = None
+                    continue
+                self._poll([play for play in self._plays.values()
+                            if play.next_poll <= now])
+        finally:
+            self._worker = None
+
+    def _poll(self, due):
+        statuses = self._list_plays(due) if len(due) > 1 else {}
+        for play in due:
+            try:
+                resp = statuses.get(play.pRef)
+                if resp is None:
+                    self.requests += 1
+                    resp = http_requests.get(play.url, headers=play.headers)
+                play.polls += 1
+                self._update(play, resp)
+            except Exception as e:
+                self._finish(play, error=e)
+
+    def _list_plays(self, due):
+        """Returns the status of the plays settled by the list of the
+        running plays by pRef, the others, e.g. completed since they were
+        last polled, are polled one by one.
+        """
+        url = due[0].endpoint_url + facade_constants.LIVE_PLAYS
+        try:
+            self.requests += 1
+            resp = http_requests.get(url, headers=due[-1].headers)
+        except Exception as e:
+            LOG.info("Failed to list the plays, polling them one by one. "
+                     "Error: %s" % e)
+            return {}
+        statuses = {}
+        for status in resp if isinstance(resp, list) else []:
+            if not isinstance(status, dict):
+                continue
+            # running, or completed when the server listed all the plays
+            if status.get('code') is None and status.get('alive') is not True:
+                continue
+            # the play metadata are keyed by id, the pRef of the play
+            statuses[status.get('id', status.get('pRef'))] = status
+        return statuses
+
+    def _update(self, play, resp):
+        resp_code = resp.get('code')
+        now = time.time()
+        if resp_code == 0:
+            self._finish(play, result=resp)
+        elif resp_code:
+            command_string = resp.get('commandString')
+            message = (_("Playbook: '%s' run failed. Check ansible logs "
+                         "[%s, %s] on deployer for more details for "
+                         "process[%s].")
+                       % (logging.mask_password(command_string),
+                          '~/.ansible/ansible.log',
+                          '/var/log/configuration_processor/errors.log',
+                          play.pRef))
+            LOG.error("%s" % message)
+            self._finish(play, error=facade_exceptions.GetException(
+                "%s. Status Code: %s" % (message, resp_code)))
+        elif now >= play.deadline:
+            if play.cleanup:
+                play.cleanup()
+            self._finish(play, error=facade_exceptions.TimeoutError(
+                _("Timed out running playbook")))
+        else:
+            LOG.debug("Waiting for the play %s to complete, polled %s "
+                      "times" % (play.pRef, play.polls))
+            play.next_poll = min(now + play.interval, play.deadline)
+            play.interval = min(play.interval * INTERVAL_GROWTH,
+                                play.max_interval)
+
+    def _finish(self, play, result=None, error=None):
+        self._plays.pop(play.pRef, None)
+        if error is not None:
+            play.result.send_exception(error)
+        else:
+            play.result.send(result)
+
+
+_POLLER = PlayPoller()
+
+
+def get_poller():
+    return _POLLER
+
+
+def get_running_plays():
+    """Returns the plays waited for by the green threads of this process"""
+    return _POLLER.get_running_plays()
@@ -0,0 +1,141 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+"""Cache of the input model documents read from hlm ux services, shared by
+the HLMFacadeWrappers of a request context.
+"""
+
+import copy
+import threading
+import time
+import weakref
+
+from eon.openstack.common import log as logging
+from oslo_config import cfg
+
+READ_CACHE_OPTS = [
+    cfg.IntOpt('read_cache_ttl',
+               default=60,
+               help='Seconds the input model documents read from hlm ux '
+                    'services are reused by the operations of a request, '
+                    'they are read again as soon as the request changes the '
+                    'input model. 0 disables the cache'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(READ_CACHE_OPTS, 'hlm_ux_service')
+
+LOG = logging.getLogger(__name__)
+
+
+def _copy(value):
+    # the callers update the documents they read
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
+class ReadCache(object):
+    """Responses of the read endpoints of hlm ux services by URL. Any
+    change of the input model made through the wrappers sharing the cache
+    invalidates all of them, the changes made by other processes are seen
+    after ttl seconds.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = CONF.hlm_ux_service.read_cache_ttl if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # url -> (expiry time, response)
+        self._responses = {}
+        self._generation = 0
+
+    def get(self, url, loader):
+        """Returns a copy of the cached response of url, loading it with
+        loader on a miss.
+        """
+        with self._lock:
+            cached = self._responses.get(url)
+            if cached is not None and cached[0] > time.time():
+                self.hits += 1
+                _TOTALS['hits'] += 1
+                return _copy(cached[1])
+            self.misses += 1
+            _TOTALS['misses'] += 1
+            generation = self._generation
+        response = loader()
+        if self.ttl > 0:
+            with self._lock:
+                # not stored if the model changed while it was loaded
+                if generation == self._generation:
+                    self._responses[url] = (time.time() + self.ttl,
+                                            _copy(response))
+        return response
+
+    def peek(self, url):
+        """Returns the cached response of url itself, not to be changed, or
+        None when it is not cached. The lookup is not counted.
+        """
+        with self._lock:
+            cached = self._responses.get(url)
+            if cached is not None and cached[0] > time.time():
+                return cached[1]
+        return None
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._responses.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+                    'size': len(self._responses)}
+
+
+_CACHES = weakref.WeakKeyDictionary()
+_CACHES_LOCK = threading.Lock()
+# hits and misses of all the caches, including the released ones
+_TOTALS = {'hits': 0, 'misses': 0}
+
+
+def get_cache(context):
+    """Returns the read cache of the request context, released with it. A
+    context that cannot be referenced weakly gets a cache of its own.
+    """
+    with _CACHES_LOCK:
+        try:
+            cache = _CACHES.get(context)
+            if cache is None:
+                cache = _CACHES[context] = ReadCache()
+        except TypeError:
+            LOG.debug("No shared read cache for the context %s", context)
+            cache = ReadCache()
+    return cache
+
+
+def get_stats():
+    """Returns the hits, misses and hit rate of the read caches"""
+    hits, misses = _TOTALS['hits'], _TOTALS['misses']
+    lookups = hits + misses
+    return {'hits': hits,
+            'misses': misses,
+            'hit_rate': float(hits) / lookups if lookups else 0.0,
+            'contexts': len(_CACHES)}
@@ -17,6 +17,7 @@
 import json
 import mock
 
+from eon import api
 from eon.api.controllers.v2 import resources
 from eon.tests.unit import base_test
 from eon.tests.unit import fake_data
@@ -33,6 +34,8 @@ class TestResources(base_test.TestCase):
         self.req = resources.pecan.request
         self.req.context = mock.MagicMock()
         self.context = self.req.context
+        self.pagination = {"limit": None, "marker": None, "sort_key": "id",
+                           "sort_dir": "asc"}
 
     def test_get_all(self):
         filters = {}
@@ -41,7 +44,8 @@ class TestResources(base_test.TestCase):
                                'get_all_resources') as get_all_m:
             self.rsrc.get_all(**filters)
             get_all_m.assert_called_once_with(self.context,
-                                              filters_called_with)
+                                              filters_called_with,
+                                              self.pagination)
 
     def test_get_all_with_filter_type(self):
         filters = {"type": "esxcluster"}
@@ -50,7 +54,8 @@ class TestResources(base_test.TestCase):
                                'get_all_resources') as get_all_m:
             self.rsrc.get_all(**filters)
             get_all_m.assert_called_once_with(self.context,
-                                              filters_called_with)
+                                              filters_called_with,
+                                              self.pagination)
 
     def test_get_all_with_filter_state(self):
         filters = {"state": "imported"}
@@ -59,7 +64,8 @@ class TestResources(base_test.TestCase):
                                'get_all_resources') as get_all_m:
             self.rsrc.get_all(**filters)
             get_all_m.assert_called_once_with(self.context,
-                                              filters_called_with)
+                                              filters_called_with,
+                                              self.pagination)
 
     def test_get_all_with_filter_state_type(self):
         filters = {"type": "esxcluster", "state": "imported"}
@@ -68,7 +74,46 @@ class TestResources(base_test.TestCase):
                                'get_all_resources') as get_all_m:
             self.rsrc.get_all(**filters)
             get_all_m.assert_called_once_with(self.context,
-                                              filters_called_with)
+                                              filters_called_with,
+                                              self.pagination)
+
+    def test_get_all_paginated(self):
+        filters = {"type": "esxcluster", "limit": "2",
+                   "marker": fake_data.fake_id1}
+        self.req.host_url = "http://eon:8282"
+        resources.pecan.response.headers = {}
+        with mock.patch.object(self.req.rpcapi_v2,
+                               'get_all_resources') as get_all_m:
+            get_all_m.return_value = [{"id": "id1"}, {"id": "id2"}]
+            self.rsrc.get_all(**filters)
+            get_all_m.assert_called_once_with(
+                self.context, {"type": "esxcluster", "state": None},
+                {"limit": 2, "marker": fake_data.fake_id1, "sort_key": "id",
+                 "sort_dir": "asc"})
+            self.assertEqual(
+                '<http://eon:8282/v2/resources?limit=2&marker=id2&'
+                'sort_dir=asc&sort_key=id&type=esxcluster>; rel="next"',
+                resources.pecan.response.headers['Link'])
+
+    def test_get_all_last_page(self):
+        resources.pecan.response.headers = {}
+        with mock.patch.object(self.req.rpcapi_v2,
+                               'get_all_resources') as get_all_m:
+            get_all_m.return_value = [{"id": "id1"}]
+            self.rsrc.get_all(**{"limit": "2"})
+            self.assertNotIn('Link', resources.pecan.response.headers)
+
+    def test_get_all_not_paginated(self):
+        self.config(max_limit=2, group='api')
+        self.addCleanup(api.CONF.clear_override, 'max_limit', 'api')
+        resources.pecan.response.headers = {}
+        rows = [{"id": "id%d" % i} for i in range(5)]
+        with mock.patch.object(self.req.rpcapi_v2,
+                               'get_all_resources') as get_all_m:
+            get_all_m.return_value = rows
+            self.assertEqual(rows, self.rsrc.get_all())
+            self.assertIsNone(get_all_m.call_args[0][2]["limit"])
+        self.assertNotIn('Link', resources.pecan.response.headers)
 
     def test_get_with_wrong_filter(self):
         filters = {"type": "cluster"}
@@ -91,6 +136,12 @@ class TestResources(base_test.TestCase):
             self.rsrc.get(res_id)
             delete_m.assert_called_once_with(self.context, res_id)
 
+    def test_running_plays(self):
+        with mock.patch.object(self.req.rpcapi_v2,
+                               'get_running_plays') as plays_m:
+            self.rsrc.running_plays()
+            plays_m.assert_called_once_with(self.context)
+
     def test_post_baremetal(self):
         with mock.patch.object(self.req.rpcapi_v2,
                                'create_resource') as create_r:
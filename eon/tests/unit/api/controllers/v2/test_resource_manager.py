@@ -33,20 +33,24 @@ class TestResources(base_test.TestCase):
         self.req = resource_manager.pecan.request
         self.req.context = mock.MagicMock()
         self.context = self.req.context
+        self.pagination = {"limit": None, "marker": None, "sort_key": "id",
+                           "sort_dir": "asc"}
 
     def test_get_all(self):
         filters = {}
         with mock.patch.object(self.req.rpcapi_v2,
                                'get_all_resource_mgrs') as get_all_m:
             self.rsrc_mgrs.get_all(**filters)
-            get_all_m.assert_called_once_with(self.context, None)
+            get_all_m.assert_called_once_with(self.context, None,
+                                              self.pagination)
 
     def test_get_all_with_filter_type(self):
         filters = {"type": "vcenter"}
         with mock.patch.object(self.req.rpcapi_v2,
                                'get_all_resource_mgrs') as get_all_m:
             self.rsrc_mgrs.get_all(**filters)
-            get_all_m.assert_called_once_with(self.context, filters["type"])
+            get_all_m.assert_called_once_with(self.context, filters["type"],
+                                              self.pagination)
 
     def test_get_with_wrong_filter(self):
         filters = {"type": "vcenter1"}
@@ -55,6 +59,24 @@ class TestResources(base_test.TestCase):
             self.assertRaises(webob.exc.HTTPBadRequest,
                               self.rsrc_mgrs.get_all, **filters)
 
+    def test_inventory_health(self):
+        with mock.patch.object(self.req.rpcapi_v2,
+                               'get_inventory_health') as health_m:
+            self.rsrc_mgrs.inventory_health(type="vcenter")
+            health_m.assert_called_once_with(self.context, "vcenter")
+
+    def test_inventory_health_all_types(self):
+        with mock.patch.object(self.req.rpcapi_v2,
+                               'get_inventory_health') as health_m:
+            self.rsrc_mgrs.inventory_health()
+            health_m.assert_called_once_with(self.context, None)
+
+    def test_inventory_health_wrong_type(self):
+        with mock.patch.object(self.req.rpcapi_v2, 'get_inventory_health'):
+            self.assertRaises(webob.exc.HTTPBadRequest,
+                              self.rsrc_mgrs.inventory_health,
+                              type="vcenter1")
+
     def test_post(self):
         with mock.patch.object(self.req.rpcapi_v2,
                                'create_resource_mgr') as create_m:
@@ -52,6 +52,22 @@ class TestAPI(base_test.TestCase):
         self.assertEqual(validator_out,
                          api.load_query_params(kw, validator))
 
+    def test_load_pagination_params_default(self):
+        self.assertEqual({"limit": None, "marker": None, "sort_key": "id",
+                          "sort_dir": "asc"},
+                         api.load_pagination_params({}))
+        self.assertEqual(1000, api.load_pagination_params(
+            {"marker": "fake-id"})["limit"])
+
+    def test_load_pagination_params_max_limit(self):
+        kw = {"limit": "5000", "marker": "fake-id", "sort_key": "name",
+              "sort_dir": "desc"}
+        self.assertEqual({"limit": 1000, "marker": "fake-id",
+                          "sort_key": "name", "sort_dir": "desc"},
+                         api.load_pagination_params(kw))
+        self.assertEqual(10,
+                         api.load_pagination_params({"limit": "10"})["limit"])
+
     def test_load_body(self):
         req = self.req
         validator = mock.Mock
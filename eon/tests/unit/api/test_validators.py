@@ -53,3 +53,27 @@ class TestValidators(TestCase):
         self.assertRaises(exception.Invalid,
                           self.res_mang_val.validate_get,
                           kws)
+
+    def test_validate_get_pagination(self):
+        kws = {"limit": "10", "marker": str(uuid.uuid4()),
+               "sort_key": "state", "sort_dir": "desc"}
+        self.assertIsNone(self.res_val.validate_get(kws))
+
+    def test_validate_get_pagination_invalid_limit(self):
+        for limit in ("0", "-1", "ten"):
+            self.assertRaises(exception.Invalid,
+                              self.res_val.validate_get,
+                              {"limit": limit})
+
+    def test_validate_get_pagination_invalid_marker(self):
+        self.assertRaises(exception.Invalid,
+                          self.res_mang_val.validate_get,
+                          {"marker": "123"})
+
+    def test_validate_get_pagination_invalid_sort(self):
+        self.assertRaises(exception.Invalid,
+                          self.res_mang_val.validate_get,
+                          {"sort_key": "state"})
+        self.assertRaises(exception.Invalid,
+                          self.res_val.validate_get,
+                          {"sort_dir": "up"})
@@ -0,0 +1,116 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+import eventlet
+import mock
+import socket
+from testtools import TestCase
+
+from eon.common import dns_resolver
+
+
+class TestAddressResolver(TestCase):
+
+    def setUp(self):
+        super(TestAddressResolver, self).setUp()
+        self.resolver = dns_resolver.AddressResolver(ttl=300,
+                                                     negative_ttl=30,
+                                                     timeout=1,
+                                                     max_size=2)
+        forward = mock.patch.object(dns_resolver.AddressResolver,
+                                    "_forward_lookup",
+                                    return_value="10.1.1.1")
+        reverse = mock.patch.object(dns_resolver.AddressResolver,
+                                    "_reverse_lookup",
+                                    return_value="host1.example.com")
+        self.forward = forward.start()
+        self.reverse = reverse.start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_resolve_name(self):
+        self.assertEqual(["10.1.1.1", "host1.example.com"],
+                         self.resolver.resolve("host1"))
+        self.forward.assert_called_once_with("host1")
+        self.reverse.assert_called_once_with("10.1.1.1")
+
+    def test_resolve_address(self):
+        self.assertEqual(["10.1.1.2", "host1.example.com"],
+                         self.resolver.resolve("10.1.1.2"))
+        self.assertFalse(self.forward.called)
+        self.reverse.assert_called_once_with("10.1.1.2")
+
+    def test_resolve_cached(self):
+        self.resolver.resolve("host1").append("mutated")
+        self.assertEqual(["10.1.1.1", "host1.example.com"],
+                         self.resolver.resolve("host1"))
+        self.assertEqual(1, self.forward.call_count)
+        self.assertEqual((1, 1), (self.resolver.hits, self.resolver.misses))
+
+    @mock.patch.object(dns_resolver.time, "time")
+    def test_resolve_expired(self, mock_time):
+        mock_time.return_value = 1000
+        self.resolver.resolve("host1")
+        mock_time.return_value = 1301
+        self.resolver.resolve("host1")
+        self.assertEqual(2, self.forward.call_count)
+
+    @mock.patch.object(dns_resolver.time, "time")
+    def test_resolve_negative_cached(self, mock_time):
+        mock_time.return_value = 1000
+        self.reverse.side_effect = socket.gaierror
+        self.assertEqual(["host1"], self.resolver.resolve("host1"))
+        mock_time.return_value = 1029
+        self.assertEqual(["host1"], self.resolver.resolve("host1"))
+        self.assertEqual(1, self.reverse.call_count)
+        mock_time.return_value = 1031
+        self.resolver.resolve("host1")
+        self.assertEqual(2, self.reverse.call_count)
+
+    def test_resolve_timeout(self):
+        self.resolver.timeout = 0.01
+        self.reverse.side_effect = lambda address: eventlet.sleep(1)
+        self.assertEqual(["host1"], self.resolver.resolve("host1"))
+
+    def test_resolve_evicts_oldest(self):
+        for name in ("host1", "host2", "host3"):
+            self.resolver.resolve(name)
+        self.resolver.resolve("host1")
+        self.assertEqual(4, self.forward.call_count)
+
+    def test_resolve_many(self):
+        self.assertEqual(
+            {"host1": ["10.1.1.1", "host1.example.com"],
+             "10.1.1.2": ["10.1.1.2", "host1.example.com"]},
+            self.resolver.resolve_many(["host1", "10.1.1.2", "host1"]))
+        self.assertEqual(1, self.forward.call_count)
+
+
+class TestReverseLookup(TestCase):
+
+    @mock.patch.object(dns_resolver.tpool, "execute",
+                       return_value=("host1.example.com", [], ["10.1.1.2"]))
+    def test_reverse_lookup(self, mock_execute):
+        self.assertEqual(
+            "host1.example.com",
+            dns_resolver.AddressResolver._reverse_lookup("10.1.1.2"))
+        mock_execute.assert_called_once_with(socket.gethostbyaddr,
+                                             "10.1.1.2")
+
+    def test_reverse_lookup_hosts_file(self):
+        # answered as the system resolves it, from the hosts file
+        self.assertEqual(
+            socket.gethostbyaddr("127.0.0.1")[0],
+            dns_resolver.AddressResolver._reverse_lookup("127.0.0.1"))
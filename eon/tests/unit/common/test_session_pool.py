@@ -0,0 +1,172 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+import threading
+
+import mock
+from testtools import TestCase
+
+from eon.common import session_pool
+
+
+class TestSessionPool(TestCase):
+
+    def setUp(self):
+        super(TestSessionPool, self).setUp()
+        self.connect = mock.Mock(side_effect=lambda: mock.Mock())
+        self.is_active = mock.Mock(return_value=True)
+        self.reconnect = mock.Mock(side_effect=lambda session: mock.Mock())
+        self.disconnect = mock.Mock()
+        self.pool = session_pool.SessionPool(self.connect, self.is_active,
+                                             self.reconnect, self.disconnect,
+                                             max_sessions=2,
+                                             check_interval=60)
+        self.addCleanup(session_pool.close_pools)
+
+    def test_get_counts_users(self):
+        first = self.pool.get()
+        second = self.pool.get()
+        self.assertIsNot(first, second)
+        # the cap is reached, the least used session is shared
+        self.assertTrue(self.pool.get() in (first, second))
+        self.assertEqual(2, self.connect.call_count)
+        self.assertTrue(self.pool.release(first))
+        self.assertTrue(self.pool.release(second))
+        self.assertFalse(self.pool.release(mock.Mock()))
+
+    def test_release(self):
+        pool = session_pool.get_pool(session_pool.PYVMOMI, "10.1.1.1", 443,
+                                     "user", "password", lambda: self.pool)
+        session = pool.get()
+        self.assertTrue(session_pool.release(session))
+        self.assertIs(session, pool.get())
+        self.assertEqual(1, self.connect.call_count)
+        # not one of the pools, e.g. as they were removed
+        self.assertFalse(session_pool.release(mock.Mock()))
+
+    def test_reconnect(self):
+        pool = session_pool.get_pool(session_pool.PYVMOMI, "10.1.1.1", 443,
+                                     "user", "password", lambda: self.pool)
+        session = pool.get()
+        reconnected = session_pool.reconnect(session)
+        self.reconnect.assert_called_once_with(session)
+        # the other users get the re-authenticated session
+        self.assertTrue(session_pool.release(reconnected))
+        self.assertIs(reconnected, pool.get())
+        self.assertIsNone(session_pool.reconnect(mock.Mock()))
+        self.assertEqual(1, self.reconnect.call_count)
+
+    def test_session_held(self):
+        with self.pool.session() as first:
+            with self.pool.session() as second:
+                self.assertIsNot(first, second)
+                # the cap is reached, the least used session is shared
+                with self.pool.session() as third:
+                    self.assertTrue(third in (first, second))
+            with self.pool.session() as fourth:
+                self.assertIs(second, fourth)
+        self.assertEqual(2, self.connect.call_count)
+
+    @mock.patch.object(session_pool, "time")
+    def test_check_reconnects_inactive_session(self, mock_time):
+        mock_time = mock_time.time
+        mock_time.return_value = 1000
+        with self.pool.session() as session:
+            pass
+        mock_time.return_value = 1059
+        with self.pool.session() as held:
+            self.assertIs(session, held)
+        self.assertFalse(self.is_active.called)
+
+        mock_time.return_value = 1060
+        with self.pool.session() as held:
+            self.assertIs(session, held)
+        self.is_active.assert_called_once_with(session)
+
+        mock_time.return_value = 1120
+        self.is_active.side_effect = Exception("NotAuthenticated")
+        with self.pool.session() as reconnected:
+            self.reconnect.assert_called_once_with(session)
+            self.assertIsNot(session, reconnected)
+        with self.pool.session() as held:
+            self.assertIs(reconnected, held)
+
+    def test_login_failure(self):
+        self.connect.side_effect = Exception("login failed")
+        self.assertRaises(Exception, self.pool.get)
+        self.connect.side_effect = lambda: mock.Mock()
+        with self.pool.session():
+            pass
+        self.assertEqual(2, self.connect.call_count)
+        self.pool.close()
+        self.assertEqual(1, self.disconnect.call_count)
+
+    def test_login_outside_pool_lock(self):
+        session = self.pool.get()
+        logging_in = threading.Event()
+        login = threading.Event()
+
+        def _connect():
+            logging_in.set()
+            login.wait()
+            return mock.Mock()
+        self.connect.side_effect = _connect
+        # all the sessions are used, another one logs in
+        waiter = threading.Thread(target=self.pool.get)
+        waiter.start()
+        logging_in.wait()
+        self.pool.release(session)
+        # the idle session is handed out while the other logs in
+        with self.pool.session() as held:
+            self.assertIs(session, held)
+        login.set()
+        waiter.join()
+        self.assertEqual(2, self.connect.call_count)
+
+    def test_close(self):
+        session = self.pool.get()
+        self.pool.close()
+        self.disconnect.assert_called_once_with(session)
+        self.assertIsNot(session, self.pool.get())
+
+    def test_get_pool(self):
+        create_pool = mock.Mock(side_effect=lambda: mock.Mock())
+        pool = session_pool.get_pool(session_pool.PYVMOMI, "10.1.1.1",
+                                     "443", "user", "password", create_pool)
+        self.assertIs(pool, session_pool.get_pool(
+            session_pool.PYVMOMI, "10.1.1.1", 443, "user", "password",
+            create_pool))
+        self.assertIsNot(pool, session_pool.get_pool(
+            session_pool.OSLO_VMWARE, "10.1.1.1", 443, "user", "password",
+            create_pool))
+        self.assertEqual(2, create_pool.call_count)
+
+        changed = session_pool.get_pool(session_pool.PYVMOMI, "10.1.1.1",
+                                        443, "user", "changed", create_pool)
+        self.assertIsNot(pool, changed)
+        pool.close.assert_called_once_with()
+
+    def test_remove_pools(self):
+        create_pool = mock.Mock(side_effect=lambda: mock.Mock())
+        pools = [session_pool.get_pool(client, host, 443, "user", "password",
+                                       create_pool)
+                 for client, host in ((session_pool.PYVMOMI, "10.1.1.1"),
+                                      (session_pool.OSLO_VMWARE, "10.1.1.1"),
+                                      (session_pool.PYVMOMI, "10.1.1.2"))]
+        session_pool.remove_pools("10.1.1.1")
+        pools[0].close.assert_called_once_with()
+        pools[1].close.assert_called_once_with()
+        self.assertFalse(pools[2].close.called)
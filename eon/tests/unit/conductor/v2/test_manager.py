@@ -18,6 +18,8 @@ import contextlib
 import mock
 
 from testtools import TestCase
+
+import eon.db
 from eon.conductor.v2 import manager
 
 
@@ -69,6 +71,31 @@ class TestConductorManager(TestCase):
                              self.manager.get_resource_mgr(self.context,
                                                            '1234', True))
 
+    def test_get_inventory_health(self):
+        expected = [{'id': '1234', "type": 'vcenter'}]
+        with mock.patch.object(self.manager._resource_mgr,
+                               "get_inventory_health") as health_mock:
+            health_mock.return_value = expected
+            self.assertEqual(expected,
+                             self.manager.get_inventory_health(self.context,
+                                                               'vcenter'))
+            health_mock.assert_called_once_with(self.context,
+                                                type_='vcenter')
+
+    def test_get_db_pool_stats(self):
+        db_api = eon.db.get_api()
+        db_api._POOL_STATS.reset()
+        self.addCleanup(db_api._POOL_STATS.reset)
+        db_api._POOL_STATS.incr('checkouts')
+        stats = self.manager.get_db_pool_stats(self.context)
+        self.assertEqual(1, stats['checkouts'])
+        self.assertEqual(0, stats['timeouts'])
+
+    def test_log_db_pool_stats(self):
+        with mock.patch.object(manager, "LOG") as log_mock:
+            self.manager.log_db_pool_stats(self.context)
+        self.assertTrue("checkouts" in log_mock.info.call_args[0][0])
+
     def test_create_resource_mgr(self):
         expected = {'1234': {'id': '1234', "type": 'vcenter'}}
         with mock.patch.object(self.manager._resource_mgr, "create") \
@@ -116,6 +143,14 @@ class TestConductorManager(TestCase):
             self.assertEqual([],
                              self.manager.get_all_resources(self.context))
 
+    def test_get_running_plays(self):
+        expected = [{'pRef': '1234', 'name': 'site', 'conductor': 'host'}]
+        with mock.patch('eon.hlm_facade.play_poller.get_running_plays') \
+                as plays_mock:
+            plays_mock.return_value = [{'pRef': '1234', 'name': 'site'}]
+            self.assertEqual(expected,
+                             self.manager.get_running_plays(self.context))
+
     def test_get_resource(self):
         expected = {'1234': {'id': '1234', "type": 'esxcluster'}}
         with mock.patch.object(self.manager._resource, "get") \
@@ -43,10 +43,12 @@ class TestConductorAPI(base_test.TestCase):
 
     def test_get_all_resource_mgr(self):
         type_ = "vcenter"
+        pagination = {"limit": 10, "marker": None}
         mc = self._test_rpcapi(self.rpcapi.get_all_resource_mgrs,
-                               *[self.context, type_])
+                               *[self.context, type_, pagination])
         mc.assert_called_once_with(
-            self.context, "get_all_resource_mgrs", type_=type_)
+            self.context, "get_all_resource_mgrs", type_=type_,
+            pagination=pagination)
 
     def test_get_resource_mgr(self):
         id_ = "fake-id"
@@ -55,6 +57,17 @@ class TestConductorAPI(base_test.TestCase):
         mc.assert_called_once_with(
             self.context, "get_resource_mgr", id_=id_, with_inventory=True)
 
+    def test_get_inventory_health(self):
+        type_ = "vcenter"
+        mc = self._test_rpcapi(self.rpcapi.get_inventory_health,
+                               *[self.context, type_])
+        mc.assert_called_once_with(
+            self.context, "get_inventory_health", type_=type_)
+
+    def test_get_db_pool_stats(self):
+        mc = self._test_rpcapi(self.rpcapi.get_db_pool_stats, self.context)
+        mc.assert_called_once_with(self.context, "get_db_pool_stats")
+
     def test_create_resource_mgr(self):
         data = {}
         mc = self._test_rpcapi(self.rpcapi.create_resource_mgr,
@@ -80,10 +93,12 @@ class TestConductorAPI(base_test.TestCase):
 
     def test_get_all_resources(self):
         filters = {"type": "esxcluster"}
+        pagination = {"limit": 10, "marker": None}
         mc = self._test_rpcapi(self.rpcapi.get_all_resources,
-                               *[self.context, filters])
+                               *[self.context, filters, pagination])
         mc.assert_called_once_with(
-            self.context, "get_all_resources", filters=filters)
+            self.context, "get_all_resources", filters=filters,
+            pagination=pagination)
 
     def test_get_resource(self):
         id_ = "fake-id"
@@ -92,6 +107,10 @@ class TestConductorAPI(base_test.TestCase):
         mc.assert_called_once_with(
             self.context, "get_resource", id_=id_, with_inventory=True)
 
+    def test_get_running_plays(self):
+        mc = self._test_rpcapi(self.rpcapi.get_running_plays, self.context)
+        mc.assert_called_once_with(self.context, "get_running_plays")
+
     def test_create_resource(self):
         data = {}
         mc = self._test_rpcapi(self.rpcapi.create_resource,
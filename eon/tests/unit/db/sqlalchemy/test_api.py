@@ -14,6 +14,7 @@
 # under the License.
 #.
 
+import mock
 import sqlalchemy
 from oslo_config import cfg
 
@@ -187,6 +188,46 @@ class DbApiTestV2(test_utils.DbTestcaseV2):
 
         self.assertEqual(len(rsc_list), 1)
 
+    def test_get_all_rsc_paginated(self):
+        self._create_rscs()
+        rsc_list = self.db_api.get_all_resources(
+            self.context, session=self.session,
+            **{'sort_key': 'name', 'sort_dir': 'asc', 'limit': 2})
+        self.assertEqual(['RHNode1', 'cluster1'],
+                         [rsc.name for rsc in rsc_list])
+
+        rsc_list = self.db_api.get_all_resources(
+            self.context, session=self.session,
+            **{'sort_key': 'name', 'sort_dir': 'asc', 'limit': 2,
+               'marker': rsc_list[-1].id})
+        self.assertEqual(['rhelnode_1'], [rsc.name for rsc in rsc_list])
+
+        rsc_list = self.db_api.get_all_resources(
+            self.context, session=self.session,
+            **{'type': 'rhel', 'sort_key': 'name', 'sort_dir': 'desc'})
+        self.assertEqual(['rhelnode_1', 'RHNode1'],
+                         [rsc.name for rsc in rsc_list])
+
+    def test_get_all_rsc_not_paginated(self):
+        self._create_rscs()
+        rsc_list = self.db_api.get_all_resources(
+            self.context, session=self.session,
+            **{'limit': None, 'marker': None, 'sort_key': 'name',
+               'sort_dir': 'asc'})
+        self.assertEqual(
+            len(self.db_api.get_all_resources(self.context,
+                                              session=self.session)),
+            len(rsc_list))
+        self.assertEqual(sorted(rsc.name for rsc in rsc_list),
+                         [rsc.name for rsc in rsc_list])
+
+    def test_get_all_rsc_paginated_invalid_marker(self):
+        self._create_rscs()
+        self.assertRaises(exception.NotFound,
+                          self.db_api.get_all_resources,
+                          self.context, session=self.session,
+                          **{'limit': 2, 'marker': 'fake-id'})
+
     def test_get_all_rsc_rhel(self):
         self._create_rscs()
 
@@ -266,6 +307,128 @@ class DbApiTestV2(test_utils.DbTestcaseV2):
                               parent_id, prop_update)
         self._assert_is_not_deleted(prop_update)
 
+    def test_get_resources_with_properties(self):
+        rsc_mgr = self.db_api.create_resource_manager(
+            self.context, fake_data.vc_data, session=self.session)
+        parent_id, key, val = self._create_properties()
+        data = dict(fake_data.esxclust_data, resource_mgr_id=rsc_mgr.id)
+        rsc1 = self.db_api.create_resource(self.context, data,
+                                           session=self.session)
+        self.db_api.update_resource(self.context, parent_id,
+                                    {"resource_mgr_id": rsc_mgr.id},
+                                    session=self.session)
+        self.db_api.create_resource(self.context, fake_data.rhel_data1,
+                                    session=self.session)
+
+        rscs, props = self.db_api.get_resources_with_properties(
+            self.context, resource_mgr_id=rsc_mgr.id, session=self.session)
+        self.assertEqual(set([parent_id, rsc1.id]),
+                         set(rsc.id for rsc in rscs))
+        self.assertEqual(set([parent_id, rsc1.id]), set(props))
+        self.assertEqual([], props[rsc1.id])
+        self.assertEqual(set(key), set(p.key for p in props[parent_id]))
+
+    def test_get_resources_by_addresses(self):
+        data = dict(fake_data.rhel_data, normalized_address="10.1.1.51")
+        rsc = self.db_api.create_resource(self.context, data,
+                                          session=self.session)
+        self.db_api.create_resource(self.context, fake_data.rhel_data1,
+                                    session=self.session)
+
+        for addresses in ([fake_data.rhel_data["ip_address"]],
+                          ["10.1.1.51", "10.9.9.9"]):
+            found = self.db_api.get_resources_by_addresses(
+                self.context, addresses, session=self.session)
+            self.assertEqual([rsc.id], [r.id for r in found])
+        self.assertEqual([], self.db_api.get_resources_by_addresses(
+            self.context, ["10.9.9.9"], session=self.session))
+        self.assertEqual([], self.db_api.get_resources_by_addresses(
+            self.context, [], session=self.session))
+
+    def test_get_resource_managers_by_addresses(self):
+        data = dict(fake_data.vc_data, normalized_address="vc.example.com")
+        rsc_mgr = self.db_api.create_resource_manager(
+            self.context, data, session=self.session)
+
+        found = self.db_api.get_resource_managers_by_addresses(
+            self.context, ["vc.example.com"], session=self.session)
+        self.assertEqual([rsc_mgr.id], [r.id for r in found])
+
+    def test_lookups_translate_db_errors(self):
+        session = mock.Mock()
+        session.query.side_effect = sqlalchemy.exc.OperationalError(
+            "SELECT", {}, "gone away")
+        for lookup, arg in (
+                (self.db_api.get_resources_by_addresses, ["10.1.1.51"]),
+                (self.db_api.get_resource_managers_by_addresses,
+                 ["vc.example.com"]),
+                (self.db_api.get_resource_managers_by_resource_id, "id1")):
+            self.assertRaises(exception.UnexpectedDBException, lookup,
+                              self.context, arg, session=session)
+
+    def test_listings_translate_db_errors(self):
+        session = mock.Mock()
+        session.query.side_effect = sqlalchemy.exc.OperationalError(
+            "SELECT", {}, "gone away")
+        for listing in (self.db_api.get_all_resources,
+                        self.db_api.get_all_resource_managers):
+            self.assertRaises(exception.UnexpectedDBException, listing,
+                              self.context, session=session)
+            self.assertRaises(exception.UnexpectedDBException, listing,
+                              self.context, session=session, limit=10)
+
+    def test_create_resources(self):
+        created = self.db_api.create_resources(
+            self.context, [fake_data.rhel_data, fake_data.rhel_data1],
+            session=self.session)
+
+        self.assertEqual(2, len(created))
+        for values in created:
+            rsc = self.db_api.get_resource(self.context, values["id"],
+                                           session=self.session)
+            self.assertEqual(values["name"], rsc.name)
+            self._assert_is_not_deleted(rsc.to_dict())
+
+    def test_delete_resources(self):
+        rsc1 = self.db_api.create_resource(
+            self.context, fake_data.rhel_data, session=self.session)
+        rsc2 = self.db_api.create_resource(
+            self.context, fake_data.rhel_data1, session=self.session)
+
+        self.assertEqual(1, self.db_api.delete_resources(
+            self.context, [rsc1.id], session=self.session))
+        self.assertRaises(exception.NotFound, self.db_api.get_resource,
+                          self.context, rsc1.id, session=self.session)
+        self.db_api.get_resource(self.context, rsc2.id, session=self.session)
+        self.assertEqual(0, self.db_api.delete_resources(
+            self.context, [], session=self.session))
+
+    def test_update_resource_state(self):
+        rsc = self.db_api.create_resource(
+            self.context, fake_data.rhel_data, session=self.session)
+
+        self.assertTrue(self.db_api.update_resource_state(
+            self.context, rsc.id, ["imported", "provisioned"],
+            "provision-initiated", {"type": "hlinux"},
+            session=self.session))
+        rsc = self.db_api.get_resource(self.context, rsc.id,
+                                       session=self.session)
+        self.assertEqual(("provision-initiated", "hlinux"),
+                         (rsc.state, rsc.type))
+
+    def test_update_resource_state_unexpected_state(self):
+        rsc = self.db_api.create_resource(
+            self.context, fake_data.rhel_data, session=self.session)
+
+        self.assertFalse(self.db_api.update_resource_state(
+            self.context, rsc.id, ["activated"], "deactivating",
+            session=self.session))
+        self.assertFalse(self.db_api.update_resource_state(
+            self.context, "missing-id", ["imported"], "activating",
+            session=self.session))
+        self.assertEqual("imported", self.db_api.get_resource(
+            self.context, rsc.id, session=self.session).state)
+
     def _create_properties(self):
         key = [fake_data.rhel_prop_key, fake_data.rhel_prop_key1]
         val = [fake_data.rhel_prop_val, fake_data.rhel_prop_val1]
@@ -299,6 +462,71 @@ class DbApiTestV2(test_utils.DbTestcaseV2):
         self._assert_property(key[0], val[0], parent_id, prop)
         self._assert_is_not_deleted(prop)
 
+    def test_get_properties_by_parent_ids(self):
+        parent_id, key, val = self._create_properties()
+        rsc = self.db_api.create_resource(
+            self.context, fake_data.rhel_data1, session=self.session)
+        props = self.db_api.get_properties_by_parent_ids(
+            self.context, [parent_id, rsc.id], session=self.session)
+
+        self.assertEqual(set(props.keys()), set([parent_id, rsc.id]))
+        self.assertEqual(props[rsc.id], [])
+        self.assertEqual(len(props[parent_id]), 2)
+        for prop, k, v in zip(sorted(props[parent_id], key=lambda p: p.key),
+                              sorted(key), [val[1], val[0]]):
+            self._assert_property(k, v, parent_id, prop.to_dict())
+            self._assert_is_not_deleted(prop.to_dict())
+
+    def test_get_properties_by_parent_ids_empty(self):
+        self.assertEqual(self.db_api.get_properties_by_parent_ids(
+            self.context, [], session=self.session), {})
+
+    def test_create_properties(self):
+        rsc1 = self.db_api.create_resource(
+            self.context, fake_data.rhel_data, session=self.session)
+        rsc2 = self.db_api.create_resource(
+            self.context, fake_data.rhel_data1, session=self.session)
+        created = self.db_api.create_properties(
+            self.context,
+            {rsc1.id: {fake_data.rhel_prop_key: fake_data.rhel_prop_val,
+                       fake_data.rhel_prop_key1: fake_data.rhel_prop_val1},
+             rsc2.id: {fake_data.rhel_prop_key: fake_data.rhel_prop_val1}},
+            session=self.session)
+
+        self.assertEqual(3, len(created))
+        props = self.db_api.get_properties_by_parent_ids(
+            self.context, [rsc1.id, rsc2.id], session=self.session)
+        self.assertEqual(2, len(props[rsc1.id]))
+        prop = props[rsc2.id][0].to_dict()
+        self._assert_property(fake_data.rhel_prop_key,
+                              fake_data.rhel_prop_val1, rsc2.id, prop)
+        self._assert_is_not_deleted(prop)
+        self.assertTrue(prop["id"] in [c["id"] for c in created])
+
+    def test_create_properties_empty(self):
+        self.assertEqual([], self.db_api.create_properties(
+            self.context, {}, session=self.session))
+
+    def test_upsert_properties(self):
+        parent_id, key, val = self._create_properties()
+        old_id = self.db_api.get_properties(
+            self.context, parent_id, key=key[0], session=self.session)[0].id
+        written = self.db_api.upsert_properties(
+            self.context,
+            {parent_id: {key[0]: "new-value", "new-key": val[1]}},
+            session=self.session)
+
+        self.assertEqual(2, len(written))
+        prop = self.db_api.get_properties(
+            self.context, parent_id, key=key[0], session=self.session)[0]
+        self.assertEqual(old_id, prop.id)
+        self._assert_property(key[0], "new-value", parent_id, prop.to_dict())
+        prop = self.db_api.get_properties(
+            self.context, parent_id, key="new-key", session=self.session)[0]
+        self._assert_property("new-key", val[1], parent_id, prop.to_dict())
+        self.assertEqual(3, len(self.db_api.get_properties(
+            self.context, parent_id, session=self.session)))
+
     def _assert_delete_for_properties(self, prop_del_list):
         for prop in prop_del_list:
             self.assertRaises(exception.NotFound,
@@ -366,6 +594,33 @@ class DbApiTestV2(test_utils.DbTestcaseV2):
                                                  session=self.session)
         return parent_id, key, val
 
+    def test_create_resource_mgr_properties(self):
+        rsc_mgr = self.db_api.create_resource_manager(
+            self.context, fake_data.vc_data, session=self.session)
+        created = self.db_api.create_resource_mgr_properties(
+            self.context,
+            {rsc_mgr.id: {fake_data.vc_prop_key: fake_data.vc_prop_val}},
+            session=self.session)
+
+        prop = self.db_api.get_resource_mgr_properties(
+            self.context, rsc_mgr.id, session=self.session)[0].to_dict()
+        self.assertEqual(created[0]["id"], prop["id"])
+        self._assert_property(fake_data.vc_prop_key, fake_data.vc_prop_val,
+                              rsc_mgr.id, prop)
+
+    def test_upsert_resource_mgr_properties(self):
+        parent_id, key, val = self._create_resource_mgr_properties()
+        self.db_api.upsert_resource_mgr_properties(
+            self.context, {parent_id: {key[1]: val[0]}},
+            session=self.session)
+
+        prop = self.db_api.get_resource_mgr_properties(
+            self.context, parent_id, key=key[1],
+            session=self.session)[0].to_dict()
+        self._assert_property(key[1], val[0], parent_id, prop)
+        self.assertEqual(2, len(self.db_api.get_resource_mgr_properties(
+            self.context, parent_id, session=self.session)))
+
     def test_get_resource_mgr_properties(self):
         parent_id, key, val = self._create_resource_mgr_properties()
         prop_list = self.db_api.get_resource_mgr_properties(
@@ -416,3 +671,77 @@ class DbApiTestV2(test_utils.DbTestcaseV2):
         self.assertRaises(sqlalchemy.orm.exc.NoResultFound,
                           self.db_api.get_resource_managers_by_resource_id,
                           self.context, rsc["id"], self.session)
+
+    def test_transactional_makers_cached(self):
+        self.db_api.get_transactional_session("test").close()
+        maker = self.db_api._get_maker(False, True, transactional=True)
+        self.assertIs(maker,
+                      self.db_api._get_maker(False, True, transactional=True))
+        self.assertIsNot(maker,
+                         self.db_api._get_maker(True, True,
+                                                transactional=True))
+
+    def test_get_pool_stats(self):
+        self.db_api._POOL_STATS.reset()
+        self.db_api.get_all_resource_managers(self.context)
+        stats = self.db_api.get_pool_stats()
+        self.assertEqual(1, stats["checkouts"])
+        self.assertEqual(1, stats["checkins"])
+        self.assertEqual(0, stats["timeouts"])
+
+    def test_timed_queue_pool(self):
+        self.db_api._POOL_STATS.reset()
+        engine = sqlalchemy.create_engine(
+            "sqlite://", poolclass=self.db_api._TimedQueuePool,
+            pool_size=1, max_overflow=0, pool_timeout=0.1)
+        conn = engine.connect()
+        self.assertRaises(sqlalchemy.exc.TimeoutError, engine.connect)
+        conn.close()
+        stats = self.db_api._POOL_STATS.as_dict()
+        self.assertEqual(1, stats["timeouts"])
+        self.assertTrue(stats["max_wait"] >= 0.1)
+
+    def _register_row_cache(self):
+        cache = mock.Mock()
+        self.db_api.register_row_cache(cache)
+        self.addCleanup(self.db_api._ROW_CACHES.discard, cache)
+        return cache
+
+    def _invalidated_keys(self, cache):
+        keys = set()
+        for call in cache.invalidate.call_args_list:
+            keys.update(call[0][0])
+        return keys
+
+    def test_row_cache_invalidated_on_write(self):
+        rsc = self.db_api.create_resource(self.context, fake_data.rhel_data,
+                                          session=self.session)
+        cache = self._register_row_cache()
+        self.db_api.update_resource(self.context, rsc.id, {"state": "x"},
+                                    session=self.session)
+        self.db_api.create_property(self.context, rsc.id, "key", "value",
+                                    session=self.session)
+        self.db_api.upsert_properties(self.context, {rsc.id: {"key": "v2"}},
+                                      session=self.session)
+        self.assertEqual(set([("resource", rsc.id), ("properties", rsc.id)]),
+                         self._invalidated_keys(cache))
+
+    def test_row_cache_invalidated_on_commit(self):
+        rsc = self.db_api.create_resource(self.context, fake_data.rhel_data,
+                                          session=self.session)
+        cache = self._register_row_cache()
+        session = self.db_api.get_transactional_session("test")
+        self.db_api.update_resource(self.context, rsc.id, {"state": "x"},
+                                    session=session)
+        self.assertEqual(1, cache.invalidate.call_count)
+        self.db_api.commit_session("test", session)
+        self.assertEqual(2, cache.invalidate.call_count)
+        cache.invalidate.assert_called_with(set([("resource", rsc.id)]))
+
+    def test_row_cache_cleared_on_resource_manager_delete(self):
+        rsc_mgr = self.db_api.create_resource_manager(
+            self.context, fake_data.vc_data, session=self.session)
+        cache = self._register_row_cache()
+        self.db_api.delete_resource_manager(self.context, rsc_mgr.id,
+                                            session=self.session)
+        self.assertTrue(cache.clear.called)
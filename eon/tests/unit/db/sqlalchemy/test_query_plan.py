@@ -0,0 +1,138 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#.
+
+import sqlalchemy
+from oslo_config import cfg
+
+from eon.tests.unit import test_utils_v2 as test_utils
+from eon.tests.unit.db.sqlalchemy import fake_data
+from eon.db.sqlalchemy import api as db_api
+import eon.db.sqlalchemy.migration as eon_migrate
+
+CONF = cfg.CONF
+
+
+class QueryPlanTestV2(test_utils.DbTestcaseV2):
+    """Checks that the hot lookup queries of the DB API are served by
+    the composite indexes, using SQLite's EXPLAIN QUERY PLAN."""
+
+    def setUp(self):
+        super(QueryPlanTestV2, self).setUp()
+        self.context = None
+        self.db_api = db_api
+        CONF.set_default('db_auto_create', True)
+        self.db_api.setup_db_env()
+        self.setup_sqlite(eon_migrate)
+        self.rsc_mgr = self.db_api.create_resource_manager(
+            self.context, fake_data.vc_data_uuid)
+        self.rsc = self.db_api.create_resource(
+            self.context, fake_data.esxclust_data)
+        self.db_api.create_property(self.context, self.rsc.id,
+                                    fake_data.rhel_prop_key,
+                                    fake_data.rhel_prop_val)
+        self.db_api.create_resource_mgr_property(self.context,
+                                                 self.rsc_mgr.id,
+                                                 fake_data.vc_prop_key,
+                                                 fake_data.vc_prop_val)
+
+    def _get_query_plans(self, fn, *args, **kwargs):
+        """Runs a DB API call and returns the query plan of every SELECT
+        it issued."""
+        statements = []
+
+        def _capture(conn, cursor, statement, parameters, context,
+                     executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append((statement, parameters))
+
+        engine = self.db_api.get_engine()
+        sqlalchemy.event.listen(engine, "before_cursor_execute", _capture)
+        try:
+            fn(self.context, *args, **kwargs)
+        finally:
+            sqlalchemy.event.remove(engine, "before_cursor_execute",
+                                    _capture)
+        self.assertNotEqual([], statements)
+        plans = []
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                rows = conn.execute("EXPLAIN QUERY PLAN " + statement,
+                                    parameters)
+                plans.append(" ".join(row[-1] for row in rows))
+        return plans
+
+    def _assert_uses_index(self, index, fn, *args, **kwargs):
+        for plan in self._get_query_plans(fn, *args, **kwargs):
+            self.assertTrue(("INDEX %s " % index) in plan, plan)
+
+    def _assert_searches(self, fn, *args, **kwargs):
+        """Key lookups may also be served by the (key, parent_id) unique
+        constraint, so only check that no table scan is needed."""
+        for plan in self._get_query_plans(fn, *args, **kwargs):
+            self.assertTrue(plan.startswith("SEARCH"), plan)
+
+    def test_get_properties_uses_index(self):
+        index = "ix_properties_parent_id_deleted"
+        self._assert_uses_index(index, self.db_api.get_properties,
+                                self.rsc.id)
+        self._assert_searches(self.db_api.get_properties,
+                              self.rsc.id, key=fake_data.rhel_prop_key)
+        self._assert_uses_index(index,
+                                self.db_api.get_properties_by_parent_ids,
+                                [self.rsc.id])
+
+    def test_get_resource_mgr_properties_uses_index(self):
+        index = "ix_resource_mgr_properties_parent_id_deleted"
+        self._assert_uses_index(index,
+                                self.db_api.get_resource_mgr_properties,
+                                self.rsc_mgr.id)
+        self._assert_searches(self.db_api.get_resource_mgr_properties,
+                              self.rsc_mgr.id, key=fake_data.vc_prop_key)
+
+    def test_get_all_resources_uses_index(self):
+        self._assert_uses_index("ix_resource_type_state_deleted",
+                                self.db_api.get_all_resources,
+                                type='esx_cluster', state='imported')
+        self._assert_uses_index("ix_resource_resource_mgr_id_state_deleted",
+                                self.db_api.get_all_resources,
+                                resource_mgr_id=self.rsc_mgr.id)
+        self._assert_uses_index("ix_resource_name_deleted",
+                                self.db_api.get_all_resources,
+                                name='cluster1')
+
+    def test_get_by_addresses_uses_index(self):
+        for get_by_addresses, table in (
+                (self.db_api.get_resources_by_addresses, "resource"),
+                (self.db_api.get_resource_managers_by_addresses,
+                 "resource_manager")):
+            plans = self._get_query_plans(get_by_addresses, ["10.1.1.1"])
+            for index in ("ix_%s_ip_address_deleted" % table,
+                          "ix_%s_normalized_address_deleted" % table):
+                self.assertTrue(("INDEX %s " % index) in plans[0], plans)
+
+    def test_get_all_resource_managers_uses_index(self):
+        self._assert_uses_index("ix_resource_manager_type_deleted",
+                                self.db_api.get_all_resource_managers,
+                                type='vcenter')
+
+    def test_migration_recreates_indexes(self):
+        eon_migrate.downgrade('2ac322d60ab1')
+        self.assertRaises(AssertionError, self._assert_uses_index,
+                          "ix_properties_parent_id_deleted",
+                          self.db_api.get_properties, self.rsc.id)
+        eon_migrate.upgrade('head')
+        self._assert_uses_index("ix_properties_parent_id_deleted",
+                                self.db_api.get_properties, self.rsc.id)
@@ -21,7 +21,9 @@ import os
 from mock import patch
 from pyVmomi import vim
 
+from eon.common import exception
 import eon.common.log as logging
+from eon.common import session_pool
 from eon.deployer import util
 from eon.tests.unit import tests
 from eon.tests.unit.deployer import fake_inputs
@@ -337,6 +339,29 @@ class TestUtil(tests.BaseTestCase):
     def test_collect_properties(self):
         pass
 
+    def test_get_vcenter_session_pooled(self):
+        self.addCleanup(session_pool.close_pools)
+        with contextlib.nested(
+                patch.object(util, 'SmartConnect'),
+                patch.object(util, 'Disconnect')) as (smart_connect,
+                                                      disconnect):
+            si = self.vmware_util.get_vcenter_session(
+                '10.1.1.1', '443', 'user', 'password')
+            self.vmware_util.release_vcenter_session(si)
+            self.assertIs(si, self.vmware_util.get_vcenter_session(
+                '10.1.1.1', 443, 'user', 'password'))
+            self.assertEqual(1, smart_connect.call_count)
+            session_pool.remove_pools('10.1.1.1')
+            disconnect.assert_called_once_with(si)
+
+    def test_get_vcenter_session_failure(self):
+        self.addCleanup(session_pool.close_pools)
+        with patch.object(util, 'SmartConnect',
+                          side_effect=Exception("login failed")):
+            self.assertRaises(exception.VcenterConnectionException,
+                              self.vmware_util.get_vcenter_session,
+                              '10.1.1.1', '443', 'user', 'password')
+
     def test_get_vm(self):
         session = {'content': MOB.content}
         all_vm_refs = [{'name': 'vm_name'}]
@@ -313,6 +313,10 @@ host_fake_inv_data1 = {'hosts':
     [{'connection_state': 'connected', 'moid': host_moid1,
       'name': '10.1.1.1', 'vms': 0}]}
 
+host_fake_inv_data_with_vms = {'hosts':
+    [{'connection_state': 'connected', 'moid': host_moid1,
+      'name': '10.1.1.1', 'vms': 2}]}
+
 sample_inventory = {("HostSystem", host_moid1):
                     {"name": "10.1.1.1",
                      "parent": mock.MagicMock(type=dict),
@@ -321,7 +325,7 @@ sample_inventory = {("HostSystem", host_moid1):
 sample_inventory_with_vms = {("HostSystem", host_moid1):
                              {"name": "10.1.1.1",
                              "runtime.connectionState": "connected",
-                             "vm": [mock.ANY]}}
+                             "vm": 2}}
 
 network_prop = {"vm_config": [{}],
                 "lifecycle_manager": {"hlm_version": "4.0.0"},
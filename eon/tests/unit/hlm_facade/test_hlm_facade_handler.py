@@ -14,13 +14,18 @@
 # under the License.
 #
 
+import copy
+
+import mock
 from mock import patch
 from mock import call
 from eon.tests.unit import base_test
 from eon.tests.unit import fake_data
+from eon.hlm_facade import hlm_facade_handler
 from eon.hlm_facade.hlm_facade_handler import HLMFacadeWrapper
 from eon.hlm_facade import exception
 from eon.hlm_facade import constants
+from eon.hlm_facade import json_patch
 
 URL = "http://localhost:9085"
 fake_id = "rand"
@@ -33,6 +38,10 @@ class TestHTTPRequests(base_test.TestCase):
         self.context.auth_token = "m1a4y1a9n3k"
         self.hux = HLMFacadeWrapper(self.context)
         self.headers = {'X-Auth-Token': self.context.auth_token}
+        self.addCleanup(hlm_facade_handler._PATCH_UNSUPPORTED.clear)
+        self.config(json_patch_updates=True, group='hlm_ux_service')
+        self.addCleanup(hlm_facade_handler.CONF.clear_override,
+                        'json_patch_updates', 'hlm_ux_service')
 
     @patch('eon.hlm_facade.http_requests.get')
     def test_get_model(self, mock_req):
@@ -260,6 +269,57 @@ class TestHTTPRequests(base_test.TestCase):
     def test_commit_changes(self, mock_post):
         self.hux.commit_changes(fake_id, "fake-task")
 
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_reads_cached(self, mock_req):
+        mock_req.return_value = [{"id": "ccn1-0001"}]
+        servers = self.hux.get_servers()
+        servers.append({"id": "ccn1-0002"})
+        # another wrapper of the context shares the cache
+        self.assertEqual([{"id": "ccn1-0001"}],
+                         HLMFacadeWrapper(self.context).get_servers())
+        mock_req.assert_called_once_with(URL + constants.SERVERS_URL,
+                                         headers=self.headers)
+        self.assertEqual({"hits": 1, "misses": 1, "hit_rate": 0.5,
+                          "size": 1}, self.hux.cache_stats())
+
+    @patch('eon.hlm_facade.http_requests.put')
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_update_server_by_id_invalidates_reads(self, mock_get, mock_put):
+        mock_get.return_value = {"id": fake_id}
+        self.hux.get_server_by_id(fake_id)
+        self.hux.update_server_by_id({"key": "val"}, fake_id)
+        # the server read before is reused for the update
+        self.assertEqual(1, mock_get.call_count)
+        mock_put.assert_called_once_with(
+            URL + constants.SERVERS_URL + "/" + fake_id,
+            body={"id": fake_id, "key": "val"}, headers=self.headers)
+        self.hux.get_server_by_id(fake_id)
+        self.assertEqual(2, mock_get.call_count)
+
+    @patch('eon.hlm_facade.http_requests.delete')
+    @patch('eon.hlm_facade.http_requests.post')
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_commit_and_revert_invalidate_reads(self, mock_get, mock_post,
+                                                mock_delete):
+        mock_get.return_value = {}
+        self.hux.get_pass_through()
+        self.hux.commit_changes(fake_id, "fake-task")
+        self.hux.get_pass_through()
+        self.hux.revert_changes()
+        self.hux.get_pass_through()
+        self.assertEqual(3, mock_get.call_count)
+
+    @patch('eon.hlm_facade.http_requests.post')
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_failed_change_invalidates_reads(self, mock_get, mock_post):
+        mock_get.return_value = []
+        mock_post.side_effect = exception.UpdateException
+        self.hux.get_servers()
+        self.assertRaises(exception.UpdateException, self.hux.create_server,
+                          {"id": fake_id})
+        self.hux.get_servers()
+        self.assertEqual(2, mock_get.call_count)
+
     @patch('eon.hlm_facade.http_requests.delete')
     def test_delete_server(self, mock_del):
         self.hux.delete_server(fake_id)
@@ -314,10 +374,12 @@ class TestHTTPRequests(base_test.TestCase):
         self.assertEquals(mock_get.call_count, 1)
         mock_get.assert_has_calls(calls)
 
+    @patch('eon.hlm_facade.http_requests.patch')
     @patch('eon.hlm_facade.http_requests.post')
     @patch('eon.hlm_facade.http_requests.get')
-    def test_add_empty_pass_through(self, mock_get, mock_post):
-        mock_get.return_value = fake_data.FAKE_INPUT_MODEL
+    def test_add_empty_pass_through(self, mock_get, mock_post, mock_patch):
+        mock_patch.side_effect = exception.NotSupported()
+        mock_get.return_value = copy.deepcopy(fake_data.FAKE_INPUT_MODEL)
         self.hux.add_empty_pass_through()
         expected_url = URL + constants.INPUT_MODEL_URL
         calls = [call(expected_url, headers={'X-Auth-Token': 'm1a4y1a9n3k'})]
@@ -326,3 +388,105 @@ class TestHTTPRequests(base_test.TestCase):
                                           body=fake_data.EMPTY_PASS_THRU,
                                           headers={'X-Auth-Token':
                                                        'm1a4y1a9n3k'})
+        self.assertIn(expected_url, hlm_facade_handler._PATCH_UNSUPPORTED)
+
+    @patch('eon.hlm_facade.http_requests.patch')
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_add_empty_pass_through_patch(self, mock_get, mock_patch):
+        self.hux.add_empty_pass_through()
+        self.assertFalse(mock_get.called)
+        expected_url = URL + constants.INPUT_MODEL_URL
+        mock_patch.assert_called_once_with(expected_url, mock.ANY,
+                                           headers=self.headers)
+        model = json_patch.apply(copy.deepcopy(fake_data.FAKE_INPUT_MODEL),
+                                 mock_patch.call_args[0][1])
+        self.assertEqual(fake_data.EMPTY_PASS_THRU, model)
+
+    @patch('eon.hlm_facade.http_requests.patch')
+    @patch('eon.hlm_facade.http_requests.put')
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_update_pass_through_patch(self, mock_get, mock_put, mock_patch):
+        mock_get.return_value = {'global': {}, 'servers': [{'id': 's1'}]}
+        pass_through = self.hux.get_pass_through()
+        pass_through['servers'].append({'id': 's2'})
+        self.hux.update_pass_through(pass_through)
+        self.assertFalse(mock_put.called)
+        mock_patch.assert_called_once_with(
+            URL + constants.PASS_THROUGH_URL,
+            [{'op': 'add', 'path': '/servers/-', 'value': {'id': 's2'}}],
+            headers=self.headers)
+
+    @patch('eon.hlm_facade.http_requests.patch')
+    @patch('eon.hlm_facade.http_requests.put')
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_update_pass_through_unchanged(self, mock_get, mock_put,
+                                           mock_patch):
+        mock_get.return_value = {'global': {}, 'servers': []}
+        self.hux.update_pass_through(self.hux.get_pass_through())
+        self.assertFalse(mock_put.called)
+        self.assertFalse(mock_patch.called)
+
+    @patch('eon.hlm_facade.http_requests.patch')
+    @patch('eon.hlm_facade.http_requests.put')
+    def test_update_pass_through_not_read(self, mock_put, mock_patch):
+        body = {'global': {}, 'servers': []}
+        self.hux.update_pass_through(body)
+        mock_put.assert_called_once_with(URL + constants.PASS_THROUGH_URL,
+                                         body=body, headers=self.headers)
+        self.assertFalse(mock_patch.called)
+
+    @patch('eon.hlm_facade.http_requests.patch')
+    @patch('eon.hlm_facade.http_requests.put')
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_update_pass_through_patch_not_supported(self, mock_get,
+                                                     mock_put, mock_patch):
+        mock_patch.side_effect = exception.NotSupported()
+        mock_get.return_value = {'global': {}, 'servers': []}
+        url = URL + constants.PASS_THROUGH_URL
+        for server in ['s1', 's2']:
+            pass_through = self.hux.get_pass_through()
+            pass_through['servers'].append({'id': server})
+            self.hux.update_pass_through(pass_through)
+            mock_put.assert_called_with(url, body=pass_through,
+                                        headers=self.headers)
+        # whole documents are sent once the patch failed
+        self.assertEqual(1, mock_patch.call_count)
+        self.assertEqual(2, mock_put.call_count)
+
+    @patch('eon.hlm_facade.http_requests.patch')
+    @patch('eon.hlm_facade.http_requests.put')
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_update_pass_through_patch_rejected(self, mock_get, mock_put,
+                                                mock_patch):
+        # e.g. the tests of the patch failed on a changed document
+        mock_patch.side_effect = [exception.HlmFacadeException(),
+                                  exception.NotFound()]
+        mock_get.return_value = {'global': {}, 'servers': [{'id': 's1'}]}
+        url = URL + constants.PASS_THROUGH_URL
+        for server in ['s2', 's3']:
+            pass_through = self.hux.get_pass_through()
+            pass_through['servers'][0]['id'] = server
+            self.hux.update_pass_through(pass_through)
+            mock_put.assert_called_with(url, body=pass_through,
+                                        headers=self.headers)
+        self.assertEqual(
+            [{'op': 'test', 'path': '/servers/0', 'value': {'id': 's1'}},
+             {'op': 'replace', 'path': '/servers/0/id', 'value': 's2'}],
+            mock_patch.call_args_list[0][0][1])
+        # patches are still sent
+        self.assertEqual(2, mock_patch.call_count)
+        self.assertNotIn(url, hlm_facade_handler._PATCH_UNSUPPORTED)
+
+    @patch('eon.hlm_facade.http_requests.patch')
+    @patch('eon.hlm_facade.http_requests.put')
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_update_pass_through_patch_disabled(self, mock_get, mock_put,
+                                                mock_patch):
+        hlm_facade_handler.CONF.clear_override('json_patch_updates',
+                                               'hlm_ux_service')
+        mock_get.return_value = {'global': {}, 'servers': []}
+        pass_through = self.hux.get_pass_through()
+        pass_through['servers'].append({'id': 's1'})
+        self.hux.update_pass_through(pass_through)
+        self.assertEqual(1, mock_put.call_count)
+        self.assertFalse(mock_patch.called)
@@ -14,13 +14,26 @@
 # under the License.
 #.
 
+import json
+import logging
+import mock
+import requests
+
 from mock import patch
 from eon.tests.unit import tests
+from eon.hlm_facade import exception as facade_exception
 from eon.hlm_facade import http_requests
 
 FAKE_BODY = {'some_key': 'some_val'}
 
 
+def fake_response(body=None, status_code=200):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = json.dumps(body) if body is not None else ""
+    return resp
+
+
 class fake_resp_bad_req(object):
     status_code = 400
 
@@ -39,48 +52,136 @@ class TestHTTPRequests(tests.BaseTestCase):
         super(TestHTTPRequests, self).setUp()
         self.url = "http://dummyURL"
         self.body = FAKE_BODY
+        http_requests.reset_session()
+        self.addCleanup(http_requests.reset_session)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test__http_requests_exception(self, mock_req):
         mock_req.return_value = fake_resp_bad_req
         self.assertRaises(Exception, http_requests._http_request, 'POST',
                           self.url, headers=None, body=FAKE_BODY)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test__http_requests(self, mock_req):
+        mock_req.return_value = fake_response(FAKE_BODY)
         http_requests._http_request('POST', self.url, headers=None,
                                     body=FAKE_BODY)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test__http_requests_failed(self, mock_req):
         mock_req.side_effect = Exception
         self.assertRaises(Exception, http_requests._http_request, 'GET',
                           self.url, headers=None, body=FAKE_BODY)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test__http_req_unauthorized(self, mock_req):
         mock_req.return_value = fake_resp_unauthorized
         self.assertRaises(Exception, http_requests._http_request, 'GET',
                           self.url, headers=None, body=FAKE_BODY)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test__http_req_not_found(self, mock_req):
         mock_req.return_value = fake_not_found
         self.assertRaises(Exception, http_requests._http_request, 'GET',
                           self.url, headers=None, body=FAKE_BODY)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_post(self, mock_req):
+        mock_req.return_value = fake_response(FAKE_BODY)
         http_requests.post(self.url, body=FAKE_BODY)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_get(self, mock_req):
+        mock_req.return_value = fake_response(FAKE_BODY)
         http_requests.get(self.url)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_put(self, mock_req):
+        mock_req.return_value = fake_response(FAKE_BODY)
         http_requests.put(self.url, body=FAKE_BODY)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_delete(self, mock_req):
+        mock_req.return_value = fake_response(FAKE_BODY)
         http_requests.delete(self.url)
+
+    @patch('requests.Session.request')
+    def test_session_reused(self, mock_req):
+        mock_req.return_value = fake_response(FAKE_BODY)
+        http_requests.get(self.url)
+        session = http_requests._get_session()
+        http_requests.get(self.url)
+        self.assertIs(session, http_requests._get_session())
+        self.assertEqual(2, mock_req.call_count)
+
+    def test_session_pool(self):
+        http_requests.CONF.set_override('http_pool_maxsize', 4,
+                                        'hlm_ux_service')
+        http_requests.CONF.set_override('http_connect_retries', 2,
+                                        'hlm_ux_service')
+        self.addCleanup(http_requests.CONF.clear_override,
+                        'http_pool_maxsize', 'hlm_ux_service')
+        self.addCleanup(http_requests.CONF.clear_override,
+                        'http_connect_retries', 'hlm_ux_service')
+        adapter = http_requests._get_session().get_adapter(self.url)
+        self.assertEqual(4, adapter._pool_maxsize)
+        self.assertEqual(2, adapter.max_retries.connect)
+        self.assertEqual(0, adapter.max_retries.read)
+
+    def test_reset_session(self):
+        session = http_requests._get_session()
+        with patch.object(session, "close") as mock_close:
+            http_requests.reset_session()
+        mock_close.assert_called_once_with()
+        self.assertIsNot(session, http_requests._get_session())
+
+    @patch('requests.Session.request')
+    def test_timeout(self, mock_req):
+        mock_req.return_value = fake_response(FAKE_BODY)
+        http_requests.get(self.url)
+        self.assertEqual((10, 600), mock_req.call_args[1]['timeout'])
+        http_requests.post(self.url, FAKE_BODY, timeout=5)
+        self.assertEqual(5, mock_req.call_args[1]['timeout'])
+
+    @patch.object(http_requests, '_log')
+    @patch('requests.Session.request')
+    def test_log_only_when_debug(self, mock_req, mock_log):
+        mock_req.return_value = fake_response(FAKE_BODY)
+        with patch.object(http_requests.LOG, 'isEnabledFor',
+                          return_value=False) as enabled:
+            http_requests.post(self.url, body=FAKE_BODY)
+        enabled.assert_called_once_with(logging.DEBUG)
+        self.assertFalse(mock_log.called)
+        with patch.object(http_requests.LOG, 'isEnabledFor',
+                          return_value=True):
+            http_requests.post(self.url, body=FAKE_BODY)
+        mock_log.assert_called_once_with('POST', self.url, mock.ANY,
+                                         '{"some_key": "some_val"}')
+
+    @patch('requests.Session.request')
+    def test_get_decoded(self, mock_req):
+        mock_req.return_value = fake_response(FAKE_BODY)
+        self.assertEqual(FAKE_BODY, http_requests.get(self.url))
+
+    @patch('requests.Session.request')
+    def test_get_empty(self, mock_req):
+        mock_req.return_value = fake_response()
+        self.assertIs(mock_req.return_value, http_requests.get(self.url))
+
+    @patch('requests.Session.request')
+    def test_patch(self, mock_req):
+        mock_req.return_value = fake_response()
+        ops = [{"op": "add", "path": "/servers/-", "value": FAKE_BODY}]
+        http_requests.patch(self.url, ops)
+        self.assertEqual('PATCH', mock_req.call_args[0][0])
+        self.assertEqual("application/json-patch+json",
+                         mock_req.call_args[1]['headers']['Content-Type'])
+        self.assertEqual(ops, json.loads(mock_req.call_args[1]['data']))
+
+    @patch('requests.Session.request')
+    def test_patch_not_supported(self, mock_req):
+        resp = fake_response(status_code=405)
+        resp._content = "<html>Method Not Allowed</html>"
+        mock_req.return_value = resp
+        self.assertRaises(facade_exception.NotSupported, http_requests.patch,
+                          self.url, [])
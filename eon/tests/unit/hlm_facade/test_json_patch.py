@@ -0,0 +1,124 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+import copy
+
+from eon.hlm_facade import json_patch
+from eon.tests.unit import fake_data
+from eon.tests.unit import tests
+
+PASS_THROUGH = {
+    "global": {"vmware": [{"id": "vc1", "username": "admin"}]},
+    "servers": [{"id": "esx-compute1",
+                 "data": {"vmware": {"vcenter_cluster": "cluster1"}}},
+                {"id": "esx-compute2",
+                 "data": {"vmware": {"vcenter_cluster": "cluster2"}}}],
+}
+
+
+class TestJsonPatch(tests.BaseTestCase):
+
+    def _assert_round_trip(self, source, target):
+        ops = json_patch.diff(source, target)
+        self.assertEqual(target, json_patch.apply(copy.deepcopy(source), ops))
+        return ops
+
+    def test_pointer(self):
+        self.assertEqual("/fileSectionMap/data~1pass_through.yml/0",
+                         json_patch.pointer("fileSectionMap",
+                                            "data/pass_through.yml", 0))
+        self.assertEqual("/a~0b", json_patch.pointer("a~b"))
+
+    def test_diff_unchanged(self):
+        self.assertEqual([], json_patch.diff(PASS_THROUGH,
+                                             copy.deepcopy(PASS_THROUGH)))
+
+    def test_diff_server_added(self):
+        target = copy.deepcopy(PASS_THROUGH)
+        target["servers"].append({"id": "esx-compute3"})
+        self.assertEqual([{"op": "add", "path": "/servers/-",
+                           "value": {"id": "esx-compute3"}}],
+                         self._assert_round_trip(PASS_THROUGH, target))
+
+    def test_diff_servers_removed(self):
+        target = copy.deepcopy(PASS_THROUGH)
+        target["servers"] = []
+        self.assertEqual([{"op": "test", "path": "/servers/1",
+                           "value": PASS_THROUGH["servers"][1]},
+                          {"op": "remove", "path": "/servers/1"},
+                          {"op": "test", "path": "/servers/0",
+                           "value": PASS_THROUGH["servers"][0]},
+                          {"op": "remove", "path": "/servers/0"}],
+                         self._assert_round_trip(PASS_THROUGH, target))
+
+    def test_diff_value_changed(self):
+        target = copy.deepcopy(PASS_THROUGH)
+        target["servers"][1]["data"]["vmware"]["vcenter_cluster"] = "c3"
+        del target["global"]["vmware"][0]["username"]
+        self.assertEqual(
+            [{"op": "test", "path": "/global/vmware/0",
+              "value": PASS_THROUGH["global"]["vmware"][0]},
+             {"op": "remove", "path": "/global/vmware/0/username"},
+             {"op": "test", "path": "/servers/1",
+              "value": PASS_THROUGH["servers"][1]},
+             {"op": "replace",
+              "path": "/servers/1/data/vmware/vcenter_cluster",
+              "value": "c3"}],
+            self._assert_round_trip(PASS_THROUGH, target))
+
+    def test_diff_without_test(self):
+        target = copy.deepcopy(PASS_THROUGH)
+        target["servers"][1]["data"]["vmware"]["vcenter_cluster"] = "c3"
+        self.assertEqual(
+            [{"op": "replace",
+              "path": "/servers/1/data/vmware/vcenter_cluster",
+              "value": "c3"}],
+            json_patch.diff(PASS_THROUGH, target, test=False))
+
+    def test_diff_stale_source(self):
+        target = copy.deepcopy(PASS_THROUGH)
+        target["servers"][1]["data"]["vmware"]["vcenter_cluster"] = "c3"
+        ops = json_patch.diff(PASS_THROUGH, target)
+        # the first server was removed since PASS_THROUGH was read
+        current = copy.deepcopy(PASS_THROUGH)
+        del current["servers"][0]
+        current["servers"].append({"id": "esx-compute3"})
+        self.assertRaises(ValueError, json_patch.apply, current, ops)
+
+    def test_diff_type_changed(self):
+        self.assertEqual([{"op": "replace", "path": "/servers",
+                           "value": None}],
+                         json_patch.diff({"servers": []}, {"servers": None},
+                                         test=False))
+        self.assertEqual([{"op": "test", "path": "/enabled", "value": 1},
+                          {"op": "replace", "path": "/enabled",
+                           "value": True}],
+                         json_patch.diff({"enabled": 1}, {"enabled": True}))
+        self.assertEqual([{"op": "test", "path": "", "value": {}},
+                          {"op": "replace", "path": "", "value": []}],
+                         json_patch.diff({}, []))
+
+    def test_diff_model(self):
+        target = copy.deepcopy(fake_data.FAKE_INPUT_MODEL)
+        target["inputModel"]["pass-through"] = PASS_THROUGH
+        target["fileInfo"]["files"].append("data/pass_through.yml")
+        self._assert_round_trip(fake_data.FAKE_INPUT_MODEL, target)
+
+    def test_apply_missing_path(self):
+        self.assertRaises(KeyError, json_patch.apply, {"a": {}},
+                          [{"op": "replace", "path": "/a/b", "value": 1}])
+        self.assertRaises(IndexError, json_patch.apply, {"a": []},
+                          [{"op": "remove", "path": "/a/0"}])
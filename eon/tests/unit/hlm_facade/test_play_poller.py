@@ -0,0 +1,167 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+import eventlet
+import mock
+from mock import patch
+
+from eon.hlm_facade import constants
+from eon.hlm_facade import exception
+from eon.hlm_facade import play_poller
+from eon.tests.unit import base_test
+
+URL = "http://localhost:9085"
+HEADERS = {'X-Auth-Token': 'm1a4y1a9n3k'}
+
+# play metadata listed by hlm ux services, a server ignoring the live
+# filter lists the completed plays too
+PLAYS_SAMPLE = [
+    {"id": "1504608791_5316",
+     "pid": 5316,
+     "alive": True,
+     "killed": False,
+     "startTime": 1504608791453,
+     "commandString": "ansible-playbook -i hosts/verb_hosts site.yml "
+                      "--limit esx-compute1",
+     "logSize": 48213},
+    {"id": "1504608655_5102",
+     "pid": 5102,
+     "alive": False,
+     "killed": False,
+     "code": 0,
+     "startTime": 1504608655112,
+     "endTime": 1504608702871,
+     "commandString": "ansible-playbook -i hosts/localhost "
+                      "config-processor-run.yml",
+     "logSize": 10240},
+    {"id": "1504608802_5377",
+     "pid": 5377,
+     "alive": False,
+     "killed": True,
+     "startTime": 1504608802004,
+     "endTime": 1504608810230,
+     "commandString": "ansible-playbook -i hosts/verb_hosts "
+                      "hlm-stop.yml --limit esx-compute2",
+     "logSize": 2048},
+]
+
+
+class TestPlayPoller(base_test.TestCase):
+
+    def setUp(self):
+        super(TestPlayPoller, self).setUp()
+        self.poller = play_poller.PlayPoller()
+
+    def _wait(self, pRef, timeout=60, cleanup=None):
+        return self.poller.wait(URL, pRef, HEADERS, timeout, name="site",
+                                cleanup=cleanup)
+
+    def test_play_timeout(self):
+        # the seconds the retry decorator slept
+        self.assertEqual(0, play_poller.play_timeout(1, 60))
+        self.assertEqual(5 + 12 + 19, play_poller.play_timeout(4, 60))
+        self.assertEqual(5 + 10 + 10, play_poller.play_timeout(4, 10))
+
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_wait(self, mock_get):
+        mock_get.return_value = {'code': 0}
+        self.assertEqual({'code': 0}, self._wait("p1"))
+        mock_get.assert_called_once_with(URL + constants.PLAYS + "/p1",
+                                         headers=HEADERS)
+        self.assertEqual([], self.poller.get_running_plays())
+
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_wait_failed(self, mock_get):
+        mock_get.return_value = {'code': 2, 'commandString': 'site.yml'}
+        self.assertRaises(exception.GetException, self._wait, "p1")
+
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_wait_timeout(self, mock_get):
+        mock_get.return_value = {}
+        cleanup = mock.Mock()
+        self.assertRaises(exception.TimeoutError, self._wait, "p1",
+                          timeout=0, cleanup=cleanup)
+        cleanup.assert_called_once_with()
+
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_wait_polls_again(self, mock_get):
+        self.config(play_poll_min_interval=1, group='hlm_ux_service')
+        self.addCleanup(play_poller.CONF.clear_override,
+                        'play_poll_min_interval', 'hlm_ux_service')
+        mock_get.side_effect = [{}, {'code': 0}]
+        waiter = eventlet.spawn(self._wait, "p1")
+        # polled once, waiting for the next poll
+        eventlet.sleep(0.1)
+        plays = self.poller.get_running_plays()
+        self.assertEqual(["p1"], [play["pRef"] for play in plays])
+        self.assertEqual("site", plays[0]["name"])
+        self.assertEqual(1, plays[0]["polls"])
+        self.assertEqual({'code': 0}, waiter.wait())
+        self.assertEqual(2, mock_get.call_count)
+
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_wait_plays_listed(self, mock_get):
+        mock_get.return_value = [{'pRef': 'p1', 'code': 0},
+                                 {'pRef': 'p2', 'code': 0},
+                                 {'pRef': 'p3', 'alive': False}]
+        waiters = [eventlet.spawn(self._wait, pRef) for pRef in ["p1", "p2"]]
+        self.assertEqual([{'pRef': 'p1', 'code': 0},
+                          {'pRef': 'p2', 'code': 0}],
+                         [waiter.wait() for waiter in waiters])
+        mock_get.assert_called_once_with(URL + constants.LIVE_PLAYS,
+                                         headers=HEADERS)
+        self.assertEqual(1, self.poller.requests)
+
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_list_plays(self, mock_get):
+        mock_get.return_value = PLAYS_SAMPLE
+        due = [play_poller._Play(pRef, "site", URL, HEADERS, 60, 60, None)
+               for pRef in ["1504608791_5316", "1504608802_5377",
+                            "1504608655_5102"]]
+        statuses = self.poller._list_plays(due)
+        mock_get.assert_called_once_with(URL + constants.LIVE_PLAYS,
+                                         headers=HEADERS)
+        # the killed play without exit code is polled on its own
+        self.assertEqual(["1504608655_5102", "1504608791_5316"],
+                         sorted(statuses))
+        self.assertEqual(None, statuses["1504608791_5316"].get("code"))
+        self.assertEqual(0, statuses["1504608655_5102"]["code"])
+
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_wait_plays_not_listed(self, mock_get):
+        def get(url, headers):
+            if url == URL + constants.LIVE_PLAYS:
+                return [{'pRef': 'p1', 'code': 0}]
+            return {'code': 0}
+        mock_get.side_effect = get
+        waiters = [eventlet.spawn(self._wait, pRef) for pRef in ["p1", "p2"]]
+        [waiter.wait() for waiter in waiters]
+        self.assertEqual(
+            [mock.call(URL + constants.LIVE_PLAYS, headers=HEADERS),
+             mock.call(URL + constants.PLAYS + "/p2", headers=HEADERS)],
+            mock_get.call_args_list)
+
+    @patch('eon.hlm_facade.http_requests.get')
+    def test_wait_plays_list_failed(self, mock_get):
+        def get(url, headers):
+            if url == URL + constants.LIVE_PLAYS:
+                raise exception.NotFound()
+            return {'code': 0}
+        mock_get.side_effect = get
+        waiters = [eventlet.spawn(self._wait, pRef) for pRef in ["p1", "p2"]]
+        self.assertEqual([{'code': 0}] * 2,
+                         [waiter.wait() for waiter in waiters])
+        self.assertEqual(3, mock_get.call_count)
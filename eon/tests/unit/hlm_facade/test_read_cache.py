@@ -0,0 +1,115 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+import gc
+
+import mock
+
+from eon.hlm_facade import read_cache
+from eon.tests.unit import tests
+
+
+class FakeContext(object):
+    pass
+
+
+class TestReadCache(tests.BaseTestCase):
+
+    def test_get(self):
+        cache = read_cache.ReadCache(ttl=60)
+        loader = mock.Mock(return_value={"servers": []})
+        self.assertEqual({"servers": []}, cache.get("url", loader))
+        self.assertEqual({"servers": []}, cache.get("url", loader))
+        self.assertEqual(1, loader.call_count)
+        self.assertEqual({"hits": 1, "misses": 1, "hit_rate": 0.5,
+                          "size": 1}, cache.stats())
+
+    def test_get_returns_copies(self):
+        cache = read_cache.ReadCache(ttl=60)
+        cache.get("url", lambda: {"servers": []})["servers"].append("s1")
+        cache.get("url", None)["servers"].append("s2")
+        self.assertEqual({"servers": []}, cache.get("url", None))
+
+    def test_peek(self):
+        cache = read_cache.ReadCache(ttl=60)
+        self.assertIsNone(cache.peek("url"))
+        cache.get("url", lambda: {"servers": []})
+        self.assertEqual({"servers": []}, cache.peek("url"))
+        self.assertEqual(1, cache.stats()["misses"])
+        self.assertEqual(0, cache.stats()["hits"])
+        cache.invalidate()
+        self.assertIsNone(cache.peek("url"))
+
+    @mock.patch.object(read_cache, "time")
+    def test_get_expired(self, mock_time):
+        mock_time.time.return_value = 1000
+        cache = read_cache.ReadCache(ttl=60)
+        loader = mock.Mock(return_value=[])
+        cache.get("url", loader)
+        mock_time.time.return_value = 1059
+        cache.get("url", loader)
+        self.assertEqual(1, loader.call_count)
+        mock_time.time.return_value = 1060
+        cache.get("url", loader)
+        self.assertEqual(2, loader.call_count)
+
+    def test_disabled(self):
+        cache = read_cache.ReadCache(ttl=0)
+        loader = mock.Mock(return_value=[])
+        cache.get("url", loader)
+        cache.get("url", loader)
+        self.assertEqual(2, loader.call_count)
+
+    def test_invalidate(self):
+        cache = read_cache.ReadCache(ttl=60)
+        loader = mock.Mock(return_value=[])
+        cache.get("url", loader)
+        cache.invalidate()
+        cache.get("url", loader)
+        self.assertEqual(2, loader.call_count)
+
+    def test_invalidated_while_loading(self):
+        cache = read_cache.ReadCache(ttl=60)
+
+        def _load():
+            cache.invalidate()
+            return []
+
+        cache.get("url", _load)
+        self.assertEqual(0, cache.stats()["size"])
+
+    def test_get_cache_per_context(self):
+        context = FakeContext()
+        cache = read_cache.get_cache(context)
+        self.assertIs(cache, read_cache.get_cache(context))
+        self.assertIsNot(cache, read_cache.get_cache(FakeContext()))
+        contexts = read_cache.get_stats()["contexts"]
+        del context
+        gc.collect()
+        self.assertEqual(contexts - 1, read_cache.get_stats()["contexts"])
+
+    def test_get_cache_not_weakly_referenced(self):
+        self.assertIsNot(read_cache.get_cache("context"),
+                         read_cache.get_cache("context"))
+
+    def test_get_stats(self):
+        before = read_cache.get_stats()
+        cache = read_cache.get_cache(FakeContext())
+        cache.get("url", lambda: [])
+        cache.get("url", lambda: [])
+        after = read_cache.get_stats()
+        self.assertEqual(before["hits"] + 1, after["hits"])
+        self.assertEqual(before["misses"] + 1, after["misses"])
@@ -56,6 +56,39 @@ class TestVirtCommonUtils(base_test.TestCase):
         self.mock_obj = mock.Mock()
         self.db_api = mock.MagicMock()
 
+    def test_update_props(self):
+        values = {"state": "imported", "type": "baremetal"}
+        with mock.patch.object(self.virt_utils, "db_api") as db_api:
+            self.virt_utils.update_props("ctx", "id1", values)
+            db_api.update_resource.assert_called_once_with(
+                "ctx", "id1", values,
+                session=db_api.get_transactional_session.return_value)
+            self.assertEqual(1, db_api.commit_session.call_count)
+
+    def test_update_props_failure(self):
+        with mock.patch.object(self.virt_utils, "db_api") as db_api:
+            db_api.update_resource.side_effect = Exception("db down")
+            self.assertRaises(exception.UpdateException,
+                              self.virt_utils.update_props, "ctx", "id1",
+                              {"state": "imported"})
+
+    def test_transition_state(self):
+        with mock.patch.object(self.virt_utils, "db_api") as db_api:
+            db_api.update_resource_state.return_value = True
+            self.virt_utils.transition_state("ctx", "id1", ["imported"],
+                                             "activating")
+            db_api.update_resource_state.assert_called_once_with(
+                "ctx", "id1", ["imported"], "activating", None)
+            self.assertFalse(db_api.get_resource.called)
+
+    def test_transition_state_lost(self):
+        with mock.patch.object(self.virt_utils, "db_api") as db_api:
+            db_api.update_resource_state.return_value = False
+            db_api.get_resource.return_value.state = "activating"
+            self.assertRaises(exception.InvalidStateError,
+                              self.virt_utils.transition_state, "ctx",
+                              "id1", ["imported"], "activating")
+
     def test_create_servers_payload(self):
         fake_pl = fake_data.baremetal_resource_data
         pl = self.virt_utils.create_servers_payload(fake_pl, fake_pl)
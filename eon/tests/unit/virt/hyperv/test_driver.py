@@ -30,6 +30,7 @@ class TestDriver(base_test.TestCase):
     def setUp(self):
         super(TestDriver, self).setUp()
         self.hyperv_driver = driver.HyperVDriver()
+        self.config(activation_wave_window=0)
 
     @mock.patch('eon.virt.hyperv.pywinrm.get_pywinrm_session')
     @mock.patch("eon.virt.common.utils.validate_nova_neutron_list")
@@ -19,6 +19,7 @@ import mock
 from mock import call
 
 from eon.common import exception
+from eon.hlm_facade import constants as facade_constants
 from eon.hlm_facade import exception as facade_excep
 from eon.hlm_facade.hlm_facade_handler import HLMFacadeWrapper
 from eon.virt.kvm import driver
@@ -40,6 +41,7 @@ class TestDriver(base_test.TestCase):
     def setUp(self):
         super(TestDriver, self).setUp()
         self.kvm_driver = driver.KVMDriver()
+        self.config(activation_wave_window=0)
         self.comp_mock_driver = mock.MagicMock()
         self.net_mock_driver = mock.MagicMock()
 
@@ -280,9 +282,9 @@ class TestDriver(base_test.TestCase):
             'Activate cobbler-provisioned KVM compute resource')
         m_config_run.assert_called_once_with()
         m_ready_dep.assert_called_once_with()
-        m_run_play.assert_called_once_with('site',
-                                           fake_data.fake_id1,
-                                           extra_args=None)
+        m_run_play.assert_called_once_with(
+            'site', [fake_data.fake_id1],
+            retries=facade_constants.RETRY_COUNT)
         m_monitoring.assert_called_once_with()
         m_post_activation.assert_called_once_with(self.context,
                                               fake_data.fake_id1,
@@ -326,9 +328,9 @@ class TestDriver(base_test.TestCase):
             'Activate cobbler-provisioned KVM compute resource')
         m_config_run.assert_called_once_with()
         m_ready_dep.assert_called_once_with()
-        m_run_play.assert_called_once_with('site',
-                                           fake_data.fake_id1,
-                                           extra_args=None)
+        m_run_play.assert_called_once_with(
+            'site', [fake_data.fake_id1],
+            retries=facade_constants.RETRY_COUNT)
         m_monitoring.assert_called_once_with()
         m_post_activation.assert_called_once_with(self.context,
                                               fake_data.fake_id1,
@@ -370,9 +372,9 @@ class TestDriver(base_test.TestCase):
             'Activate cobbler-provisioned KVM compute resource')
         m_config_run.assert_called_once_with()
         m_ready_dep.assert_called_once_with()
-        m_run_play.assert_called_once_with('site',
-                                           fake_data.fake_id1,
-                                           extra_args=None)
+        m_run_play.assert_called_once_with(
+            'site', [fake_data.fake_id1],
+            retries=facade_constants.RETRY_COUNT)
         m_monitoring.assert_called_once_with()
         m_post_activation.assert_called_once_with(self.context,
                                               fake_data.fake_id1,
@@ -410,9 +412,9 @@ class TestDriver(base_test.TestCase):
             'Activate cobbler-provisioned KVM compute resource')
         m_config_run.assert_called_once_with()
         m_ready_dep.assert_called_once_with()
-        m_run_play.assert_called_once_with('site',
-                                           fake_data.fake_id1,
-                                           extra_args=None)
+        m_run_play.assert_called_once_with(
+            'site', [fake_data.fake_id1],
+            retries=facade_constants.RETRY_COUNT)
         m_monitoring.assert_called_once_with()
         m_post_activation.assert_called_once_with(self.context,
                                               fake_data.fake_id1,
@@ -449,9 +451,9 @@ class TestDriver(base_test.TestCase):
             'Activate cobbler-provisioned KVM compute resource')
         m_config_run.assert_called_once_with()
         m_ready_dep.assert_called_once_with()
-        m_run_play.assert_called_once_with('site',
-                                           fake_data.fake_id1,
-                                           extra_args=None)
+        m_run_play.assert_called_once_with(
+            'site', [fake_data.fake_id1],
+            retries=facade_constants.RETRY_COUNT)
         m_monitoring.assert_called_once_with()
         m_post_activation.assert_called_once_with(self.context,
                                               fake_data.fake_id1,
@@ -510,7 +512,8 @@ class TestDriver(base_test.TestCase):
         }}
         calls = [call('hlm_ssh_configure',
                       fake_data.fake_id1, extra_args),
-                 call('site', fake_data.fake_id1)]
+                 call('site', [fake_data.fake_id1],
+                      retries=facade_constants.RETRY_COUNT)]
         m_run_play.has_calls(calls)
         m_monitoring.assert_called_once_with()
         m_post_activation.assert_called_once_with(self.context,
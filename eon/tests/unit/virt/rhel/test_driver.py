@@ -19,6 +19,7 @@ import mock
 from mock import call
 from eon.common import exception
 from eon.virt.rhel import driver
+from eon.hlm_facade import constants as facade_constants
 from eon.tests.unit import fake_data
 from eon.hlm_facade.hlm_facade_handler import HLMFacadeWrapper
 from eon.tests.unit import base_test
@@ -31,6 +32,7 @@ class TestRhelDriver(base_test.TestCase):
     def setUp(self):
         super(TestRhelDriver, self).setUp()
         self.rhel_driver = driver.RHELDriver()
+        self.config(activation_wave_window=0)
 
     @mock.patch('eon.virt.rhel.validator.'
                 'RHELValidator._verify_subscription_yum_repo_disabled')
@@ -108,9 +110,9 @@ class TestRhelDriver(base_test.TestCase):
             'Activate cobbler-provisioned KVM compute resource')
         m_config_run.assert_called_once_with()
         m_ready_dep.assert_called_once_with()
-        m_run_play.assert_called_once_with('site',
-                                           fake_data.fake_id1,
-                                           extra_args=None)
+        m_run_play.assert_called_once_with(
+            'site', [fake_data.fake_id1],
+            retries=facade_constants.RETRY_COUNT)
         m_monitoring.assert_called_once_with()
         m_post_activation.assert_called_once_with(self.context,
                                               fake_data.fake_id1,
@@ -155,9 +157,9 @@ class TestRhelDriver(base_test.TestCase):
             'Activate cobbler-provisioned KVM compute resource')
         m_config_run.assert_called_once_with()
         m_ready_dep.assert_called_once_with()
-        m_run_play.assert_called_once_with('site',
-                                           fake_data.fake_id1,
-                                           extra_args=None)
+        m_run_play.assert_called_once_with(
+            'site', [fake_data.fake_id1],
+            retries=facade_constants.RETRY_COUNT)
         m_monitoring.assert_called_once_with()
         m_post_activation.assert_called_once_with(self.context,
                                               fake_data.fake_id1,
@@ -0,0 +1,238 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+import eventlet
+import mock
+
+from eon.hlm_facade import constants as facade_constants
+from eon.tests.unit import base_test
+from eon.virt import activation_scheduler
+
+
+class FakeActivation(activation_scheduler.ActivationRequest):
+
+    def __init__(self, id_, hux_obj, apply_error=None):
+        super(FakeActivation, self).__init__(id_, [id_ + "-host"], hux_obj,
+                                             "Activate %s" % id_)
+        self.apply_error = apply_error
+        self.applied = 0
+
+    def apply_changes(self):
+        self.applied += 1
+        if self.apply_error:
+            raise self.apply_error
+
+
+class TestActivationScheduler(base_test.TestCase):
+
+    def setUp(self):
+        super(TestActivationScheduler, self).setUp()
+        self.config(activation_wave_window=0)
+        self.config(activation_wave_max_size=50)
+        self.scheduler = activation_scheduler.ActivationScheduler()
+        self.hux_obj = mock.MagicMock()
+
+    def _activate(self, *requests):
+        threads = [eventlet.spawn(self.scheduler.activate, request)
+                   for request in requests]
+        results = []
+        for thread in threads:
+            try:
+                thread.wait()
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def test_activate_single(self):
+        request = FakeActivation("r1", self.hux_obj)
+        self.assertEqual([None], self._activate(request))
+        self.hux_obj.commit_changes.assert_called_once_with("r1",
+                                                            "Activate r1")
+        self.hux_obj.config_processor_run.assert_called_once_with()
+        self.hux_obj.ready_deployment.assert_called_once_with()
+        self.hux_obj.run_playbook_by_ids.assert_called_once_with(
+            'site', ["r1-host"], retries=facade_constants.RETRY_COUNT)
+        self.hux_obj.run_monitoring_playbooks.assert_called_once_with()
+
+    def test_activate_wave(self):
+        requests = [FakeActivation("r%d" % i, self.hux_obj)
+                    for i in range(3)]
+        self.assertEqual([None] * 3, self._activate(*requests))
+        self.assertEqual([1] * 3, [request.applied for request in requests])
+        self.hux_obj.commit_changes.assert_called_once_with(
+            "r0,r1,r2", "Activate 3 compute resources")
+        self.assertEqual(1, self.hux_obj.config_processor_run.call_count)
+        self.assertEqual(1, self.hux_obj.ready_deployment.call_count)
+        self.hux_obj.run_playbook_by_ids.assert_called_once_with(
+            'site', ["r0-host", "r1-host", "r2-host"],
+            retries=3 * facade_constants.RETRY_COUNT)
+        self.assertEqual(1, self.hux_obj.run_monitoring_playbooks.call_count)
+
+    def test_activate_max_size(self):
+        self.config(activation_wave_max_size=2)
+        requests = [FakeActivation("r%d" % i, self.hux_obj)
+                    for i in range(3)]
+        self.assertEqual([None] * 3, self._activate(*requests))
+        self.assertEqual(
+            [mock.call("r0,r1", "Activate 2 compute resources"),
+             mock.call("r2", "Activate r2")],
+            self.hux_obj.commit_changes.call_args_list)
+        self.assertEqual(2, self.hux_obj.config_processor_run.call_count)
+
+    def test_activate_apply_changes_failure(self):
+        error = Exception("apply")
+        requests = [FakeActivation("r0", self.hux_obj),
+                    FakeActivation("r1", self.hux_obj, apply_error=error),
+                    FakeActivation("r2", self.hux_obj)]
+        self.assertEqual([None, error, None], self._activate(*requests))
+        # the changes of r0 are reverted with those of r1 and applied again
+        self.hux_obj.revert_changes.assert_called_once_with()
+        self.assertEqual([2, 1, 1],
+                         [request.applied for request in requests])
+        self.hux_obj.commit_changes.assert_called_once_with(
+            "r0,r2", "Activate 2 compute resources")
+        self.hux_obj.run_playbook_by_ids.assert_called_once_with(
+            'site', ["r0-host", "r2-host"],
+            retries=2 * facade_constants.RETRY_COUNT)
+
+    def test_activate_config_processor_failure(self):
+        error = Exception("config processor")
+        self.hux_obj.config_processor_run.side_effect = error
+        request = FakeActivation("r0", self.hux_obj)
+        self.assertEqual([error], self._activate(request))
+        self.assertFalse(self.hux_obj.run_playbook_by_ids.called)
+        self.assertFalse(self.hux_obj.revert_changes.called)
+
+    def test_activate_config_processor_failure_isolated(self):
+        error = Exception("config processor")
+
+        def config_processor_run():
+            # fails as long as the changes of r1 are committed
+            committed = [call[0][0] for call in
+                         self.hux_obj.commit_changes.call_args_list]
+            if "r1" in committed[-1].split(","):
+                raise error
+        self.hux_obj.config_processor_run.side_effect = config_processor_run
+        requests = [FakeActivation("r%d" % i, self.hux_obj)
+                    for i in range(3)]
+        self.assertEqual([None, error, None], self._activate(*requests))
+        self.assertEqual([2, 2, 2],
+                         [request.applied for request in requests])
+        self.assertEqual(
+            [mock.call("r0,r1,r2", "Activate 3 compute resources"),
+             mock.call("r0,r1,r2",
+                       "Rollback activation of compute resources"),
+             mock.call("r0", "Activate r0"),
+             mock.call("r1", "Activate r1"),
+             mock.call("r1", "Rollback activation of compute resources"),
+             mock.call("r2", "Activate r2")],
+            self.hux_obj.commit_changes.call_args_list)
+        self.assertEqual(
+            [mock.call("r0-host"), mock.call("r1-host"),
+             mock.call("r2-host"), mock.call("r1-host")],
+            self.hux_obj.delete_server.call_args_list)
+        self.assertEqual(2, self.hux_obj.revert_changes.call_count)
+        self.hux_obj.run_playbook_by_ids.assert_called_once_with(
+            'site', ["r0-host", "r2-host"],
+            retries=2 * facade_constants.RETRY_COUNT)
+
+    def test_activate_commit_failure_isolated(self):
+        error = Exception("commit")
+
+        def commit_changes(id_, task):
+            if "r0" in id_.split(","):
+                raise error
+        self.hux_obj.commit_changes.side_effect = commit_changes
+        requests = [FakeActivation("r%d" % i, self.hux_obj)
+                    for i in range(2)]
+        self.assertEqual([error, None], self._activate(*requests))
+        # nothing was committed to be removed
+        self.assertFalse(self.hux_obj.delete_server.called)
+        self.assertEqual(2, self.hux_obj.revert_changes.call_count)
+        self.hux_obj.run_playbook_by_ids.assert_called_once_with(
+            'site', ["r1-host"], retries=facade_constants.RETRY_COUNT)
+
+    def test_activate_single_not_delayed(self):
+        self.config(activation_wave_window=5)
+        request = FakeActivation("r1", self.hux_obj)
+        with mock.patch.object(activation_scheduler.eventlet,
+                               "sleep") as sleep:
+            self.assertEqual([None], self._activate(request))
+        self.assertFalse(sleep.called)
+
+    def test_activate_wave_delayed(self):
+        self.config(activation_wave_window=5)
+        requests = [FakeActivation("r%d" % i, self.hux_obj)
+                    for i in range(2)]
+        with mock.patch.object(activation_scheduler.eventlet,
+                               "sleep") as sleep:
+            self.assertEqual([None, None], self._activate(*requests))
+        sleep.assert_called_once_with(5)
+
+    def test_activate_lock_failure(self):
+        error = Exception("lock")
+        requests = [FakeActivation("r%d" % i, self.hux_obj)
+                    for i in range(2)]
+        with mock.patch.object(activation_scheduler.lockutils, "lock",
+                               side_effect=error):
+            self.assertEqual([error, error], self._activate(*requests))
+        self.assertEqual(None, self.scheduler._worker)
+        self.assertEqual([], self.scheduler._pending)
+
+    def test_activate_interrupted(self):
+        requests = [FakeActivation("r%d" % i, self.hux_obj)
+                    for i in range(2)]
+        with mock.patch.object(self.scheduler, "_run_wave",
+                               side_effect=eventlet.Timeout(None)):
+            results = self._activate(*requests)
+        # the callers get an error rather than waiting forever
+        self.assertEqual(2, len(results))
+        for result in results:
+            self.assertTrue(isinstance(result, Exception))
+        self.assertEqual(None, self.scheduler._worker)
+
+    def test_activate_site_failure(self):
+        error = Exception("site")
+
+        def run_site(play, hosts, retries):
+            if "r1-host" in hosts:
+                raise error
+        self.hux_obj.run_playbook_by_ids.side_effect = run_site
+        requests = [FakeActivation("r%d" % i, self.hux_obj)
+                    for i in range(3)]
+        self.assertEqual([None, error, None], self._activate(*requests))
+        # site is run again for each resource to find the failed ones
+        self.assertEqual(
+            [mock.call('site', ["r0-host", "r1-host", "r2-host"],
+                       retries=3 * facade_constants.RETRY_COUNT),
+             mock.call('site', ["r0-host"],
+                       retries=facade_constants.RETRY_COUNT),
+             mock.call('site', ["r1-host"],
+                       retries=facade_constants.RETRY_COUNT),
+             mock.call('site', ["r2-host"],
+                       retries=facade_constants.RETRY_COUNT)],
+            self.hux_obj.run_playbook_by_ids.call_args_list)
+        self.assertEqual(1, self.hux_obj.run_monitoring_playbooks.call_count)
+
+    def test_activate_before_site_failure(self):
+        error = Exception("before site")
+        requests = [FakeActivation("r%d" % i, self.hux_obj)
+                    for i in range(2)]
+        requests[0].before_site = mock.Mock(side_effect=error)
+        self.assertEqual([error, None], self._activate(*requests))
+        self.hux_obj.run_playbook_by_ids.assert_called_once_with(
+            'site', ["r1-host"], retries=facade_constants.RETRY_COUNT)
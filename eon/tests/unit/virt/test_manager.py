@@ -67,6 +67,114 @@ class Test_Validate_Names(TestCase):
                                             res_data2, name2, _id))
 
 
+class Test_Validate_Create_Update(TestCase):
+
+    def setUp(self):
+        super(Test_Validate_Create_Update, self).setUp()
+        self.db_api = mock.MagicMock()
+        self.db_api.get_all_resources.return_value = []
+        self.db_api.get_resources_by_addresses.return_value = []
+        self.db_api.get_resource.return_value = {"id": "id1",
+                                                 "ip_address": "10.1.1.1"}
+        patcher = mock.patch.object(utils, "get_addresses",
+                                    return_value=["10.1.1.2", "Host2"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test__validate_create(self):
+        address = manager._validate_create(
+            "ctx", self.db_api, {"name": "res", "ip_address": "host2"},
+            "resource")
+        self.assertEqual("10.1.1.2", address)
+        self.db_api.get_all_resources.assert_called_once_with("ctx",
+                                                              name="res")
+        self.db_api.get_resources_by_addresses.assert_called_once_with(
+            "ctx", set(["10.1.1.2", "Host2", "host2"]))
+
+    def test__validate_create_duplicate_name(self):
+        self.db_api.get_all_resources.return_value = [{"name": "res"}]
+        self.assertRaises(exception.ResourceExists,
+                          manager._validate_create, "ctx", self.db_api,
+                          {"name": "res", "ip_address": "host2"},
+                          "resource")
+
+    def test__validate_create_duplicate_address(self):
+        self.db_api.get_resources_by_addresses.return_value = [
+            {"id": "id2"}]
+        self.assertRaises(exception.ResourceExists,
+                          manager._validate_create, "ctx", self.db_api,
+                          {"name": "res", "ip_address": "host2"},
+                          "resource")
+
+    def test__validate_update_same_address(self):
+        self.assertIsNone(manager._validate_update(
+            "ctx", self.db_api, {"ip_address": "10.1.1.1"}, "id1",
+            "resource"))
+        self.assertFalse(self.db_api.get_resources_by_addresses.called)
+
+    def test__validate_update_address(self):
+        self.db_api.get_resources_by_addresses.return_value = [
+            {"id": "id1"}]
+        self.assertEqual("10.1.1.2", manager._validate_update(
+            "ctx", self.db_api, {"ip_address": "host2"}, "id1",
+            "resource"))
+
+    def test__validate_update_duplicate_address(self):
+        self.db_api.get_resources_by_addresses.return_value = [
+            {"id": "id2"}]
+        self.assertRaises(exception.ResourceExists,
+                          manager._validate_update, "ctx", self.db_api,
+                          {"ip_address": "host2"}, "id1", "resource")
+
+
+class TestRowCache(TestCase):
+
+    def test_get_caches_rows(self):
+        cache = manager.RowCache(2)
+        loader = mock.Mock(return_value="row")
+        self.assertEqual("row", cache.get(("resource", "id1"), loader))
+        self.assertEqual("row", cache.get(("resource", "id1"), loader))
+        self.assertEqual(1, loader.call_count)
+        self.assertEqual({"hits": 1, "misses": 1, "size": 1, "max_size": 2},
+                         cache.stats())
+
+    def test_get_evicts_least_recently_used(self):
+        cache = manager.RowCache(2)
+        cache.get(("resource", "id1"), lambda: "row1")
+        cache.get(("resource", "id2"), lambda: "row2")
+        cache.get(("resource", "id1"), lambda: "new-row1")
+        cache.get(("resource", "id3"), lambda: "row3")
+        self.assertEqual("row1", cache.get(("resource", "id1"),
+                                           lambda: "new-row1"))
+        self.assertEqual("new-row2", cache.get(("resource", "id2"),
+                                               lambda: "new-row2"))
+
+    def test_invalidate(self):
+        cache = manager.RowCache(2)
+        cache.get(("resource", "id1"), lambda: "row1")
+        cache.invalidate(set([("resource", "id1")]))
+        self.assertEqual("new-row1", cache.get(("resource", "id1"),
+                                               lambda: "new-row1"))
+
+    def test_invalidate_while_loading(self):
+        cache = manager.RowCache(2)
+
+        def _loader():
+            cache.invalidate(set([("resource", "id1")]))
+            return "stale-row1"
+
+        self.assertEqual("stale-row1", cache.get(("resource", "id1"),
+                                                 _loader))
+        self.assertEqual("row1", cache.get(("resource", "id1"),
+                                           lambda: "row1"))
+
+    def test_disabled(self):
+        cache = manager.RowCache(0)
+        cache.get(("resource", "id1"), lambda: "row1")
+        self.assertEqual("row2", cache.get(("resource", "id1"),
+                                           lambda: "row2"))
+
+
 class TestManager(TestCase):
 
     @classmethod
@@ -118,6 +226,7 @@ class TestManager(TestCase):
 
     def setUp(self):
         TestCase.setUp(self)
+        self.manager.cache.clear()
 
     @classmethod
     def tearDownClass(cls):
@@ -141,10 +250,17 @@ class TestManager(TestCase):
                 self.db_resource_ptys
 
             db_api.get_all_resource_managers.reset_mock()
-            self.manager.get_all(self.context, None)
+            db_api.get_properties_by_parent_ids.reset_mock()
+            db_api.get_properties_by_parent_ids.return_value = {
+                self.db_resource_mgr['id']: self.db_resource_ptys}
+            resp = self.manager.get_all(self.context, None)
 
             db_api.get_all_resource_managers.assert_any_call(self.context,
                                                          types=None)
+            db_api.get_properties_by_parent_ids.assert_called_once_with(
+                self.context, [self.db_resource_mgr['id']])
+            self.assertFalse(db_apis['get_properties'].called)
+            self.assertEqual(resp[0]['meta_data'][0]['value'], "vcenter-123")
 
     def test_get_all_with_type_success(self):
         db_api = self.manager.db_api
@@ -235,6 +351,27 @@ class TestManager(TestCase):
                               self.context,
                               "id")
 
+    def test_get_inventory_health(self):
+        driver_obj = mock.MagicMock()
+        driver_obj.get_inventory_health.return_value = [{"id": "vc1"}]
+        with mock.patch.object(driver, "load_resource_mgr_driver",
+                               return_value=driver_obj) as load_res_driver:
+            self.assertEqual([{"id": "vc1", "type": "vcenter"}],
+                             self.manager.get_inventory_health(
+                                 self.context, "vcenter"))
+            load_res_driver.assert_called_once_with("vcenter")
+
+    def test_get_inventory_health_all_types(self):
+        driver_obj = mock.MagicMock()
+        driver_obj.get_inventory_health.return_value = []
+        with mock.patch.object(driver, "load_resource_mgr_driver",
+                               return_value=driver_obj) as load_res_driver:
+            self.assertEqual([], self.manager.get_inventory_health(
+                self.context))
+            self.assertEqual(
+                sorted(driver.RESOURCE_MGR_DRIVERS),
+                [args[0] for args, _ in load_res_driver.call_args_list])
+
     def test_delete_success(self):
         act_res = [{"state": "imported"}, {"state": "imported"}]
         driver_obj = mock.MagicMock()
@@ -276,15 +413,20 @@ class TestManager(TestCase):
             mock.patch.object(utils, "get_addresses"),
             mock.patch.object(driver, "load_resource_mgr_driver"),
             mock.patch.object(db_api, "create_resource_manager"),
-            mock.patch.object(db_api, "create_property"),
+            mock.patch.object(db_api, "create_resource_mgr_properties"),
                 ) as (get_addr, load_res_driver, create_res_mgr,
-                      create_prop):
+                      create_props):
             get_addr.return_value = ["10.1.214.16"]
             load_res_driver.return_value = driver_obj
             driver_obj.validate_create.return_value = mock.MagicMock()
             driver_obj.get_properties.return_value = resource_ptys
             create_res_mgr.return_value = self.db_resource_mgr
+            create_props.return_value = []
+            db_api.get_resource_managers_by_addresses.return_value = []
             self.manager.create(self.context, self.data)
+            create_props.assert_called_once_with(
+                self.context, {self.db_resource_mgr["id"]: resource_ptys},
+                session=mock.ANY)
 
     def test_create_internal_error(self):
         driver_obj = mock.MagicMock()
@@ -373,23 +515,63 @@ class TestManager(TestCase):
         driver_obj = mock.MagicMock()
         new = [('domain-c1998', 'esx-app-cluster1')]
         rem = [('domain-c1999', 'esx-app-cluster2')]
+        rsrc_ptys = {"id1": self.db_resource_ptys}
         with mock.patch.multiple(
                 db_api,
                 get_all_resource_managers=mock.DEFAULT,
-                get_all_resources=mock.DEFAULT,
+                get_resources_with_properties=mock.DEFAULT,
                 get_properties=mock.DEFAULT
                 ) as db_apis:
             db_apis['get_all_resource_managers'].return_value = \
                             self.db_resource_mgrs
-            db_apis['get_all_resources'].return_value = \
-                self.db_resources
-            db_apis['get_properties'].return_value = \
-                self.db_resource_ptys
+            db_apis['get_resources_with_properties'].return_value = (
+                self.db_resources, rsrc_ptys)
             with mock.patch.object(driver, "load_resource_mgr_driver") \
                     as load_res_driver:
                 load_res_driver.return_value = driver_obj
                 driver_obj.poll_resources.return_value = (new, rem)
                 self.manager.auto_import_resources(self.context, "type")
+            self.assertEqual(len(self.db_resource_mgrs),
+                             driver_obj.auto_import_resources.call_count)
+            driver_obj.auto_import_resources.assert_called_with(
+                self.context, self.db_resource_mgrs[-1], self.db_resources,
+                rsrc_ptys)
+            self.assertFalse(db_apis['get_properties'].called)
+            self.assertTrue("type" in self.manager.auto_import_durations)
+
+    def test_subscribe_inventory_events(self):
+        db_api = self.manager.db_api
+        driver_obj = mock.MagicMock()
+        events = [mock.Mock(moid="domain-c1"), mock.Mock(moid="domain-c2")]
+        rsrc_ptys = {"id1": self.db_resource_ptys}
+        with contextlib.nested(
+            mock.patch.object(driver, "load_resource_mgr_driver",
+                              return_value=driver_obj),
+            mock.patch.multiple(db_api,
+                                get_resource_manager=mock.DEFAULT,
+                                get_resources_with_properties=mock.DEFAULT)
+                ) as (_, db_apis):
+            db_apis['get_resources_with_properties'].return_value = (
+                self.db_resources, rsrc_ptys)
+            self.manager.subscribe_inventory_events(self.context, "vcenter")
+            callback = driver_obj.subscribe_inventory_events.call_args[0][0]
+            callback({"id": "vc-1"}, events)
+        db_apis['get_resource_manager'].assert_called_once_with(self.context,
+                                                                "vc-1")
+        driver_obj.auto_import_resources.assert_called_once_with(
+            self.context, db_apis['get_resource_manager'].return_value,
+            self.db_resources, rsrc_ptys,
+            cluster_moids=set(["domain-c1", "domain-c2"]))
+
+    def test_on_inventory_events_not_registered(self):
+        with contextlib.nested(
+            mock.patch.object(self.manager.db_api, "get_resource_manager",
+                              side_effect=exception.NotFound()),
+            mock.patch.object(self.manager, "_auto_import_resource_mgr")
+                ) as (_, auto_import):
+            self.manager._on_inventory_events(self.context, "vcenter",
+                                              {"id": "vc-1"}, [])
+        self.assertFalse(auto_import.called)
 
 
 class TestResources(TestCase):
@@ -442,6 +624,7 @@ class TestResources(TestCase):
         TestCase.setUp(self)
         manager.eon.db = mock.MagicMock()
         self.mocked_obj = mock.Mock()
+        self.manager.cache.clear()
 
     def test_get_all_success(self):
         db_api = self.manager.db_api
@@ -455,11 +638,18 @@ class TestResources(TestCase):
                 self.db_resource_ptys
 
             db_api.get_all_resources.reset_mock()
+            db_api.get_properties_by_parent_ids.reset_mock()
+            db_api.get_properties_by_parent_ids.return_value = {
+                self.db_resource['id']: self.db_resource_ptys}
             filters = {"type": None, "state": None}
-            self.manager.get_all(self.context, filters=filters)
+            resp = self.manager.get_all(self.context, filters=filters)
 
             db_api.get_all_resources.assert_any_call(self.context,
                                                      type=None, state=None)
+            db_api.get_properties_by_parent_ids.assert_called_once_with(
+                self.context, [self.db_resource['id']])
+            self.assertFalse(db_apis['get_properties'].called)
+            self.assertEqual(resp[0]['meta_data'][0]['value'], "vcenter-123")
 
     def test_get_all_with_type_success(self):
         db_api = self.manager.db_api
@@ -570,15 +760,25 @@ class TestResources(TestCase):
             load_res_dr.return_value = self.mocked_obj
             self.mocked_obj.get_res_inventory = fake_data.get_res_fake_inv
             get_res.return_value = fake_data.res_data_db_cluster
-            get_prop.return_value = fake_data.get_res_properties_cluster
+            props = [dict(prop, id="prop-id")
+                     for prop in fake_data.get_res_properties_cluster]
+            get_prop.return_value = props
             get_res_mgr_by_id.return_value = fake_data.res_mgr_data1
-            resultant_dict = fake_data.get_with_inventory_cluster
+            resultant_dict = copy.deepcopy(
+                fake_data.get_with_inventory_cluster)
             resultant_dict.update({"inventory":
-                    fake_data.get_res_fake_inv(mock.ANY, mock.ANY)})
+                    fake_data.get_res_fake_inv(mock.ANY, mock.ANY),
+                    "meta_data": [{"id": "prop-id", "name": "cluster_moid",
+                                   "value": "domain1"}]})
 
             observed = self.manager.get_with_inventory(self.context,
                                                    fake_data.fake_id1)
             self.assertEqual(resultant_dict, observed)
+            observed = self.manager.get_with_inventory(self.context,
+                                                   fake_data.fake_id1)
+            self.assertEqual(resultant_dict, observed)
+            self.assertEqual(1, get_res.call_count)
+            self.assertEqual(1, get_prop.call_count)
 
     def test_get_with_inventory_not_found(self):
         with mock.patch.object(self.manager.db_api, "get_resource",
@@ -628,15 +828,26 @@ class TestResources(TestCase):
             mock.patch.object(utils, "get_addresses"),
             mock.patch.object(driver, "load_resource_driver"),
             mock.patch.object(db_api, "create_resource"),
-            mock.patch.object(db_api, "create_property"),
+            mock.patch.object(db_api, "create_properties"),
                 ) as (get_addr, load_res_driver, create_res,
-                      create_prop):
+                      create_props):
             get_addr.return_value = ["10.1.214.16"]
             load_res_driver.return_value = driver_obj
             driver_obj.validate_create.return_value = mock.MagicMock()
             driver_obj.get_properties.return_value = resource_ptys
             create_res.return_value = self.db_resource
-            self.manager.create(self.context, self.data)
+            create_props.return_value = [{"id": "pty-1",
+                                          "key": "vcenter_uuid",
+                                          "value": "vcenter-123"}]
+            db_api.get_resources_by_addresses.return_value = []
+            resp = self.manager.create(self.context, self.data)
+            create_props.assert_called_once_with(
+                self.context, {self.db_resource["id"]: resource_ptys},
+                session=mock.ANY)
+            self.assertEqual([{"id": "pty-1", "name": "vcenter_uuid",
+                               "value": "vcenter-123"}],
+                             resp["meta_data"])
+            self.assertFalse(db_api.get_properties.called)
 
     def test_create_internal_error(self):
         driver_obj = mock.MagicMock()
@@ -799,6 +1010,26 @@ class TestResources(TestCase):
                                     'state',
                                     eon_const.EON_RESOURCE_STATE_DEACTIVATING)
 
+    @mock.patch('eon.virt.common.utils.VirtCommonUtils.update_prop')
+    def test_deactivate_concurrent(self, mock_state):
+        res_inv = copy.deepcopy(fake_data.resource_inventory1)
+        with contextlib.nested(
+            mock.patch.object(driver, "load_resource_driver"),
+            mock.patch.object(self.manager, "get_with_inventory",
+                              return_value=res_inv),
+            mock.patch.object(self.manager.virt_utils, "transition_state",
+                              side_effect=exception.InvalidStateError(
+                                  observed="deactivating",
+                                  expected=["activated"])),
+            mock.patch.object(eventlet, "spawn_n"),
+            ) as (_, _, _, spawn_m):
+            self.assertRaises(exception.DeactivationFailure,
+                              self.manager.deactivate, self.context,
+                              fake_data.fake_id1, {})
+            self.assertFalse(spawn_m.called)
+        # the state set by the concurrent request is not rolled back
+        self.assertFalse(mock_state.called)
+
     def test_update_success_no_creds_change(self):
         driver_obj = mock.MagicMock()
         db_api = self.manager.db_api
@@ -894,9 +1125,15 @@ class TestResources(TestCase):
                                mock.patch.object(eventlet, "spawn_n")
                                ) as (get_inv, _):
             get_inv.return_value = resource_data
-            self.manager.provision(self.context,
-                                   "id_",
-                                   provision_data)
+            with mock.patch.object(self.manager.virt_utils,
+                                   "transition_state") as transition:
+                self.manager.provision(self.context,
+                                       "id_",
+                                       provision_data)
+            transition.assert_called_once_with(
+                self.context, "id_", [eon_const.EON_RESOURCE_STATE_IMPORTED],
+                eon_const.RESOURCE_STATE_PROVISON_INITIATED,
+                {"type": "hlinux"})
 
     @mock.patch('eon.virt.common.utils.VirtCommonUtils.update_prop')
     @mock.patch("eon.hlm_facade.hlm_facade_handler."
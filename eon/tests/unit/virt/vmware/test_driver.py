@@ -30,6 +30,7 @@ from eon.deployer import driver as net_driver
 from eon.virt.vmware import hlm_input_model
 from eon.hlm_facade.hlm_facade_handler import HLMFacadeWrapper
 from eon.virt.vmware import validator
+from eon.virt.vmware import vim_util
 from eon.virt.common import utils as vir_utils
 from oslo_config import cfg
 import copy
@@ -51,6 +52,7 @@ class TestDriver(base_test.TestCase):
     def setUp(self):
         super(TestDriver, self).setUp()
         self.vc_driver = driver.VMwareVCDriver()
+        self.config(activation_wave_window=0)
         self.comp_mock_driver = mock.MagicMock()
         self.net_mock_driver = mock.MagicMock()
         driver.eon.db = mock.MagicMock()
@@ -58,6 +60,11 @@ class TestDriver(base_test.TestCase):
         self.val = validator.ESXValidator(fake_data.resource_inventory)
         self.context = mock.MagicMock()
         self.vc_driver.hux_obj = HLMFacadeWrapper(self.context)
+        # registering a vCenter would page through a mocked inventory
+        patcher = mock.patch.object(vim_util, "iter_vcenter_inventory",
+                                    return_value=iter([]))
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_validate_create(self):
         context = fake_data.FakeContext()
@@ -66,7 +73,9 @@ class TestDriver(base_test.TestCase):
                 context, fake_data.create_data))
 
     def test_monitor_events(self):
-        self.assertIsNone(self.vc_driver.monitor_events('vc_data'))
+        with mock.patch.object(self.vc_driver.vcm, "update_vc_cache"):
+            self.assertIsNone(self.vc_driver.monitor_events(
+                fake_data.create_data))
 
     def test_validate_update(self):
         with contextlib.nested(
@@ -89,6 +98,96 @@ class TestDriver(base_test.TestCase):
                                         'db_vc_rsrcs',
                                         'db_vc_rscrc_prop')
 
+    def test_auto_import_resources_single_transaction(self):
+        db_api = self.vc_driver.db_api
+        vc_data = {"id": "vc-1"}
+        with contextlib.nested(
+            mock.patch.object(self.vc_driver.vcm, "poll_vcenter_resources"),
+            mock.patch.object(self.vc_driver, "_get_cluster_id_mapping"),
+            mock.patch.multiple(db_api,
+                                get_transactional_session=mock.DEFAULT,
+                                create_resources=mock.DEFAULT,
+                                create_properties=mock.DEFAULT,
+                                delete_resources=mock.DEFAULT,
+                                commit_session=mock.DEFAULT,
+                                rollback_session=mock.DEFAULT)
+                ) as (poll, id_mapping, db_apis):
+            poll.return_value = ([("domain-c1", "cluster1")],
+                                 [("domain-c2", "cluster2")])
+            id_mapping.return_value = [("id-2", "domain-c2"),
+                                       ("id-3", "domain-c3")]
+            db_apis["create_resources"].return_value = [{"id": "id-1"}]
+            session = db_apis["get_transactional_session"].return_value
+            self.vc_driver.auto_import_resources(self.context, vc_data,
+                                                 [], {})
+            self.assertEqual(
+                1, db_apis["get_transactional_session"].call_count)
+            values = db_apis["create_resources"].call_args[0][1]
+            self.assertEqual(["cluster1"], [v["name"] for v in values])
+            self.assertEqual("vc-1", values[0]["resource_mgr_id"])
+            db_apis["create_properties"].assert_called_once_with(
+                self.context, {"id-1": {"cluster_moid": "domain-c1"}},
+                session=session)
+            db_apis["delete_resources"].assert_called_once_with(
+                self.context, ["id-2"], session=session)
+            db_apis["commit_session"].assert_called_once_with(
+                "Auto-Import", session)
+            self.assertFalse(db_apis["rollback_session"].called)
+
+    def test_auto_import_resources_cluster_moids(self):
+        with contextlib.nested(
+            mock.patch.object(self.vc_driver.vcm, "poll_vcenter_resources"),
+            mock.patch.object(self.vc_driver, "_get_cluster_id_mapping"),
+            mock.patch.object(self.vc_driver, "db_api")
+                ) as (poll, id_mapping, db_api):
+            poll.return_value = ([("domain-c1", "cluster1"),
+                                  ("domain-c3", "cluster3")],
+                                 [("domain-c2", "cluster2")])
+            id_mapping.return_value = [("id-2", "domain-c2")]
+            db_api.create_resources.return_value = [{"id": "id-3"}]
+            self.vc_driver.auto_import_resources(
+                self.context, {"id": "vc-1"}, [], {},
+                cluster_moids=set(["domain-c3"]))
+            values = db_api.create_resources.call_args[0][1]
+            self.assertEqual(["cluster3"], [v["name"] for v in values])
+            db_api.delete_resources.assert_called_once_with(
+                self.context, [], session=mock.ANY)
+
+    def test_auto_import_resources_cluster_moids_unchanged(self):
+        with contextlib.nested(
+            mock.patch.object(self.vc_driver.vcm, "poll_vcenter_resources"),
+            mock.patch.object(self.vc_driver, "db_api")
+                ) as (poll, db_api):
+            poll.return_value = ([("domain-c1", "cluster1")], [])
+            self.vc_driver.auto_import_resources(
+                self.context, {"id": "vc-1"}, [], {},
+                cluster_moids=set(["domain-c3"]))
+            self.assertFalse(db_api.get_transactional_session.called)
+
+    def test_subscribe_inventory_events(self):
+        with mock.patch.object(self.vc_driver.vcm, "subscribe") as subscribe:
+            self.vc_driver.subscribe_inventory_events("callback")
+        subscribe.assert_called_once_with("callback")
+
+    def test_auto_import_resources_rollback(self):
+        db_api = self.vc_driver.db_api
+        with contextlib.nested(
+            mock.patch.object(self.vc_driver.vcm, "poll_vcenter_resources"),
+            mock.patch.object(self.vc_driver, "_get_cluster_id_mapping"),
+            mock.patch.multiple(db_api,
+                                get_transactional_session=mock.DEFAULT,
+                                create_resources=mock.DEFAULT,
+                                commit_session=mock.DEFAULT,
+                                rollback_session=mock.DEFAULT)
+                ) as (poll, id_mapping, db_apis):
+            poll.return_value = ([("domain-c1", "cluster1")], [])
+            id_mapping.return_value = []
+            db_apis["create_resources"].side_effect = Exception("failed")
+            self.vc_driver.auto_import_resources(self.context, {"id": "vc"},
+                                                 [], {})
+            self.assertFalse(db_apis["commit_session"].called)
+            self.assertEqual(1, db_apis["rollback_session"].call_count)
+
     def test__update_input_model(self):
         id_ = "123"
         server = [{'id': 123}, {'id': 456}]
@@ -327,19 +426,17 @@ class TestDriver(base_test.TestCase):
             mock.patch.object(self.vc_driver, "_update_state"),
             mock.patch.object(net_driver, "load_resource_network_driver"),
             mock.patch.object(self.vc_driver.db_api, "get_properties"),
-            mock.patch.object(self.vc_driver.db_api, "update_property"),
+            mock.patch.object(self.vc_driver.db_api, "upsert_properties"),
                                ) as (_, update_st, load_net, get_prop,
-                                     update_prop):
+                                     upsert_props):
             load_net.create.return_value = (
                 fake_data.host_commision_network_info)
             get_prop.return_value = [prop]
             self.vc_driver.host_commission(self.context, clus_d["type"],
                                            clus_d, network_prop)
-            update_prop.assert_called_once_with(self.context,
-                                                "update-property",
-                                                fake_data.fake_id1,
-                                                "hlm_properties",
-                                                prop.value)
+            upsert_props.assert_called_once_with(
+                self.context,
+                {fake_data.fake_id1: {"hlm_properties": prop.value}})
             update_st.assert_called_once_with(self.context, fake_data.fake_id1,
                                               "host-commissioning")
 
@@ -483,6 +580,8 @@ class TestDriver(base_test.TestCase):
         m_up_model.assert_called_once_with(fake_data.fake_id1,
                                            fake_data.pass_through)
 
+    @mock.patch('eon.hlm_facade.hlm_facade_handler.HLMFacadeWrapper.'
+                'config_processor_run')
     @mock.patch('eon.virt.vmware.driver.VMwareVCDriver._run_cp_playbooks')
     @mock.patch('eon.virt.vmware.driver.VMwareVCDriver._stop_compute_services')
     @mock.patch('eon.virt.vmware.driver.VMwareVCDriver._update_input_model')
@@ -494,9 +593,10 @@ class TestDriver(base_test.TestCase):
     @mock.patch('eon.virt.vmware.driver.VMwareVCDriver.provision')
     @mock.patch('eon.virt.vmware.driver.VMwareVCDriver.set_network_properties')
     def test_activate_exception(self, m_set_net, m_prov, md, mpo, mpu,
-                                mgm, m_bimd, m_update, m_stop, m_cp):
+                                mgm, m_bimd, m_update, m_stop, m_cp,
+                                m_cp_run):
         m_bimd.return_value = fake_data.pass_through
-        m_cp.side_effect = Exception
+        m_cp_run.side_effect = Exception
         self.assertRaises(Exception, self.vc_driver.activate,
                           self.context,
                           fake_data.fake_id1,
@@ -16,11 +16,18 @@
 
 import contextlib
 import eventlet
+import fixtures
 import mock
+import os
 import time
 import uuid
 
+from oslo_vmware import exceptions as vmware_excep
+from suds import sudsobject
 from testtools import TestCase
+from eon.common import session_pool
+from eon.common import utils
+from eon.virt.vmware import inventory_collector
 from eon.virt.vmware.inventory_collector import VCInventoryCollector
 from eon.virt.vmware import vim_util as v_util
 from eon.tests.unit import fake_data
@@ -98,6 +105,7 @@ class FolderObject(DataObject):
 
     def __init__(self, value):
         super(FolderObject, self).__init__()
+        self._type = "Folder"
         self.value = value
 
 
@@ -153,14 +161,17 @@ class TestVCInventoryCollector(TestCase):
 
     def setUp(self):
         super(TestVCInventoryCollector, self).setUp()
-        drs_mock = mock.Mock()
-        drs_mock.drsConfig.enabled = True
         self._pool = mock.MagicMock()
         self.pool = eventlet.GreenPool()
         self.vcdata = {"ip_address": "192.168.1.3",
                        'username': 'user',
                        'password': 'password'}
         self.session = mock.MagicMock()
+        self.snapshot_dir = self.useFixture(fixtures.TempDir()).path
+        inventory_collector.CONF.set_override(
+            'inventory_snapshot_dir', self.snapshot_dir, 'vmware')
+        self.addCleanup(inventory_collector.CONF.clear_override,
+                        'inventory_snapshot_dir', 'vmware')
         self.vc_inv = VCInventoryCollector(self.vcdata, self.session,
                                            self._pool)
         self.vc_inv._inventory = \
@@ -170,7 +181,7 @@ class TestVCInventoryCollector(TestCase):
              ('ClusterComputeResource', "domain-1"):
                 {'name': "esx-app-cluster1", "parent":
                     FolderObject("folder-13"),
-                    'configurationEx': drs_mock},
+                    'configuration.drsConfig.enabled': True},
              ('Folder', "folder-12"): {'mor': "folder-12"},
              ('Folder', "folder-13"): {'mor': "folder-13"},
              ('HostSystem', 'host-21'): {'name': "10.10.0.1"},
@@ -188,7 +199,8 @@ class TestVCInventoryCollector(TestCase):
                 {'name': "esx-app-cluster1", "parent":
                     FolderObject("folder-13")},
              ('Folder', "folder-12"): {'mor': "folder-12"},
-             ('Folder', "folder-13"): {'mor': "folder-13"},
+             ('Folder', "folder-13"): {'mor': "folder-13", "parent":
+                                       FolderObject("folder-12")},
              ('HostSystem', 'host-21'): {'name': "10.10.0.1"},
              ('Datacenter', 'datacenter-21'): {'hostFolder':
                                                 FolderObject("folder-12"),
@@ -233,12 +245,446 @@ class TestVCInventoryCollector(TestCase):
                                     'name': 'datacenter-21'}}
         self.assertEqual(self.vc_inv2.get_vc_inventory(), expected)
 
+    def _object_update(self, kind, mo_type, moid, **props):
+        objectupdate = DataObject()
+        objectupdate.kind = kind
+        objectupdate.obj = DataObject()
+        objectupdate.obj._type = mo_type
+        objectupdate.obj.value = moid
+        objectupdate.changeSet = []
+        for name, val in props.items():
+            prop = DataObject()
+            prop.op = "assign"
+            prop.name = name
+            prop.val = val
+            objectupdate.changeSet.append(prop)
+        return objectupdate
+
+    def _update_set(self, *objectupdates, **kwargs):
+        updateSet = DataObject()
+        updateSet.version = kwargs.get("version", "2")
+        updateSet.truncated = kwargs.get("truncated", False)
+        propFilterUpdate = DataObject()
+        propFilterUpdate.objectSet = list(objectupdates)
+        updateSet.filterSet = [propFilterUpdate]
+        return updateSet
+
+    def _apply_update(self, *args, **props):
+        self.vc_inv._updated_changed_properties(self._update_set(
+            self._object_update(*args, **props)))
+
+    def test_indexes_follow_updates(self):
+        self._apply_update("enter", "HostSystem", "host-22",
+                           name="10.10.0.2",
+                           parent=FolderObject("domain-c1997"))
+        self.assertEqual([("HostSystem", "host-22")],
+                         self.vc_inv.get_hosts_by_cluster_moid(
+                             "domain-c1997"))
+
+        # the host moves to another cluster
+        self._apply_update("modify", "HostSystem", "host-22",
+                           parent=FolderObject("domain-1"))
+        self.assertEqual([], self.vc_inv.get_hosts_by_cluster_moid(
+            "domain-c1997"))
+        self.assertEqual([("HostSystem", "host-22")],
+                         self.vc_inv.get_hosts_by_cluster_moid("domain-1"))
+
+        # the cluster is renamed
+        self._apply_update("modify", "ClusterComputeResource",
+                           "domain-c1997", name="renamed")
+        self.assertIsNone(self.vc_inv.get_cluster_by_name("esx-app-cluster"))
+        self.assertEqual(("ClusterComputeResource", "domain-c1997"),
+                         self.vc_inv.get_cluster_by_name("renamed"))
+
+        self._apply_update("leave", "HostSystem", "host-22")
+        self.assertEqual([], self.vc_inv.get_hosts_by_cluster_moid(
+            "domain-1"))
+
+    def test_indexes_follow_datacenter_updates(self):
+        self._apply_update("leave", "Datacenter", "datacenter-21")
+        self.assertIsNone(self.vc_inv.get_datacenter_for_cluster_moid(
+            "domain-c1997"))
+        self.assertEqual({'count': 0}, self.vc_inv.get_vc_inventory())
+
+        self._apply_update("enter", "Datacenter", "datacenter-22",
+                           name="dc2", hostFolder=FolderObject("folder-13"))
+        self.assertEqual({'moid': 'datacenter-22', 'name': 'dc2'},
+                         self.vc_inv.get_datacenter_for_cluster_moid(
+                             "domain-1"))
+        self.assertEqual([('domain-1', 'esx-app-cluster1')],
+                         self.vc_inv.get_cluster_names(True))
+
+    def test_coalesce_updates(self):
+        changes = {}
+        self.vc_inv._coalesce_updates(self._update_set(
+            self._object_update("modify", "HostSystem", "host-21",
+                                name="a"),
+            self._object_update("modify", "HostSystem", "host-21",
+                                name="b"),
+            self._object_update("leave", "Folder", "folder-13"),
+            self._object_update("enter", "Folder", "folder-13",
+                                name="f")), changes)
+        self.assertEqual({("HostSystem", "host-21"): ["modify",
+                                                      {"name": "b"}],
+                          ("Folder", "folder-13"): ["replace",
+                                                    {"name": "f"}]},
+                         changes)
+        self.vc_inv._apply_changes(changes)
+        self.assertEqual({"name": "f"},
+                         self.vc_inv._inventory[("Folder", "folder-13")])
+        self.assertEqual({"name": "b"},
+                         self.vc_inv._inventory[("HostSystem", "host-21")])
+
+    @mock.patch.object(v_util, "wait_for_updates_ex")
+    def test_wait_for_updates_truncated(self, wait_for_updates):
+        self.vc_inv.version = "1"
+        wait_for_updates.side_effect = [
+            self._update_set(self._object_update(
+                "modify", "HostSystem", "host-21", name="a"),
+                version="2", truncated=True),
+            self._update_set(self._object_update(
+                "modify", "HostSystem", "host-21", name="b"),
+                version="3")]
+        with mock.patch.object(self.vc_inv, "_apply_changes") as apply:
+            self.vc_inv._wait_for_updates()
+        apply.assert_called_once_with(
+            {("HostSystem", "host-21"): ["modify", {"name": "b"}]})
+        self.assertEqual("3", self.vc_inv.version)
+        self.assertEqual([mock.call(self.vc_inv.vim, "1", max_wait=85,
+                                    max_update_count=100),
+                          mock.call(self.vc_inv.vim, "2", max_wait=85,
+                                    max_update_count=100)],
+                         wait_for_updates.call_args_list)
+        stats = self.vc_inv.get_update_stats()
+        self.assertEqual((1, 1), (stats["batches"], stats["objects"]))
+
+    @mock.patch.object(v_util, "wait_for_updates_ex")
+    def test_wait_for_updates_lag(self, wait_for_updates):
+        self.vc_inv.version = "1"
+        wait_for_updates.return_value = self._update_set(
+            self._object_update("modify", "HostSystem", "host-21",
+                                name="a"), version="2")
+        # the wait returns right away, the change was made since the
+        # previous burst was received
+        self.vc_inv._last_received = 95
+        with mock.patch.object(inventory_collector, "time") as mock_time:
+            mock_time.time.side_effect = [100, 100, 102]
+            self.vc_inv._wait_for_updates()
+        self.assertEqual(7, self.vc_inv.get_update_stats()["last_lag"])
+
+        # the wait blocked until the change was made
+        self.vc_inv.version = "1"
+        with mock.patch.object(inventory_collector, "time") as mock_time:
+            mock_time.time.side_effect = [100, 150, 151]
+            self.vc_inv._wait_for_updates()
+        stats = self.vc_inv.get_update_stats()
+        self.assertEqual((1, 7), (stats["last_lag"], stats["max_lag"]))
+
+    @mock.patch.object(v_util, "wait_for_updates_ex")
+    def test_wait_for_updates_no_change(self, wait_for_updates):
+        self.vc_inv.version = "1"
+        wait_for_updates.return_value = self._update_set(version="1")
+        with mock.patch.object(self.vc_inv, "_apply_changes") as apply:
+            self.vc_inv._wait_for_updates()
+        self.assertFalse(apply.called)
+
+    def test_get_datacenter_for_cluster_in_nested_folder(self):
+        self.assertEqual({'moid': 'datacenter-21', 'name': 'datacenter-21'},
+                         self.vc_inv2.get_datacenter_for_cluster_moid(
+                             "domain-c1998"))
+        self.assertEqual([('domain-c1997', 'esx-app-cluster')],
+                         self.vc_inv2.get_cluster_names(True))
+
+    def test_inventory_events(self):
+        callback = mock.Mock()
+        self.vc_inv.subscribe(callback)
+        self.vc_inv._updated_changed_properties(self._update_set(
+            self._object_update("enter", "ClusterComputeResource",
+                                "domain-c2000", name="new",
+                                parent=FolderObject("folder-12")),
+            self._object_update("leave", "ClusterComputeResource",
+                                "domain-1"),
+            self._object_update("modify", "ClusterComputeResource",
+                                "domain-c1997", name="renamed"),
+            self._object_update("modify", "HostSystem", "host-21",
+                                name="10.10.0.9")))
+        events = [
+            inventory_collector.InventoryEvent(
+                inventory_collector.CLUSTER_ENTERED, "domain-c2000", "new",
+                None),
+            inventory_collector.InventoryEvent(
+                inventory_collector.CLUSTER_LEFT, "domain-1",
+                "esx-app-cluster1", None),
+            inventory_collector.InventoryEvent(
+                inventory_collector.CLUSTER_RENAMED, "domain-c1997",
+                "renamed", "esx-app-cluster")]
+        self._pool.spawn_n.assert_called_once_with(self.vc_inv._notify,
+                                                   callback, events)
+        self.vc_inv._notify(callback, events)
+        callback.assert_called_once_with(self.vcdata, events)
+
+    def test_inventory_events_cluster_moved(self):
+        self.vc_inv.subscribe(mock.Mock())
+        changes = {}
+        self.vc_inv._coalesce_updates(self._update_set(
+            self._object_update("modify", "ClusterComputeResource",
+                                "domain-c1997",
+                                parent=FolderObject("folder-13")),
+            # the initial update set repeats the cached properties
+            self._object_update("enter", "ClusterComputeResource",
+                                "domain-1", name="esx-app-cluster1",
+                                parent=FolderObject("folder-13"))), changes)
+        self.assertEqual(
+            [inventory_collector.InventoryEvent(
+                inventory_collector.CLUSTER_MOVED, "domain-c1997",
+                "esx-app-cluster", None)],
+            self.vc_inv._get_cluster_events(changes))
+
+    def test_inventory_events_no_subscribers(self):
+        self.vc_inv._updated_changed_properties(self._update_set(
+            self._object_update("leave", "ClusterComputeResource",
+                                "domain-1")))
+        self.assertFalse(self._pool.spawn_n.called)
+
+    def test_notify_failure(self):
+        callback = mock.Mock(side_effect=Exception("failed"))
+        self.vc_inv._notify(callback, [])
+        callback.assert_called_once_with(self.vcdata, [])
+
     def test_register_managed_objects(self):
+        clusters = [ClusterComputeResource(), ManagedObject("HostSystem")]
+        missing = DataObject()
+        missing.missingSet = []
+        with contextlib.nested(
+            mock.patch.object(v_util, "iter_vcenter_inventory",
+                              return_value=iter([clusters[:1],
+                                                 [clusters[1], missing]])),
+            mock.patch.object(v_util, "create_filter"),
+            ) as (iter_inventory, create_filter):
+            self.vc_inv._inventory = {}
+            self.vc_inv.register_managed_objects(self.vcdata)
+        self.assertEqual(
+            set([("ClusterComputeResource", "domain-c1999"),
+                 ("HostSystem", clusters[1].value)]),
+            set(self.vc_inv._inventory))
+        self.assertEqual({"name": "esx-app-cluster2"}, self.vc_inv._inventory[
+            ("ClusterComputeResource", "domain-c1999")])
+        self.assertTrue(create_filter.called)
+        self._pool.spawn_n.assert_called_once_with(
+            self.vc_inv.monitor_property_updates)
+
+    def test_get_health(self):
+        clusters = [ClusterComputeResource(), ManagedObject("HostSystem")]
+        with contextlib.nested(
+            mock.patch.object(v_util, "iter_vcenter_inventory",
+                              return_value=iter([clusters])),
+            mock.patch.object(v_util, "create_filter")):
+            self.vc_inv._inventory = {}
+            self.vc_inv.register_managed_objects(self.vcdata)
+        health = self.vc_inv.get_health()
+        self.assertEqual({"ClusterComputeResource": 1, "HostSystem": 1},
+                         health["objects"])
+        self.assertEqual("192.168.1.3", health["ip_address"])
+        self.assertEqual("vcenter", health["source"])
+        self.assertFalse(health["monitoring"])
+        self.assertEqual(0, health["reconnects"])
+        self.assertIsNotNone(health["initial_load_seconds"])
+        self.assertTrue(0 <= health["update_age"] < 60)
+        self.assertIsNone(health["poll_age"])
+        self.assertTrue(health["memory_bytes"] > 0)
+
+    def test_estimate_size(self):
+        self.vc_inv._inventory = self._converted_inventory(30)
+        actual = utils.deep_size(self.vc_inv._objects)
+        with mock.patch.object(inventory_collector, "SIZE_SAMPLE", 5):
+            estimate = self.vc_inv.estimate_size()
+        self.assertTrue(actual / 2 < estimate < actual * 2,
+                        (estimate, actual))
+
+    def test_register_managed_objects_empty(self):
         with contextlib.nested(
-            mock.patch.object(v_util, "retreive_vcenter_inventory"),
+            mock.patch.object(v_util, "iter_vcenter_inventory",
+                              return_value=iter([])),
             mock.patch.object(v_util, "create_filter"),
-            ):
+            ) as (_, create_filter):
             self.vc_inv.register_managed_objects(self.vcdata)
+        self.assertFalse(create_filter.called)
+        self.assertFalse(self._pool.spawn_n.called)
+
+    @staticmethod
+    def _mor(mo_type, moid):
+        mor = sudsobject.Property(moid)
+        mor._type = mo_type
+        return mor
+
+    def _suds_inventory(self, vm_count=2):
+        vms = sudsobject.Object()
+        vms.ManagedObjectReference = [
+            self._mor("VirtualMachine", "vm-%s" % i) for i in range(vm_count)]
+        return {
+            ('Datacenter', 'datacenter-21'): {
+                'name': "dc1",
+                'hostFolder': self._mor("Folder", "folder-12")},
+            ('Folder', 'folder-12'): {'name': "host"},
+            ('ClusterComputeResource', 'domain-c7'): {
+                'name': "cluster1",
+                'parent': self._mor("Folder", "folder-12"),
+                'configuration.drsConfig.enabled': True,
+                'summary.totalMemory': 1024L},
+            ('HostSystem', 'host-21'): {
+                'name': "10.10.0.1",
+                'parent': self._mor("ClusterComputeResource", "domain-c7"),
+                'runtime.connectionState': "connected",
+                'vm': vms},
+        }
+
+    def _converted_inventory(self, vm_count=2):
+        return dict((key, dict((name, inventory_collector.convert_property(
+                                   key[0], name, val))
+                               for name, val in props.items()))
+                    for key, props in self._suds_inventory(vm_count).items())
+
+    def test_convert_property(self):
+        inventory = self._converted_inventory()
+        cluster = inventory[('ClusterComputeResource', 'domain-c7')]
+        self.assertEqual(inventory_collector.MoRef("Folder", "folder-12"),
+                         cluster['parent'])
+        self.assertEqual(2, inventory[('HostSystem', 'host-21')]['vm'])
+        self.assertEqual(0, inventory_collector.convert_property(
+            "HostSystem", "vm", 0))
+
+        mount = sudsobject.Object()
+        mount.key = self._mor("HostSystem", "host-21")
+        mounts = sudsobject.Object()
+        mounts.DatastoreHostMount = [mount]
+        self.assertEqual(("host-21",), inventory_collector.convert_property(
+            "Datastore", "host", mounts))
+        self.assertEqual("datastore1", inventory_collector.convert_property(
+            "Datastore", "name", "datastore1"))
+
+    def test_compact_inventory_footprint(self):
+        raw = utils.deep_size(self._suds_inventory(30))
+        compact = utils.deep_size(self._converted_inventory(30))
+        self.assertTrue(compact * 5 < raw, (compact, raw))
+
+    def test_snapshot_round_trip(self):
+        self.vc_inv._inventory = self._converted_inventory()
+        self.vc_inv.version = "42"
+        self.assertTrue(self.vc_inv.save_snapshot())
+        self.assertEqual(["192.168.1.3.json.gz"],
+                         os.listdir(self.snapshot_dir))
+
+        vc_inv = VCInventoryCollector(self.vcdata, None, self._pool)
+        self.assertTrue(vc_inv.load_snapshot())
+        self.assertTrue(vc_inv.from_snapshot)
+        self.assertEqual("42", vc_inv.snapshot_version)
+        self.assertEqual(
+            {'datacenter': {'moid': 'datacenter-21', 'name': 'dc1'},
+             'DRS': True,
+             'hosts': [{'name': '10.10.0.1', 'moid': 'host-21',
+                        'connection_state': 'connected', 'vms': 2}]},
+            vc_inv.get_cluster_spec_inventory("domain-c7"))
+        self.assertEqual([("domain-c7", "cluster1")],
+                         vc_inv.get_cluster_names(True))
+        self.assertEqual(self.vc_inv._inventory, vc_inv._inventory)
+
+    def test_load_snapshot_missing(self):
+        vc_inv = VCInventoryCollector(self.vcdata, None, self._pool)
+        self.assertFalse(vc_inv.load_snapshot())
+        self.assertFalse(vc_inv.from_snapshot)
+
+    def test_load_snapshot_corrupted(self):
+        with open(os.path.join(self.snapshot_dir, "192.168.1.3.json.gz"),
+                  "w") as snapshot_file:
+            snapshot_file.write("not a snapshot")
+        vc_inv = VCInventoryCollector(self.vcdata, None, self._pool)
+        self.assertFalse(vc_inv.load_snapshot())
+
+    @mock.patch.object(inventory_collector, "time")
+    def test_load_snapshot_too_old(self, mock_time):
+        mock_time.time.return_value = 1000
+        self.vc_inv.save_snapshot()
+        vc_inv = VCInventoryCollector(self.vcdata, None, self._pool)
+        mock_time.time.return_value = 1000 + 86401
+        self.assertFalse(vc_inv.load_snapshot())
+        mock_time.time.return_value = 1000 + 86399
+        self.assertTrue(vc_inv.load_snapshot())
+
+    def test_snapshot_disabled(self):
+        inventory_collector.CONF.set_override('inventory_snapshot_dir', '',
+                                              'vmware')
+        self.assertFalse(self.vc_inv.save_snapshot())
+        self.assertFalse(self.vc_inv.load_snapshot())
+        self.assertEqual([], os.listdir(self.snapshot_dir))
+
+    @mock.patch.object(inventory_collector, "time")
+    def test_save_snapshot_if_due(self, mock_time):
+        mock_time.time.return_value = 1000
+        self.vc_inv.save_snapshot()
+        self.vc_inv.version = "2"
+        mock_time.time.return_value = 1299
+        with mock.patch.object(self.vc_inv, "save_snapshot") as save:
+            self.vc_inv._save_snapshot_if_due()
+            self.assertFalse(save.called)
+            mock_time.time.return_value = 1300
+            self.vc_inv._save_snapshot_if_due()
+            self.assertEqual(1, save.call_count)
+            self.vc_inv.version = ""
+            self.vc_inv._save_snapshot_if_due()
+            self.assertEqual(1, save.call_count)
+
+    def test_register_managed_objects_reconciles_snapshot(self):
+        self.vc_inv.save_snapshot()
+        vc_inv = VCInventoryCollector(self.vcdata, self.session, self._pool)
+        vc_inv.load_snapshot()
+        callback = mock.Mock()
+        vc_inv.subscribe(callback)
+        with contextlib.nested(
+            mock.patch.object(v_util, "iter_vcenter_inventory",
+                              return_value=iter([[ClusterComputeResource()]])),
+            mock.patch.object(v_util, "create_filter"),
+            mock.patch.object(vc_inv, "save_snapshot"),
+            ) as (_, _, save_snapshot):
+            vc_inv.register_managed_objects(self.vcdata)
+        self.assertEqual([("ClusterComputeResource", "domain-c1999")],
+                         list(vc_inv._inventory))
+        self.assertFalse(vc_inv.from_snapshot)
+        self.assertTrue(save_snapshot.called)
+        events = self._pool.spawn_n.call_args_list[0][0][2]
+        self.assertEqual(
+            sorted([(inventory_collector.CLUSTER_LEFT, "domain-c1997"),
+                    (inventory_collector.CLUSTER_LEFT, "domain-1"),
+                    (inventory_collector.CLUSTER_ENTERED, "domain-c1999")]),
+            sorted((event.kind, event.moid) for event in events))
+
+    def test_register_managed_objects_keeps_snapshot_on_failure(self):
+        self.vc_inv.save_snapshot()
+        vc_inv = VCInventoryCollector(self.vcdata, self.session, self._pool)
+        vc_inv.load_snapshot()
+
+        def _pages(*args, **kwargs):
+            yield [ClusterComputeResource()]
+            raise Exception("connection lost")
+
+        with contextlib.nested(
+            mock.patch.object(v_util, "iter_vcenter_inventory",
+                              side_effect=_pages),
+            mock.patch.object(v_util, "create_filter"),
+            mock.patch.object(vc_inv, "save_snapshot"),
+            ) as (_, _, save_snapshot):
+            vc_inv.register_managed_objects(self.vcdata)
+        self.assertEqual(set(self.vc_inv._inventory), set(vc_inv._inventory))
+        self.assertTrue(vc_inv.from_snapshot)
+        self.assertFalse(save_snapshot.called)
+
+    def test_load_inventory_from(self):
+        self.vc_inv.from_snapshot = True
+        self.vc_inv.snapshot_version = "3"
+        self.vc_inv2.load_inventory_from(self.vc_inv)
+        self.assertEqual(self.vc_inv._inventory, self.vc_inv2._inventory)
+        self.assertTrue(self.vc_inv2.from_snapshot)
+        self.assertEqual([('domain-c1997', 'esx-app-cluster')],
+                         self.vc_inv2.get_cluster_names(True))
 
     def mock_ret_true(self):
         yield True
@@ -256,6 +702,71 @@ class TestVCInventoryCollector(TestCase):
             wait_for_updates.return_value = fake_vim.wait_for_updates_ex(None,
                                                                     "enter")
             self.vc_inv.monitor_property_updates()
+        health = self.vc_inv.get_health()
+        self.assertTrue(0 <= health["poll_age"] < 60)
+        self.assertTrue(0 <= health["update_age"] < 60)
+        self.assertFalse(health["monitoring"])
+
+    def test_monitor_property_updates_reconnects(self):
+        with contextlib.nested(
+            mock.patch.object(v_util, "wait_for_updates_ex",
+                              side_effect=vmware_excep.VimConnectionException(
+                                  "connection lost")),
+            mock.patch.object(v_util, "create_filter"),
+            mock.patch.object(self.vc_inv, "wait_for_inventory",
+                              side_effect=self.mock_ret_true())):
+            self.vc_inv.monitor_property_updates()
+        self.assertEqual(1, self.vc_inv.get_health()["reconnects"])
+        self.session._create_session.assert_called_once_with()
+
+    def test_monitor_property_updates_reconnects_pooled_session(self):
+        reconnected = mock.MagicMock()
+        with contextlib.nested(
+            mock.patch.object(v_util, "wait_for_updates_ex",
+                              side_effect=vmware_excep.VimFaultException(
+                                  [inventory_collector.NOT_AUTHENTICATED],
+                                  "not authenticated")),
+            mock.patch.object(v_util, "create_filter"),
+            mock.patch.object(session_pool, "reconnect",
+                              return_value=reconnected),
+            mock.patch.object(session_pool, "release", return_value=True),
+            mock.patch.object(self.vc_inv, "wait_for_inventory",
+                              side_effect=self.mock_ret_true())
+            ) as (_, create_filter, reconnect, release, _):
+            self.vc_inv.monitor_property_updates()
+        # re-authenticated through its pool, not on its own
+        reconnect.assert_called_once_with(self.session)
+        self.assertFalse(self.session._create_session.called)
+        create_filter.assert_called_once_with(reconnected.vim)
+        release.assert_called_once_with(reconnected)
+
+    def test_monitor_property_updates_removed_not_reconnected(self):
+        def wait_for_updates(*args, **kwargs):
+            # the vCenter is removed while waiting for its updates
+            self.vc_inv.monitor = False
+            raise vmware_excep.VimFaultException(
+                [inventory_collector.NOT_AUTHENTICATED], "logged out")
+        with contextlib.nested(
+            mock.patch.object(v_util, "wait_for_updates_ex",
+                              side_effect=wait_for_updates),
+            mock.patch.object(session_pool, "reconnect"),
+            mock.patch.object(session_pool, "release", return_value=False)
+            ) as (_, reconnect, _):
+            self.vc_inv.monitor_property_updates()
+        self.assertFalse(reconnect.called)
+        self.assertFalse(self.session._create_session.called)
+        # no longer pooled, it is logged out by the collector
+        self.session.logout.assert_called_once_with()
+
+    def test_monitor_property_updates_stopped_releases_session(self):
+        with contextlib.nested(
+            mock.patch.object(self.vc_inv, "wait_for_inventory",
+                              return_value=False),
+            mock.patch.object(session_pool, "release")) as (_, release):
+            self.vc_inv.monitor_property_updates()
+        # the pooled session stays logged in for its other users
+        release.assert_called_once_with(self.session)
+        self.assertFalse(self.session.logout.called)
 
     def test_monitor_property_updates_leave(self):
         fake_vim = FakeVim()
@@ -294,10 +805,91 @@ class TestVCInventoryCollector(TestCase):
         self.assertEqual(expected,
                         self.vc_inv.get_cluster_spec_inventory(cluster_moid))
 
+    def test_get_vc_inventory_memoized(self):
+        build = mock.patch.object(self.vc_inv, "_build_vc_inventory",
+                                  wraps=self.vc_inv._build_vc_inventory)
+        with build as mock_build:
+            view = self.vc_inv.get_vc_inventory()
+            view.pop("count")
+            view["datacenter-21"]["clusters"].clear()
+            # a host change does not change the datacenters and clusters
+            self._apply_update("modify", "HostSystem", "host-21",
+                               **{"runtime.connectionState": "disconnected"})
+            self.assertEqual({'count': 1, 'datacenter-21': {
+                'clusters': {'domain-c1997': 'esx-app-cluster'},
+                'clusters_count': 1, 'name': 'datacenter-21'}},
+                self.vc_inv.get_vc_inventory())
+            self.assertEqual(1, mock_build.call_count)
+
+            self._apply_update("modify", "ClusterComputeResource",
+                               "domain-c1997", name="renamed")
+            self.assertEqual(
+                {'domain-c1997': 'renamed'},
+                self.vc_inv.get_vc_inventory()["datacenter-21"]["clusters"])
+            self.assertEqual(2, mock_build.call_count)
+
+    def test_get_cluster_spec_inventory_memoized(self):
+        connected = {"runtime.connectionState": "connected"}
+        self._apply_update("enter", "HostSystem", "host-22",
+                           name="10.10.0.2", parent=FolderObject("domain-1"),
+                           **connected)
+        self._apply_update("enter", "HostSystem", "host-23",
+                           name="10.10.0.3",
+                           parent=FolderObject("domain-c1997"), **connected)
+        hosts = mock.patch.object(self.vc_inv, "get_hosts_for_cluster",
+                                  wraps=self.vc_inv.get_hosts_for_cluster)
+        with hosts as mock_hosts:
+            spec = self.vc_inv.get_cluster_spec_inventory("domain-1")
+            self.assertEqual(["10.10.0.2"],
+                             [host["name"] for host in spec["hosts"]])
+            spec["hosts"][0]["name"] = "changed"
+
+            # a host of another cluster changes
+            self._apply_update("modify", "HostSystem", "host-23",
+                               name="10.10.0.33")
+            spec = self.vc_inv.get_cluster_spec_inventory("domain-1")
+            self.assertEqual("10.10.0.2", spec["hosts"][0]["name"])
+            self.assertEqual(1, mock_hosts.call_count)
+
+            self._apply_update("modify", "HostSystem", "host-22",
+                               name="10.10.0.22")
+            spec = self.vc_inv.get_cluster_spec_inventory("domain-1")
+            self.assertEqual("10.10.0.22", spec["hosts"][0]["name"])
+            self.assertEqual(2, mock_hosts.call_count)
+
+            # the host moves to another cluster
+            self._apply_update("modify", "HostSystem", "host-22",
+                               parent=FolderObject("domain-c1997"))
+            spec = self.vc_inv.get_cluster_spec_inventory("domain-1")
+            self.assertEqual([], spec.get("hosts", []))
+
+    def test_get_cluster_spec_inventory_vm_counts(self):
+        vms = DataObject()
+        vms.ManagedObjectReference = [mock.ANY, mock.ANY]
+        self._apply_update("enter", "HostSystem", "host-22",
+                           name="10.10.0.2", parent=FolderObject("domain-1"),
+                           vm=vms, **{"runtime.connectionState": "connected"})
+        self.vc_inv.vim = mock.MagicMock()
+        hosts = mock.patch.object(self.vc_inv, "get_hosts_for_cluster",
+                                  wraps=self.vc_inv.get_hosts_for_cluster)
+        with hosts as mock_hosts:
+            for _ in range(3):
+                spec = self.vc_inv.get_cluster_spec_inventory("domain-1")
+                self.assertEqual([2], [host["vms"] for host in spec["hosts"]])
+            self.assertEqual(1, mock_hosts.call_count)
+
+            # the last VM left the host
+            self._apply_update("modify", "HostSystem", "host-22", vm=None)
+            spec = self.vc_inv.get_cluster_spec_inventory("domain-1")
+            self.assertEqual([0], [host["vms"] for host in spec["hosts"]])
+            self.assertEqual(2, mock_hosts.call_count)
+        # the repeated GETs are served from memory
+        self.assertEqual([], self.vc_inv.vim.mock_calls)
+
     def test_get_hosts_for_cluster(self):
         host_mors = [("HostSystem", fake_data.host_moid1)]
-        with mock.patch.object(self.vc_inv, "get_hosts_by_cluster_moid") \
-            as get_host:
+        with mock.patch.object(self.vc_inv, "get_hosts_by_cluster_moid"
+                               ) as get_host:
             self.vc_inv._inventory = fake_data.sample_inventory
             get_host.return_value = host_mors
             observed = self.vc_inv.get_hosts_for_cluster(
@@ -306,13 +898,13 @@ class TestVCInventoryCollector(TestCase):
 
     def test_get_hosts_for_cluster_with_vms(self):
         host_mors = [("HostSystem", fake_data.host_moid1)]
-        with mock.patch.object(self.vc_inv, "get_hosts_by_cluster_moid") \
-            as get_host:
+        with mock.patch.object(self.vc_inv, "get_hosts_by_cluster_moid"
+                               ) as get_host:
             self.vc_inv._inventory = fake_data.sample_inventory_with_vms
             get_host.return_value = host_mors
             observed = self.vc_inv.get_hosts_for_cluster(
                 fake_data.cluster_moid1)
-            self.assertEqual(fake_data.host_fake_inv_data1, observed)
+            self.assertEqual(fake_data.host_fake_inv_data_with_vms, observed)
             get_host.assert_called_once_with(fake_data.cluster_moid1)
 
     def test_get_hosts_by_cluster_moid(self):
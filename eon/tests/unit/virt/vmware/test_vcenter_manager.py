@@ -18,6 +18,9 @@ import contextlib
 import eventlet
 import mock
 
+from eon.common import exception
+
+from eon.common import session_pool
 from eon.virt.vmware import inventory_collector
 from eon.virt.vmware import vcenter_manager
 from testtools import TestCase
@@ -32,6 +35,7 @@ class TestVcenterManager(TestCase):
                        'username': 'user',
                        'password': 'password'}
         self.vcm = vcenter_manager.vCenterManager()
+        self.addCleanup(session_pool.close_pools)
 
     def test_add_vcenter(self):
         vcenter_version = "4.1:699731"
@@ -58,6 +62,74 @@ class TestVcenterManager(TestCase):
             session_m.return_value = session_mock
             self.assertTrue(self.vcm.get_vcenter_info(self.vcdata))
 
+    def test_get_session_pooled(self):
+        with mock.patch.object(vcenter_manager, "VMwareAPISession") \
+                as session_m:
+            with self.vcm._session(self.vcdata) as session:
+                pass
+            with self.vcm._session(self.vcdata) as reused:
+                self.assertIs(session, reused)
+            session_m.assert_called_once_with("192.168.1.3", "user",
+                                              "password", host_port=443)
+
+            session.is_current_session_active.return_value = False
+            with mock.patch.object(session_pool, "time") as mock_time:
+                mock_time.time.return_value = float("inf")
+                with self.vcm._session(self.vcdata) as reused:
+                    self.assertIs(session, reused)
+            session._create_session.assert_called_once_with()
+            self.assertEqual(1, session_m.call_count)
+
+    def test_get_session_held_by_collector(self):
+        with mock.patch.object(vcenter_manager, "VMwareAPISession",
+                               side_effect=lambda *args, **kwargs:
+                               mock.MagicMock()) as session_m:
+            collector_session = self.vcm._get_session(self.vcdata)
+            # the short operations log in another session
+            with self.vcm._session(self.vcdata) as session:
+                self.assertIsNot(collector_session, session)
+            self.assertEqual(2, session_m.call_count)
+            session_pool.release(collector_session)
+            self.assertFalse(collector_session.logout.called)
+
+    def test_get_session_failure(self):
+        with mock.patch.object(vcenter_manager, "VMwareAPISession",
+                               side_effect=Exception("login failed")):
+            self.assertRaises(exception.VCenterRegisterFailure,
+                              self.vcm._get_session, self.vcdata)
+
+    def test_get_inventory_health(self):
+        collectors = {}
+        for ip_address in ("192.168.1.3", "192.168.1.2"):
+            collectors[ip_address] = mock.MagicMock()
+            collectors[ip_address].get_health.return_value = {
+                "ip_address": ip_address}
+        self.vcm.registered_vcenters = collectors
+        self.addCleanup(setattr, self.vcm, "registered_vcenters", {})
+        self.assertEqual([{"ip_address": "192.168.1.2"},
+                          {"ip_address": "192.168.1.3"}],
+                         self.vcm.get_inventory_health())
+
+    def test_subscribe(self):
+        callback = mock.Mock()
+        inv_mock = mock.MagicMock()
+        self.vcm.registered_vcenters = {"192.168.1.2": inv_mock}
+        self.addCleanup(setattr, self.vcm, "_subscribers", [])
+        self.addCleanup(setattr, self.vcm, "registered_vcenters", {})
+        self.vcm.subscribe(callback)
+        inv_mock.subscribe.assert_called_once_with(callback)
+
+        with contextlib.nested(
+            mock.patch.object(self.vcm, "_get_vcenter_version",
+                              return_value=("10.10", "10.10.1",
+                                            mock.MagicMock())),
+            mock.patch.object(inventory_collector, "VCInventoryCollector"),
+            mock.patch.object(self.vcm, "_get_vcenter_uuid"),
+            mock.patch.object(utils, "validate_vcenter_version")
+                ) as (_, inv_coll, _, _):
+            self.vcm.add_vcenter(self.vcdata)
+        inv_coll.return_value.subscribe.assert_called_once_with(callback)
+
     def test_get_registered_clusters(self):
         db_vc_resources = [{"name": "cluster1", "type": "esxcluster",
                             "id": "1234"}]
@@ -108,6 +180,40 @@ class TestVcenterManager(TestCase):
         with mock.patch.object(eventlet, "spawn_n"):
             self.assertIsNone(self.vcm.monitor_events(self.vcdata))
 
+    def test_monitor_events_loads_snapshot(self):
+        self.addCleanup(setattr, self.vcm, "registered_vcenters", {})
+        self.vcm.registered_vcenters = {}
+        with contextlib.nested(
+            mock.patch.object(eventlet, "spawn_n"),
+            mock.patch.object(inventory_collector, "VCInventoryCollector"),
+                ) as (spawn_n, inv_coll):
+            inv_coll.return_value.load_snapshot.return_value = True
+            self.vcm.monitor_events(self.vcdata)
+        inv_coll.assert_called_once_with(mock.ANY, None, self.vcm._pool)
+        self.assertEqual(inv_coll.return_value,
+                         self.vcm.registered_vcenters["192.168.1.3"])
+        spawn_n.assert_called_once_with(self.vcm.update_vc_cache,
+                                        self.vcdata)
+
+    def test_add_vcenter_serves_snapshot(self):
+        snapshot_collector = mock.MagicMock(from_snapshot=True)
+        self.addCleanup(setattr, self.vcm, "registered_vcenters", {})
+        self.vcm.registered_vcenters = {"192.168.1.3": snapshot_collector}
+        with contextlib.nested(
+            mock.patch.object(self.vcm, "_get_vcenter_version",
+                              return_value=("10.10", "10.10.1",
+                                            mock.MagicMock())),
+            mock.patch.object(inventory_collector, "VCInventoryCollector"),
+            mock.patch.object(self.vcm, "_get_vcenter_uuid"),
+            mock.patch.object(utils, "validate_vcenter_version")
+                ) as (_, inv_coll, _, _):
+            self.vcm.add_vcenter(dict(self.vcdata))
+        _invcollector = inv_coll.return_value
+        _invcollector.load_inventory_from.assert_called_once_with(
+            snapshot_collector)
+        self.assertEqual(_invcollector,
+                         self.vcm.registered_vcenters["192.168.1.3"])
+
     def test_update_vc_cache(self):
         with mock.patch.object(self.vcm, "add_vcenter"):
             self.assertIsNone(self.vcm.update_vc_cache(self.vcdata))
@@ -115,5 +221,11 @@ class TestVcenterManager(TestCase):
     def test_delete_vcenter(self):
         inv_mock = mock.MagicMock()
         self.vcm.registered_vcenters = {"192.168.1.3": inv_mock}
-        self.assertIsNone(self.vcm.delete_vcenter(self.vcdata))
+        with contextlib.nested(
+            mock.patch.object(inventory_collector, "remove_snapshot"),
+            mock.patch.object(session_pool, "remove_pools"),
+                ) as (remove_snapshot, remove_pools):
+            self.assertIsNone(self.vcm.delete_vcenter(self.vcdata))
         self.assertEquals(self.vcm.registered_vcenters, {})
+        remove_snapshot.assert_called_once_with("192.168.1.3")
+        remove_pools.assert_called_once_with("192.168.1.3")
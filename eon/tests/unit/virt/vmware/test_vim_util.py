@@ -53,6 +53,46 @@ class TestVIMUtil(TestCase):
             ):
             self.assertIsNone(vim_util.create_filter(vim))
 
+    def test_create_filter_use_case(self):
+        vim = mock.MagicMock()
+        builder = mock.Mock()
+        self.addCleanup(vim_util._FILTER_SPEC_BUILDERS.pop, "test")
+        vim_util.register_filter_spec_builder("test", builder)
+        vim_util.create_filter(vim, use_case="test")
+        builder.build.assert_called_once_with(vim)
+        vim.CreateFilter.assert_called_once_with(
+            vim._service_content.propertyCollector,
+            spec=builder.build.return_value, partialUpdates=False)
+
+    def test_update_spec_skips_volatile_properties(self):
+        updates = vim_util.get_filter_spec_builder(
+            vim_util.INVENTORY_UPDATES).prop_spec_map
+        self.assertFalse("summary.freeSpace" in updates["Datastore"])
+        # the VM counts of the hosts are kept from the updates
+        self.assertTrue("vm" in updates["HostSystem"])
+
+    def test_property_filter_spec_builder(self):
+        vim = mock.MagicMock()
+        builder = vim_util.PropertyFilterSpecBuilder(
+            {"HostSystem": ["name", "vm"], "Datastore": ["name"]})
+        with contextlib.nested(
+            mock.patch.object(vmware_util, "build_recursive_traversal_spec"),
+            mock.patch.object(vmware_util, "build_object_spec"),
+            mock.patch.object(vmware_util, "build_property_spec"),
+            mock.patch.object(vmware_util, "build_property_filter_spec"),
+            ) as (build_trav_spec, build_object_spec, build_prop_spec,
+                  build_filter_spec):
+            builder.build(vim)
+            build_object_spec.assert_called_once_with(
+                vim.client.factory, vim.service_content.rootFolder,
+                [build_trav_spec.return_value])
+            self.assertEqual(
+                [mock.call(vim.client.factory, type_="Datastore",
+                           properties_to_collect=["name"]),
+                 mock.call(vim.client.factory, type_="HostSystem",
+                           properties_to_collect=["name", "vm"])],
+                build_prop_spec.call_args_list)
+
     def test_wait_for_updates_ex(self):
         vim = mock.MagicMock()
         self.assertTrue(vim_util.wait_for_updates_ex(vim,
@@ -61,3 +101,40 @@ class TestVIMUtil(TestCase):
     def test_retreive_vcenter_inventory(self):
         vim = mock.MagicMock()
         self.assertTrue(vim_util.retreive_vcenter_inventory(vim))
+
+    def _result(self, objects, token=None):
+        return mock.Mock(objects=objects, token=token)
+
+    def test_iter_vcenter_inventory(self):
+        vim = mock.MagicMock()
+        vim.ContinueRetrievePropertiesEx.side_effect = [
+            self._result(["obj2"], token="token2"),
+            self._result(["obj3"])]
+        with mock.patch.object(vim_util, "retreive_vcenter_inventory",
+                               return_value=self._result(["obj1"],
+                                                         token="token1")):
+            pages = list(vim_util.iter_vcenter_inventory(vim))
+        self.assertEqual([["obj1"], ["obj2"], ["obj3"]], pages)
+        collector = vim.service_content.propertyCollector
+        self.assertEqual(
+            [mock.call(collector, token="token1"),
+             mock.call(collector, token="token2")],
+            vim.ContinueRetrievePropertiesEx.call_args_list)
+        self.assertFalse(vim.CancelRetrievePropertiesEx.called)
+
+    def test_iter_vcenter_inventory_no_objects(self):
+        with mock.patch.object(vim_util, "retreive_vcenter_inventory",
+                               return_value=None):
+            self.assertEqual(
+                [], list(vim_util.iter_vcenter_inventory(mock.MagicMock())))
+
+    def test_iter_vcenter_inventory_stopped(self):
+        vim = mock.MagicMock()
+        with mock.patch.object(vim_util, "retreive_vcenter_inventory",
+                               return_value=self._result(["obj1"],
+                                                         token="token1")):
+            pages = vim_util.iter_vcenter_inventory(vim)
+            next(pages)
+            pages.close()
+        vim.CancelRetrievePropertiesEx.assert_called_once_with(
+            vim.service_content.propertyCollector, token="token1")
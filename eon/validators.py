@@ -124,6 +124,40 @@ class ValidatorBase(object):
                 msg = _("Invalid parameter '%s' passed for querying") % key_
                 raise exception.Invalid(msg)
 
+    def validate_pagination(self, kws, supported_sort_keys):
+        """
+        :raises
+            exception.Invalid
+        """
+        limit = kws.get(res_const.LIMIT_KEY)
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except (TypeError, ValueError):
+                limit = 0
+            if limit <= 0:
+                msg = _("Limit must be a positive integer")
+                raise exception.Invalid(msg)
+        marker = kws.get(res_const.MARKER_KEY)
+        if marker is not None:
+            try:
+                uuid.UUID(marker)
+            except (TypeError, ValueError):
+                msg = _("Marker '%s' is not a valid UUID") % marker
+                raise exception.Invalid(msg)
+        sort_key = kws.get(res_const.SORT_KEY)
+        if sort_key is not None and sort_key not in supported_sort_keys:
+            msg = (_("Invalid sort key '%s'. Supported sort keys are %s")
+                   % (sort_key, supported_sort_keys))
+            raise exception.Invalid(msg)
+        sort_dir = kws.get(res_const.SORT_DIR_KEY)
+        if (sort_dir is not None and
+                sort_dir not in res_const.SUPPORTED_SORT_DIRS):
+            msg = (_("Invalid sort direction '%s'. Supported sort "
+                     "directions are %s")
+                   % (sort_dir, res_const.SUPPORTED_SORT_DIRS))
+            raise exception.Invalid(msg)
+
     def validate_keys_for_type(self, type_, data):
         _keys = data.keys()
         if type_ == res_const.RHEL:
@@ -195,7 +229,9 @@ class ResourceManagerValidator(ValidatorBase):
         """
         self.validate_query_params(kws,
                                    const.SUPPORTED_QUERY_PARAMS)
-        self.validate_type(kws[const.TYPE_KEY], const.SUPPORTED_TYPES)
+        if kws.get(const.TYPE_KEY):
+            self.validate_type(kws[const.TYPE_KEY], const.SUPPORTED_TYPES)
+        self.validate_pagination(kws, const.SUPPORTED_SORT_KEYS)
 
 
 class ResourceValidator(ValidatorBase):
@@ -212,6 +248,7 @@ class ResourceValidator(ValidatorBase):
         if kws.get(res_const.STATE_KEY):
             self.validate_state(res_const.SUPPORTED_STATES,
                                 kws[res_const.STATE_KEY])
+        self.validate_pagination(kws, res_const.SUPPORTED_SORT_KEYS)
 
     def validate_post(self, json_body):
         self.validate_type(json_body[const.TYPE_KEY],
@@ -0,0 +1,275 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+"""Coalesces the activations of compute resources requested at about the
+same time into waves, each committing the input model, running the config
+processor, ready deployment and site once for all of them.
+"""
+
+import eventlet
+from eventlet import event
+from oslo_config import cfg
+
+from eon.hlm_facade import constants as facade_constants
+from eon.openstack.common import lockutils
+from eon.openstack.common import log as logging
+
+activation_opts = [
+    cfg.IntOpt('activation_wave_window',
+               default=5,
+               help='Seconds the activations requested after one another '
+                    'are collected to be run by the same playbook runs'),
+    cfg.IntOpt('activation_wave_max_size',
+               default=50,
+               help='Maximum number of compute resources activated by the '
+                    'same playbook runs'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(activation_opts)
+
+LOG = logging.getLogger(__name__)
+
+
+class ActivationRequest(object):
+    """Activation of a compute resource run by a wave. The drivers subclass
+    it to add the resource to the input model and to prepare it for site.
+
+    :param id_: id of the resource
+    :param hosts: ids of the input model servers of the resource
+    :param hux_obj: HLMFacadeWrapper of the request
+    :param task: commit task of the resource when activated on its own
+    """
+    # attempts of site to wait for the resource
+    retries = facade_constants.RETRY_COUNT
+    run_monitoring = True
+
+    def __init__(self, id_, hosts, hux_obj, task):
+        self.id_ = id_
+        self.hosts = hosts
+        self.hux_obj = hux_obj
+        self.task = task
+        self._result = event.Event()
+
+    def apply_changes(self):
+        """Updates the input model, not committed yet"""
+        raise NotImplementedError()
+
+    def remove_changes(self):
+        """Removes the resource from the input model, not committed yet,
+        when its committed changes are deployed again on their own
+        """
+        for host in self.hosts:
+            self.hux_obj.delete_server(host)
+
+    def before_site(self):
+        """Runs the steps of the resource between ready deployment and
+        site
+        """
+        pass
+
+    def run_site(self):
+        """Runs site for the resource alone"""
+        self.hux_obj.run_playbook_by_ids('site', self.hosts,
+                                         retries=self.retries)
+
+    def succeeded(self):
+        if not self._result.ready():
+            self._result.send()
+
+    def failed(self, error):
+        if not self._result.ready():
+            LOG.error("[%s] Activation failed: %s" % (self.id_, error))
+            self._result.send_exception(error)
+
+    def wait(self):
+        return self._result.wait()
+
+
+class ActivationScheduler(object):
+    """Runs the activations in waves, one at a time. The activations
+    requested while a wave runs, or within activation_wave_window seconds
+    of the first one, make up the next wave.
+    """
+
+    def __init__(self):
+        self._pending = []
+        self._worker = None
+
+    def activate(self, request):
+        """Waits for the wave activating the resource of request, raising
+        the error the activation of the resource failed with.
+        """
+        self._pending.append(request)
+        if self._worker is None:
+            self._worker = eventlet.spawn(self._run)
+        request.wait()
+
+    def _run(self):
+        wave = []
+        ran_wave = False
+        try:
+            while self._pending:
+                # a lone activation is not delayed, the others requested
+                # meanwhile make up the next wave
+                if CONF.activation_wave_window > 0 and (
+                        ran_wave or len(self._pending) > 1):
+                    eventlet.sleep(CONF.activation_wave_window)
+                size = max(1, CONF.activation_wave_max_size)
+                wave, self._pending = (self._pending[:size],
+                                       self._pending[size:])
+                with lockutils.lock("run-playbook"):
+                    with lockutils.lock("set-playbook-lock"):
+                        self._run_wave(wave)
+                ran_wave = True
+        except BaseException as e:
+            # the callers would otherwise wait forever
+            requests, self._pending = wave + self._pending, []
+            error = e if isinstance(e, Exception) else Exception(
+                "The activation waves were interrupted: %r" % e)
+            LOG.error("Failing the activations of %s: %s"
+                      % ([request.id_ for request in requests], error))
+            for request in requests:
+                request.failed(error)
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self._worker = None
+
+    def _run_wave(self, wave):
+        LOG.info("Activating the compute resources %s"
+                 % [request.id_ for request in wave])
+        try:
+            wave = self._apply_changes(wave)
+            if not wave:
+                return
+            hux_obj = wave[0].hux_obj
+            wave = self._deploy(hux_obj, wave)
+            wave = self._call(wave, "before_site")
+            wave = self._run_site(hux_obj, wave)
+            if any(request.run_monitoring for request in wave):
+                hux_obj.run_monitoring_playbooks()
+        except Exception as e:
+            LOG.exception(e)
+            for request in wave:
+                request.failed(e)
+            return
+        for request in wave:
+            request.succeeded()
+
+    def _apply_changes(self, wave):
+        """Applies the input model changes of the wave, reverting them and
+        applying them again without those failing. Returns the requests
+        applied.
+        """
+        while wave:
+            for request in wave:
+                try:
+                    request.apply_changes()
+                except Exception as e:
+                    request.failed(e)
+                    break
+            else:
+                return wave
+            wave = [other for other in wave if other is not request]
+            request.hux_obj.revert_changes()
+        return wave
+
+    def _deploy(self, hux_obj, wave):
+        """Commits the input model changes of the wave and runs the config
+        processor and ready deployment once for all of them. When that
+        fails, the changes are taken out of the input model and deployed
+        again one resource at a time. Returns the requests deployed.
+        """
+        committed = False
+        try:
+            if len(wave) == 1:
+                hux_obj.commit_changes(wave[0].id_, wave[0].task)
+            else:
+                hux_obj.commit_changes(
+                    ",".join(request.id_ for request in wave),
+                    "Activate %d compute resources" % len(wave))
+            committed = True
+            hux_obj.config_processor_run()
+            hux_obj.ready_deployment()
+            return wave
+        except Exception:
+            if len(wave) == 1:
+                raise
+            LOG.info("Deploying the input model changes of %s failed, "
+                     "deploying them one at a time"
+                     % [request.id_ for request in wave])
+        self._remove_changes(hux_obj, wave, committed)
+        deployed = []
+        for request in wave:
+            committed = False
+            try:
+                request.apply_changes()
+                hux_obj.commit_changes(request.id_, request.task)
+                committed = True
+                hux_obj.config_processor_run()
+                hux_obj.ready_deployment()
+                deployed.append(request)
+            except Exception as e:
+                request.failed(e)
+                # not to fail the deployment of the next ones
+                self._remove_changes(hux_obj, [request], committed)
+        return deployed
+
+    def _remove_changes(self, hux_obj, wave, committed):
+        hux_obj.revert_changes()
+        if committed:
+            for request in wave:
+                request.remove_changes()
+            hux_obj.commit_changes(
+                ",".join(request.id_ for request in wave),
+                "Rollback activation of compute resources")
+
+    def _call(self, wave, step):
+        applied = []
+        for request in wave:
+            try:
+                getattr(request, step)()
+                applied.append(request)
+            except Exception as e:
+                request.failed(e)
+        return applied
+
+    def _run_site(self, hux_obj, wave):
+        if not wave:
+            return wave
+        hosts = [host for request in wave for host in request.hosts]
+        try:
+            hux_obj.run_playbook_by_ids(
+                'site', hosts,
+                retries=sum(request.retries for request in wave))
+            return wave
+        except Exception:
+            if len(wave) == 1:
+                raise
+            LOG.info("site failed for %s, running it for each of them"
+                     % hosts)
+        return self._call(wave, "run_site")
+
+
+_SCHEDULER = ActivationScheduler()
+
+
+def activate(request):
+    """Activates the resource of request with the other resources being
+    activated, see ActivationScheduler.activate
+    """
+    _SCHEDULER.activate(request)
@@ -49,29 +49,55 @@ class VirtCommonUtils(object):
         self.db_api.setup_db_env()
 
     def update_prop(self, context, rsrc_id, prop, prop_value):
-        db_session_event = ('update-%s' % prop)
+        self.update_props(context, rsrc_id, {prop: prop_value})
+
+    def update_props(self, context, rsrc_id, values):
+        """Updates several fields of a resource in one transaction.
+
+        :param values: dict of the resource fields and their new values
+        """
+        props = ", ".join(sorted(values))
+        db_session_event = ('update-%s' % props)
         try:
-            LOG.debug("Updating resource: %s's %s to %s" % (
-                                                    rsrc_id, prop, prop_value))
+            LOG.debug("Updating resource: %s's fields to %s" % (
+                                                    rsrc_id, values))
             db_session = self.db_api.get_transactional_session(
                 db_session_event)
-            values = {prop: prop_value}
             self.db_api.update_resource(context,
                                         rsrc_id,
                                         values,
                                         session=db_session)
 
             self.db_api.commit_session(db_session_event, db_session)
-            LOG.info("Updated the resource [%s] %s to: %s" %
-                     (rsrc_id, prop, prop_value))
+            LOG.info("Updated the resource [%s] fields to: %s" %
+                     (rsrc_id, values))
         except Exception as e:
             msg = (_("Updating 'eon resource %s' failed. Error: "
-                     "'%s'") % (prop, e.message))
+                     "'%s'") % (props, e.message))
             log_msg = (("Updating 'eon resource %s' failed. Error: "
-                     "'%s'") % (prop, e.message))
+                     "'%s'") % (props, e.message))
             LOG.error(log_msg)
             raise exception.UpdateException(msg=msg)
 
+    def transition_state(self, context, rsrc_id, expected_states,
+                         next_state, values=None):
+        """Moves the resource to next_state only if it is still in one of
+        the expected states, along with the other fields in values.
+
+        :raises InvalidStateError: if the resource has moved to another
+            state meanwhile, e.g. by a concurrent request
+        """
+        if not self.db_api.update_resource_state(context, rsrc_id,
+                                                 expected_states,
+                                                 next_state, values):
+            observed = self.db_api.get_resource(context, rsrc_id).state
+            LOG.info("[%s] Not moved to state %s, observed state %s"
+                     % (rsrc_id, next_state, observed))
+            raise exception.InvalidStateError(observed=observed,
+                                              expected=expected_states)
+        LOG.info("Updated the resource [%s] state to: %s" %
+                 (rsrc_id, next_state))
+
     def create_servers_payload(self, body, db_data):
         hlm_payload = {}
         # base payload for provision and activate
@@ -88,18 +88,31 @@ class ResourceDriver(object):
 
     def auto_import_resources(self, context, db_resource_mgr_data,
                               db_rsrcs,
-                              db_rsrcs_properties):
+                              db_rsrcs_properties, **kwargs):
         """
            Returns list of resources added/removed
         """
         raise NotImplementedError()
 
+    def subscribe_inventory_events(self, callback):
+        """
+           Subscribes callback(resource_mgr_data, events) to the inventory
+           change events of the resource_mgrs
+        """
+        pass
+
     def get_inventory(self):
         """
            Returns the resource_mgr/ resource inventory on creation
         """
         raise NotImplementedError()
 
+    def get_inventory_health(self):
+        """
+           Returns the health of the inventory caches of the resource_mgrs
+        """
+        return []
+
     def get_res_inventory(self):
         """
         Returns the resource inventory
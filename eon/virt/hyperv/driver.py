@@ -16,6 +16,7 @@
 
 from eon.openstack.common import log as logging
 from eon.openstack.common import lockutils
+from eon.virt import activation_scheduler
 from eon.virt import driver
 from eon.virt.common.utils import VirtCommonUtils
 from eon.hlm_facade.hlm_facade_handler import HLMFacadeWrapper
@@ -41,6 +42,21 @@ CONF.register_group(opt_group)
 CONF.register_opts(HYPERV_ROOT_ACTIONS_OPTS, opt_group)
 
 
+class HyperVActivation(activation_scheduler.ActivationRequest):
+    """Activation of a HyperV compute resource by a wave"""
+    run_monitoring = False
+
+    def __init__(self, resource_id, input_model_data, hux_obj):
+        super(HyperVActivation, self).__init__(
+            resource_id, [resource_id], hux_obj,
+            "Activate HyperV compute resource")
+        self.input_model_data = input_model_data
+
+    def apply_changes(self):
+        # update input model
+        self.hux_obj.create_server(self.input_model_data)
+
+
 class HyperVDriver(driver.ResourceDriver):
 
     def __init__(self):
@@ -357,7 +373,6 @@ class HyperVDriver(driver.ResourceDriver):
                     'state', constants.EON_RESOURCE_STATE_PROVISIONED)
             raise e
 
-    @lockutils.synchronized("set-playbook-lock")
     def _invoke_activate_playbooks(self, context, id_,
                                    activate_data,
                                    input_model_data,
@@ -366,19 +381,20 @@ class HyperVDriver(driver.ResourceDriver):
         resource_id = resource_inventory[constants.EON_RESOURCE_ID]
         hux_obj = HLMFacadeWrapper(context)
         try:
-            # update input model
-            hux_obj.create_server(input_model_data)
             if run_playbook:
-                hux_obj.commit_changes(
-                    resource_id, "Activate HyperV compute resource")
-                hux_obj.config_processor_run()
-                hux_obj.ready_deployment()
-                hux_obj.run_playbook_by_ids('site', resource_id)
-                self.post_activation_steps(context, id_,
-                                                      resource_inventory)
+                # committed and deployed with the resources activated
+                # at the same time
+                activation_scheduler.activate(HyperVActivation(
+                    resource_id, input_model_data, hux_obj))
+                self.post_activation_steps(context, id_, resource_inventory)
+            else:
+                with lockutils.lock("set-playbook-lock"):
+                    # update input model
+                    hux_obj.create_server(input_model_data)
         except Exception as e:
-            self._rollback_activate(context, hux_obj, resource_inventory,
-                                    run_playbook)
+            with lockutils.lock("set-playbook-lock"):
+                self._rollback_activate(context, hux_obj,
+                                        resource_inventory, run_playbook)
             raise e
 
     @lockutils.synchronized("set-playbook-lock")
@@ -21,6 +21,7 @@ from eon.hlm_facade.hlm_facade_handler import HLMFacadeWrapper
 from eon.hlm_facade import exception as facade_excep
 from eon.openstack.common import log as logging
 from eon.openstack.common import lockutils
+from eon.virt import activation_scheduler
 from eon.virt import constants
 from eon.virt import driver
 from eon.virt.common import utils as vir_utils
@@ -30,6 +31,37 @@ import eon.db
 LOG = logging.getLogger(__name__)
 
 
+class KVMActivation(activation_scheduler.ActivationRequest):
+    """Activation of a KVM compute resource by a wave"""
+
+    def __init__(self, kvm_driver, activate_data, input_model_data,
+                 resource_inventory, hux_obj):
+        resource_id = resource_inventory.get(constants.EON_RESOURCE_ID)
+        super(KVMActivation, self).__init__(
+            resource_id, [resource_id], hux_obj,
+            "Activate cobbler-provisioned KVM compute resource")
+        self.driver = kvm_driver
+        self.activate_data = activate_data
+        self.input_model_data = input_model_data
+        self.resource_inventory = resource_inventory
+        self.pre_provisioned = False
+
+    def apply_changes(self):
+        # For pre-provisioned node, check input model data
+        self.pre_provisioned = self.driver._update_input_model(
+            self.hux_obj, self.id_, self.activate_data,
+            self.input_model_data, self.resource_inventory)
+        if self.pre_provisioned:
+            self.task = "Activate pre-provisioned KVM compute resource"
+
+    def before_site(self):
+        if self.pre_provisioned:
+            self.driver._configure_ssh(self.hux_obj,
+                                       self.resource_inventory)
+        self.driver._configure_disks(self.hux_obj, self.activate_data,
+                                     self.resource_inventory)
+
+
 class KVMDriver(driver.ResourceDriver):
 
     def __init__(self):
@@ -120,95 +152,93 @@ class KVMDriver(driver.ResourceDriver):
                                           action=None):
         pass
 
-    @lockutils.synchronized("set-playbook-lock")
+    def _update_input_model(self, hux_obj, id_, activate_data,
+                            input_model_data, resource_inventory):
+        """Updates the server of the resource in the input model, returns
+        whether it had to be created as the resource is pre-provisioned
+        """
+        resource_id = resource_inventory.get(constants.EON_RESOURCE_ID)
+        try:
+            hux_obj.update_server_by_id(input_model_data, resource_id)
+            return False
+        except facade_excep.NotFound:
+            LOG.error("[%s] Resource not in HLM input model. Update"
+                      " with complete payload" % id_)
+            # build complete input model
+            input_model_data.update(
+                self.virt_utils.create_servers_payload(
+                    activate_data, resource_inventory))
+            # update input model
+            hux_obj.create_server(input_model_data)
+            return True
+
+    def _configure_ssh(self, hux_obj, resource_inventory):
+        # Create hlmuser and copy ssh keys
+        resource_id = resource_inventory.get(constants.EON_RESOURCE_ID)
+        username = resource_inventory.get(constants.EON_RESOURCE_USERNAME)
+        password = resource_inventory.get(constants.EON_RESOURCE_PASSWORD)
+        encrypted_password = vir_utils.get_encrypted_password(password)
+        password = constants.DECRYPT_LOOK_UP_STR % (encrypted_password)
+        extra_args = {"extraVars": {
+            "ansible_ssh_user": username,
+            "ansible_ssh_pass": password,
+            "hlmpassword": password
+        }}
+        hux_obj.run_playbook_by_ids('hlm_ssh_configure',
+                                    resource_id, extra_args=extra_args)
+
+    def _configure_disks(self, hux_obj, activate_data, resource_inventory):
+        resource_id = resource_inventory.get(constants.EON_RESOURCE_ID)
+        skip_disk_config = activate_data.get(constants.SKIP_DISK_CONFIG)
+        remote_connection = RemoteConnection(
+                        resource_inventory.get("ip_address"),
+                        resource_inventory.get("username"),
+                        resource_inventory.get("password"))
+        if str(skip_disk_config).lower() == "true":
+            self.modify_marker_to_skip_disk_config(remote_connection,
+                                                   action="create")
+        elif str(skip_disk_config).lower() == "false":
+            self.modify_marker_to_skip_disk_config(remote_connection,
+                                                   action="delete")
+
+            run_wipe_disks = activate_data.get(constants.RUN_WIPE_DISKS,
+                                               False)
+            if run_wipe_disks and str(run_wipe_disks).lower() == "true":
+                has_os_config_ran = vir_utils.check_if_os_config_ran(
+                    remote_connection)
+                if not has_os_config_ran:
+                    self.run_wipe_disks(hux_obj, resource_id)
+                else:
+                    LOG.warn("Skipping run wipe disks. If you need"
+                             " to force run wipe disks, delete"
+                             " the marker file %s on the compute"
+                             " node before activation." % constants.
+                             OSCONFIG_RAN_MARKER)
+
     def _invoke_activate_playbooks(self, context, id_,
                                    activate_data,
                                    input_model_data,
                                    run_playbook,
                                    resource_inventory):
-        resource_id = resource_inventory.get(constants.EON_RESOURCE_ID)
         hux_obj = HLMFacadeWrapper(context)
         try:
-            # For pre-provisioned node, check input model data
-            try:
-                hux_obj.update_server_by_id(input_model_data,
-                                            resource_id)
-                if run_playbook:
-                    hux_obj.commit_changes(
-                        resource_id,
-                        "Activate cobbler-provisioned KVM compute resource")
-                    hux_obj.config_processor_run()
-                    hux_obj.ready_deployment()
-            except facade_excep.NotFound:
-                LOG.error("[%s] Resource not in HLM input model. Update"
-                          " with complete payload" % id_)
-                # build complete input model
-                input_model_data.update(
-                    self.virt_utils.create_servers_payload(
-                        activate_data, resource_inventory))
-                # update input model
-                hux_obj.create_server(input_model_data)
-                if run_playbook:
-                    hux_obj.commit_changes(
-                        resource_id,
-                        "Activate pre-provisioned KVM compute resource")
-                    hux_obj.config_processor_run()
-                    hux_obj.ready_deployment()
-                    # Create hlmuser and copy ssh keys
-                    username = resource_inventory.get(
-                        constants.EON_RESOURCE_USERNAME)
-                    password = resource_inventory.get(
-                        constants.EON_RESOURCE_PASSWORD)
-                    encrypted_password = (vir_utils
-                        .get_encrypted_password(password))
-                    password = (constants.DECRYPT_LOOK_UP_STR
-                                 % (encrypted_password))
-                    extra_args = {"extraVars": {
-                        "ansible_ssh_user": username,
-                        "ansible_ssh_pass": password,
-                        "hlmpassword": password
-                    }}
-                    hux_obj.run_playbook_by_ids('hlm_ssh_configure',
-                        resource_id, extra_args=extra_args)
-
             if run_playbook:
-                skip_disk_config = activate_data.get(
-                    constants.SKIP_DISK_CONFIG)
-                extra_args = None
-                remote_connection = RemoteConnection(
-                                resource_inventory.get("ip_address"),
-                                resource_inventory.get("username"),
-                                resource_inventory.get("password"))
-                if str(skip_disk_config).lower() == "true":
-                    self.modify_marker_to_skip_disk_config(remote_connection,
-                                                           action="create")
-                elif str(skip_disk_config).lower() == "false":
-                    self.modify_marker_to_skip_disk_config(remote_connection,
-                                                           action="delete")
-
-                    run_wipe_disks = activate_data.get(
-                        constants.RUN_WIPE_DISKS, False)
-                    if run_wipe_disks and \
-                                    str(run_wipe_disks).lower() == "true":
-                        has_os_config_ran = vir_utils.check_if_os_config_ran(
-                            remote_connection)
-                        if not has_os_config_ran:
-                            self.run_wipe_disks(hux_obj, resource_id)
-                        else:
-                            LOG.warn("Skipping run wipe disks. If you need"
-                                     " to force run wipe disks, delete"
-                                     " the marker file %s on the compute"
-                                     " node before activation." % constants.
-                                     OSCONFIG_RAN_MARKER)
-
-                hux_obj.run_playbook_by_ids('site', resource_id,
-                                     extra_args=extra_args)
-                hux_obj.run_monitoring_playbooks()
+                # committed and deployed with the resources activated
+                # at the same time
+                activation_scheduler.activate(KVMActivation(
+                    self, activate_data, input_model_data,
+                    resource_inventory, hux_obj))
                 self.post_activation_steps(context, id_,
                                            resource_inventory)
+            else:
+                with lockutils.lock("set-playbook-lock"):
+                    self._update_input_model(hux_obj, id_, activate_data,
+                                             input_model_data,
+                                             resource_inventory)
         except Exception as e:
-            self._rollback_activate(context, hux_obj, resource_inventory,
-                                    run_playbook)
+            with lockutils.lock("set-playbook-lock"):
+                self._rollback_activate(context, hux_obj,
+                                        resource_inventory, run_playbook)
             raise e
 
     @lockutils.synchronized("set-playbook-lock")
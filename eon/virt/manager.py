@@ -14,8 +14,12 @@
 # under the License.
 #.
 
+import collections
 import copy
 import eventlet
+import functools
+import threading
+import time
 from copy import deepcopy
 from oslo_config import cfg
 
@@ -28,6 +32,7 @@ from eon.common import message_notifier
 from eon.openstack.common.gettextutils import _
 from eon.hlm_facade.hlm_facade_handler import HLMFacadeWrapper
 from eon.hlm_facade import exception as facade_excep
+from eon.openstack.common import lockutils
 from eon.openstack.common import log as logging
 from eon.validators import ResourceValidator
 from eon.virt import constants as eon_const
@@ -38,9 +43,17 @@ from eon.virt import driver
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 
+cache_opts = [
+    cfg.IntOpt('resource_cache_size', default=1024,
+               help='Maximum number of resource, resource manager and '
+                    'property rows cached in memory. 0 disables the '
+                    'cache.'),
+]
+CONF.register_opts(cache_opts)
+
 
 def _make_response(db_data,
-                   property_list=[],
+                   property_list=None,
                    session=None,
                    inventory=None,
                    meta_data=True,
@@ -52,6 +65,7 @@ def _make_response(db_data,
     :param property_list: a list of dicts if passed is the
         meta/properties info of the eon_resource else if None then
         all properties of the eon_resource is collected from DB.
+        An empty list means the eon_resource has no properties.
         This value is referred from response through key
         EON_RESOURCE_META_KEY
     :param session: DB session.
@@ -84,9 +98,7 @@ def _make_response(db_data,
 
     if meta_data:
         # Getting properties
-        if not property_list:
-            property_list = []
-
+        if property_list is None:
             db_api = eon.db.get_api()
             db_api.setup_db_env()
             property_list = db_api.get_properties(
@@ -126,8 +138,18 @@ def _validate_duplicate_names(res_data, name, _id=None):
         return True
 
 
+def _get_address_keys(ipaddrlist):
+    """Returns the resolved addresses along with their normalized forms,
+    as matched against the ip_address and normalized_address columns"""
+    return (set(ipaddrlist) |
+            set(utils.normalize_address(addr) for addr in ipaddrlist))
+
+
 def _validate_create(context, db_api, create_data, model_name):
-    """ Validates the resource manager before creating it."""
+    """ Validates the resource manager before creating it.
+
+    :return: the normalized resolved address to store for the new entry
+    """
     ipaddrlist = utils.get_addresses(create_data['ip_address'])
 
     if not ipaddrlist:
@@ -139,52 +161,51 @@ def _validate_create(context, db_api, create_data, model_name):
     LOG.info("IP/FQDN for the " + model_name + " %s is %s" % (
         create_data['ip_address'],
         ipaddrlist))
+    name = create_data.get("name")
     try:
-        get_all = getattr(db_api, "get_all_%ss" % model_name)
-        res_data = get_all(context)
-        if not res_data:
-            # No registered resources
-            LOG.info("No registered %s" % model_name)
-            return
+        same_name_data = []
+        if name:
+            get_all = getattr(db_api, "get_all_%ss" % model_name)
+            same_name_data = get_all(context, name=name)
+        get_by_addresses = getattr(db_api,
+                                   "get_%ss_by_addresses" % model_name)
+        same_address_data = get_by_addresses(context,
+                                             _get_address_keys(ipaddrlist))
     except Exception:
         errors = (_("Failed to retrieve data for (%s) %s")
                   % (model_name, create_data.get('ip_address')))
         raise exception.InternalFailure(reason=errors)
-    name = create_data.get("name")
-    valid_name = _validate_duplicate_names(res_data, name)
+    valid_name = _validate_duplicate_names(same_name_data, name)
     if not valid_name:
         msg = (_("Two different (%s) with same "
                  "name cannot be registered") % model_name)
         raise exception.ResourceExists(reason=msg)
-    registered_data = []
-    for data in res_data:
-        registered_data.append(data['ip_address'])
 
-    if set(ipaddrlist).intersection(set(registered_data)):
+    if same_address_data:
         errors = (_("(%s) by ip_address (%s) already exists.")
                   % (model_name, create_data['ip_address']))
         raise exception.ResourceExists(reason=errors)
+    return utils.normalize_address(ipaddrlist[0])
 
 
 def _validate_update(context, db_api, update_data, _id,
                      model_name):
+    """ Validates the update of a resource manager or resource.
+
+    :return: the normalized resolved address to store when the address
+        is changed, else None
+    """
     get_resource = getattr(db_api, "get_%s" % model_name)
     res_data = get_resource(context, _id)
     if not res_data:
         errors = (_("(%s) with id [%s] does"
                     " not exist") % (model_name, _id))
         raise exception.ResourceNotFound(reason=errors)
-    get_all = getattr(db_api, "get_all_%ss" % model_name)
-    res_all_data = get_all(context)
-    if not res_all_data:
-        # This should not happen
-        errors = (_("Could not retrieve (%s) %s")
-                  % (model_name, update_data.get('ip_address')))
-        raise exception.InternalFailure(reason=errors)
     name = update_data.get("name")
     if name:
+        get_all = getattr(db_api, "get_all_%ss" % model_name)
         validate_name = _validate_duplicate_names(
-            res_all_data, name, _id)
+            get_all(context, name=name), name, _id)
         if not validate_name:
             msg = (_("Update Failed since (%s) with"
                      " given name already exists") % model_name)
@@ -206,27 +227,116 @@ def _validate_update(context, db_api, update_data, _id,
         raise exception.AddressResolutionFailure(reason=errors)
     # Check if there is another resource registered with the same
     # information as the modified data
-    registered_data = []
-    for data in res_all_data:
-        if data['id'] != _id:
-            registered_data.append(data['ip_address'])
-    LOG.info(registered_data)
-    LOG.info(ipaddrlist)
-    duplicates = set(ipaddrlist).intersection(set(registered_data))
+    get_by_addresses = getattr(db_api, "get_%ss_by_addresses" % model_name)
+    duplicates = [data for data in
+                  get_by_addresses(context, _get_address_keys(ipaddrlist))
+                  if data['id'] != _id]
     if duplicates:
         errors = (_("Update of (%s) failed: " +
                     "(%s) (%s) already exists.") %
                  (model_name, model_name, update_data['ip_address']))
         raise exception.ResourceExists(reason=errors)
+    return utils.normalize_address(ipaddrlist[0])
 
 
-class ResourceManager:
+class RowCache(object):
+    """LRU cache of resource, resource manager and property rows.
+
+    The DB API invalidates the entries on every write of the cached rows,
+    see register_row_cache in eon.db.sqlalchemy.api. A row invalidated
+    while it is being loaded is not stored. Writes made by other processes
+    are not seen. The cached rows are shared and must not be modified.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._rows = collections.OrderedDict()
+        # token of the pending load of each key
+        self._loading = {}
+
+    def get(self, key, loader):
+        """Return the cached row for key, loading it with loader on a miss
+
+        :param key: (table name, id) tuple, the id being the parent_id for
+            the property tables
+        :param loader: callable returning the row(s) from the DB
+        """
+        with self._lock:
+            if key in self._rows:
+                self.hits += 1
+                row = self._rows.pop(key)
+                self._rows[key] = row
+                return row
+            self.misses += 1
+            token = object()
+            self._loading[key] = token
+        row = loader()
+        with self._lock:
+            if self._loading.get(key) is token:
+                del self._loading[key]
+                if self.max_size > 0:
+                    self._rows[key] = row
+                    while len(self._rows) > self.max_size:
+                        self._rows.popitem(last=False)
+        return row
+
+    def invalidate(self, keys):
+        with self._lock:
+            for key in keys:
+                self._rows.pop(key, None)
+                self._loading.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+            self._loading.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'size': len(self._rows),
+                    'max_size': self.max_size}
+
+
+class CachedReadsMixin(object):
+    """Reads of the resource, resource manager and property rows through
+    the RowCache of the instance
+    """
+
+    def _init_cache(self):
+        self.cache = RowCache(CONF.resource_cache_size)
+        self.db_api.register_row_cache(self.cache)
+
+    def _get_resource(self, context, id_):
+        return self.cache.get(
+            ('resource', id_),
+            lambda: self.db_api.get_resource(context, id_))
+
+    def _get_properties(self, context, id_):
+        return self.cache.get(
+            ('properties', id_),
+            lambda: self.db_api.get_properties(context, id_))
+
+    def _get_resource_manager(self, context, id_):
+        return self.cache.get(
+            ('resource_manager', id_),
+            lambda: self.db_api.get_resource_manager(context, id_))
+
+
+class ResourceManager(CachedReadsMixin):
 
     """Implements Resource Manager CRUD API's"""
 
     def __init__(self):
         self.db_api = eon.db.get_api()
         self.db_api.setup_db_env()
+        self._init_cache()
+        # duration in seconds of the last auto-import cycle per type
+        self.auto_import_durations = {}
 
     def start(self, context):
         db_resource_mgrs_data = self.db_api.get_all_resource_managers(
@@ -236,12 +346,14 @@ class ResourceManager:
                 db_resource_mgr_data['type'])
             driver_obj.monitor_events(db_resource_mgr_data)
 
-    def get_all(self, context, type_):
+    def get_all(self, context, type_, pagination=None):
         """Get all EON resource mgrs of specified type.
 
         :param context: Request context.
         :param type_: type of eon resource mgrs which we want to retrieve.
             "None" for all resources.
+        :param pagination: Dictionary of limit, marker, sort_key and
+            sort_dir to page through the resource mgrs.
         sample output:
             [
                 {"id" : "resource_mgr_id1",..},
@@ -254,12 +366,16 @@ class ResourceManager:
 
         try:
             db_resource_mgrs_data = self.db_api.get_all_resource_managers(
-                context, types=types)
+                context, types=types, **(pagination or {}))
+            db_props_data = self.db_api.get_properties_by_parent_ids(
+                context, [db_data['id'] for db_data in db_resource_mgrs_data])
 
             _resource_mgrs_data = []
             for db_resource_mgr_data in db_resource_mgrs_data:
                 _resource_mgrs_data.append(_make_response(
-                    db_resource_mgr_data))
+                    db_resource_mgr_data,
+                    property_list=db_props_data.get(
+                        db_resource_mgr_data['id'], [])))
         except Exception as e:
             msg = ("Error retrieving the 'resource managers' reason : %s"
                   % e.message)
@@ -275,8 +391,7 @@ class ResourceManager:
             retrieve.
         """
         try:
-            db_resource_mgr_data = self.db_api.get_resource_manager(
-                context, id_)
+            db_resource_mgr_data = self._get_resource_manager(context, id_)
             _resource_mgr_data = _make_response(db_resource_mgr_data)
 
         except exception.NotFound as e:
@@ -304,8 +419,7 @@ class ResourceManager:
             the inventory collection.
         """
         try:
-            db_resource_mgr_data = self.db_api.get_resource_manager(
-                context, id_)
+            db_resource_mgr_data = self._get_resource_manager(context, id_)
             db_props_data = self.db_api.get_resource_mgr_properties(context,
                 id_, key=eon_const.RESOURCE_MGR_STATE_KEY)
 
@@ -328,6 +442,22 @@ class ResourceManager:
             LOG.exception(msg)
             raise exception.RetrieveException(e.message)
 
+    def get_inventory_health(self, context, type_=None):
+        """Returns the health of the inventory caches of the resource mgrs
+        of type_, or of all the types.
+
+        :param context: Request context.
+        :param type_: type of the resource mgrs, e.g. vcenter
+        """
+        types = [type_] if type_ else sorted(driver.RESOURCE_MGR_DRIVERS)
+        health = []
+        for resource_mgr_type in types:
+            driver_obj = driver.load_resource_mgr_driver(resource_mgr_type)
+            for resource_mgr_health in driver_obj.get_inventory_health():
+                resource_mgr_health['type'] = resource_mgr_type
+                health.append(resource_mgr_health)
+        return health
+
     def delete(self, context, id_):
         """Delete an EON resource mgr.
 
@@ -363,28 +493,63 @@ class ResourceManager:
             raise e
 
     def auto_import_resources(self, context, _type):
+        start = time.time()
         db_resource_mgrs_data = self.db_api.get_all_resource_managers(
             context, types=_type)
         for db_resource_mgr_data in db_resource_mgrs_data:
+            self._auto_import_resource_mgr(context, _type,
+                                           db_resource_mgr_data)
+        duration = time.time() - start
+        self.auto_import_durations[_type] = duration
+        LOG.info("Auto-import of %s resources for %d resource managers "
+                 "took %.3f seconds", _type, len(db_resource_mgrs_data),
+                 duration)
+
+    def _auto_import_resource_mgr(self, context, _type, db_resource_mgr_data,
+                                  **kwargs):
+        # the periodic auto-import and the inventory events of a
+        # resource_mgr must not import the same resources concurrently
+        with lockutils.lock("auto-import-%s" % db_resource_mgr_data['id']):
             try:
-                db_rsrcs = self.db_api.get_all_resources(
-                    context,
-                    resource_mgr_id=db_resource_mgr_data['id'])
-                db_resources_properties = {}
-                for db_rsrc in db_rsrcs:
-                    db_rsrc_properties = self.db_api.get_properties(
-                        context, db_rsrc['id'])
-                    db_resources_properties[db_rsrc['id']] = db_rsrc_properties
+                (db_rsrcs, db_resources_properties) = (
+                    self.db_api.get_resources_with_properties(
+                        context,
+                        resource_mgr_id=db_resource_mgr_data['id']))
                 driver_obj = driver.load_resource_mgr_driver(_type)
                 driver_obj.auto_import_resources(context, db_resource_mgr_data,
                                                  db_rsrcs,
-                                                 db_resources_properties)
+                                                 db_resources_properties,
+                                                 **kwargs)
             except Exception as exc:
                 msg = ("Couldn't proceed with auto-import of resources "
                       "for resource_mgr %s") % db_resource_mgr_data['id']
                 LOG.info(msg)
                 LOG.exception("Error: %s" % exc)
 
+    def subscribe_inventory_events(self, context, _type):
+        """Imports/un-imports the resources of the resource_mgrs of _type as
+        soon as their inventory changes, the periodic auto-import being the
+        reconciliation backstop.
+        """
+        driver_obj = driver.load_resource_mgr_driver(_type)
+        driver_obj.subscribe_inventory_events(
+            functools.partial(self._on_inventory_events, context, _type))
+
+    def _on_inventory_events(self, context, _type, resource_mgr_data,
+                             events):
+        try:
+            db_resource_mgr_data = self.db_api.get_resource_manager(
+                context, resource_mgr_data['id'])
+        except (KeyError, exception.NotFound):
+            # not registered yet, left to the periodic auto-import
+            return
+        moids = set(event.moid for event in events)
+        LOG.info("Auto-importing the resources %s of resource_mgr %s on "
+                 "inventory events" % (sorted(moids),
+                                       db_resource_mgr_data['id']))
+        self._auto_import_resource_mgr(context, _type, db_resource_mgr_data,
+                                       cluster_moids=moids)
+
     def create(self, context, data, is_auto_import=False):
         """Creates an EON resource mgr.
         Field "state" is introduced, will be set as "Registered".
@@ -397,26 +562,23 @@ class ResourceManager:
             db_session_event)
         state_map = {eon_const.RESOURCE_MGR_STATE_KEY:
                         eon_const.EON_RESOURCE_MANAGER_STATE_REGISTERED}
-        property_list = []
         try:
-            _validate_create(context, self.db_api, data,
-                             eon_const.EON_RESOURCE_MANAGER)
+            normalized_address = _validate_create(
+                context, self.db_api, data, eon_const.EON_RESOURCE_MANAGER)
             resource_mgr_type = data.get('type')
             resource_mgr_driver = driver.load_resource_mgr_driver(
                 resource_mgr_type)
             data = resource_mgr_driver.validate_create(context, data)
+            data['normalized_address'] = normalized_address
 
             LOG.info("Registering resource manager, context: %s",
                      logging.mask_password(data))
             db_resource_mgr_data = self.db_api.create_resource_manager(
                 context, data, session=db_session)
             properties = resource_mgr_driver.get_properties(state_map)
-            for property_key, property_value in properties.iteritems():
-                property_list.append(
-                    self.db_api.create_resource_mgr_property(
-                    context, db_resource_mgr_data['id'],
-                    property_key, property_value, session=db_session)
-                )
+            property_list = self.db_api.create_resource_mgr_properties(
+                context, {db_resource_mgr_data['id']: properties},
+                session=db_session)
             resource_mgr_dict = _make_response(db_resource_mgr_data,
                                                property_list=property_list)
             resource_mgr_driver.update_vc_pass_through(context,
@@ -473,8 +635,9 @@ class ResourceManager:
         run_playbook = update_data.get("run_playbook", True)
 
         try:
-            _validate_update(context, self.db_api, update_data, id_,
-                             eon_const.EON_RESOURCE_MANAGER)
+            normalized_address = _validate_update(
+                context, self.db_api, update_data, id_,
+                eon_const.EON_RESOURCE_MANAGER)
             _resource_mgr_data = _make_response(
                 self.db_api.get_resource_manager(context, id_))
             resource_mgr_type = _resource_mgr_data.get('type')
@@ -514,8 +677,10 @@ class ResourceManager:
                     eventlet.spawn_n(resource_mgr_driver.update,
                         context, id_, resource_inventory=resources_data)
 
-            self.db_api.update_resource_manager(context, id_,
-                                                _resource_mgr_data_update)
+            db_values = dict(_resource_mgr_data_update)
+            if normalized_address:
+                db_values['normalized_address'] = normalized_address
+            self.db_api.update_resource_manager(context, id_, db_values)
             props = self.db_api.get_resource_mgr_properties(context,
                 id_, key=eon_const.RESOURCE_MGR_STATE_KEY)
             return _make_response(_resource_mgr_data_update,
@@ -542,17 +707,18 @@ class ResourceManager:
         pass
 
 
-class Resource(object):
+class Resource(CachedReadsMixin):
 
     """Implements Resource CRUD operations"""
 
     def __init__(self):
         self.db_api = eon.db.get_api()
         self.db_api.setup_db_env()
+        self._init_cache()
         self.validator = ResourceValidator()
         self.virt_utils = vir_utils.VirtCommonUtils()
 
-    def get_all(self, context, filters=None):
+    def get_all(self, context, filters=None, pagination=None):
         """Get all EON resources of specified type.
 
         :param context: Request context.
@@ -565,6 +731,8 @@ class Resource(object):
              <resource state>: state of eon resource which we want to retrieve.
                                deactivating/activated/provisioned/imported/
                                "None" for all states.
+        :param pagination: Dictionary of limit, marker, sort_key and
+            sort_dir to page through the resources.
         sample output:
             [
                 {"id" : "resource1",..},
@@ -572,12 +740,19 @@ class Resource(object):
             ]
         """
         try:
+            kwargs = dict(filters or {})
+            kwargs.update(pagination or {})
             db_resources_data = self.db_api.get_all_resources(
-                context, **filters)
+                context, **kwargs)
+            db_props_data = self.db_api.get_properties_by_parent_ids(
+                context, [db_data['id'] for db_data in db_resources_data])
 
             _resources_data = []
             for db_resource_data in db_resources_data:
-                _resources_data.append(_make_response(db_resource_data))
+                _resources_data.append(_make_response(
+                    db_resource_data,
+                    property_list=db_props_data.get(
+                        db_resource_data['id'], [])))
         except Exception as e:
             msg = ("Error retrieving the 'resources' reason : %s"
                   % e.message)
@@ -593,8 +768,7 @@ class Resource(object):
             retrieve.
         """
         try:
-            db_resource_data = self.db_api.get_resource(
-                context, id_)
+            db_resource_data = self._get_resource(context, id_)
             _resource_data = _make_response(db_resource_data,
                                             meta_data=False)
 
@@ -626,21 +800,27 @@ class Resource(object):
             "password": "UNSET", "type": "esxcluster", "port": "UNSET"}
         """
         try:
-            db_resource_data = self.db_api.get_resource(context, id_)
-            res_properties = self.db_api.get_properties(context, id_)
+            db_resource_data = self._get_resource(context, id_)
+            res_properties = self._get_properties(context, id_)
 
             # for non resource managers return get
             if (db_resource_data['type'] !=
                     eon_const.EON_RESOURCE_TYPE_ESX_CLUSTER):
-                return _make_response(db_resource_data)
+                return _make_response(db_resource_data,
+                                      property_list=res_properties)
 
-            res_mgr_obj = (
-                self.db_api.get_resource_managers_by_resource_id(context,
-                                                                 id_))
+            res_mgr_id = db_resource_data.get('resource_mgr_id')
+            if res_mgr_id:
+                res_mgr_obj = self._get_resource_manager(context, res_mgr_id)
+            else:
+                res_mgr_obj = (
+                    self.db_api.get_resource_managers_by_resource_id(context,
+                                                                     id_))
             driver_obj = driver.load_resource_driver(db_resource_data['type'])
             _inventory = driver_obj.get_res_inventory(res_mgr_obj,
                                                       res_properties)
             _resource_data = _make_response(db_resource_data,
+                                            property_list=res_properties,
                                             inventory=_inventory)
             # (NOTE) Here setting the details of resource manager for the
             # resource
@@ -730,12 +910,13 @@ class Resource(object):
         db_session = self.db_api.get_transactional_session(
             db_session_event)
         try:
-            _validate_create(context, self.db_api, data,
-                             eon_const.EON_RESOURCE)
+            normalized_address = _validate_create(
+                context, self.db_api, data, eon_const.EON_RESOURCE)
             resource_type = data.get('type')
             resource_driver = driver.load_resource_driver(
                 resource_type)
             data = resource_driver.validate_create(context, data)
+            data['normalized_address'] = normalized_address
 
             LOG.info("Registering resource , context: %s",
                      logging.mask_password(data))
@@ -743,14 +924,12 @@ class Resource(object):
                                                            data,
                                                            session=db_session)
             properties = resource_driver.get_properties(data)
-            for property_key, property_value in properties.iteritems():
-                self.db_api.create_property(context,
-                                            db_resource_data['id'],
-                                            property_key,
-                                            property_value,
-                                            session=db_session)
+            property_list = self.db_api.create_properties(
+                context, {db_resource_data['id']: properties},
+                session=db_session)
             self.db_api.commit_session(db_session_event, db_session)
-            resource_dict = _make_response(db_resource_data)
+            resource_dict = _make_response(db_resource_data,
+                                           property_list=property_list)
             return resource_dict
         except (exception.AddressResolutionFailure,
                 exception.InternalFailure,
@@ -772,8 +951,7 @@ class Resource(object):
             raise exception.CreateException(msg=msg)
 
     def _get_state(self, context, id_):
-        db_resource_data = self.db_api.get_resource(
-            context, id_)
+        db_resource_data = self._get_resource(context, id_)
         return db_resource_data['state']
 
     def _pre_activation_steps(self, context, id_, resource_inventory, data):
@@ -805,10 +983,10 @@ class Resource(object):
                                     data=data)
 
         LOG.info("[%s] Pre-activation checks finished successfully" % id_)
-        next_state = eon_const.ACTIVATION_STATE_MAPPING.get(
-            resource_inventory.get(eon_const.EON_RESOURCE_STATE))
-        self.virt_utils.update_prop(context, id_, eon_const.EON_RESOURCE_STATE,
-                                    next_state)
+        state = resource_inventory.get(eon_const.EON_RESOURCE_STATE)
+        next_state = eon_const.ACTIVATION_STATE_MAPPING.get(state)
+        # fails if a concurrent request has moved the resource meanwhile
+        self.virt_utils.transition_state(context, id_, [state], next_state)
         resource_inventory[eon_const.EON_RESOURCE_STATE] = next_state
 
     def populate_network_json(self, context, type_, data):
@@ -903,11 +1081,10 @@ class Resource(object):
                             resource_inventory[eon_const.EON_RESOURCE_TYPE])
         resource_driver.pre_deactivation_steps(context,
                                         resource_inventory=resource_inventory)
-        next_state = eon_const.DEACTIVATION_STATE_MAPPING.get(
-            resource_inventory.get(eon_const.EON_RESOURCE_STATE))
-
-        self.virt_utils.update_prop(context, id_, eon_const.EON_RESOURCE_STATE,
-                                    next_state)
+        state = resource_inventory.get(eon_const.EON_RESOURCE_STATE)
+        next_state = eon_const.DEACTIVATION_STATE_MAPPING.get(state)
+        # fails if a concurrent request has moved the resource meanwhile
+        self.virt_utils.transition_state(context, id_, [state], next_state)
         resource_inventory[eon_const.EON_RESOURCE_STATE] = next_state
         LOG.info("[%s] Pre deactivation checks finished successfully" % id_)
 
@@ -1020,8 +1197,9 @@ class Resource(object):
         db_session_event = "update-resource"
         db_session = self.db_api.get_transactional_session(db_session_event)
         try:
-            _validate_update(context, self.db_api, update_data, id_,
-                             eon_const.EON_RESOURCE)
+            normalized_address = _validate_update(
+                context, self.db_api, update_data, id_,
+                eon_const.EON_RESOURCE)
             db_resource_data = self.db_api.get_resource(context, id_)
             _resource_data_update = deepcopy(db_resource_data)
             resource_type = db_resource_data.get('type')
@@ -1041,6 +1219,9 @@ class Resource(object):
 
             LOG.info("Updating resource, context: %s",
                      logging.mask_password(_resource_data_update))
+            if normalized_address:
+                _resource_data_update['normalized_address'] = (
+                    normalized_address)
             db_resource_data = self.db_api.update_resource(
                 context, id_, _resource_data_update, session=db_session)
 
@@ -1154,15 +1335,11 @@ class Resource(object):
         self.validator.validate_type(type_in_db,
                                      eon_const.EON_RESOURCE_TYPE_BAREMETAL)
         next_state = eon_const.RESOURCE_STATE_PROVISON_INITIATED
-        self.virt_utils.update_prop(context, res_id,
-                                    eon_const.EON_RESOURCE_STATE,
-                                    next_state)
-        res_inventory["state"] = next_state
-
         # update the type from baremetal to given resource type
         type_ = data[eon_const.EON_RESOURCE_TYPE]
-        self.virt_utils.update_prop(context, res_id, 'type',
-                                    type_)
+        self.virt_utils.transition_state(context, res_id, expected_state,
+                                         next_state, {'type': type_})
+        res_inventory["state"] = next_state
         res_inventory["type"] = data["type"]
         LOG.debug("[%s] pre provisioning comple" % res_id)
 
@@ -1211,10 +1388,10 @@ class Resource(object):
                                         next_state)
         except Exception as e:
             LOG.error("[%s] Provisioning failed. %s " % (id_, e.message))
-            self.virt_utils.update_prop(context, id_, 'state',
-                                        eon_const.EON_RESOURCE_STATE_IMPORTED)
-            self.virt_utils.update_prop(context, id_, 'type',
-                                        eon_const.EON_RESOURCE_TYPE_BAREMETAL)
+            self.virt_utils.update_props(
+                context, id_,
+                {'state': eon_const.EON_RESOURCE_STATE_IMPORTED,
+                 'type': eon_const.EON_RESOURCE_TYPE_BAREMETAL})
             hux_obj.revert_changes()
             hux_obj.delete_server(resource_id)
             hux_obj.commit_changes(resource_id, "Delete KVM compute resource")
@@ -14,6 +14,7 @@
 # under the License.
 #.
 
+# properties retrieved when a vCenter is registered
 prop_spec_map = {"Datacenter": ["name",
                                 "hostFolder",
                                 "networkFolder"],
@@ -23,7 +24,7 @@ prop_spec_map = {"Datacenter": ["name",
                                             "host",
                                             "parent",
                                             "datastore",
-                                            "configurationEx",
+                                            "configuration.drsConfig.enabled",
                                             "summary.totalMemory",
                                             ],
                  "HostSystem": ["name", "parent", "runtime.connectionState",
@@ -35,6 +36,30 @@ prop_spec_map = {"Datacenter": ["name",
                                "summary.accessible"],
                  }
 
+# properties whose updates are applied to the inventory. The free space of
+# the datastores changes with every VM power operation and is only
+# retrieved at registration. The vm array of a host is kept as its VM count.
+update_prop_spec_map = {"Datacenter": ["name",
+                                       "hostFolder",
+                                       "networkFolder"],
+                        "Folder": ["name",
+                                   "childEntity"],
+                        "ClusterComputeResource": [
+                            "name",
+                            "host",
+                            "parent",
+                            "datastore",
+                            "configuration.drsConfig.enabled",
+                            "summary.totalMemory",
+                            ],
+                        "HostSystem": ["name", "parent",
+                                       "runtime.connectionState", "vm"],
+                        "Datastore": ["name",
+                                      "host",
+                                      "summary.capacity",
+                                      "summary.accessible"],
+                        }
+
 VCENTER_RECONNECT_INTERVAL = 10
 
 ESX_PROXY_NAME = 'computeproxy'
@@ -26,6 +26,7 @@ from eon.deployer import constants as deployer_const
 from eon.openstack.common import log as logging
 from eon.openstack.common import lockutils
 from eon.common import context as eon_context
+from eon.virt import activation_scheduler
 from eon.virt import driver, constants
 from eon.virt.vmware import constants as vmware_const, utils
 from eon.virt.vmware import hlm_input_model
@@ -47,6 +48,31 @@ CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
 
+class ESXActivation(activation_scheduler.ActivationRequest):
+    """Activation of the service VMs of an ESX cluster by a wave"""
+
+    def __init__(self, vc_driver, id_, hosts, input_data, hux_obj,
+                 run_monitoring=True):
+        super(ESXActivation, self).__init__(
+            id_, hosts, hux_obj, "Activate ESX compute resource")
+        self.driver = vc_driver
+        self.input_data = input_data
+        self.run_monitoring = run_monitoring
+        self.retries = (len(hosts) *
+                        facade_constants.
+                        ESX_TIMEOUT_PER_HOST / facade_constants.
+                        MAX_INTERVAL) + 10
+
+    def apply_changes(self):
+        self.driver.hux_obj = self.hux_obj
+        self.driver._update_input_model(self.id_, self.input_data)
+
+    def remove_changes(self):
+        super(ESXActivation, self).remove_changes()
+        self.driver.hux_obj = self.hux_obj
+        self.driver._delete_pass_through(self.input_data)
+
+
 class VMwareVCDriver(driver.ResourceDriver):
 
     def __init__(self):
@@ -71,63 +97,68 @@ class VMwareVCDriver(driver.ResourceDriver):
     def validate_delete(self, vc_data):
         self.vcm.delete_vcenter(vc_data)
 
+    def subscribe_inventory_events(self, callback):
+        self.vcm.subscribe(callback)
+
     def auto_import_resources(self, context, db_vc_data,
-                       db_vc_rsrcs, db_vc_rscrc_prop):
+                       db_vc_rsrcs, db_vc_rscrc_prop, cluster_moids=None):
+        """Imports the clusters added to and un-imports the clusters removed
+        from the vCenter.
+
+        :param cluster_moids: only import/un-import these clusters, when
+            handling their inventory change events
+        """
         (new_clusters, removed_clusters) = self.vcm.poll_vcenter_resources(
                                                db_vc_data, db_vc_rsrcs,
                                                db_vc_rscrc_prop)
-        for cluster in new_clusters:
-            self._import_cluster(context, cluster,
-                                        db_vc_data['id'])
+        if cluster_moids is not None:
+            new_clusters = [cluster for cluster in new_clusters
+                            if cluster[0] in cluster_moids]
+            removed_clusters = [cluster for cluster in removed_clusters
+                                if cluster[0] in cluster_moids]
+        if not (new_clusters or removed_clusters):
+            return
 
         clusters_id_mappings = self._get_cluster_id_mapping(db_vc_rsrcs,
                                                     db_vc_rscrc_prop)
-        for cluster in removed_clusters:
-            self._unimport_cluster(context, cluster, clusters_id_mappings)
-
-    def _import_cluster(self, context, resource, resource_mgr_id):
-        LOG.info("Import cluster %s " % resource[1])
+        removed_moids = set(cluster[0] for cluster in removed_clusters)
+        removed_ids = [cluster_id for (cluster_id, moid)
+                       in clusters_id_mappings if moid in removed_moids]
+        LOG.info("Importing clusters %s and un-importing clusters %s of "
+                 "vCenter %s" % ([cluster[1] for cluster in new_clusters],
+                                 [cluster[1] for cluster in removed_clusters],
+                                 db_vc_data['id']))
+        db_session = self.db_api.get_transactional_session('Auto-Import')
         try:
-            db_session = self.db_api.get_transactional_session(
-                'Import-Cluster')
-
-            data = {'resource_mgr_id': resource_mgr_id,
-                    'ip_address': "UNSET",
-                    'username': "UNSET",
-                    'password': "UNSET",
-                    'type': constants.EON_RESOURCE_TYPE_ESX_CLUSTER,
-                    'state': constants.EON_RESOURCE_STATE_IMPORTED,
-                    'port': "UNSET",
-                    'name': resource[1]}
-            create_ref = self.db_api.create_resource(context,
-                                              data,
-                                              session=db_session)
-            self.db_api.create_property(context,
-                                        create_ref.id,
-                                        constants.CLUSTER_MOID,
-                                        resource[0],
-                                        session=db_session)
-            LOG.info("Imported cluster %s and id is %s"
-                      % (resource[1], create_ref.id))
-            self.db_api.commit_session('Import-Cluster', db_session)
-
+            create_refs = self.db_api.create_resources(
+                context,
+                [self._get_cluster_data(cluster, db_vc_data['id'])
+                 for cluster in new_clusters],
+                session=db_session)
+            self.db_api.create_properties(
+                context,
+                dict((create_ref['id'], {constants.CLUSTER_MOID: cluster[0]})
+                     for create_ref, cluster in zip(create_refs,
+                                                    new_clusters)),
+                session=db_session)
+            self.db_api.delete_resources(context, removed_ids,
+                                         session=db_session)
+            self.db_api.commit_session('Auto-Import', db_session)
         except Exception as e:
-            message = ("Failed to import cluster. Error: %s") % e.message
+            message = ("Failed to import/un-import clusters. "
+                       "Error: %s") % e.message
             LOG.warn(message)
-            self.db_api.rollback_session('Import-Cluster', db_session)
-
-    def _unimport_cluster(self, context, remove_cluster,
-                          clusters_id_mappings):
-        LOG.info("Un-Import Cluster %s " % remove_cluster[0])
-        try:
-            for cluster_id in clusters_id_mappings:
-                if cluster_id[1] == remove_cluster[0]:
-                    LOG.info("Deleting cluster %s" % cluster_id[0])
-                    self.db_api.delete_resource(context, cluster_id[0])
-        except Exception as e:
-            msg = "Failed to delete cluster %s. Error: %s" % (
-                                                cluster_id, e.message)
-            LOG.info(msg)
+            self.db_api.rollback_session('Auto-Import', db_session)
+
+    def _get_cluster_data(self, resource, resource_mgr_id):
+        return {'resource_mgr_id': resource_mgr_id,
+                'ip_address': "UNSET",
+                'username': "UNSET",
+                'password': "UNSET",
+                'type': constants.EON_RESOURCE_TYPE_ESX_CLUSTER,
+                'state': constants.EON_RESOURCE_STATE_IMPORTED,
+                'port': "UNSET",
+                'name': resource[1]}
 
     def _get_cluster_id_mapping(self, db_vc_resources,
                                  db_vc_resources_prop):
@@ -153,6 +184,9 @@ class VMwareVCDriver(driver.ResourceDriver):
         vcdata['resources'] = vc_data
         return vcdata
 
+    def get_inventory_health(self):
+        return self.vcm.get_inventory_health()
+
     def get_res_inventory(self, res_mgr_data, res_property_obj):
         """
         :param res_mgr_data: resource mangager DB object
@@ -211,20 +245,9 @@ class VMwareVCDriver(driver.ResourceDriver):
         """Stores in DB
         """
         vc_data = cluster_data['resource_manager_info']
-        dc_network_prop = self.get_dc_network_properties(context,
-                                    vc_data['id'], dc_name)
-        if dc_network_prop:
-            self.db_api.update_resource_mgr_property(
-                context, "update", vc_data['id'], dc_name,
-                json.dumps(network_prop),
-                session=session)
-        else:
-            self.db_api.create_resource_mgr_property(
-                                        context,
-                                        vc_data['id'],
-                                        dc_name,
-                                        json.dumps(network_prop),
-                                        session=session)
+        self.db_api.upsert_resource_mgr_properties(
+            context, {vc_data['id']: {dc_name: json.dumps(network_prop)}},
+            session=session)
 
     def _store_and_setup_network(self, context,
             resource_type, cluster_data,
@@ -510,11 +533,9 @@ class VMwareVCDriver(driver.ResourceDriver):
                 cluster_data["name"])
             host_ovsvapp_list.extend(new_hosts_list)
             LOG.info("Updated hlm properties %s" % hlm_info)
-            self.db_api.update_property(context,
-                                    "update-property",
-                                    cluster_data['id'],
-                                    res_const.HLM_PROPERTIES,
-                                    json.dumps(hlm_info))
+            self.db_api.upsert_properties(
+                context, {cluster_data['id']: {res_const.HLM_PROPERTIES:
+                                               json.dumps(hlm_info)}})
             return new_hosts_list
 
         except Exception as e:
@@ -538,12 +559,9 @@ class VMwareVCDriver(driver.ResourceDriver):
                  % (id_, input_model_for_hosts))
         self._update_state(context, id_,
                            constants.EON_RESOURCE_STATE_ACTIVATING)
-        with lockutils.lock("run-playbook"):
-            self.hux_obj = HLMFacadeWrapper(context)
-            self._update_input_model(id_, input_model_for_hosts)
-            self._invoke_activate_playbooks(context, id_,
-                                            input_model_for_hosts,
-                                            True)
+        self._invoke_activate_playbooks(context, id_,
+                                        input_model_for_hosts,
+                                        True)
 
     def move_hosts(self, id_, cluster_data, hosts_data, rollback=False):
         """
@@ -593,11 +611,9 @@ class VMwareVCDriver(driver.ResourceDriver):
         hlm_info[vmware_const.NETWORK_DRIVER][cluster_data["name"]] = new_list
 
         LOG.info("Updated hlm properties %s" % hlm_info)
-        self.db_api.update_property(context,
-                                "update-property",
-                                cluster_data['id'],
-                                res_const.HLM_PROPERTIES,
-                                json.dumps(hlm_info))
+        self.db_api.upsert_properties(
+            context, {cluster_data['id']: {res_const.HLM_PROPERTIES:
+                                           json.dumps(hlm_info)}})
 
     def provision(self, context, resource_type, cluster_data, network_prop):
         """
@@ -1078,26 +1094,19 @@ class VMwareVCDriver(driver.ResourceDriver):
         # TODO check the flow of rollback it is must.
         LOG.debug("[%s] Invoking hlm ux APIs to update the input model" % id_)
         hosts = self._get_host_id(input_data)
-        retries_count = (len(hosts) *
-                         facade_constants.
-                         ESX_TIMEOUT_PER_HOST / facade_constants.
-                         MAX_INTERVAL) + 10
-        # TODO if we want to split site.yml to optimize and to introduce states
-        plays = ['site']
+        hux_obj = HLMFacadeWrapper(context)
+        # committed and deployed with the resources activated at the same
+        # time
         try:
-            self.hux_obj.commit_changes(id_, "Activate ESX compute resource")
-            self._run_cp_playbooks()
-            for play in plays:
-                self.hux_obj.run_playbook_by_ids(play, hosts,
-                                                 retries=retries_count)
-            # TODO needs a relook
-            if run_monitoring_plays:
-                self.hux_obj.run_monitoring_playbooks()
+            activation_scheduler.activate(ESXActivation(
+                self, id_, hosts, input_data, hux_obj, run_monitoring_plays))
 
         # TODO add custom exception for and do the necessary cleanup only
         except Exception as e:
             LOG.exception(e)
-            self._rollback_activate(id_, hosts, input_data)
+            with lockutils.lock("run-playbook"):
+                self.hux_obj = hux_obj
+                self._rollback_activate(id_, hosts, input_data)
             raise e
 
     def _invoke_reconfigure_playbooks(self, context, id_, input_data,
@@ -1156,11 +1165,12 @@ class VMwareVCDriver(driver.ResourceDriver):
                 activation_data)
             run_playbook = kwargs.get('run_playbook')
 
-            with lockutils.lock("run-playbook"):
-                self.hux_obj = HLMFacadeWrapper(context)
-                self._update_input_model(id_, input_data)
-                if run_playbook:
-                    self._invoke_activate_playbooks(context, id_, input_data)
+            if run_playbook:
+                self._invoke_activate_playbooks(context, id_, input_data)
+            else:
+                with lockutils.lock("run-playbook"):
+                    self.hux_obj = HLMFacadeWrapper(context)
+                    self._update_input_model(id_, input_data)
 
             self.post_activation_steps(context, id_, resource_inventory)
 
@@ -14,11 +14,22 @@
 # under the License.
 #.
 
+import collections
+import copy
+import gzip
+import itertools
+import json
 import logging
+import os
+import sys
 import time
 
+from oslo_config import cfg
 from oslo_vmware import exceptions as vmware_excep
 
+from eon.common import session_pool
+from eon.common import utils
+from eon.openstack.common import fileutils
 from eon.openstack.common.gettextutils import _
 from eon.virt.vmware import constants
 from eon.virt.vmware import vim_util as v_util
@@ -27,85 +38,493 @@ from eon.virt.vmware import vim_util as v_util
 MAX_OBJECTS = 500
 NOT_AUTHENTICATED = "NotAuthenticated"
 INVALID_COLLECTOR = "InvalidCollectorVersion"
+CLUSTER = "ClusterComputeResource"
+DATACENTER = "Datacenter"
+DATASTORE = "Datastore"
+FOLDER = "Folder"
+HOST = "HostSystem"
+# properties the secondary indexes of the inventory are built on
+INDEXED_PROPERTIES = ("name", "parent", "hostFolder")
+SNAPSHOT_FORMAT = 4
+# objects of each type measured to estimate the size of the inventory
+SIZE_SAMPLE = 100
+
+# kinds of the inventory change events published to the subscribers
+CLUSTER_ENTERED = "cluster-entered"
+CLUSTER_LEFT = "cluster-left"
+CLUSTER_RENAMED = "cluster-renamed"
+CLUSTER_MOVED = "cluster-moved"
+
+InventoryEvent = collections.namedtuple("InventoryEvent",
+                                        ["kind", "moid", "name", "old_name"])
 LOG = logging.getLogger(__name__)
 
 
+inventory_opts = [
+    cfg.IntOpt('inventory_max_object_updates',
+               default=100,
+               help='Maximum number of object updates vCenter returns per '
+                    'WaitForUpdatesEx call, the rest of a burst is fetched '
+                    'right after'),
+    cfg.IntOpt('inventory_max_wait',
+               default=85,
+               help='Seconds a WaitForUpdatesEx call waits for vCenter '
+                    'inventory updates'),
+    cfg.StrOpt('inventory_snapshot_dir',
+               default='/var/cache/eon/inventory',
+               help='Directory the snapshots of the vCenter inventories are '
+                    'written to, a restarted conductor serves them until '
+                    'the inventories are retrieved again. Empty disables '
+                    'the snapshots'),
+    cfg.IntOpt('inventory_snapshot_interval',
+               default=300,
+               help='Minimum seconds between two snapshots of the '
+                    'inventory of a vCenter'),
+    cfg.IntOpt('inventory_snapshot_max_age',
+               default=86400,
+               help='Seconds after which a snapshot is too old to be '
+                    'loaded'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(inventory_opts, 'vmware')
+
+
+def _get_moid(mor):
+    return getattr(mor, "value", None) if mor else None
+
+
+def get_snapshot_path(ip_address):
+    if CONF.vmware.inventory_snapshot_dir:
+        return os.path.join(CONF.vmware.inventory_snapshot_dir,
+                            "%s.json.gz" % ip_address)
+
+
+def remove_snapshot(ip_address):
+    path = get_snapshot_path(ip_address)
+    if path:
+        fileutils.delete_if_exists(path)
+
+
+class MoRef(object):
+    """Reference to a managed object of the inventory"""
+    __slots__ = ("_type", "value")
+
+    def __init__(self, _type, value):
+        self._type = _type
+        self.value = value
+
+    def __eq__(self, other):
+        return (isinstance(other, MoRef) and self._type == other._type and
+                self.value == other.value)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self._type, self.value))
+
+    def __repr__(self):
+        return "MoRef(%r, %r)" % (self._type, self.value)
+
+
+_RECORDS = dict((record.__name__, record) for record in (MoRef,))
+
+
+def _intern(value):
+    return intern(str(value))
+
+
+def _to_moref(mor):
+    if mor:
+        return MoRef(_intern(mor._type), _intern(mor.value))
+
+
+def _to_moids(mor_array):
+    return tuple(_intern(mor.value) for mor in
+                 getattr(mor_array, "ManagedObjectReference", None) or ())
+
+
+def _count_morefs(mor_array):
+    return len(getattr(mor_array, "ManagedObjectReference", None) or ())
+
+
+def _to_mounted_hosts(mount_array):
+    return tuple(_intern(mount.key.value) for mount in
+                 getattr(mount_array, "DatastoreHostMount", None) or ())
+
+
+# The retrieved property values are converted into what EON reads of them,
+# the references become MoRef, the arrays of references tuples of moids and
+# the vm array of a host its VM count. The other values are kept as is.
+_PROPERTY_CONVERTERS = {
+    (DATACENTER, "hostFolder"): _to_moref,
+    (DATACENTER, "networkFolder"): _to_moref,
+    (FOLDER, "childEntity"): _to_moids,
+    (CLUSTER, "parent"): _to_moref,
+    (CLUSTER, "host"): _to_moids,
+    (CLUSTER, "datastore"): _to_moids,
+    (HOST, "parent"): _to_moref,
+    (HOST, "runtime.connectionState"): _intern,
+    (HOST, "vm"): _count_morefs,
+    (DATASTORE, "host"): _to_mounted_hosts,
+}
+
+
+def convert_property(mo_type, name, value):
+    converter = _PROPERTY_CONVERTERS.get((mo_type, name))
+    return converter(value) if converter else value
+
+
+def _to_snapshot(value):
+    """Converts a property value into JSON types, a record becomes a dict
+    of its name to the values of its slots.
+    """
+    if type(value).__name__ in _RECORDS:
+        return {type(value).__name__: [getattr(value, slot)
+                                       for slot in value.__slots__]}
+    if isinstance(value, (list, tuple)):
+        return [_to_snapshot(val) for val in value]
+    if value is None or isinstance(value, (basestring, bool, int, long,
+                                           float)):
+        return value
+    return str(value)
+
+
+def _from_snapshot(value):
+    if isinstance(value, dict):
+        (name, values), = value.items()
+        return _RECORDS[name](*[_from_snapshot(val) for val in values])
+    if isinstance(value, list):
+        return tuple(_from_snapshot(val) for val in value)
+    if isinstance(value, unicode):
+        try:
+            return _intern(value)
+        except UnicodeEncodeError:
+            return value
+    return value
+
+
 class VCInventoryCollector(object):
     def __init__(self, vc_data, session, threadPool):
         self._vcenter_data = vc_data
         self.session = session
         self._inventory = {}
         self._pool = threadPool
-        self.vim = self.session.vim
+        self.vim = self.session.vim if self.session else None
         self.monitor = True
+        self.version = ""
+        # the inventory was loaded from a snapshot and is not reconciled
+        # with vCenter yet
+        self.from_snapshot = False
+        self.snapshot_version = None
+        self._snapshot_saved = time.time()
+        self.update_stats = {'batches': 0, 'objects': 0,
+                             'last_lag': 0.0, 'max_lag': 0.0}
+        self._last_received = None
+        self._subscribers = []
+        # reported by get_health
+        self.load_duration = None
+        self.updated_at = None
+        self.polled_at = None
+        self.reconnects = 0
+        self.monitoring = False
+
+    def subscribe(self, callback):
+        """Registers callback(vcenter_data, events) to be called in a green
+        thread with the list of InventoryEvent of each applied burst of
+        updates.
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    @property
+    def _inventory(self):
+        return self._objects
+
+    @_inventory.setter
+    def _inventory(self, inventory):
+        """Replaces the inventory and rebuilds its secondary indexes"""
+        self._objects = inventory
+        # type -> {moid: properties}
+        self._by_type = collections.defaultdict(dict)
+        # parent moid -> set of (type, moid) of the children
+        self._children = collections.defaultdict(set)
+        # (type, name) -> set of moids
+        self._names = collections.defaultdict(set)
+        # hostFolder moid -> datacenter moid
+        self._dc_by_host_folder = {}
+        # the memoized views are rebuilt when the generation of the
+        # objects they are derived from changed
+        self._tree_generation = getattr(self, "_tree_generation", 0) + 1
+        self._cluster_generations = collections.defaultdict(int)
+        self._vc_inventory_view = None
+        self._cluster_specs = {}
+        for key, props in inventory.items():
+            self._index(key, props)
+
+    def _index(self, key, props):
+        mo_type, moid = key
+        if mo_type in (CLUSTER, DATACENTER, FOLDER):
+            self._tree_generation += 1
+        self._by_type[mo_type][moid] = props
+        if "name" in props:
+            self._names[(mo_type, props["name"])].add(moid)
+        parent = _get_moid(props.get("parent"))
+        if parent is not None:
+            self._children[parent].add(key)
+        host_folder = _get_moid(props.get("hostFolder"))
+        if mo_type == DATACENTER and host_folder is not None:
+            self._dc_by_host_folder[host_folder] = moid
+
+    def _unindex(self, key, props):
+        mo_type, moid = key
+        if mo_type in (CLUSTER, DATACENTER, FOLDER):
+            self._tree_generation += 1
+        self._by_type[mo_type].pop(moid, None)
+        if "name" in props:
+            self._discard(self._names, (mo_type, props["name"]), moid)
+        parent = _get_moid(props.get("parent"))
+        if parent is not None:
+            self._discard(self._children, parent, key)
+        host_folder = _get_moid(props.get("hostFolder"))
+        if self._dc_by_host_folder.get(host_folder) == moid:
+            del self._dc_by_host_folder[host_folder]
+
+    @staticmethod
+    def _discard(index, index_key, value):
+        values = index.get(index_key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del index[index_key]
+
+    def _touch(self, key):
+        """Invalidates the memoized spec of the cluster the object is or
+        belongs to.
+        """
+        mo_type, moid = key
+        if mo_type == CLUSTER:
+            self._cluster_generations[moid] += 1
+        elif mo_type == HOST:
+            parent = _get_moid(self._objects.get(key, {}).get("parent"))
+            if parent is not None:
+                self._cluster_generations[parent] += 1
+
+    def _add_object(self, key, props):
+        if key in self._objects:
+            self._touch(key)
+            self._unindex(key, self._objects[key])
+        self._objects[key] = props
+        self._index(key, props)
+        self._touch(key)
+
+    def _set_property(self, key, name, value):
+        props = self._objects.get(key)
+        if props is None:
+            self._add_object(key, {name: value})
+            return
+        self._touch(key)
+        if name in INDEXED_PROPERTIES:
+            self._unindex(key, props)
+            props[name] = value
+            self._index(key, props)
+        else:
+            props[name] = value
+        self._touch(key)
+
+    def _remove_object(self, key):
+        self._touch(key)
+        props = self._objects.pop(key, None)
+        if props is not None:
+            self._unindex(key, props)
 
     def register_managed_objects(self, vc_data):
 
         t = time.time()
-        clus_inventory = v_util.retreive_vcenter_inventory(self.vim)
+        pages = 0
+        objects = {}
+        complete = False
         try:
-            for obj in clus_inventory:
-                if hasattr(obj, 'propSet'):
-                    self._inventory[(obj.obj._type, obj.obj.value)] = (
-                        self.convert_propset_to_dict(obj.propSet))
-                else:
-                    LOG.debug("Unable to retrieve propSet for %s. "
-                                % str(obj))
-                    if hasattr(obj, 'missingSet'):
-                        # The object may have information useful for logging
-                        for m in obj.missingSet:
-                            LOG.warning(("Unable to retrieve value for "
-                                         "%(path)s. Reason: %(reason)s"),
-                                        {'path': m.path,
-                                         'reason': m.fault.localizedMessage})
+            for page in v_util.iter_vcenter_inventory(
+                    self.vim, max_objects=MAX_OBJECTS):
+                pages += 1
+                for obj in page:
+                    self._register_object(obj, objects)
+            complete = True
         except Exception as e:
             LOG.exception('Error while retrieving vCenter Inventory, Error: '
                          '%s', e)
 
-        LOG.info('vCenter Inventory retrieved in %s seconds' % (
-            str(time.time() - t)))
+        elapsed = time.time() - t
+        LOG.info('vCenter Inventory of %s objects retrieved in %s pages in '
+                 '%s seconds' % (len(objects), pages, str(elapsed)))
+        if complete:
+            self.load_duration = elapsed
+
+        # keep serving a snapshot rather than a partial inventory
+        if complete or not self.from_snapshot:
+            self._reconcile(objects)
 
-        if clus_inventory:
+        if pages:
             v_util.create_filter(self.vim)
             self._pool.spawn_n(self.monitor_property_updates)
+            if complete:
+                self.save_snapshot()
 
-    def get_cluster_by_name(self, cluster_name):
-        cluster_mors = filter(lambda x: x[0] == "ClusterComputeResource",
-                              self._inventory)
+    def _register_object(self, obj, objects):
+        if hasattr(obj, 'propSet'):
+            objects[(obj.obj._type, obj.obj.value)] = \
+                self.convert_propset_to_dict(obj.propSet, obj.obj._type)
+        else:
+            LOG.debug("Unable to retrieve propSet for %s. "
+                        % str(obj))
+            if hasattr(obj, 'missingSet'):
+                # The object may have information useful for logging
+                for m in obj.missingSet:
+                    LOG.warning(("Unable to retrieve value for "
+                                 "%(path)s. Reason: %(reason)s"),
+                                {'path': m.path,
+                                 'reason': m.fault.localizedMessage})
+
+    def _reconcile(self, objects):
+        """Replaces the inventory with the retrieved objects. When the
+        inventory was loaded from a snapshot, the clusters that changed
+        since are published to the subscribers.
+        """
+        events = []
+        if self.from_snapshot and self._subscribers:
+            changes = collections.OrderedDict()
+            for moid in self._by_type[CLUSTER]:
+                if (CLUSTER, moid) not in objects:
+                    changes[(CLUSTER, moid)] = ["leave", None]
+            for key, props in objects.items():
+                if key[0] == CLUSTER:
+                    changes[key] = ["modify", props]
+            events = self._get_cluster_events(changes)
+        self._inventory = objects
+        self.from_snapshot = False
+        self.updated_at = time.time()
+        if events:
+            self._publish(events)
+
+    def load_inventory_from(self, collector):
+        """Serves the inventory of another collector of the vCenter, e.g.
+        the one loaded from a snapshot, until this one is retrieved.
+        """
+        self._inventory = dict(collector._inventory)
+        self.from_snapshot = collector.from_snapshot
+        self.snapshot_version = collector.snapshot_version
+        self.updated_at = collector.updated_at
 
-        for x in cluster_mors:
-            if self._inventory[x]["name"] == cluster_name:
-                return x
+    def save_snapshot(self):
+        """Writes the inventory, tagged with its update version, to the
+        snapshot file of the vCenter.
 
-    def get_cluster_by_moid(self, cluster_moid):
-        cluster_mors = filter(lambda x: x[0] == "ClusterComputeResource",
-                              self._inventory)
+        :return: True if the snapshot was written
+        """
+        ip_address = self._vcenter_data['ip_address']
+        path = get_snapshot_path(ip_address)
+        if not path:
+            return False
+        t = time.time()
+        snapshot = {
+            'format': SNAPSHOT_FORMAT,
+            'ip_address': ip_address,
+            'version': self.version,
+            'saved_at': t,
+            'objects': [[mo_type, moid,
+                         dict((name, _to_snapshot(val))
+                              for name, val in props.items())]
+                        for (mo_type, moid), props in self._objects.items()]
+        }
+        data = json.dumps(snapshot, separators=(',', ':'))
+        tmp_path = path + ".tmp"
+        try:
+            fileutils.ensure_tree(os.path.dirname(path))
+            with gzip.open(tmp_path, "wb") as snapshot_file:
+                snapshot_file.write(data)
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            LOG.warning("Failed to write the inventory snapshot of vCenter "
+                        "%s, Error: %s" % (ip_address, e))
+            return False
+        self.snapshot_version = self.version
+        self._snapshot_saved = t
+        LOG.info("Inventory snapshot of %s objects of vCenter %s written in "
+                 "%.3f seconds" % (len(snapshot['objects']), ip_address,
+                                   time.time() - t))
+        return True
 
-        for x in cluster_mors:
-            if x[1] == cluster_moid:
-                return x
+    def load_snapshot(self):
+        """Loads the inventory from the snapshot file of the vCenter, if it
+        is not older than inventory_snapshot_max_age.
+
+        :return: True if the inventory was loaded
+        """
+        ip_address = self._vcenter_data['ip_address']
+        path = get_snapshot_path(ip_address)
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with gzip.open(path, "rb") as snapshot_file:
+                snapshot = json.loads(snapshot_file.read())
+            if (snapshot.get('format') != SNAPSHOT_FORMAT or
+                    snapshot.get('ip_address') != ip_address):
+                LOG.warning("Ignoring the inventory snapshot %s, it is not "
+                            "of vCenter %s" % (path, ip_address))
+                return False
+            age = time.time() - snapshot['saved_at']
+            if age > CONF.vmware.inventory_snapshot_max_age:
+                LOG.info("Ignoring the inventory snapshot %s written %d "
+                         "seconds ago" % (path, age))
+                return False
+            inventory = dict(
+                ((mo_type, moid),
+                 dict((name, _from_snapshot(val))
+                      for name, val in props.items()))
+                for mo_type, moid, props in snapshot['objects'])
+        except (IOError, ValueError, KeyError, TypeError) as e:
+            LOG.warning("Failed to load the inventory snapshot %s, Error: %s"
+                        % (path, e))
+            return False
+        self._inventory = inventory
+        self.from_snapshot = True
+        self.snapshot_version = snapshot['version']
+        self.updated_at = snapshot['saved_at']
+        LOG.info("Loaded inventory snapshot of %s objects of vCenter %s "
+                 "written %d seconds ago" % (len(inventory), ip_address, age))
+        return True
+
+    def _save_snapshot_if_due(self):
+        if (self.version != self.snapshot_version and
+                time.time() - self._snapshot_saved >=
+                CONF.vmware.inventory_snapshot_interval):
+            self.save_snapshot()
+
+    def get_cluster_by_name(self, cluster_name):
+        moids = self._names.get((CLUSTER, cluster_name))
+        if moids:
+            return (CLUSTER, min(moids))
+
+    def get_cluster_by_moid(self, cluster_moid):
+        if cluster_moid in self._by_type[CLUSTER]:
+            return (CLUSTER, cluster_moid)
 
     def is_cluster_inside_folder(self, clus_mor):
         """
         Check whether the cluster is inside folders
         """
-        folder_mors = filter(lambda x: x[0] == "Folder", self._inventory)
-        LOG.debug("Checking whether the cluster is inside a folder,"
-                  "Folder MORs: %s" % folder_mors)
-        parent_moid = self._inventory[clus_mor]['parent'].value
-        for folder in folder_mors:
-            _i, moid = folder
-            if moid == parent_moid:
-                # Find the dc for the folder
-                dc_mors = filter(lambda x: x[0] == "Datacenter",
-                                 self._inventory)
-                LOG.debug("datacenter MORS %s" % str(dc_mors))
-                # Check if the clusters parent matches any datacenter
-                # if if matches, deduce its not there under any folder
-                for dc in dc_mors:
-                    hostFolder = self._inventory[dc]['hostFolder']
-                    if hostFolder.value == moid:
-                        return False
+        parent_moid = self._objects[clus_mor]['parent'].value
+        # the cluster is not under any folder if its parent is the
+        # hostFolder of a datacenter
+        if ((FOLDER, parent_moid) in self._objects and
+                parent_moid in self._dc_by_host_folder):
+            return False
 
         LOG.warning(("Cluster %s is inside a folder."
                      " so it will be ignored. If you want to activate"
@@ -117,17 +536,13 @@ class VCInventoryCollector(object):
         """
         :return: list of tuples ex :[(domain-c1, cluster_name)]
         """
-        cluster_mors = filter(lambda x: x[0] == "ClusterComputeResource",
-                              self._inventory)
-
         cluster_names = []
-        for cls_mor in cluster_mors:
+        for moid, props in sorted(self._by_type[CLUSTER].items()):
             if (ignore_clusters_in_folders and
-                self.is_cluster_inside_folder(cls_mor)):
+                self.is_cluster_inside_folder((CLUSTER, moid))):
                 continue
 
-            cluster_names.append((cls_mor[1],
-                                  self._inventory[cls_mor]["name"]))
+            cluster_names.append((moid, props["name"]))
 
         return cluster_names
 
@@ -140,37 +555,40 @@ class VCInventoryCollector(object):
         return self.get_datacenter_for_cluster(cluster)
 
     def get_datacenter_for_cluster(self, cluster):
-        folder_mors = filter(lambda x: x[0] == "Folder", self._inventory)
-        parent_moid = self._inventory[cluster]['parent'].value
-        for folder in folder_mors:
-            obj_type, moid = folder
-            if moid == parent_moid:
-                # Find the dc for the folder
-                dc_mors = filter(lambda x: x[0] == "Datacenter",
-                                 self._inventory)
-                dc = None
-                dc_moid = None
-                for dc in dc_mors:
-                    dc_type, dc_moid = dc
-                    hostFolder = self._inventory[dc]['hostFolder']
-                    if hostFolder.value == moid:
-                        break
-
+        """Walks up the folders of the cluster to the hostFolder of its
+        datacenter.
+        """
+        moid = _get_moid(self._objects[cluster].get('parent'))
+        visited = set()
+        while moid is not None and moid not in visited:
+            dc_moid = self._dc_by_host_folder.get(moid)
+            if dc_moid is not None:
                 return {'moid': dc_moid,
-                        'name': self._inventory[dc]['name']
+                        'name': self._objects[(DATACENTER, dc_moid)]['name']
                 }
+            visited.add(moid)
+            moid = _get_moid(self._objects.get((FOLDER, moid), {}).get(
+                'parent'))
 
     def get_vc_inventory(self):
+        """Returns the datacenters with their clusters, rebuilt only when
+        a datacenter, folder or cluster changed.
+        """
+        view = self._vc_inventory_view
+        if view is None or view[0] != self._tree_generation:
+            view = self._vc_inventory_view = (self._tree_generation,
+                                              self._build_vc_inventory())
+        return dict((key, dict(dc, clusters=dict(dc['clusters']))
+                     if isinstance(dc, dict) else dc)
+                    for key, dc in view[1].items())
+
+    def _build_vc_inventory(self):
         data_center = {}
-        dc_mors = filter(lambda x: x[0] == "Datacenter",
-                         self._inventory)
-        cluster_mors = filter(lambda x: x[0] == "ClusterComputeResource",
-                              self._inventory)
-        for cluster_mor in cluster_mors:
-            # cluster_mor is a tuple with type and moid.
-            cluster_moid = cluster_mor[1]
-            cluster_name = self._inventory[cluster_mor]["name"]
-            dc = self.get_datacenter_for_cluster(cluster_mor)
+        for cluster_moid, props in self._by_type[CLUSTER].items():
+            cluster_name = props["name"]
+            dc = self.get_datacenter_for_cluster((CLUSTER, cluster_moid))
+            if not dc:
+                continue
             dc_moid = dc['moid']
             if not data_center.get(dc_moid):
                 data_center[dc_moid] = {}
@@ -184,7 +602,7 @@ class VCInventoryCollector(object):
             data_center[key]["clusters_count"] = len(data_center
                                                      [key]["clusters"].keys())
 
-        data_center['count'] = len(dc_mors)
+        data_center['count'] = len(self._by_type[DATACENTER])
         return data_center
 
     def get_vcenter_inventory(self):
@@ -192,19 +610,11 @@ class VCInventoryCollector(object):
 
     def get_hosts_by_cluster_moid(self, cluster_moid):
         """
-        :param cluster_name: name of the cluster
-        :param vc_hosts_mors: managed objects of all the hosts in vcenter
-        :return:
+        :param cluster_moid: moid of the cluster
+        :return: managed objects of the hosts in the cluster
         """
-        host_mors = filter(lambda x: x[0] == "HostSystem", self._inventory)
-
-        cluster_host_mors = []
-        for x in host_mors:
-            if (self._inventory[x]["parent"].value ==
-                cluster_moid):
-                cluster_host_mors.append(x)
-
-        return cluster_host_mors
+        return sorted(child for child in self._children.get(cluster_moid, ())
+                      if child[0] == HOST)
 
     def get_hosts_for_cluster(self, cls_moid):
         result = {}
@@ -217,14 +627,8 @@ class VCInventoryCollector(object):
             host_details['connection_state'] = \
                 self._inventory[host]['runtime.connectionState']
             host_details["moid"] = host_moid
-            vms = 0
-            try:
-                vm_array_obj = self._inventory[host]['vm']
-                vms = len(vm_array_obj.ManagedObjectReference)
-            except Exception:
-                # Indicates no VMs are present
-                vms = 0
-            host_details['vms'] = vms
+            # the vm property holds the VM count of the host
+            host_details['vms'] = self._inventory[host].get('vm') or 0
             result['hosts'].append(host_details)
 
         return result
@@ -244,25 +648,22 @@ class VCInventoryCollector(object):
         ""
         }
         """
-        inventory = {}
-        cls_mor = None
-        cluster_mors = filter(lambda x: x[0] == "ClusterComputeResource",
-                              self._inventory)
-
-        for cluster_mor in cluster_mors:
-            if cluster_mor[1] == cluster_moid:
-                cls_mor = cluster_mor
-                break
-
+        cls_mor = self.get_cluster_by_moid(cluster_moid)
         if not cls_mor:
             return {}
-        dc = self.get_datacenter_for_cluster(cls_mor)
-        inventory["datacenter"] = dc
-        inventory.update(self.get_hosts_for_cluster(cluster_moid))
-        inventory["DRS"] = (self._inventory[cls_mor]["configurationEx"]
-                            .drsConfig.enabled)
-
-        return inventory
+        # rebuilt when the datacenters/folders, the cluster or its hosts,
+        # including their VM counts, changed
+        generation = (self._tree_generation,
+                      self._cluster_generations[cluster_moid])
+        cached = self._cluster_specs.get(cluster_moid)
+        if cached is None or cached[0] != generation:
+            spec = {}
+            spec["datacenter"] = self.get_datacenter_for_cluster(cls_mor)
+            spec.update(self.get_hosts_for_cluster(cluster_moid))
+            spec["DRS"] = bool(self._inventory[cls_mor].get(
+                "configuration.drsConfig.enabled"))
+            cached = self._cluster_specs[cluster_moid] = (generation, spec)
+        return copy.deepcopy(cached[1])
 
     def wait_for_inventory(self):
         return self.monitor
@@ -273,7 +674,15 @@ class VCInventoryCollector(object):
         session
         """
         self.version = ""
-        self.session._create_session()
+        self.reconnects += 1
+        # re-authenticated for the other users of the pooled session
+        session = session_pool.reconnect(self.session)
+        if session is None:
+            # no longer pooled, logged out when the monitoring stops
+            self.session._create_session()
+        else:
+            self.session = session
+            self.vim = session.vim
         v_util.create_filter(self.vim)
 
     def monitor_property_updates(self):
@@ -282,35 +691,26 @@ class VCInventoryCollector(object):
         """
         LOG.info("Started monitor updates")
         self.version = ""
+        self.monitoring = True
         while self.wait_for_inventory():
             try:
-                updateSet = None
                 LOG.debug("Waiting for inventory updates on vCenter: %s. "
                           % (self._vcenter_data['ip_address']))
-
-                updateSet = v_util.wait_for_updates_ex(self.vim,
-                                                       self.version)
-                if not updateSet:
-                    continue
-
-                current_version = updateSet.version
-                if current_version != self.version:
-                    self._updated_changed_properties(updateSet)
-                    self.version = current_version
-                    LOG.debug("Update version on vCenter (%s) %s" % (
-                        self._vcenter_data['ip_address'], self.version))
-                    time.sleep(20)
+                self._wait_for_updates()
+                self._save_snapshot_if_due()
 
             except vmware_excep.VimConnectionException as e:
                 LOG.error("Connection to vCenter failed."
                           " Retrying...")
-                self._reset_inventory()
+                # not logged in again once the vCenter is removed
+                if self.monitor:
+                    self._reset_inventory()
 
             except vmware_excep.VimFaultException as excep:
                 # If this is due to an inactive session, we should re-create
                 # the session and retry.
-                if (NOT_AUTHENTICATED in excep.fault_list or
-                    INVALID_COLLECTOR in excep.fault_list):
+                if self.monitor and (NOT_AUTHENTICATED in excep.fault_list or
+                                     INVALID_COLLECTOR in excep.fault_list):
                     # in activate session creating new
                     self._reset_inventory()
             except Exception, e:
@@ -318,57 +718,217 @@ class VCInventoryCollector(object):
                            "Error : %s") % e)
                 time.sleep(constants.VCENTER_RECONNECT_INTERVAL)
 
+        self.monitoring = False
         LOG.info(_("Stopped monitoring for vCenter updates"))
-        self.session.logout()
+        # the session is pooled, it is logged out with the pool unless the
+        # pool was removed meanwhile
+        if (self.session is not None and
+                not session_pool.release(self.session)):
+            try:
+                self.session.logout()
+            except Exception as e:
+                LOG.info("Failed to log out of vCenter %s, Error: %s"
+                         % (self._vcenter_data['ip_address'], e))
+
+    def _wait_for_update_set(self):
+        return v_util.wait_for_updates_ex(
+            self.vim, self.version,
+            max_wait=CONF.vmware.inventory_max_wait,
+            max_update_count=CONF.vmware.inventory_max_object_updates)
+
+    def _wait_for_updates(self):
+        """Waits for the next burst of updates and applies it to the
+        cache at once. A burst larger than inventory_max_object_updates
+        is returned truncated and its remaining updates are fetched right
+        away, coalescing the updates of the same objects.
+        """
+        wait_started = time.time()
+        updateSet = self._wait_for_update_set()
+        received = self.polled_at = time.time()
+        if not updateSet or updateSet.version == self.version:
+            return
+        changes = collections.OrderedDict()
+        while updateSet:
+            self._coalesce_updates(updateSet, changes)
+            self.version = updateSet.version
+            if not getattr(updateSet, 'truncated', False):
+                break
+            updateSet = self._wait_for_update_set()
+        self._apply_changes(changes)
+        self.updated_at = received
+
+        # The changes were made by the time the wait returned. If it
+        # returned right away they may have been made since the previous
+        # burst was received, while we were not waiting.
+        since = received
+        if received - wait_started < 1 and self._last_received:
+            since = self._last_received
+        self._last_received = received
+        self._record_lag(time.time() - since, len(changes))
+        LOG.debug("Update version on vCenter (%s) %s" % (
+            self._vcenter_data['ip_address'], self.version))
+
+    def _record_lag(self, lag, objects):
+        stats = self.update_stats
+        stats['batches'] += 1
+        stats['objects'] += objects
+        stats['last_lag'] = lag
+        stats['max_lag'] = max(stats['max_lag'], lag)
+        LOG.debug("Applied updates of %s objects of vCenter %s, lag %.3f "
+                  "seconds" % (objects, self._vcenter_data['ip_address'],
+                               lag))
+
+    def get_update_stats(self):
+        """
+        :return: dict with the number of update batches and objects
+            applied to the cache, and the last and maximum lag (in seconds)
+            between a change in vCenter and the cache applying it
+        """
+        return dict(self.update_stats)
+
+    def estimate_size(self):
+        """Approximates the bytes used by the inventory from the size of up
+        to SIZE_SAMPLE objects of each type.
+        """
+        size = sys.getsizeof(self._objects)
+        seen = {}
+        for mo_type, objects in self._by_type.items():
+            sample = list(itertools.islice(objects.items(), SIZE_SAMPLE))
+            if sample:
+                size += (utils.deep_size(sample, seen) * len(objects) //
+                         len(sample))
+        return size
+
+    def get_health(self):
+        """
+        :return: dict with the object counts by type, the update version,
+            the seconds since the last update applied and since vCenter was
+            last polled for updates, the reconnections, the duration of the
+            initial retrieval and the approximate memory of the inventory
+        """
+        now = time.time()
+
+        def _age(at):
+            return now - at if at is not None else None
+
+        return {
+            'id': self._vcenter_data.get('id'),
+            'name': self._vcenter_data.get('name'),
+            'ip_address': self._vcenter_data['ip_address'],
+            'source': 'snapshot' if self.from_snapshot else 'vcenter',
+            'monitoring': self.monitoring,
+            'objects': dict((mo_type, len(objects)) for mo_type, objects
+                            in self._by_type.items() if objects),
+            'version': self.version,
+            'update_age': _age(self.updated_at),
+            'poll_age': _age(self.polled_at),
+            'reconnects': self.reconnects,
+            'initial_load_seconds': self.load_duration,
+            'memory_bytes': self.estimate_size(),
+            'update_stats': self.get_update_stats(),
+        }
 
     def _updated_changed_properties(self, updateSet):
         if not updateSet:
             return
-        else:
-            pfus = updateSet.filterSet
-            for propertyfilterupdate in pfus:
-                ous = propertyfilterupdate.objectSet
-                for objectupdate in ous:
-                    if objectupdate.kind == "enter"\
-                            or objectupdate.kind == "modify":
-                        self._handle_add_event(objectupdate,
-                                               updateSet.version)
-                    elif objectupdate.kind == "leave":
-                        self._handle_delete_event(objectupdate)
-
-    def _handle_add_event(self, objectupdate, version):
-        vc_inv = self._inventory
-        mor = objectupdate.obj
-        changeSet = objectupdate.changeSet
-        for propertychange in changeSet:
-            if propertychange.op == 'add'\
-                    or propertychange.op == 'assign':
-                if hasattr(propertychange, "name"):
-                    if str(version) is not "0_1":
-                        LOG.debug(('Update received on vCenter %s'
-                                   ' for MOR %s with property %s'
-                                   ' and type %s')
-                                 % (self._vcenter_data['ip_address'],
-                                    (mor._type, mor.value),
-                                    propertychange.name, propertychange.op))
-                    prop_name = propertychange.name
-                    prop_val = getattr(propertychange, "val", 0)
-                    if (mor._type, mor.value) in vc_inv.keys():
-                        vc_inv[(mor._type, mor.value)][prop_name] = prop_val
-                    else:
-                        vc_inv[(mor._type, mor.value)] = {prop_name: prop_val}
-
-    def _handle_delete_event(self, objectupdate):
-        mor = objectupdate.obj
-        LOG.info(('Delete event received on vCenter %(vcenter)s'
-                   'for MOR %(mor)s' %
-                   {'vcenter': self._vcenter_data['ip_address'],
-                    'mor': (mor._type, mor.value)}))
-        if (mor._type, mor.value) in self._inventory.keys():
-            self._inventory.pop((mor._type, mor.value))
-
-    def convert_propset_to_dict(self, propset_list):
+        changes = collections.OrderedDict()
+        self._coalesce_updates(updateSet, changes)
+        self._apply_changes(changes)
+
+    @staticmethod
+    def _coalesce_updates(updateSet, changes):
+        """Merges the object updates of updateSet into changes, a dict of
+        (type, moid) to [kind, {property: value}], keeping only the last
+        value of each property.
+        """
+        for propertyfilterupdate in updateSet.filterSet:
+            for objectupdate in propertyfilterupdate.objectSet:
+                mor = objectupdate.obj
+                key = (mor._type, mor.value)
+                if objectupdate.kind == "leave":
+                    changes[key] = ["leave", None]
+                    continue
+                if objectupdate.kind not in ("enter", "modify"):
+                    continue
+                change = changes.get(key)
+                if change is None:
+                    change = changes[key] = [objectupdate.kind, {}]
+                elif change[0] == "leave":
+                    # left and entered again, drop the stale properties
+                    change = changes[key] = ["replace", {}]
+                for propertychange in objectupdate.changeSet:
+                    if (propertychange.op in ('add', 'assign') and
+                            hasattr(propertychange, "name")):
+                        change[1][propertychange.name] = convert_property(
+                            mor._type, propertychange.name,
+                            getattr(propertychange, "val", 0))
+
+    def _apply_changes(self, changes):
+        events = self._get_cluster_events(changes) if self._subscribers \
+            else []
+        for key, (kind, props) in changes.items():
+            if kind in ("leave", "replace"):
+                LOG.info(('Delete event received on vCenter %(vcenter)s'
+                          'for MOR %(mor)s' %
+                          {'vcenter': self._vcenter_data['ip_address'],
+                           'mor': key}))
+                self._remove_object(key)
+            if kind == "leave":
+                continue
+            LOG.debug(('Update received on vCenter %s for MOR %s with '
+                       'properties %s')
+                      % (self._vcenter_data['ip_address'], key,
+                         props.keys()))
+            for prop_name, prop_val in props.items():
+                self._set_property(key, prop_name, prop_val)
+        if events:
+            self._publish(events)
+
+    def _get_cluster_events(self, changes):
+        """Compares the coalesced changes with the cache to find the
+        clusters that entered, left, were renamed or moved to another
+        folder.
+        """
+        events = []
+        for key, (kind, props) in changes.items():
+            if key[0] != CLUSTER:
+                continue
+            cached = self._objects.get(key)
+            moid = key[1]
+            if kind == "leave":
+                if cached is not None:
+                    events.append(InventoryEvent(CLUSTER_LEFT, moid,
+                                                 cached.get("name"), None))
+            elif cached is None or kind == "replace":
+                events.append(InventoryEvent(CLUSTER_ENTERED, moid,
+                                             props.get("name"), None))
+            elif "name" in props and props["name"] != cached.get("name"):
+                events.append(InventoryEvent(CLUSTER_RENAMED, moid,
+                                             props["name"],
+                                             cached.get("name")))
+            elif ("parent" in props and _get_moid(props["parent"]) !=
+                    _get_moid(cached.get("parent"))):
+                events.append(InventoryEvent(CLUSTER_MOVED, moid,
+                                             cached.get("name"), None))
+        return events
+
+    def _publish(self, events):
+        LOG.info("Inventory events of vCenter %s: %s"
+                 % (self._vcenter_data['ip_address'], events))
+        for callback in self._subscribers:
+            self._pool.spawn_n(self._notify, callback, events)
+
+    def _notify(self, callback, events):
+        try:
+            callback(self._vcenter_data, events)
+        except Exception as e:
+            LOG.exception("Failed to handle the inventory events of vCenter "
+                          "%s, Error: %s"
+                          % (self._vcenter_data['ip_address'], e))
+
+    def convert_propset_to_dict(self, propset_list, mo_type=None):
         propset_dict = {}
         for prop in propset_list:
-            propset_dict[prop.name] = prop.val
+            propset_dict[prop.name] = convert_property(mo_type, prop.name,
+                                                       prop.val)
         return propset_dict
@@ -14,6 +14,7 @@
 # under the License.
 #.
 
+import contextlib
 import copy
 import eventlet
 import logging
@@ -25,6 +26,7 @@ from oslo_config import cfg
 from oslo_vmware import api
 
 from eon.common import exception
+from eon.common import session_pool
 from eon.virt import constants as virt_constants
 from eon.virt.vmware import constants
 from eon.virt.vmware import inventory_collector
@@ -74,6 +76,16 @@ class vCenterManager(object):
     def __init__(self):
         self._pool = eventlet.GreenPool()
         self.registered_vcenters = {}
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Subscribes callback(vcenter_data, events) to the inventory change
+        events of the registered and later registered vCenters.
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+        for _invcollector in self.registered_vcenters.values():
+            _invcollector.subscribe(callback)
 
     def get_session(self, vcenter_data):
         return VMwareAPISession(vcenter_data['ip_address'],
@@ -81,24 +93,34 @@ class vCenterManager(object):
                                 vcenter_data['password'],
                                 host_port=vcenter_data.get("port"))
 
+    def _get_session_pool(self, vcenter_data):
+        ipaddress = vcenter_data['ip_address']
+        username = vcenter_data['username']
+        password = vcenter_data['password']
+        port = vcenter_data.get("port") or CONF.vmware.host_port
+
+        def _connect():
+            return VMwareAPISession(ipaddress, username, password,
+                                    host_port=port)
+
+        def _reconnect(session):
+            session._create_session()
+            return session
+
+        def _create_pool():
+            return session_pool.SessionPool(
+                _connect, lambda s: s.is_current_session_active(),
+                _reconnect, lambda s: s.logout())
+
+        return session_pool.get_pool(session_pool.OSLO_VMWARE, ipaddress,
+                                     port, username, password, _create_pool)
+
     def _get_session(self, vcenter_data):
+        """Returns a pooled session for a caller using it until it calls
+        session_pool.release(session)
+        """
         try:
-            session = None
-            ipaddress = vcenter_data['ip_address']
-            username = vcenter_data['username']
-            password = vcenter_data['password']
-            port = vcenter_data.get("port")
-            _invcollector = self.get_vcenter_inventory_collector(vcenter_data)
-            if _invcollector is None:
-                session = VMwareAPISession(ipaddress, username, password,
-                                           host_port=port)
-            else:
-                if _invcollector.session.is_current_session_active():
-                    return _invcollector.session
-                else:
-                    session = VMwareAPISession(ipaddress, username, password,
-                                               host_port=port)
-            return session
+            return self._get_session_pool(vcenter_data).get()
         except Exception as e:
             msg = (_("Could not login to the vCenter server %s")
                    % (vcenter_data['ip_address']))
@@ -109,9 +131,18 @@ class vCenterManager(object):
             raise exception.VCenterRegisterFailure(reason=msg,
                                                    resolution=resolution)
 
+    @contextlib.contextmanager
+    def _session(self, vcenter_data):
+        """Holds a pooled session for a short operation"""
+        session = self._get_session(vcenter_data)
+        try:
+            yield session
+        finally:
+            session_pool.release(session)
+
     def _get_vcenter_uuid(self, vcenter_data):
-        return self._get_session(vcenter_data).vim. \
-                    service_content.about.instanceUuid
+        with self._session(vcenter_data) as session:
+            return session.vim.service_content.about.instanceUuid
 
     def _get_vcenter_version(self, vcenter_data):
         session = self._get_session(vcenter_data)
@@ -153,9 +184,15 @@ class vCenterManager(object):
                 "is not supported. Please refer to the HPE Helion "
                 "Support Matrix") % (vc_version, vc_build))
             LOG.error(log_msg)
+            session_pool.release(session)
             raise exception.UnsupportedVCenterVersion(err=msg)
         _invcollector = inventory_collector.VCInventoryCollector(
             vcenter_data, session, self._pool)
+        snapshot_collector = self.get_vcenter_inventory_collector(vcenter_data)
+        if snapshot_collector is not None and snapshot_collector.from_snapshot:
+            _invcollector.load_inventory_from(snapshot_collector)
+        for callback in self._subscribers:
+            _invcollector.subscribe(callback)
         self.registered_vcenters[vcenter_data["ip_address"]] = _invcollector
         _invcollector.register_managed_objects(vcenter_data)
         vcenter_data.update({'id': self._get_vcenter_uuid(vcenter_data)})
@@ -174,6 +211,13 @@ class vCenterManager(object):
         """Retrieve vCenter cluster inventory """
         return self.registered_vcenters.get(vcenter_data["ip_address"])
 
+    def get_inventory_health(self):
+        """Returns the health of the inventory collector of each registered
+        vCenter, see VCInventoryCollector.get_health.
+        """
+        return [self.registered_vcenters[ip_address].get_health()
+                for ip_address in sorted(self.registered_vcenters)]
+
     def get_vcenter_info(self, vcenter_data):
         properties = {}
         properties['vcenter_uuid'] = self._get_vcenter_uuid(vcenter_data)
@@ -255,8 +299,21 @@ class vCenterManager(object):
         return (added_clusters, removed_clusters)
 
     def monitor_events(self, vc_data):
+        self._load_inventory_snapshot(vc_data)
         eventlet.spawn_n(self.update_vc_cache, vc_data)
 
+    def _load_inventory_snapshot(self, vc_data):
+        """Registers a collector serving the inventory snapshot of the
+        vCenter until add_vcenter retrieves the inventory again.
+        """
+        vc_creds = self._get_vc_creds(vc_data)
+        if self.get_vcenter_inventory_collector(vc_creds) is not None:
+            return
+        _invcollector = inventory_collector.VCInventoryCollector(
+            vc_creds, None, self._pool)
+        if _invcollector.load_snapshot():
+            self.registered_vcenters[vc_creds["ip_address"]] = _invcollector
+
     def update_vc_cache(self, vc_data):
         while True:
             try:
@@ -286,6 +343,8 @@ class vCenterManager(object):
 
     def delete_vcenter(self, vcenter_data):
         self.logout_vc_session(vcenter_data)
+        session_pool.remove_pools(vcenter_data["ip_address"])
+        inventory_collector.remove_snapshot(vcenter_data["ip_address"])
 
 
 class VMwareAPISession(api.VMwareAPISession):
@@ -18,6 +18,61 @@ from oslo_vmware import vim_util
 
 from eon.virt.vmware import constants
 
+# use cases of the property collector filter specs
+INVENTORY = "inventory"
+INVENTORY_UPDATES = "inventory-updates"
+
+
+class PropertyFilterSpecBuilder(object):
+    """Builds the PropertyFilterSpec collecting the given properties of
+    each managed object type of the whole inventory.
+
+    :param prop_spec_map: dict of managed object type to the list of the
+        property paths to collect, a path may go into a data object
+        e.g. configuration.drsConfig.enabled
+    """
+
+    def __init__(self, prop_spec_map):
+        self.prop_spec_map = dict((type_, list(properties))
+                                  for type_, properties in
+                                  prop_spec_map.items())
+
+    def build(self, vim):
+        client_factory = vim.client.factory
+        recur_trav_spec = vim_util.build_recursive_traversal_spec(
+            client_factory)
+        object_specs = vim_util.build_object_spec(
+            client_factory, vim.service_content.rootFolder,
+            [recur_trav_spec])
+        property_specs = [
+            vim_util.build_property_spec(client_factory, type_=type_,
+                                         properties_to_collect=properties)
+            for type_, properties in sorted(self.prop_spec_map.items())]
+        return vim_util.build_property_filter_spec(
+            client_factory, property_specs=property_specs,
+            object_specs=object_specs)
+
+
+_FILTER_SPEC_BUILDERS = {}
+
+
+def register_filter_spec_builder(use_case, builder):
+    """Registers the builder of the filter spec of a use case, replacing
+    the previous one. A builder has a build(vim) method.
+    """
+    _FILTER_SPEC_BUILDERS[use_case] = builder
+
+
+def get_filter_spec_builder(use_case):
+    return _FILTER_SPEC_BUILDERS[use_case]
+
+
+register_filter_spec_builder(
+    INVENTORY, PropertyFilterSpecBuilder(constants.prop_spec_map))
+register_filter_spec_builder(
+    INVENTORY_UPDATES,
+    PropertyFilterSpecBuilder(constants.update_prop_spec_map))
+
 
 def create_data_object(client_factory, spec_name, **kwargs):
     factory = client_factory.create('ns0:%s' % spec_name)
@@ -41,9 +96,8 @@ def _create_filter(vim, propertyFilterSpec, collector=None):
                              partialUpdates=False)
 
 
-def create_filter(vim):
-    prop_spec_map = constants.prop_spec_map
-    property_filter_spec = _get_property_filter_spec(vim, prop_spec_map)
+def create_filter(vim, use_case=INVENTORY_UPDATES):
+    property_filter_spec = get_filter_spec_builder(use_case).build(vim)
     _create_filter(vim, property_filter_spec)
 
 
@@ -73,32 +127,47 @@ def wait_for_updates_ex(vim,
 
 def _get_property_filter_spec(vim, prop_spec_map=None):
     if not prop_spec_map:
-        prop_spec_map = constants.prop_spec_map
-
-    client_factory = vim.client.factory
-    recur_trav_spec = vim_util.build_recursive_traversal_spec(client_factory)
-    # Build the object spec
-    object_spec = vim_util.build_object_spec(client_factory,
-                                    vim.service_content.rootFolder,
-                                    [recur_trav_spec])
-    # Build property spec
-    propertySpecList = []
-    for prop_spec in prop_spec_map:
-        propertySpec = vim_util.build_property_spec(client_factory,
-                                type_=prop_spec,
-                                properties_to_collect=prop_spec_map[prop_spec])
-        propertySpecList.append(propertySpec)
-
-    return vim_util.build_property_filter_spec(client_factory,
-                                               property_specs=propertySpecList,
-                                               object_specs=object_spec)
+        return get_filter_spec_builder(INVENTORY).build(vim)
+    return PropertyFilterSpecBuilder(prop_spec_map).build(vim)
 
 
-def retreive_vcenter_inventory(vim, prop_spec_map=None, max_objects=500):
-    """gets the inventory for a vCenter."""
-    property_filter_spec = _get_property_filter_spec(vim, prop_spec_map)
+def _retrieve_properties_ex(vim, property_filter_spec, max_objects):
     options = vim.client.factory.create('ns0:RetrieveOptions')
     options.maxObjects = max_objects
     return vim.RetrievePropertiesEx(vim.service_content.propertyCollector,
                                     specSet=[property_filter_spec],
                                     options=options)
+
+
+def retreive_vcenter_inventory(vim, prop_spec_map=None, max_objects=500):
+    """gets the inventory for a vCenter."""
+    property_filter_spec = _get_property_filter_spec(vim, prop_spec_map)
+    return _retrieve_properties_ex(vim, property_filter_spec, max_objects)
+
+
+def iter_vcenter_inventory(vim, prop_spec_map=None, max_objects=500):
+    """Retrieves the inventory for a vCenter page by page, following the
+    continuation tokens of RetrievePropertiesEx.
+
+    :return: generator of the lists of ObjectContent of each page
+    """
+    result = retreive_vcenter_inventory(vim, prop_spec_map, max_objects)
+    return _iter_pages(vim, result)
+
+
+def _iter_pages(vim, result):
+    collector = vim.service_content.propertyCollector
+    token = None
+    try:
+        while result:
+            token = getattr(result, 'token', None)
+            yield getattr(result, 'objects', [])
+            if not token:
+                break
+            token, next_token = None, token
+            result = vim.ContinueRetrievePropertiesEx(collector,
+                                                      token=next_token)
+    finally:
+        # the consumer stopped early, release the pending results
+        if token:
+            vim.CancelRetrievePropertiesEx(collector, token=token)
@@ -0,0 +1,109 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+"""Compares the requests to hlm ux services opening a connection each, as
+they used to, with the requests of eon.hlm_facade.http_requests sharing the
+keep-alive connections of a session, against a local stand-in server.
+
+    python tools/hlm_facade_http_benchmark.py [--requests 500]
+"""
+
+import argparse
+import BaseHTTPServer
+import json
+import SocketServer
+import threading
+import time
+
+import requests
+
+from eon.hlm_facade import http_requests
+
+RESPONSE = json.dumps({"id": "server-1", "role": "ESX-COMPUTE-ROLE",
+                       "ip-addr": "10.1.1.1", "server-group": "RACK1"})
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # keep the connections alive
+    protocol_version = "HTTP/1.1"
+    # send the response at once rather than line by line, which delays
+    # the next request on a kept alive connection
+    wbufsize = -1
+
+    def _respond(self):
+        length = int(self.headers.getheader("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def _unpooled_get(url):
+    # what http_requests did for each request
+    resp = requests.request("GET", url,
+                            headers={"Content-Type": "application/json",
+                                     "Accept": "application/json"})
+    return resp.json()
+
+
+def _time(func, url, count):
+    t = time.time()
+    for _ in range(count):
+        func(url)
+    return time.time() - t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    server = _Server(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = "http://127.0.0.1:%d/api/v2/model/entities/servers" % (
+        server.server_address[1])
+    try:
+        # warm up
+        _unpooled_get(url)
+        http_requests.get(url)
+        unpooled = _time(_unpooled_get, url, args.requests)
+        pooled = _time(http_requests.get, url, args.requests)
+    finally:
+        server.shutdown()
+        http_requests.reset_session()
+    print("%d GET requests" % args.requests)
+    print("connection per request: %7.1f ms/request"
+          % (unpooled * 1000 / args.requests))
+    print("pooled session:         %7.1f ms/request (%.1fx faster)"
+          % (pooled * 1000 / args.requests, unpooled / pooled))
+
+
+if __name__ == "__main__":
+    main()
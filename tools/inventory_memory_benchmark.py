@@ -0,0 +1,161 @@
+#
+# (c) Copyright 2015-2017 Hewlett Packard Enterprise Development Company LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+
+"""Compares the memory footprint of the vCenter inventory cache holding the
+raw suds property values with the converted one, on a synthetic inventory.
+The raw inventory has the configurationEx of the clusters that used to be
+retrieved.
+
+    python tools/inventory_memory_benchmark.py [--hosts 5000]
+"""
+
+import argparse
+import time
+
+from suds import sudsobject
+
+from eon.common.utils import deep_size
+from eon.virt.vmware import inventory_collector
+
+
+def _mor(mo_type, moid):
+    mor = sudsobject.Property(moid)
+    mor._type = mo_type
+    return mor
+
+
+def _mor_array(mo_type, moids):
+    array = sudsobject.Object()
+    array.ManagedObjectReference = [_mor(mo_type, moid) for moid in moids]
+    return array
+
+
+def _cluster_config(vm_moids):
+    drs_config = sudsobject.Object()
+    drs_config.enabled = True
+    drs_config.enableVmBehaviorOverrides = True
+    drs_config.defaultVmBehavior = "fullyAutomated"
+    drs_config.vmotionRate = 3
+    config = sudsobject.Object()
+    config.drsConfig = drs_config
+    config.dasConfig = sudsobject.Object()
+    config.dasConfig.enabled = True
+    config.dasConfig.admissionControlEnabled = True
+    config.drsVmConfig = []
+    for moid in vm_moids:
+        vm_config = sudsobject.Object()
+        vm_config.key = _mor("VirtualMachine", moid)
+        vm_config.enabled = True
+        vm_config.behavior = "manual"
+        config.drsVmConfig.append(vm_config)
+    return config
+
+
+def build_inventory(hosts, hosts_per_cluster=20, vms_per_host=20,
+                    datastores_per_cluster=4, derived=False):
+    """Returns the inventory as retrieved from vCenter, (type, moid) to
+    the dict of the raw property values.
+
+    :param derived: retrieve the DRS flag instead of the configurationEx of
+        the clusters
+    """
+    inventory = {}
+    inventory[("Datacenter", "datacenter-1")] = {
+        "name": "dc1",
+        "hostFolder": _mor("Folder", "group-h1"),
+        "networkFolder": _mor("Folder", "group-n1")}
+    clusters = (hosts + hosts_per_cluster - 1) // hosts_per_cluster
+    inventory[("Folder", "group-h1")] = {
+        "name": "host",
+        "childEntity": _mor_array("ClusterComputeResource",
+                                  ["domain-c%d" % c for c in range(clusters)])}
+    for c in range(clusters):
+        host_moids = ["host-%d" % h for h in
+                      range(c * hosts_per_cluster,
+                            min(hosts, (c + 1) * hosts_per_cluster))]
+        ds_moids = ["datastore-%d-%d" % (c, d)
+                    for d in range(datastores_per_cluster)]
+        cluster = {
+            "name": "cluster-%d" % c,
+            "parent": _mor("Folder", "group-h1"),
+            "host": _mor_array("HostSystem", host_moids),
+            "datastore": _mor_array("Datastore", ds_moids),
+            "summary.totalMemory": 1024 ** 4}
+        if derived:
+            cluster["configuration.drsConfig.enabled"] = True
+        else:
+            cluster["configurationEx"] = _cluster_config(
+                ["vm-%s-0" % moid for moid in host_moids])
+        inventory[("ClusterComputeResource", "domain-c%d" % c)] = cluster
+        for ds_moid in ds_moids:
+            mounts = sudsobject.Object()
+            mounts.DatastoreHostMount = []
+            for host_moid in host_moids:
+                mount = sudsobject.Object()
+                mount.key = _mor("HostSystem", host_moid)
+                mount.mountInfo = sudsobject.Object()
+                mount.mountInfo.path = "/vmfs/volumes/%s" % ds_moid
+                mount.mountInfo.accessMode = "readWrite"
+                mount.mountInfo.accessible = True
+                mounts.DatastoreHostMount.append(mount)
+            inventory[("Datastore", ds_moid)] = {
+                "name": ds_moid,
+                "host": mounts,
+                "summary.capacity": 1024 ** 4,
+                "summary.freeSpace": 1024 ** 3,
+                "summary.accessible": True}
+        for host_moid in host_moids:
+            inventory[("HostSystem", host_moid)] = {
+                "name": "%s.example.com" % host_moid,
+                "parent": _mor("ClusterComputeResource", "domain-c%d" % c),
+                "runtime.connectionState": "connected",
+                "vm": _mor_array("VirtualMachine",
+                                 ["vm-%s-%d" % (host_moid, v)
+                                  for v in range(vms_per_host)])}
+    return inventory
+
+
+def convert_inventory(inventory):
+    return dict((key, dict((name, inventory_collector.convert_property(
+                               key[0], name, value))
+                           for name, value in props.items()))
+                for key, props in inventory.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=5000)
+    parser.add_argument("--vms-per-host", type=int, default=20)
+    args = parser.parse_args()
+
+    inventory = build_inventory(args.hosts, vms_per_host=args.vms_per_host)
+    retrieved = build_inventory(args.hosts, vms_per_host=args.vms_per_host,
+                                derived=True)
+    t = time.time()
+    converted = convert_inventory(retrieved)
+    elapsed = time.time() - t
+    raw_size = deep_size(inventory)
+    converted_size = deep_size(converted)
+    print("%d objects, %d hosts, %d VMs per host"
+          % (len(inventory), args.hosts, args.vms_per_host))
+    print("raw suds values:  %8.1f MiB" % (raw_size / 1024.0 ** 2))
+    print("converted values: %8.1f MiB (%.1fx smaller, converted in %.2f "
+          "seconds)" % (converted_size / 1024.0 ** 2,
+                        float(raw_size) / converted_size, elapsed))
+
+
+if __name__ == "__main__":
+    main()